@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import AIProvider, Container, Script, Execution
+from .models import (
+    AIProvider, Container, Script, Execution, ExecutionBatch, RenderCacheEntry, DependencyRequest,
+    DebugSignature, DebugFix
+)
 
 @admin.register(AIProvider)
 class AIProviderAdmin(admin.ModelAdmin):
@@ -12,6 +15,7 @@ class ContainerAdmin(admin.ModelAdmin):
     list_display = ('name', 'image', 'is_running', 'is_active', 'last_checked')
     list_filter = ('is_running', 'is_active')
     search_fields = ('name', 'image')
+    readonly_fields = ('installed_packages',)
     
     actions = ['check_container_status']
     
@@ -41,21 +45,54 @@ class ScriptAdmin(admin.ModelAdmin):
     actions = ['execute_script']
     
     def execute_script(self, request, queryset):
-        from .agents.execution_agent import ManimExecutionAgent
-        execution_agent = ManimExecutionAgent()
+        from .agents.queue_agent import RenderQueueAgent
         
-        executed = 0
-        for script in queryset:
-            execution_agent.execute(script)
-            executed += 1
+        # Render workers pick the batch up - nothing renders inside the admin request
+        batch = RenderQueueAgent().enqueue_batch(list(queryset))
         
-        self.message_user(request, f"Execution triggered for {executed} scripts.")
+        self.message_user(request, f"Queued {batch.executions.count()} scripts as batch {batch.id}.")
     
-    execute_script.short_description = "Execute selected scripts"
+    execute_script.short_description = "Queue selected scripts for execution"
 
 @admin.register(Execution)
 class ExecutionAdmin(admin.ModelAdmin):
-    list_display = ('id', 'script', 'attempt_number', 'is_successful', 'started_at', 'completed_at')
-    list_filter = ('is_successful',)
+    list_display = ('id', 'script', 'status', 'quality', 'attempt_number', 'is_successful', 'is_cached', 'termination_reason', 'started_at', 'completed_at')
+    list_filter = ('status', 'quality', 'is_successful', 'is_cached', 'termination_reason', 'error_category')
     search_fields = ('id', 'script__id', 'error')
-    readonly_fields = ('id', 'script', 'started_at', 'completed_at', 'original_script', 'modified_script')
+    readonly_fields = ('id', 'script', 'source_execution', 'renditions', 'smoke_runs', 'smoke_seconds', 'render_seconds', 'api_migrations', 'started_at', 'completed_at', 'original_script', 'modified_script')
+
+@admin.register(ExecutionBatch)
+class ExecutionBatchAdmin(admin.ModelAdmin):
+    list_display = ('id', 'max_concurrency', 'progress', 'created_at')
+    readonly_fields = ('id', 'created_at')
+    
+    def progress(self, obj):
+        progress = obj.get_progress()
+        return f"{progress['succeeded']} succeeded, {progress['failed']} failed of {progress['total']}"
+
+@admin.register(RenderCacheEntry)
+class RenderCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('key', 'scene_class', 'quality', 'size_bytes', 'hit_count', 'last_used_at')
+    list_filter = ('quality',)
+    search_fields = ('key', 'scene_class')
+    readonly_fields = ('key', 'created_at', 'last_used_at')
+
+@admin.register(DependencyRequest)
+class DependencyRequestAdmin(admin.ModelAdmin):
+    list_display = ('distribution', 'import_name', 'request_count', 'is_promoted', 'last_requested_at')
+    list_filter = ('is_promoted',)
+    search_fields = ('distribution', 'import_name')
+    readonly_fields = ('created_at', 'last_requested_at', 'promoted_at')
+
+@admin.register(DebugSignature)
+class DebugSignatureAdmin(admin.ModelAdmin):
+    list_display = ('key', 'category', 'exception', 'message', 'lookups', 'hits', 'successes', 'failures', 'last_seen_at')
+    list_filter = ('category',)
+    search_fields = ('key', 'exception', 'message', 'source_line')
+    readonly_fields = ('key', 'created_at', 'last_seen_at')
+
+@admin.register(DebugFix)
+class DebugFixAdmin(admin.ModelAdmin):
+    list_display = ('diff_hash', 'signature', 'applied_count', 'successes', 'failures', 'last_used_at')
+    search_fields = ('diff_hash', 'signature__key', 'diff')
+    readonly_fields = ('signature', 'diff_hash', 'created_at', 'last_used_at')
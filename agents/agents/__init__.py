@@ -7,4 +7,6 @@ from .base_agent import BaseAgent
 from .ai_agent import AIScriptGenerationAgent, AIScriptDebuggingAgent
 from .docker_agent import DockerAgent
 from .execution_agent import ManimExecutionAgent
-from .dependency_agent import DependencyAgent 
\ No newline at end of file
+from .dependency_agent import DependencyAgent 
+from .queue_agent import RenderQueueAgent
+from .container_pool import ContainerPoolAgent
\ No newline at end of file
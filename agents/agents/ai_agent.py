@@ -1,21 +1,121 @@
 import os
+import ast
+import copy
+import time
 import traceback
-import google.generativeai as genai
-from openai import AzureOpenAI
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from django.conf import settings
+from django.db import close_old_connections
 from .base_agent import BaseAgent
+from .prompt_cache import PromptCacheAgent
+from .provider_clients import provider_clients
+from .scene_analysis import find_scene_classes
+from .error_classifier import classify_error, trim_error
+from .api_migrations import migrate_script
+from .fix_cache import FixCacheAgent
+from .patching import number_lines, apply_patch, strip_fences
+from .script_stream import ScriptStreamParser
+
+def close_response(response):
+    """
+    Close a streamed provider response, which cancels its HTTP request.
+    A Gemini response has no close() of its own; the gRPC or REST stream
+    it reads its chunks from is cancelled instead.
+    """
+    for target in (response, getattr(response, '_iterator', None)):
+        for method in ('close', 'cancel'):
+            if callable(getattr(target, method, None)):
+                try:
+                    getattr(target, method)()
+                except Exception:
+                    pass
+                return
+
+
+class HedgedCall:
+    """
+    Cancellation handle of one provider call of a hedged generation.
+    The call registers its streamed response; cancel() closes it, so a call
+    that lost the race stops generating instead of running to completion.
+    """
+    
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._response = None
+    
+    def attach(self, response):
+        """Register the streamed response of the call, closing it if the call is already cancelled"""
+        with self._lock:
+            self._response = response
+            cancelled = self.cancelled.is_set()
+        if cancelled:
+            close_response(response)
+    
+    def cancel(self):
+        """Cancel the call and close its response"""
+        with self._lock:
+            self.cancelled.set()
+            response = self._response
+        if response is not None:
+            close_response(response)
+
 
 class AIScriptGenerationAgent(BaseAgent):
     """
     Agent responsible for generating animation scripts using AI providers.
     Supports multiple AI providers including Gemini and Azure OpenAI.
+    
+    In hedged mode the prompt also goes to the next providers by priority
+    once the first one is slower than its recent p95 latency (or right away
+    for premium requests); the first script that passes preflight wins.
+    
+    Completions are streamed and checked as they arrive: prose, markdown or
+    a syntax error cancels the stream and the prompt is sampled again. Once
+    the imports and the scene class header are in, a container and the Manim
+    API index are warmed up and the header is pre-flight checked, while the
+    rest of the script is still being generated.
     """
     
+    # Sampling temperature for script generation
+    GENERATION_TEMPERATURE = 0.7
+    
+    # Container and Manim API index warm-up shared by the agents of this process
+    _warmup_lock = threading.Lock()
+    _warmup_thread = None
+    _last_warmup = 0.0
+    
     def __init__(self, debug=False):
         """Initialize the AI Script Generation Agent"""
         super().__init__(debug)
+        self.prompt_cache = PromptCacheAgent(debug)
+        
+        # Tokens reported by the provider for the most recent call
+        self.last_token_usage = 0
+        
+        # Hedged generation across providers
+        self.hedging_enabled = getattr(settings, 'AI_HEDGED_GENERATION', False)
+        self.hedge_max_providers = getattr(settings, 'AI_HEDGE_MAX_PROVIDERS', 2)
+        
+        # The hedge fires after the primary's latency percentile, or the fixed delay
+        # until the primary has AI_HEDGE_MIN_SAMPLES recorded calls
+        self.hedge_percentile = getattr(settings, 'AI_HEDGE_PERCENTILE', 95)
+        self.hedge_delay = getattr(settings, 'AI_HEDGE_DELAY', 10.0)
+        self.hedge_min_samples = getattr(settings, 'AI_HEDGE_MIN_SAMPLES', 20)
+        self.hedge_timeout = getattr(settings, 'AI_HEDGE_TIMEOUT', 120)
+        
+        # Streamed generation, resampled when the stream turns out not to be code
+        self.streaming_enabled = getattr(settings, 'AI_STREAMING_GENERATION', True)
+        self.stream_max_resamples = getattr(settings, 'AI_STREAM_MAX_RESAMPLES', 2)
+        
+        # Seconds during which another warm-up of the pool and the API index is skipped
+        self.warmup_ttl = getattr(settings, 'AI_STREAM_WARMUP_TTL', 30)
+        
+        # Cancellation handle when this agent runs one call of a hedged generation
+        self._hedged_call = None
     
-    def generate(self, prompt, provider=None):
+    def generate(self, prompt, provider=None, hedged=None, premium=False):
         """
         Generate a Manim script using the specified AI provider
         
@@ -23,6 +123,9 @@ class AIScriptGenerationAgent(BaseAgent):
             prompt (str): Description of the animation to create
             provider (str/AIProvider, optional): Provider to use or name/ID of a provider.
                                                 If None, uses first available provider.
+            hedged (bool, optional): Race the next providers by priority against the first one.
+                                     Defaults to AI_HEDGED_GENERATION; ignored when a provider is given.
+            premium (bool, optional): Send a hedged prompt to every provider at once
         
         Returns:
             dict: Result with script content, provider, and success flag
@@ -40,6 +143,20 @@ class AIScriptGenerationAgent(BaseAgent):
                 "provider": None
             }
         
+        # Reuse a script that already rendered for the same or a near-identical prompt
+        model_name = self._get_model_name(provider_obj)
+        prompt_key = self.prompt_cache.make_key(prompt, provider_obj, model_name, self.GENERATION_TEMPERATURE)
+        cached_script, cache_tier, similarity = self.prompt_cache.lookup(prompt, prompt_key, provider_obj, model_name)
+        if cached_script:
+            return {
+                "success": True,
+                "script": cached_script.content,
+                "provider": provider_obj,
+                "script_obj": cached_script,
+                "cache_hit": cache_tier,
+                "similarity": similarity
+            }
+        
         # Craft a specialized prompt for animation generation
         manim_prompt = f"""
         Create a Manim animation script based on this description: "{prompt}"
@@ -55,26 +172,27 @@ class AIScriptGenerationAgent(BaseAgent):
         DO NOT include ```python or ``` markers around the code. Just give me the pure Python code.
         """
         
+        hedge_providers = []
+        if (self.hedging_enabled if hedged is None else hedged) and provider is None:
+            hedge_providers = self._get_hedge_providers(provider_obj)
+        
         try:
-            # Generate script using the appropriate provider
-            provider_type = provider_obj.provider_type if hasattr(provider_obj, 'provider_type') else provider_obj
-            
-            if provider_type == 'gemini':
-                script = self._generate_with_gemini(manim_prompt, provider_obj)
-            elif provider_type == 'azure_openai':
-                script = self._generate_with_azure_openai(manim_prompt, provider_obj)
+            if hedge_providers:
+                script, provider_obj = self._generate_hedged(manim_prompt, [provider_obj] + hedge_providers, premium)
+                model_name = self._get_model_name(provider_obj)
+                prompt_key = self.prompt_cache.make_key(prompt, provider_obj, model_name, self.GENERATION_TEMPERATURE)
             else:
-                raise ValueError(f"Unsupported provider type: {provider_type}")
-            
+                script = self._call_provider(manim_prompt, provider_obj)
             
             # Create Script record in database if within Django context
-            script_obj = self._create_script_record(prompt, script, provider_obj)
+            script_obj = self._create_script_record(prompt, script, provider_obj, prompt_key, model_name)
             
             return {
                 "success": True,
                 "script": script,
                 "provider": provider_obj,
-                "script_obj": script_obj
+                "script_obj": script_obj,
+                "cache_hit": None
             }
             
         except Exception as e:
@@ -90,6 +208,162 @@ class AIScriptGenerationAgent(BaseAgent):
                 "provider": provider_obj
             }
     
+    def _call_provider(self, prompt, provider):
+        """
+        Generate script text with a provider
+        
+        Args:
+            prompt (str): The full generation prompt
+            provider (AIProvider/str): The provider configuration
+            
+        Returns:
+            str: Generated script text
+        """
+        provider_type = provider.provider_type if hasattr(provider, 'provider_type') else provider
+        
+        if self.streaming_enabled and provider_type in ('gemini', 'azure_openai'):
+            return self._generate_streaming(prompt, provider, provider_type)
+        if provider_type == 'gemini':
+            return self._generate_with_gemini(prompt, provider)
+        elif provider_type == 'azure_openai':
+            return self._generate_with_azure_openai(prompt, provider)
+        raise ValueError(f"Unsupported provider type: {provider_type}")
+    
+    def _generate_hedged(self, prompt, providers, premium=False):
+        """
+        Race providers for the same prompt
+        
+        The first provider starts right away; each next one starts when every
+        running call has been slower than the hedge delay or has failed. The
+        first script that passes preflight wins. Calls still running are
+        cancelled: they always stream, and their responses are closed. Each
+        generation runs its calls on its own threads, which end with them.
+        
+        Args:
+            prompt (str): The full generation prompt
+            providers (list): Providers in priority order, the primary first
+            premium (bool, optional): Start every provider at once
+            
+        Returns:
+            tuple: (script, provider) of the winner
+        """
+        # Import here to avoid circular imports
+        from .preflight import PreflightAgent
+        preflight = PreflightAgent(self.debug)
+        
+        pending = {}
+        calls = []
+        waiting = list(providers)
+        fallback = None
+        errors = []
+        deadline = time.monotonic() + self.hedge_timeout
+        executor = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix='ai-hedge')
+        
+        def launch():
+            candidate = waiting.pop(0)
+            # Each call gets its own copy so token usage is not shared between threads
+            worker = copy.copy(self)
+            worker._hedged_call = HedgedCall()
+            calls.append(worker._hedged_call)
+            pending[executor.submit(worker._generate_candidate, prompt, candidate, preflight)] = candidate
+            self.log_info(f"Hedged generation: started {candidate}")
+        
+        try:
+            launch()
+            while premium and waiting:
+                launch()
+            
+            while pending:
+                delay = self._hedge_delay(providers[0]) if waiting else None
+                remaining = max(0.0, deadline - time.monotonic())
+                done, _ = wait(pending, timeout=min(delay, remaining) if delay is not None else remaining,
+                               return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    candidate = pending.pop(future)
+                    try:
+                        script, tokens, passed = future.result()
+                    except Exception as e:
+                        errors.append(f"{candidate}: {str(e)}")
+                        self.log_warning(f"Hedged generation: {candidate} failed: {str(e)}")
+                        continue
+                    
+                    if passed:
+                        self.last_token_usage = tokens
+                        self.log_info(f"Hedged generation: {candidate} won")
+                        return script, candidate
+                    
+                    # Keep the first script that failed preflight in case no provider does better
+                    self.log_info(f"Hedged generation: script from {candidate} failed preflight")
+                    fallback = fallback or (script, tokens, candidate)
+                
+                if time.monotonic() >= deadline:
+                    break
+                
+                # Hedge when the running calls are slow, or when a call failed and nothing is running
+                if waiting and (not done or not pending):
+                    launch()
+        finally:
+            # Losing calls stop generating instead of running to completion
+            for call in calls:
+                call.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        if fallback:
+            script, tokens, candidate = fallback
+            self.last_token_usage = tokens
+            return script, candidate
+        raise RuntimeError("Every provider failed: " + "; ".join(errors) if errors else "Hedged generation timed out")
+    
+    def _generate_candidate(self, prompt, provider, preflight):
+        """
+        Generate a script with one provider and validate it - runs in a hedge thread
+        
+        The completion is streamed whatever AI_STREAMING_GENERATION says, so
+        the call can be cancelled when another provider wins.
+        
+        Returns:
+            tuple: (script, tokens, passed_preflight)
+        """
+        provider_type = provider.provider_type if hasattr(provider, 'provider_type') else provider
+        if provider_type in ('gemini', 'azure_openai'):
+            script = self._generate_streaming(prompt, provider, provider_type)
+        else:
+            script = self._call_provider(prompt, provider)
+        result = preflight.check(self._clean_script(script))
+        return script, self.last_token_usage, result["success"]
+    
+    def _hedge_delay(self, provider):
+        """Seconds to wait for a provider before hedging - its recent latency percentile"""
+        recorded = provider_clients.latency_percentile(
+            self._get_provider_id(provider), self.hedge_percentile, self.hedge_min_samples
+        )
+        return recorded if recorded is not None else self.hedge_delay
+    
+    def _get_hedge_providers(self, primary):
+        """
+        Active providers after the primary by priority, to hedge generation with
+        
+        Args:
+            primary (AIProvider): Provider the prompt goes to first
+            
+        Returns:
+            list: Up to AI_HEDGE_MAX_PROVIDERS - 1 providers
+        """
+        if not hasattr(primary, 'pk'):
+            return []
+        
+        try:
+            from ..models import AIProvider as AIProviderModel
+            return list(
+                AIProviderModel.objects.filter(is_active=True)
+                .exclude(pk=primary.pk)
+                .order_by('priority')[:max(0, self.hedge_max_providers - 1)]
+            )
+        except Exception as e:
+            self.log_debug(f"Could not load hedge providers: {str(e)}")
+            return []
+    
     def _generate_with_gemini(self, prompt, provider):
         """
         Generate script using Google's Gemini model
@@ -108,19 +382,20 @@ class AIScriptGenerationAgent(BaseAgent):
         if not api_key:
             raise ValueError("No Gemini API key available")
         
-        # Configure Gemini
-        genai.configure(api_key=api_key)
-        
-        # Call Gemini API
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt)
+        # Call Gemini API on the shared model handle
+        model = provider_clients.get_gemini(self._get_provider_id(provider), api_key, model_name)
+        response = model.call(model.client.generate_content, prompt)
         
         # Extract the text from the response
         if hasattr(response, 'text'):
-            return response.text
+            text = response.text
         else:
             # Handle different response formats
-            return str(response.candidates[0].content.parts[0].text)
+            text = str(response.candidates[0].content.parts[0].text)
+        
+        usage = getattr(response, 'usage_metadata', None)
+        self.last_token_usage = getattr(usage, 'total_token_count', 0) or self._estimate_tokens(prompt, text)
+        return text
     
     def _generate_with_azure_openai(self, prompt, provider):
         """
@@ -141,25 +416,240 @@ class AIScriptGenerationAgent(BaseAgent):
         if not api_key or not endpoint:
             raise ValueError("Azure OpenAI credentials not available")
         
-        # Configure Azure OpenAI client
-        client = AzureOpenAI(
-            api_key=api_key,
-            api_version="2023-07-01-preview",
-            azure_endpoint=endpoint
-        )
+        # Shared Azure OpenAI client - reuses its connection pool
+        client = provider_clients.get_azure_openai(self._get_provider_id(provider), api_key, endpoint)
         
         # Call Azure OpenAI API
-        response = client.chat.completions.create(
+        response = client.call(
+            client.client.chat.completions.create,
             model=deployment,
             messages=[
                 {"role": "system", "content": "You are an expert Manim developer who creates beautiful animations."},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.7,
+            temperature=self.GENERATION_TEMPERATURE,
             max_tokens=4000
         )
         
-        return response.choices[0].message.content
+        text = response.choices[0].message.content
+        usage = getattr(response, 'usage', None)
+        self.last_token_usage = getattr(usage, 'total_tokens', 0) or self._estimate_tokens(prompt, text)
+        return text
+    
+    def _generate_streaming(self, prompt, provider, provider_type):
+        """
+        Generate a script from a streamed completion, checking it as it arrives
+        
+        A stream that turns into prose, markdown or invalid Python is cancelled
+        and the prompt sampled again, up to AI_STREAM_MAX_RESAMPLES times; the
+        last sample is kept whatever it contains. A closing code fence or prose
+        after a complete scene ends the stream early.
+        
+        Args:
+            prompt (str): The full generation prompt
+            provider (AIProvider/str): The provider configuration
+            provider_type (str): 'gemini' or 'azure_openai'
+            
+        Returns:
+            str: Generated script text
+        """
+        stream_method = self._stream_with_gemini if provider_type == 'gemini' else self._stream_with_azure_openai
+        tokens = 0
+        warmed_up = False
+        
+        for sample in range(self.stream_max_resamples + 1):
+            last_sample = sample == self.stream_max_resamples
+            parser = ScriptStreamParser()
+            self.last_token_usage = 0
+            
+            stream = stream_method(prompt, provider)
+            try:
+                for chunk in stream:
+                    if self._hedged_call and self._hedged_call.cancelled.is_set():
+                        raise RuntimeError("Cancelled, another provider won the hedged generation")
+                    rejection = parser.feed(chunk)
+                    if parser.header and not warmed_up:
+                        warmed_up = True
+                        self._start_warmup(parser.header)
+                    if parser.complete or (rejection and not last_sample):
+                        break
+                else:
+                    rejection = parser.finish()
+            finally:
+                stream.close()
+            
+            # Cancelled streams report no usage, estimate what was received
+            tokens += self.last_token_usage or self._estimate_tokens(prompt, parser.text)
+            if not rejection or last_sample:
+                break
+            self.log_warning(f"Streamed generation from {provider} rejected ({rejection}), resampling")
+        
+        self.last_token_usage = tokens
+        return parser.text if parser.rejection else parser.script()
+    
+    def _stream_with_gemini(self, prompt, provider):
+        """
+        Stream a script from Google's Gemini model
+        
+        Args:
+            prompt (str): The prompt to send to Gemini
+            provider (AIProvider/dict): The provider configuration
+        
+        Yields:
+            str: Text chunks as they arrive; last_token_usage is set once the stream is complete
+        """
+        api_key = self._get_provider_credential(provider, 'api_key', settings.GEMINI_API_KEY)
+        model_name = self._get_provider_credential(provider, 'model_name', 'gemini-2.5-flash-preview-04-17')
+        
+        if not api_key:
+            raise ValueError("No Gemini API key available")
+        
+        model = provider_clients.get_gemini(self._get_provider_id(provider), api_key, model_name)
+        started = time.monotonic()
+        text = ""
+        response = None
+        try:
+            response = model.client.generate_content(prompt, stream=True)
+            self._attach_response(response)
+            for chunk in response:
+                try:
+                    piece = chunk.text
+                except ValueError:
+                    # A chunk without text parts, e.g. only safety ratings
+                    piece = ""
+                text += piece
+                yield piece
+        except Exception:
+            model.record(time.monotonic() - started, failed=True)
+            raise
+        finally:
+            # Cancelling the underlying stream stops the generation when the caller stops reading
+            if response is not None:
+                close_response(response)
+        
+        # Only complete streams count towards the latency the hedge delay is based on
+        model.record(time.monotonic() - started)
+        usage = getattr(response, 'usage_metadata', None)
+        self.last_token_usage = getattr(usage, 'total_token_count', 0) or self._estimate_tokens(prompt, text)
+    
+    def _stream_with_azure_openai(self, prompt, provider):
+        """
+        Stream a script from Azure OpenAI
+        
+        Args:
+            prompt (str): The prompt to send to Azure OpenAI
+            provider (AIProvider/dict): The provider configuration
+        
+        Yields:
+            str: Text chunks as they arrive; last_token_usage is set once the stream is complete
+        """
+        api_key = self._get_provider_credential(provider, 'api_key', settings.AZURE_OPENAI_API_KEY)
+        endpoint = self._get_provider_credential(provider, 'endpoint', settings.AZURE_OPENAI_ENDPOINT)
+        deployment = self._get_provider_credential(provider, 'deployment', settings.AZURE_OPENAI_DEPLOYMENT)
+        
+        if not api_key or not endpoint:
+            raise ValueError("Azure OpenAI credentials not available")
+        
+        client = provider_clients.get_azure_openai(self._get_provider_id(provider), api_key, endpoint)
+        started = time.monotonic()
+        text = ""
+        stream = None
+        try:
+            stream = client.client.chat.completions.create(
+                model=deployment,
+                messages=[
+                    {"role": "system", "content": "You are an expert Manim developer who creates beautiful animations."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=self.GENERATION_TEMPERATURE,
+                max_tokens=4000,
+                stream=True
+            )
+            self._attach_response(stream)
+            for chunk in stream:
+                piece = chunk.choices[0].delta.content if chunk.choices else None
+                if piece:
+                    text += piece
+                    yield piece
+        except Exception:
+            client.record(time.monotonic() - started, failed=True)
+            raise
+        finally:
+            # Closing the response cancels the completion when the caller stops reading
+            if stream is not None:
+                close_response(stream)
+        
+        client.record(time.monotonic() - started)
+        self.last_token_usage = self._estimate_tokens(prompt, text)
+    
+    def _attach_response(self, response):
+        """Let the hedged generation this call belongs to cancel it by closing its response"""
+        if self._hedged_call:
+            self._hedged_call.attach(response)
+    
+    def _start_warmup(self, header):
+        """
+        Warm up a container and the Manim API index while the script is still streaming
+        
+        Skipped when another warm-up is running or ran within AI_STREAM_WARMUP_TTL.
+        
+        Args:
+            header (str): Imports and scene class header of the script
+        """
+        cls = AIScriptGenerationAgent
+        with cls._warmup_lock:
+            running = cls._warmup_thread is not None and cls._warmup_thread.is_alive()
+            if running or time.monotonic() - cls._last_warmup < self.warmup_ttl:
+                return
+            cls._last_warmup = time.monotonic()
+            cls._warmup_thread = threading.Thread(target=self._warm_up, args=(header,),
+                                                  name='ai-warmup', daemon=True)
+            cls._warmup_thread.start()
+    
+    def _warm_up(self, header):
+        """Start the pool's containers, index their Manim API and pre-flight check the header - runs in a thread"""
+        # Import here to avoid circular imports
+        from .container_pool import ContainerPoolAgent
+        from .preflight import PreflightAgent
+        from ..models import Container
+        
+        close_old_connections()
+        try:
+            pool = ContainerPoolAgent(self.debug)
+            pool.ensure_min_size()
+            pool.refresh_health()
+            
+            container = Container.objects.filter(is_active=True, is_running=True).order_by('name').first()
+            if not container:
+                return
+            
+            # The class body has not arrived yet - a placeholder keeps the header parseable
+            result = PreflightAgent(self.debug).check(f"{header}\n    pass\n", container.name)
+            if not result["success"]:
+                self.log_warning(f"Header of the streamed script failed pre-flight: {result['error']}")
+            self.log_info(f"Warmed up {container.name} while the script was streaming")
+        except Exception as e:
+            self.log_warning(f"Could not warm up for the streamed script: {str(e)}")
+        finally:
+            close_old_connections()
+    
+    def _estimate_tokens(self, prompt, text):
+        """Rough token count (4 characters per token) when the provider reports none"""
+        return (len(prompt or "") + len(text or "")) // 4
+    
+    def _clean_script(self, script):
+        """
+        Strip markdown code fences a provider may have wrapped around the script
+        
+        Args:
+            script (str): Script text returned by the provider
+            
+        Returns:
+            str: Cleaned script
+        """
+        if not script:
+            return script
+        return script.replace("```python", "").replace("```", "").strip()
     
     
     def _get_provider(self, provider=None):
@@ -227,7 +717,26 @@ class AIScriptGenerationAgent(BaseAgent):
         # Otherwise use the default
         return default
     
-    def _create_script_record(self, prompt, script_content, provider):
+    def _get_provider_id(self, provider):
+        """Registry id for a provider - its primary key, or 'settings' for env credentials"""
+        return provider.pk if hasattr(provider, 'pk') else 'settings'
+    
+    def _get_model_name(self, provider):
+        """
+        Get the model (or Azure deployment) a provider generates with
+        
+        Args:
+            provider (AIProvider/str): The provider object or name
+            
+        Returns:
+            str: Model name
+        """
+        provider_type = provider.provider_type if hasattr(provider, 'provider_type') else provider
+        if provider_type == 'azure_openai':
+            return self._get_provider_credential(provider, 'deployment', settings.AZURE_OPENAI_DEPLOYMENT)
+        return self._get_provider_credential(provider, 'model_name', 'gemini-2.5-flash-preview-04-17')
+    
+    def _create_script_record(self, prompt, script_content, provider, prompt_hash="", model_name=""):
         """
         Create a database record for the generated script
         
@@ -235,6 +744,8 @@ class AIScriptGenerationAgent(BaseAgent):
             prompt (str): The original prompt
             script_content (str): The generated script
             provider (AIProvider/str): The provider used
+            prompt_hash (str, optional): Prompt cache key of the generation request
+            model_name (str, optional): Model or deployment that generated the script
             
         Returns:
             Script: The created Script object or None if outside Django context
@@ -243,12 +754,9 @@ class AIScriptGenerationAgent(BaseAgent):
             # Try to import Script model - handle circular imports
             from ..models import Script, AIProvider
             
-            # Find the scene class name
-            scene_class = None
-            for line in script_content.split('\n'):
-                if line.strip().startswith('class ') and '(Scene)' in line:
-                    scene_class = line.strip().split('class ')[1].split('(')[0].strip()
-                    break
+            # Find the (first) scene class name
+            scene_classes = find_scene_classes(self._clean_script(script_content))
+            scene_class = scene_classes[0] if scene_classes else None
             
             # If provider is a string, try to find the provider object
             provider_obj = provider
@@ -261,6 +769,8 @@ class AIScriptGenerationAgent(BaseAgent):
             script_obj = Script.objects.create(
                 prompt=prompt,
                 content=script_content,
+                prompt_hash=prompt_hash,
+                model_name=model_name or "",
                 scene_class=scene_class,
                 provider=provider_obj if not isinstance(provider_obj, str) else None,
                 status='pending'
@@ -278,14 +788,27 @@ class AIScriptGenerationAgent(BaseAgent):
 class AIScriptDebuggingAgent(BaseAgent):
     """
     Agent responsible for debugging and fixing Manim scripts using AI.
+    
+    In patch mode the provider gets the trimmed error and a numbered window of
+    the script around the failing line, and answers with a line-range patch or
+    a unified diff that is applied locally. Only when the patch does not apply
+    is the whole script sent and asked back.
     """
     
     def __init__(self, debug=False):
         """Initialize the AI Script Debugging Agent"""
         super().__init__(debug)
         self.script_generator = AIScriptGenerationAgent(debug)
+        self.fix_cache = FixCacheAgent(debug)
+        self.patch_mode = getattr(settings, 'AI_DEBUG_PATCH_MODE', True)
+        
+        # Script lines sent on each side of the failing line in patch mode
+        self.context_lines = getattr(settings, 'AI_DEBUG_CONTEXT_LINES', 15)
+        
+        # Lines of the trimmed error sent to the provider
+        self.max_error_lines = getattr(settings, 'AI_DEBUG_MAX_ERROR_LINES', 40)
     
-    def debug(self, script, error_message, provider=None, execution=None):
+    def debug_script(self, script, error_message, provider=None, execution=None, tried_fixes=()):
         """
         Debug a Manim script that encountered an error using AI
         
@@ -294,10 +817,30 @@ class AIScriptDebuggingAgent(BaseAgent):
             error_message (str): The error message from execution
             provider (str/AIProvider, optional): Provider to use for debugging
             execution (Execution, optional): The execution record for tracking
+            tried_fixes (iterable, optional): Ids of cached fixes that already failed in this execution
             
         Returns:
-            dict: Result with fixed script and success flag
+            dict: Result with fixed script and success flag, the error signature
+                  and fix_id when the fix came from the fix cache
         """
+        # Error line numbers refer to the script as rendered, without markdown fences
+        script = strip_fences(script)
+        
+        # A fix that resolved the same error before is tried without calling the provider
+        signature = self.fix_cache.signature(script, error_message)
+        cached_script, cached_fix = self.fix_cache.lookup(script, signature, exclude=tried_fixes)
+        if cached_fix:
+            if execution:
+                self._update_execution(execution, "pending", script, cached_script)
+            return {
+                "success": True,
+                "fixed_script": cached_script,
+                "changed": True,
+                "tokens": 0,
+                "signature": signature,
+                "fix_id": cached_fix.pk
+            }
+        
         # Get provider to use
         provider_obj = self.script_generator._get_provider(provider)
         
@@ -307,14 +850,17 @@ class AIScriptDebuggingAgent(BaseAgent):
             return {
                 "success": False,
                 "error": error_msg,
-                "fixed_script": None
+                "fixed_script": None,
+                "changed": False,
+                "tokens": 0
             }
         
-        # Create debug prompt
+        # Create debug prompt - rich tracebacks are cut down to the frames that matter
+        error_excerpt = trim_error(error_message, self.max_error_lines)
         debug_prompt = f"""
         I'm trying to run a Manim animation script, but it's throwing the following error:
         
-        {error_message}
+        {error_excerpt}
         
         Here's the script:
         
@@ -331,18 +877,20 @@ class AIScriptDebuggingAgent(BaseAgent):
             if execution:
                 self._update_execution(execution, "debugging", script)
             
-            # Generate fixed script
             provider_type = provider_obj.provider_type if hasattr(provider_obj, 'provider_type') else provider_obj
             
-            if provider_type == 'gemini':
-                fixed_script = self._debug_with_gemini(debug_prompt, provider_obj)
-            elif provider_type == 'azure_openai':
-                fixed_script = self._debug_with_azure_openai(debug_prompt, provider_obj)
-            else:
-                raise ValueError(f"Unsupported provider type: {provider_type}")
+            # Ask for a patch first, the whole script only if the patch does not apply
+            cleaned_script, tokens, mode = None, 0, "patch"
+            if self.patch_mode:
+                cleaned_script, tokens = self._debug_with_patch(script, error_message, error_excerpt, provider_obj, provider_type)
             
-            # Clean up the fixed script
-            cleaned_script = self.script_generator._clean_script(fixed_script)
+            if cleaned_script is None:
+                mode = "full"
+                fixed_script = self._call_debug_provider(debug_prompt, provider_obj, provider_type)
+                tokens += self.script_generator.last_token_usage
+                
+                # Clean up the fixed script
+                cleaned_script = self.script_generator._clean_script(fixed_script)
             
             # Update execution record if provided
             if execution:
@@ -351,7 +899,10 @@ class AIScriptDebuggingAgent(BaseAgent):
             return {
                 "success": True,
                 "fixed_script": cleaned_script,
-                "changed": cleaned_script != script
+                "changed": cleaned_script != script,
+                "tokens": tokens,
+                "mode": mode,
+                "signature": signature
             }
             
         except Exception as e:
@@ -371,9 +922,100 @@ class AIScriptDebuggingAgent(BaseAgent):
                 "success": changed,
                 "error": error_msg,
                 "fixed_script": fixed_script,
-                "changed": changed
+                "changed": changed,
+                "tokens": 0
             }
     
+    def _debug_with_patch(self, script, error_message, error_excerpt, provider, provider_type):
+        """
+        Ask the provider for a patch against a numbered window of the script
+        
+        Args:
+            script (str): The script content to debug, as rendered
+            error_message (str): The error message from execution
+            error_excerpt (str): The error trimmed to its relevant lines
+            provider (AIProvider/dict): Provider to use
+            provider_type (str): Type of the provider
+            
+        Returns:
+            tuple: (patched script or None if the patch did not apply, tokens used)
+        """
+        lines = script.splitlines()
+        line = classify_error(error_message)["line"]
+        if line and 0 < line <= len(lines):
+            start, end = max(1, line - self.context_lines), min(len(lines), line + self.context_lines)
+        else:
+            start, end = 1, len(lines)
+        
+        # Imports are sent as well, fixes often need one
+        sections = []
+        header_end = self._import_header_end(lines)
+        if start > 1:
+            if header_end:
+                sections.append(number_lines(script, 1, min(header_end, start - 1)))
+            if header_end < start - 1:
+                sections.append("...")
+        sections.append(number_lines(script, start, end))
+        if end < len(lines):
+            sections.append("...")
+        
+        patch_prompt = "\n".join([
+            "A Manim animation script fails with this error:",
+            "",
+            error_excerpt,
+            "",
+            f"Lines of the script ({len(lines)} in total), numbered:",
+            "",
+            "\n".join(sections),
+            "",
+            "Fix the error with the smallest possible change. Reply ONLY with edits in this format, without explanation:",
+            "REPLACE <first line>-<last line>",
+            "<the new lines, with their full indentation and without line numbers>",
+            "END",
+            "Use INSERT AFTER <line> instead of REPLACE to add lines, and an empty REPLACE to delete them.",
+            "Line numbers refer to the numbered script above. A unified diff against it is accepted as well."
+        ])
+        
+        response = self._call_debug_provider(patch_prompt, provider, provider_type)
+        tokens = self.script_generator.last_token_usage
+        
+        patched = apply_patch(script, response)
+        if patched is None or patched == script:
+            self.log_warning("Debug patch did not apply, asking for the full script")
+            return None, tokens
+        
+        # A patch that breaks the syntax of a script that parsed is not applied
+        try:
+            ast.parse(patched)
+        except SyntaxError:
+            try:
+                ast.parse(script)
+            except SyntaxError:
+                return patched, tokens
+            self.log_warning("Debug patch produced invalid syntax, asking for the full script")
+            return None, tokens
+        
+        return patched, tokens
+    
+    def _import_header_end(self, lines):
+        """Last line (1-based) of the imports at the top of a script, 0 if there are none"""
+        end = 0
+        for number, line in enumerate(lines, start=1):
+            stripped = line.strip()
+            if stripped.startswith(("import ", "from ")):
+                end = number
+            elif stripped and not stripped.startswith("#"):
+                break
+        return end
+    
+    def _call_debug_provider(self, prompt, provider, provider_type):
+        """Send a debug prompt to the provider of the given type"""
+        if provider_type == 'gemini':
+            return self._debug_with_gemini(prompt, provider)
+        elif provider_type == 'azure_openai':
+            return self._debug_with_azure_openai(prompt, provider)
+        raise ValueError(f"Unsupported provider type: {provider_type}")
+    
     def _debug_with_gemini(self, prompt, provider):
         """Use Gemini to debug the script"""
         return self.script_generator._generate_with_gemini(prompt, provider)
@@ -395,27 +1037,13 @@ class AIScriptDebuggingAgent(BaseAgent):
         """
         self.log_warning("AI debugging failed, using simple correction strategy")
         
-        # If manim not recognized, it's likely just an execution environment issue
-        if "'manim' is not recognized" in error_message:
-            return script
+        # Only renamed Manim APIs have a fix that needs no LLM - missing packages,
+        # container failures and the rest are handled by ManimExecutionAgent
+        migration = migrate_script(script, symbols=classify_error(error_message)["symbols"])
+        if migration["fired"]:
+            self.log_info(f"Applied API migrations: {', '.join(migration['fired'])}")
         
-        # Import error correction
-        if "No module named" in error_message:
-            # Try to extract the module name and suggest an import
-            try:
-                module_name = error_message.split("No module named")[1].strip().strip("'").strip('"')
-                if module_name:
-                    return f"import {module_name}\n\n{script}"
-            except Exception:
-                pass
-        
-        # Property or method not found
-        if "has no attribute" in error_message:
-            # This is harder to fix automatically
-            pass
-        
-        # Return original if no fixes applied
-        return script
+        return migration["script"]
     
     def _update_execution(self, execution, status, original_script=None, modified_script=None):
         """
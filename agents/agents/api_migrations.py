@@ -0,0 +1,399 @@
+import ast
+
+# Bump whenever a rule is added or changed - every rewrite records the version
+# it was made with, so the LLM calls saved can be compared between versions
+MIGRATIONS_VERSION = 1
+
+# Known migrations from older Manim releases and ManimGL to Manim Community.
+#   name        - a renamed class or function, wherever the name is read or imported
+#   call        - a renamed animation whose direction or scale argument became a keyword:
+#                 the positional argument at `position` (or the `keyword` argument) moves to
+#                 `argument`, negated when the meaning flipped; `default` is added when absent
+#   attribute   - a renamed method, e.g. axes.get_graph(...) -> axes.plot(...)
+#   module      - imports of another Manim distribution
+#   graph_scene - GraphScene subclasses become Scene subclasses drawing on self.axes
+API_MIGRATIONS = [
+    {"id": "show-creation", "kind": "name", "old": "ShowCreation", "new": "Create"},
+    {"id": "text-mobject", "kind": "name", "old": "TextMobject", "new": "Tex"},
+    {"id": "tex-mobject", "kind": "name", "old": "TexMobject", "new": "MathTex"},
+    {"id": "tex-text", "kind": "name", "old": "TexText", "new": "Tex"},
+    {"id": "show-creation-then-destruction", "kind": "name",
+     "old": "ShowCreationThenDestruction", "new": "ShowPassingFlash"},
+    {"id": "show-creation-then-destruction-around", "kind": "name",
+     "old": "ShowCreationThenDestructionAround", "new": "ShowPassingFlashAround"},
+    {"id": "circle-indicate", "kind": "name", "old": "CircleIndicate", "new": "Circumscribe"},
+    {"id": "fade-in-from", "kind": "call", "old": "FadeInFrom", "new": "FadeIn",
+     "position": 1, "keyword": "direction", "argument": "shift", "negate": True, "default": "UP"},
+    {"id": "fade-in-from-down", "kind": "call", "old": "FadeInFromDown", "new": "FadeIn",
+     "argument": "shift", "default": "UP"},
+    {"id": "fade-in-from-large", "kind": "call", "old": "FadeInFromLarge", "new": "FadeIn",
+     "position": 1, "keyword": "scale_factor", "argument": "scale", "default": "2"},
+    {"id": "fade-out-and-shift", "kind": "call", "old": "FadeOutAndShift", "new": "FadeOut",
+     "position": 1, "keyword": "direction", "argument": "shift", "default": "DOWN"},
+    {"id": "fade-out-and-shift-down", "kind": "call", "old": "FadeOutAndShiftDown", "new": "FadeOut",
+     "argument": "shift", "default": "DOWN"},
+    {"id": "get-graph", "kind": "attribute", "old": "get_graph", "new": "plot"},
+    {"id": "get-parametric-curve", "kind": "attribute", "old": "get_parametric_curve", "new": "plot_parametric_curve"},
+    {"id": "get-implicit-curve", "kind": "attribute", "old": "get_implicit_curve", "new": "plot_implicit_curve"},
+    {"id": "get-derivative-graph", "kind": "attribute", "old": "get_derivative_graph", "new": "plot_derivative_graph"},
+    {"id": "get-antiderivative-graph", "kind": "attribute",
+     "old": "get_antiderivative_graph", "new": "plot_antiderivative_graph"},
+    {"id": "manimlib", "kind": "module", "old": "manimlib", "new": "manim"},
+    {"id": "manim-imports-ext", "kind": "module", "old": "manim_imports_ext", "new": "manim"},
+    {"id": "graph-scene", "kind": "graph_scene", "old": "GraphScene", "new": "Scene"},
+]
+
+# GraphScene methods that moved to Axes, with their name on Axes
+GRAPH_SCENE_METHODS = {
+    'get_graph': 'plot',
+    'get_derivative_graph': 'plot_derivative_graph',
+    'coords_to_point': 'coords_to_point',
+    'point_to_coords': 'point_to_coords',
+    'input_to_graph_point': 'input_to_graph_point',
+    'get_graph_label': 'get_graph_label',
+    'get_riemann_rectangles': 'get_riemann_rectangles',
+    'get_area': 'get_area',
+    'get_vertical_line_to_graph': 'get_vertical_line',
+    'get_vertical_lines_to_graph': 'get_vertical_lines_to_graph',
+    'get_secant_slope_group': 'get_secant_slope_group',
+    'x_axis': 'x_axis',
+    'y_axis': 'y_axis',
+}
+
+# GraphScene CONFIG keys -> (Axes argument, index in the range list), and the GraphScene defaults
+GRAPH_SCENE_RANGES = {
+    'x_min': ('x_range', 0), 'x_max': ('x_range', 1), 'x_tick_frequency': ('x_range', 2),
+    'y_min': ('y_range', 0), 'y_max': ('y_range', 1), 'y_tick_frequency': ('y_range', 2),
+}
+GRAPH_SCENE_DEFAULTS = {'x_range': ['-1', '10', '1'], 'y_range': ['-1', '10', '1']}
+GRAPH_SCENE_LENGTHS = {'x_axis_width': 'x_length', 'y_axis_height': 'y_length'}
+
+
+def migration_rules(symbols=None):
+    """
+    Rules of the migration table
+
+    Args:
+        symbols (list, optional): Only rules for these failing names, e.g. from an error
+
+    Returns:
+        list: Matching rules in table order
+    """
+    if symbols is None:
+        return list(API_MIGRATIONS)
+    symbols = set(symbols)
+    return [
+        rule for rule in API_MIGRATIONS
+        if rule["old"] in symbols or (rule["kind"] == 'graph_scene' and symbols & set(GRAPH_SCENE_METHODS))
+    ]
+
+
+def migrate_script(script, api_names=None, symbols=None):
+    """
+    Rewrite renamed Manim APIs in a script
+
+    The script is parsed once and edited in place at the positions of the
+    matching nodes, so formatting and comments survive. A rewrite that would
+    not parse is discarded.
+
+    Args:
+        script (str): Script content
+        api_names (set, optional): Names exported by the installed Manim - name rules
+                                   are skipped when the old name still exists there
+        symbols (list, optional): Only apply rules for these failing names
+
+    Returns:
+        dict: script (rewritten or unchanged), fired (ids of the rules that
+              changed the script) and version (MIGRATIONS_VERSION)
+    """
+    result = {"script": script, "fired": [], "version": MIGRATIONS_VERSION}
+    rules = migration_rules(symbols)
+    if not rules:
+        return result
+
+    try:
+        tree = ast.parse(script)
+    except SyntaxError:
+        return result
+
+    rewriter = _Rewriter(script, tree, api_names)
+    for rule in rules:
+        getattr(rewriter, f"_apply_{rule['kind']}")(rule)
+
+    migrated, fired = rewriter.apply()
+    if not fired:
+        return result
+    try:
+        ast.parse(migrated)
+    except SyntaxError:
+        return result
+
+    result.update(script=migrated, fired=[rule["id"] for rule in rules if rule["id"] in fired])
+    return result
+
+
+def migration_stats():
+    """
+    Report how often each rule fired and how the executions it touched ended
+
+    Each rewrite pass replaces at least one debug round trip, so passes are
+    counted as LLM calls saved.
+
+    Returns:
+        dict: version, executions, llm_calls_saved and per-rule counts
+    """
+    from ..models import Execution
+
+    def empty_counts():
+        return {"fired": 0, "preflight": 0, "after_error": 0, "executions": 0, "succeeded": 0,
+                "succeeded_without_debugging": 0}
+
+    # Rules of earlier table versions are reported too
+    rules = {rule["id"]: empty_counts() for rule in API_MIGRATIONS}
+    executions = 0
+    passes = set()
+
+    rows = Execution.objects.exclude(api_migrations=[]).values_list('id', 'api_migrations', 'is_successful', 'debug_tokens')
+    for execution_id, migrations, is_successful, debug_tokens in rows:
+        executions += 1
+        touched = set()
+        for migration in migrations:
+            counts = rules.setdefault(migration["rule"], empty_counts())
+            counts["fired"] += 1
+            counts["preflight" if migration["phase"] == 'preflight' else "after_error"] += 1
+            touched.add(migration["rule"])
+            passes.add((execution_id, migration["phase"], migration["attempt"]))
+        for rule_id in touched:
+            rules[rule_id]["executions"] += 1
+            rules[rule_id]["succeeded"] += int(is_successful)
+            rules[rule_id]["succeeded_without_debugging"] += int(is_successful and not debug_tokens)
+
+    return {
+        "version": MIGRATIONS_VERSION,
+        "executions": executions,
+        "llm_calls_saved": len(passes),
+        "rules": {rule_id: counts for rule_id, counts in rules.items() if counts["fired"]}
+    }
+
+
+class _Rewriter:
+    """Collects source edits for the rules and applies them in one pass"""
+
+    def __init__(self, source, tree, api_names):
+        self.source = source
+        self.data = source.encode('utf-8')
+        self.tree = tree
+        self.api_names = api_names
+        self.edits = []
+
+        # ast column offsets count UTF-8 bytes from the start of each line
+        self.line_starts = [0]
+        for line in self.data.splitlines(keepends=True):
+            self.line_starts.append(self.line_starts[-1] + len(line))
+
+        self.nodes = list(ast.walk(tree))
+        self.bound = self._bound_names()
+
+    def apply(self):
+        """Apply the collected edits, skipping any that overlap an earlier one"""
+        data, fired, end = self.data, set(), None
+        accepted = []
+        for start, stop, text, rule_id in sorted(self.edits, key=lambda edit: (edit[0], edit[1])):
+            if end is not None and start < end:
+                continue
+            accepted.append((start, stop, text))
+            fired.add(rule_id)
+            end = stop if stop > start else end
+
+        for start, stop, text in reversed(accepted):
+            data = data[:start] + text.encode('utf-8') + data[stop:]
+        return data.decode('utf-8'), fired
+
+    def _offset(self, line, col):
+        return self.line_starts[line - 1] + col
+
+    def _span(self, node):
+        return self._offset(node.lineno, node.col_offset), self._offset(node.end_lineno, node.end_col_offset)
+
+    def _indent(self, node):
+        """Leading whitespace of the line a statement starts on"""
+        line = self.data[self.line_starts[node.lineno - 1]:self._offset(node.lineno, node.col_offset)]
+        return line.decode('utf-8')
+
+    def _edit(self, rule, start, stop, text):
+        self.edits.append((start, stop, text, rule["id"]))
+
+    def _segment(self, node):
+        return ast.get_source_segment(self.source, node)
+
+    def _bound_names(self):
+        """Names the script defines itself - never renamed"""
+        bound = set()
+        for node in self.nodes:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                bound.add(node.name)
+            elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                bound.add(node.id)
+            elif isinstance(node, ast.ImportFrom) and node.module and node.module.split('.')[0] != 'manim':
+                bound.update(alias.asname or alias.name for alias in node.names)
+        return bound
+
+    def _renamable(self, rule):
+        if rule["old"] in self.bound:
+            return False
+        if self.api_names is not None and (rule["old"] in self.api_names or rule["new"] not in self.api_names):
+            return False
+        return True
+
+    def _rename_name(self, rule, skip=()):
+        """Rename every read and manim import of rule['old'], except the nodes in skip"""
+        for node in self.nodes:
+            if isinstance(node, ast.Name) and node.id == rule["old"] and isinstance(node.ctx, ast.Load) \
+                    and node not in skip:
+                self._edit(rule, *self._span(node), rule["new"])
+            elif isinstance(node, ast.ImportFrom) and node.module and node.module.split('.')[0] == 'manim':
+                for alias in node.names:
+                    if alias.name == rule["old"]:
+                        start = self._offset(alias.lineno, alias.col_offset)
+                        self._edit(rule, start, start + len(rule["old"]), rule["new"])
+
+    def _apply_name(self, rule):
+        if self._renamable(rule):
+            self._rename_name(rule)
+
+    def _apply_call(self, rule):
+        if not self._renamable(rule):
+            return
+
+        calls = [node for node in self.nodes
+                 if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == rule["old"]]
+        skipped = []
+        for call in calls:
+            position = rule.get("position")
+            keyword = next((kw for kw in call.keywords if rule.get("keyword") and kw.arg == rule["keyword"]), None)
+            value = keyword.value if keyword else None
+            if value is None and position is not None and len(call.args) > position:
+                # Only the last positional argument can become a keyword
+                if len(call.args) > position + 1 or isinstance(call.args[position], ast.Starred):
+                    skipped.append(call.func)
+                    continue
+                value = call.args[position]
+
+            if value is not None:
+                start, stop = self._span(value)
+                prefix, suffix = "", ""
+                if rule.get("negate"):
+                    simple = isinstance(value, (ast.Name, ast.Attribute, ast.Constant))
+                    prefix, suffix = ("-", "") if simple else ("-(", ")")
+                if keyword:
+                    kw_start = self._offset(keyword.lineno, keyword.col_offset)
+                    self._edit(rule, kw_start, kw_start + len(keyword.arg), rule["argument"])
+                else:
+                    prefix = f"{rule['argument']}={prefix}"
+                if prefix:
+                    self._edit(rule, start, start, prefix)
+                if suffix:
+                    self._edit(rule, stop, stop, suffix)
+            elif rule.get("default") and not any(kw.arg == rule["argument"] for kw in call.keywords):
+                self._insert_argument(rule, call, f"{rule['argument']}={rule['default']}")
+
+        self._rename_name(rule, skip=skipped)
+
+    def _insert_argument(self, rule, call, text):
+        """Add an argument after the last argument of a call"""
+        arguments = call.args + call.keywords
+        if not arguments:
+            stop = self._span(call)[1] - 1
+            self._edit(rule, stop, stop, text)
+            return
+        last = max(self._span(argument)[1] for argument in arguments)
+        self._edit(rule, last, last, f", {text}")
+
+    def _apply_attribute(self, rule):
+        # A method the script defines itself is not Manim's
+        if rule["old"] in self.bound:
+            return
+        for node in self.nodes:
+            if isinstance(node, ast.Attribute) and node.attr == rule["old"] and isinstance(node.ctx, ast.Load):
+                stop = self._span(node)[1]
+                self._edit(rule, stop - len(rule["old"]), stop, rule["new"])
+
+    def _apply_module(self, rule):
+        old, new = rule["old"], rule["new"]
+        for node in self.nodes:
+            if isinstance(node, ast.ImportFrom) and node.module and node.module.split('.')[0] == old:
+                names = ", ".join(
+                    alias.name + (f" as {alias.asname}" if alias.asname else "") for alias in node.names
+                )
+                self._edit(rule, *self._span(node), f"from {new} import {names}")
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.name.split('.')[0] == old:
+                        start = self._offset(alias.lineno, alias.col_offset)
+                        self._edit(rule, start, start + len(old), new)
+            elif isinstance(node, ast.Name) and node.id == old and isinstance(node.ctx, ast.Load):
+                self._edit(rule, *self._span(node), new)
+
+    def _apply_graph_scene(self, rule):
+        if not self._renamable(rule):
+            return
+
+        classes = [node for node in self.nodes if isinstance(node, ast.ClassDef)
+                   and any(isinstance(base, ast.Name) and base.id == rule["old"] for base in node.bases)]
+        for cls in classes:
+            self._port_graph_scene(rule, cls)
+        self._rename_name(rule)
+
+    def _port_graph_scene(self, rule, cls):
+        """Draw a GraphScene subclass on self.axes, set up from its CONFIG"""
+        axes = f"Axes({self._axes_arguments(cls)})"
+        uses_axes = False
+        setup_calls = []
+
+        for node in ast.walk(cls):
+            if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == 'self':
+                if node.attr in GRAPH_SCENE_METHODS:
+                    uses_axes = True
+                    self._edit(rule, *self._span(node), f"self.axes.{GRAPH_SCENE_METHODS[node.attr]}")
+                elif node.attr == 'axes':
+                    uses_axes = True
+            elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call) \
+                    and isinstance(node.value.func, ast.Attribute) and node.value.func.attr == 'setup_axes' \
+                    and isinstance(node.value.func.value, ast.Name) and node.value.func.value.id == 'self':
+                setup_calls.append(node)
+
+        for node in setup_calls:
+            animate = any(kw.arg == 'animate' and isinstance(kw.value, ast.Constant) and kw.value.value
+                          for kw in node.value.keywords)
+            show = "self.play(Create(self.axes))" if animate else "self.add(self.axes)"
+            self._edit(rule, *self._span(node), f"self.axes = {axes}\n{self._indent(node)}{show}")
+
+        # Without setup_axes the axes are only used for coordinates
+        if uses_axes and not setup_calls:
+            construct = next((node for node in cls.body
+                              if isinstance(node, ast.FunctionDef) and node.name == 'construct'), None)
+            if construct:
+                first = construct.body[0]
+                start = self._span(first)[0]
+                self._edit(rule, start, start, f"self.axes = {axes}\n{self._indent(first)}")
+
+    def _axes_arguments(self, cls):
+        """Axes arguments equivalent to the CONFIG of a GraphScene subclass"""
+        config = {}
+        for node in cls.body:
+            if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == 'CONFIG' for t in node.targets) \
+                    and isinstance(node.value, ast.Dict):
+                for key, value in zip(node.value.keys, node.value.values):
+                    if isinstance(key, ast.Constant) and isinstance(key.value, str):
+                        config[key.value] = self._segment(value)
+
+        ranges = {name: list(values) for name, values in GRAPH_SCENE_DEFAULTS.items()}
+        for key, (name, index) in GRAPH_SCENE_RANGES.items():
+            if config.get(key):
+                ranges[name][index] = config[key]
+
+        arguments = [f"{name}=[{', '.join(values)}]" for name, values in ranges.items()]
+        arguments += [f"{name}={config[key]}" for key, name in GRAPH_SCENE_LENGTHS.items() if config.get(key)]
+        if config.get('axes_color'):
+            arguments.append(f"axis_config={{'color': {config['axes_color']}}}")
+        return ", ".join(arguments)
@@ -0,0 +1,244 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from .base_agent import BaseAgent
+from .docker_agent import DockerAgent
+
+class ContainerPoolAgent(BaseAgent):
+    """
+    Agent responsible for the warm pool of Manim containers.
+    Picks the least-loaded healthy container for each render and scales the
+    pool between MANIM_POOL_MIN_SIZE and MANIM_POOL_MAX_SIZE.
+
+    In-flight jobs are the running Execution rows assigned to a container, so
+    the load is shared by every render worker process.
+    """
+
+    def __init__(self, debug=False):
+        """Initialize the Container Pool Agent"""
+        super().__init__(debug)
+        self.docker_agent = DockerAgent(debug)
+
+        # The compose-managed container seeds the pool and is never removed
+        self.base_container_name = getattr(settings, 'MANIM_CONTAINER_NAME', 'omega-manim')
+        self.working_dir = getattr(settings, 'MANIM_WORKING_DIR', '/manim')
+
+        # Pool sizing
+        self.min_size = getattr(settings, 'MANIM_POOL_MIN_SIZE', 1)
+        self.max_size = getattr(settings, 'MANIM_POOL_MAX_SIZE', 1)
+        self.jobs_per_container = getattr(settings, 'MANIM_POOL_JOBS_PER_CONTAINER', 1)
+
+        # Containers created by the pool are named <prefix>-<n>
+        self.name_prefix = f"{self.base_container_name}-pool"
+        self.image = getattr(settings, 'MANIM_POOL_IMAGE', self.base_container_name)
+        self.volumes = getattr(settings, 'MANIM_POOL_VOLUMES', [])
+
+        # cgroup limits of pooled containers - caps what all renders in one container can take
+        self.resource_limits = {
+            'memory': getattr(settings, 'MANIM_CONTAINER_MEMORY', ''),
+            'cpus': getattr(settings, 'MANIM_CONTAINER_CPUS', ''),
+            'pids_limit': getattr(settings, 'MANIM_CONTAINER_PIDS_LIMIT', 0)
+        }
+
+        # Seconds before a container's running state is re-checked with Docker
+        self.health_ttl = getattr(settings, 'MANIM_POOL_HEALTH_TTL', 30)
+
+    def acquire(self, execution=None):
+        """
+        Pick the least-loaded healthy container, scaling up if every container is busy
+
+        Args:
+            execution (Execution, optional): Execution record to assign to the container
+
+        Returns:
+            Container: The selected container or None if no container is available
+        """
+        from ..models import Container
+
+        self._ensure_base_container()
+        self.refresh_health()
+
+        with transaction.atomic():
+            # Lock the pool so concurrent workers see each other's assignments
+            containers = list(
+                Container.objects.select_for_update()
+                .filter(is_active=True, is_running=True)
+                .order_by('name')
+            )
+            loads = self.get_loads(containers)
+
+            candidate = min(containers, key=lambda c: loads[c.id], default=None)
+
+            # Grow the pool when the best container is already saturated
+            if (candidate is None or loads[candidate.id] >= self.jobs_per_container) and \
+                    self.pool_size() < self.max_size:
+                new_container = self.scale_up()
+                if new_container:
+                    candidate = new_container
+
+            if candidate and execution:
+                execution.container = candidate
+                execution.save(update_fields=['container', 'updated_at'])
+
+        if candidate:
+            self.log_info(f"Scheduled render on container {candidate.name}")
+        else:
+            self.log_error("No healthy Manim container available")
+        return candidate
+
+    def get_loads(self, containers):
+        """
+        Count in-flight executions per container
+
+        Args:
+            containers (list): Container records
+
+        Returns:
+            dict: Container id to number of running executions
+        """
+        from ..models import Execution
+
+        loads = {container.id: 0 for container in containers}
+        running = (
+            Execution.objects
+            .filter(status='running', container__in=containers)
+            .values('container')
+            .annotate(in_flight=Count('id'))
+        )
+        for row in running:
+            loads[row['container']] = row['in_flight']
+        return loads
+
+    def pool_size(self):
+        """Number of active containers in the pool"""
+        from ..models import Container
+        return Container.objects.filter(is_active=True).count()
+
+    def refresh_health(self):
+        """
+        Re-check containers whose running state is older than the health TTL
+
+        Returns:
+            int: Number of containers checked
+        """
+        from ..models import Container
+
+        cutoff = timezone.now() - timedelta(seconds=self.health_ttl)
+        stale = Container.objects.filter(is_active=True, last_checked__lt=cutoff)
+
+        checked = 0
+        for container in stale:
+            # DockerAgent records the result on the Container row
+            if not self.docker_agent.check_container_status(container.name):
+                self.docker_agent.ensure_container_running(container.name)
+            checked += 1
+        return checked
+
+    def scale_up(self):
+        """
+        Start a new pooled container
+
+        Returns:
+            Container: The new container record or None if it could not be started
+        """
+        from ..models import Container
+
+        name = self._next_container_name()
+        container, _ = Container.objects.update_or_create(
+            name=name,
+            defaults={
+                'image': self.image,
+                'working_dir': self.working_dir,
+                'is_active': True,
+                'is_running': False,
+                'installed_packages': []
+            }
+        )
+
+        if not self.docker_agent.create_container(name, self.image, self.volumes, self.working_dir, self.resource_limits):
+            container.is_active = False
+            container.save()
+            return None
+
+        container.refresh_from_db()
+        self.log_info(f"Scaled container pool up to {self.pool_size()} containers")
+        return container
+
+    def scale_down(self):
+        """
+        Remove idle pooled containers above the minimum pool size
+
+        Returns:
+            int: Number of containers removed
+        """
+        from ..models import Container
+
+        pooled = list(
+            Container.objects
+            .filter(is_active=True, name__startswith=f"{self.name_prefix}-")
+            .order_by('-name')
+        )
+        loads = self.get_loads(pooled)
+
+        removed = 0
+        for container in pooled:
+            if self.pool_size() <= self.min_size:
+                break
+            if loads[container.id]:
+                continue
+
+            if self.docker_agent.remove_container(container.name):
+                container.is_active = False
+                container.is_running = False
+                container.save()
+                removed += 1
+
+        if removed:
+            self.log_info(f"Scaled container pool down by {removed} containers")
+        return removed
+
+    def ensure_min_size(self):
+        """
+        Start pooled containers until the pool reaches its minimum size
+
+        Returns:
+            int: Number of containers started
+        """
+        self._ensure_base_container()
+
+        started = 0
+        while self.pool_size() < self.min_size:
+            if not self.scale_up():
+                break
+            started += 1
+        return started
+
+    def _ensure_base_container(self):
+        """Register the compose-managed container so an empty table still has a pool"""
+        from ..models import Container
+
+        if Container.objects.filter(name=self.base_container_name).exists():
+            return
+
+        Container.objects.create(
+            name=self.base_container_name,
+            image=self.image,
+            working_dir=self.working_dir,
+            last_checked=timezone.now() - timedelta(seconds=self.health_ttl)
+        )
+
+    def _next_container_name(self):
+        """Find the first unused pooled container name"""
+        from ..models import Container
+
+        taken = set(
+            Container.objects
+            .filter(name__startswith=f"{self.name_prefix}-", is_active=True)
+            .values_list('name', flat=True)
+        )
+        index = 1
+        while f"{self.name_prefix}-{index}" in taken:
+            index += 1
+        return f"{self.name_prefix}-{index}"
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import socket
+import threading
+from django.conf import settings
+from .base_agent import BaseAgent
+from .progress import line_splitter
+
+class RenderDaemonClient(BaseAgent):
+    """
+    Client of the render daemon (render_daemon.py) running inside Manim containers.
+    The daemon keeps manim imported and forks a warm child per job, so a render
+    skips interpreter start-up. It listens on <socket dir>/<container name>.sock
+    on the shared media volume.
+    """
+
+    # Container name to the time its daemon last could not be reached, shared by all clients
+    _unavailable_since = {}
+    _lock = threading.Lock()
+
+    def __init__(self, debug=False):
+        """Initialize the Render Daemon Client"""
+        super().__init__(debug)
+
+        # Host path of the daemon sockets (the container's /manim/run/render_daemon)
+        self.socket_dir = getattr(settings, 'MANIM_DAEMON_SOCKET_DIR', None) or \
+            os.path.join(settings.BASE_DIR, 'run', 'render_daemon')
+
+        # Seconds before a daemon that could not be reached is tried again
+        self.retry_after = getattr(settings, 'MANIM_DAEMON_RETRY_AFTER', 30)
+
+    def socket_path(self, container_name):
+        """Host path of a container's daemon socket"""
+        return os.path.join(self.socket_dir, f"{container_name}.sock")
+
+    def is_available(self, container_name):
+        """Whether the container's daemon socket exists and has not failed recently"""
+        with RenderDaemonClient._lock:
+            failed_at = RenderDaemonClient._unavailable_since.get(container_name)
+        if failed_at and time.monotonic() - failed_at < self.retry_after:
+            return False
+        return os.path.exists(self.socket_path(container_name))
+
+    def ping(self, container_name):
+        """
+        Check that a container's daemon answers
+
+        Returns:
+            dict: pid and manim_version of the daemon, or None if it is unreachable
+        """
+        try:
+            with self._connect(container_name) as conn:
+                conn.sendall(b'{"ping": true}\n')
+                reply = json.loads(conn.makefile("rb").readline() or b"null")
+                return reply if reply and reply.get("type") == "pong" else None
+        except (OSError, ValueError):
+            return None
+
+    def run(self, container_name, args, working_dir=None, on_output=None,
+            timeout=None, memory_limit_mb=None, cpu_seconds=None):
+        """
+        Run a manim invocation through the container's daemon
+
+        Takes the same limits as DockerAgent.execute_command; the daemon
+        enforces them on the job.
+
+        Args:
+            container_name (str): Container whose daemon runs the job
+            args (list): Arguments of `python -m manim`
+            working_dir (str, optional): Working directory in the container
+            on_output (callable, optional): Called with (stream, line) for every output line
+            timeout (int, optional): Wall-clock seconds before the job is killed
+            memory_limit_mb (int, optional): Memory limit of the job
+            cpu_seconds (int, optional): CPU time limit of the job
+
+        Returns:
+            dict: Result with success, stdout, stderr, returncode, timed_out, oom and
+                  seconds - or None if the daemon is unavailable and the caller
+                  should fall back to docker exec
+        """
+        if not self.is_available(container_name):
+            return None
+
+        try:
+            conn = self._connect(container_name)
+        except OSError as e:
+            self._mark_unavailable(container_name, e)
+            return None
+
+        request = {
+            "args": list(args),
+            "cwd": working_dir,
+            "timeout": timeout,
+            "memory_mb": memory_limit_mb,
+            "cpu_seconds": cpu_seconds
+        }
+        output = {'stdout': [], 'stderr': []}
+        feed, flush = line_splitter(on_output) if on_output else (None, None)
+
+        try:
+            # The daemon enforces the job timeout - only wait a little longer for it
+            conn.settimeout(timeout + 30 if timeout else None)
+            conn.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            self.log_info(f"Running manim {' '.join(request['args'])} on the daemon of {container_name}")
+
+            for line in conn.makefile("rb"):
+                message = json.loads(line)
+                if message["type"] == "output":
+                    output[message["stream"]].append(message["data"])
+                    if feed:
+                        feed(message["stream"], message["data"])
+                elif message["type"] == "result":
+                    return self._result(message, output, request)
+
+            raise ConnectionError("Render daemon closed the connection before the job finished")
+
+        except (OSError, ValueError) as e:
+            # The job may have run - report a failure rather than rendering it twice
+            self.log_error(f"Render daemon of {container_name} failed: {str(e)}")
+            return {
+                "success": False,
+                "stdout": "".join(output['stdout']),
+                "stderr": "".join(output['stderr']) + f"\nRender daemon error: {str(e)}",
+                "returncode": None,
+                "timed_out": isinstance(e, socket.timeout),
+                "oom": False
+            }
+
+        finally:
+            if flush:
+                flush()
+            conn.close()
+
+    def _result(self, message, output, request):
+        """Build an execute_command style result from the daemon's result message"""
+        stderr = "".join(output['stderr'])
+        if message.get("timed_out"):
+            stderr += f"\nRender exceeded its time limit ({request['timeout']} seconds) and was killed"
+        elif message.get("oom"):
+            stderr += f"\nRender exceeded the memory limit of {request['memory_mb']} MB"
+
+        return {
+            "success": message["returncode"] == 0 and not message.get("timed_out"),
+            "stdout": "".join(output['stdout']),
+            "stderr": stderr,
+            "returncode": message["returncode"],
+            "timed_out": bool(message.get("timed_out")),
+            "oom": bool(message.get("oom")),
+            "seconds": message.get("seconds")
+        }
+
+    def _connect(self, container_name):
+        """Open a connection to a container's daemon"""
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.settimeout(5)
+        try:
+            conn.connect(self.socket_path(container_name))
+        except OSError:
+            conn.close()
+            raise
+
+        with RenderDaemonClient._lock:
+            RenderDaemonClient._unavailable_since.pop(container_name, None)
+        return conn
+
+    def _mark_unavailable(self, container_name, error):
+        """Stop trying a daemon for retry_after seconds"""
+        self.log_warning(f"Render daemon of {container_name} unavailable, using docker exec: {str(error)}")
+        with RenderDaemonClient._lock:
+            RenderDaemonClient._unavailable_since[container_name] = time.monotonic()
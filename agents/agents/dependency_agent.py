@@ -1,18 +1,34 @@
 import re
 import traceback
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
 from .base_agent import BaseAgent
 from .docker_agent import DockerAgent
+from .package_index import resolve_distribution
 
 class DependencyAgent(BaseAgent):
     """
     Agent responsible for managing dependencies required by Manim scripts.
     Detects missing dependencies and installs them in the Docker container.
+    
+    Import names are mapped to distributions through an offline index and
+    installed with `pip --no-index` from a wheelhouse on the shared volume, so
+    a package is downloaded at most once for every container. Requests are
+    counted per distribution so frequent ones can be promoted into the image
+    (manage.py promote_dependencies).
     """
     
     def __init__(self, debug=False):
         """Initialize the Dependency Agent"""
         super().__init__(debug)
         self.docker_agent = DockerAgent(debug)
+        
+        # Wheel cache as seen from inside the container (the repo is mounted at /manim)
+        self.wheelhouse = getattr(settings, 'MANIM_WHEELHOUSE_DIR', '/manim/wheelhouse')
+        
+        # Fill the wheelhouse from the package index when a wheel is missing
+        self.allow_download = getattr(settings, 'MANIM_WHEELHOUSE_DOWNLOAD', True)
     
     def detect_and_install_missing_dependencies(self, error_message, container_name="omega-manim"):
         """
@@ -40,6 +56,7 @@ class DependencyAgent(BaseAgent):
         failed_modules = []
         
         for module_name in missing_modules:
+            self._record_request(module_name)
             result = self.install_dependency(module_name, container_name)
             if result["success"]:
                 installed_modules.append(module_name)
@@ -58,7 +75,7 @@ class DependencyAgent(BaseAgent):
     
     def install_dependency(self, module_name, container_name="omega-manim"):
         """
-        Install a dependency in the Docker container
+        Install a dependency in the Docker container from the wheelhouse
         
         Args:
             module_name (str): Name of the Python module to install
@@ -75,25 +92,45 @@ class DependencyAgent(BaseAgent):
                     "error": f"Invalid module name: {module_name}"
                 }
             
-            # Install module in container
-            self.log_info(f"Installing module {module_name} in container {container_name}")
-            install_command = f"pip install {module_name}"
+            distribution = resolve_distribution(module_name)
+            if not distribution or not self._is_valid_module_name(distribution):
+                return {
+                    "success": False,
+                    "module": module_name,
+                    "error": f"{module_name} is not an installable package"
+                }
+            
+            # Install from the wheelhouse only - no index, no network
+            self.log_info(f"Installing {distribution} (for {module_name}) in container {container_name}")
+            result = self.docker_agent.execute_command(container_name, self._install_command(distribution))
             
-            # Execute installation
-            result = self.docker_agent.execute_command(container_name, install_command)
+            if not result["success"] and self.allow_download:
+                # First request for this package - cache its wheels for every container
+                self.log_info(f"Adding {distribution} to the wheelhouse {self.wheelhouse}")
+                download = self.docker_agent.execute_command(
+                    container_name,
+                    f"pip download --quiet --dest {self.wheelhouse} {distribution}"
+                )
+                if download["success"]:
+                    result = self.docker_agent.execute_command(container_name, self._install_command(distribution))
+                else:
+                    result = download
             
             if result["success"]:
-                self.log_info(f"Successfully installed {module_name} in container")
+                self.log_info(f"Successfully installed {distribution} in container")
+                self._record_installed(container_name, distribution)
                 return {
                     "success": True,
                     "module": module_name,
+                    "distribution": distribution,
                     "output": result["stdout"]
                 }
             else:
-                self.log_error(f"Failed to install {module_name}: {result['stderr']}")
+                self.log_error(f"Failed to install {distribution}: {result['stderr']}")
                 return {
                     "success": False,
                     "module": module_name,
+                    "distribution": distribution,
                     "error": result["stderr"]
                 }
                 
@@ -108,6 +145,43 @@ class DependencyAgent(BaseAgent):
                 "error": error_msg
             }
     
+    def _install_command(self, distribution):
+        """pip command installing a distribution from the wheelhouse alone"""
+        return f"pip install --quiet --no-index --find-links {self.wheelhouse} {distribution}"
+    
+    def _record_request(self, module_name):
+        """Count a render that needed a missing module, for promotion into the image"""
+        from ..models import DependencyRequest
+        
+        distribution = resolve_distribution(module_name)
+        if not distribution or not self._is_valid_module_name(distribution):
+            return
+        
+        try:
+            request, created = DependencyRequest.objects.get_or_create(
+                distribution=distribution,
+                defaults={'import_name': module_name, 'request_count': 1}
+            )
+            if not created:
+                DependencyRequest.objects.filter(pk=request.pk).update(
+                    request_count=F('request_count') + 1,
+                    last_requested_at=timezone.now()
+                )
+        except Exception as e:
+            self.log_warning(f"Could not record dependency request for {distribution}: {str(e)}")
+    
+    def _record_installed(self, container_name, distribution):
+        """Add a distribution to the packages recorded on the container"""
+        from ..models import Container
+        
+        try:
+            container = Container.objects.filter(name=container_name).first()
+            if container and distribution not in container.installed_packages:
+                container.installed_packages = sorted(container.installed_packages + [distribution])
+                container.save(update_fields=['installed_packages', 'updated_at'])
+        except Exception as e:
+            self.log_warning(f"Could not record {distribution} on container {container_name}: {str(e)}")
+    
     def _extract_missing_modules(self, error_message):
         """
         Extract names of missing modules from error message
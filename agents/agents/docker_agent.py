@@ -1,19 +1,57 @@
 import os
+import time
+import queue
+import shlex
+import codecs
+import threading
 import subprocess
 import traceback
+from django.conf import settings
 from django.utils import timezone
 from .base_agent import BaseAgent
+from .docker_api import DockerAPIClient, DockerAPIError
+from .progress import line_splitter
 
 class DockerAgent(BaseAgent):
     """
     Agent responsible for Docker container operations.
     Handles container status checking, starting, stopping, and command execution.
+    
+    Talks to the Docker Engine API over its unix socket with pooled keep-alive
+    connections, and falls back to the docker CLI when the socket is unavailable.
     """
     
+    # Container name to time it was last seen running, shared by all agents in the process
+    _running_since_check = {}
+    
+    # Exit status of coreutils timeout after SIGTERM, and of a SIGKILLed process
+    TIMEOUT_EXIT = 124
+    KILLED_EXIT = 137
+    
     def __init__(self, debug=False):
         """Initialize the Docker agent"""
         super().__init__(debug)
         
+        # 'api', 'cli' or 'auto' (API when the socket exists)
+        self.transport = getattr(settings, 'DOCKER_TRANSPORT', 'auto')
+        self.socket_path = getattr(settings, 'DOCKER_SOCKET', '/var/run/docker.sock')
+        
+        # Seconds a positive running check is trusted before asking Docker again
+        self.status_cache_ttl = getattr(settings, 'DOCKER_STATUS_CACHE_TTL', 10)
+        
+        # Seconds between SIGTERM and SIGKILL of a command that exceeded its timeout
+        self.kill_grace = getattr(settings, 'MANIM_RENDER_KILL_GRACE', 10)
+        
+        self.api = DockerAPIClient.shared(self.socket_path) if self._use_api() else None
+    
+    def _use_api(self):
+        """Whether to use the Engine API instead of the CLI"""
+        if self.transport == 'cli':
+            return False
+        if self.transport == 'api':
+            return True
+        return os.path.exists(self.socket_path)
+        
     def check_container_status(self, container_name):
         """
         Check if a Docker container is running
@@ -25,6 +63,17 @@ class DockerAgent(BaseAgent):
             bool: True if container is running, False otherwise
         """
         try:
+            if self.api:
+                details = self.api.inspect_container(container_name)
+                if details is None:
+                    self.log_warning(f"Docker container {container_name} does not exist or is not accessible")
+                    return False
+                
+                is_running = bool(details.get("State", {}).get("Running"))
+                self._remember_status(container_name, is_running)
+                self._update_container_status(container_name, is_running)
+                return is_running
+            
             # Check if container exists and is running
             check_cmd = ["docker", "container", "inspect", "-f", "{{.State.Running}}", container_name]
             result = subprocess.run(
@@ -40,6 +89,7 @@ class DockerAgent(BaseAgent):
                 return False
                 
             # Update container status in database if available
+            self._remember_status(container_name, result.stdout.strip() == "true")
             self._update_container_status(container_name, result.stdout.strip() == "true")
             
             return result.stdout.strip() == "true"
@@ -48,6 +98,34 @@ class DockerAgent(BaseAgent):
             self.log_error(f"Error checking Docker container status: {str(e)}")
             return False
     
+    def get_image_id(self, container_name):
+        """
+        Get the id of the image a container was created from
+        
+        Args:
+            container_name (str): Name of the container
+            
+        Returns:
+            str: Image id (sha256 digest) or None if it could not be determined
+        """
+        try:
+            if self.api:
+                details = self.api.inspect_container(container_name)
+                return details.get("Image") if details else None
+            
+            result = subprocess.run(
+                ["docker", "container", "inspect", "-f", "{{.Image}}", container_name],
+                capture_output=True,
+                text=True,
+                encoding="utf-8",
+                errors="replace"
+            )
+            return result.stdout.strip() if result.returncode == 0 else None
+            
+        except Exception as e:
+            self.log_error(f"Error getting image of Docker container: {str(e)}")
+            return None
+    
     def ensure_container_running(self, container_name):
         """
         Check if the Docker container is running and start it if needed
@@ -59,6 +137,10 @@ class DockerAgent(BaseAgent):
             bool: True if container is running (or started successfully), False otherwise
         """
         try:
+            # Trust a recent running check instead of inspecting on every command
+            if self._recently_running(container_name):
+                return True
+            
             # First check if it's already running
             if self.check_container_status(container_name):
                 self.log_info(f"Docker container {container_name} is already running")
@@ -66,6 +148,14 @@ class DockerAgent(BaseAgent):
                 
             # Container exists but is not running, try to start it
             self.log_info(f"Starting Docker container {container_name}")
+            if self.api:
+                if self.api.start_container(container_name):
+                    self.log_info(f"Successfully started Docker container {container_name}")
+                    self._remember_status(container_name, True)
+                    self._update_container_status(container_name, True)
+                    return True
+                return False
+            
             start_cmd = ["docker", "start", container_name]
             start_result = subprocess.run(
                 start_cmd, 
@@ -78,6 +168,7 @@ class DockerAgent(BaseAgent):
             if start_result.returncode == 0:
                 self.log_info(f"Successfully started Docker container {container_name}")
                 # Update status in database
+                self._remember_status(container_name, True)
                 self._update_container_status(container_name, True)
                 return True
             else:
@@ -88,17 +179,31 @@ class DockerAgent(BaseAgent):
             self.log_error(f"Error ensuring Docker container is running: {str(e)}")
             return False
     
-    def execute_command(self, container_name, command, working_dir=None):
+    def execute_command(self, container_name, command, working_dir=None, on_output=None,
+                        timeout=None, memory_limit_mb=None, cpu_seconds=None):
         """
         Execute a command in a Docker container
         
+        With a timeout the command runs under coreutils `timeout`, which kills its
+        whole process group in the container; CPU and address-space limits are
+        applied to the process tree with prlimit. The address-space limit is
+        best-effort: the command sees it as failed allocations (MemoryError),
+        not as a kill. Memory and process counts are enforced by the
+        container's cgroup, whose OOM killer SIGKILLs the command.
+        
         Args:
             container_name (str): Name of the container to run command in
             command (str): Command to execute
             working_dir (str, optional): Working directory in container. Defaults to None.
+            on_output (callable, optional): Called with (stream, line) for every output line
+                                            while the command runs
+            timeout (int, optional): Wall-clock seconds before the command is killed
+            memory_limit_mb (int, optional): Best-effort address-space limit of the command
+            cpu_seconds (int, optional): CPU time limit of the command
             
         Returns:
-            dict: Result with stdout, stderr, and success status
+            dict: Result with stdout, stderr, success status, and timed_out / oom
+                  when the command was killed for exceeding its limits
         """
         try:
             # Ensure container is running
@@ -115,29 +220,73 @@ class DockerAgent(BaseAgent):
                 cmd = f"cd {working_dir} && {command}"
             else:
                 cmd = command
+            cmd = self._limit_command(cmd, timeout, memory_limit_mb, cpu_seconds)
+            
+            # The CLI client is killed if the in-container timeout somehow never fires
+            host_timeout = timeout + self.kill_grace + 30 if timeout else None
+            started = time.monotonic()
                 
             # Execute command in container
             self.log_info(f"Executing command in container {container_name}: {cmd}")
-            process = subprocess.run(
-                ["docker", "exec", container_name, "bash", "-c", cmd],
-                capture_output=True,
-                text=True,
-                encoding="utf-8", 
-                errors="replace"
-            )
+            if on_output:
+                process = self._execute_streaming(container_name, cmd, on_output, host_timeout)
+            elif self.api:
+                process = self.api.exec_run(container_name, ["bash", "-c", cmd])
+            else:
+                try:
+                    completed = subprocess.run(
+                        ["docker", "exec", container_name, "bash", "-c", cmd],
+                        capture_output=True,
+                        text=True,
+                        encoding="utf-8", 
+                        errors="replace",
+                        timeout=host_timeout
+                    )
+                    process = {
+                        "returncode": completed.returncode,
+                        "stdout": completed.stdout,
+                        "stderr": completed.stderr
+                    }
+                except subprocess.TimeoutExpired as e:
+                    process = {
+                        "returncode": self.TIMEOUT_EXIT,
+                        "stdout": self._decode(e.stdout),
+                        "stderr": self._decode(e.stderr)
+                    }
             
             # Return results
-            success = process.returncode == 0
+            success = process["returncode"] == 0
             if success:
                 self.log_info(f"Command executed successfully in container {container_name}")
             else:
-                self.log_error(f"Command execution failed in container {container_name}: {process.stderr}")
+                self.log_error(f"Command execution failed in container {container_name}: {process['stderr']}")
+            
+            timed_out, oom = self._classify_kill(process, timeout, time.monotonic() - started)
+            stderr = process["stderr"]
+            if timed_out:
+                stderr += f"\nCommand timed out after {timeout} seconds and was killed"
+            elif oom:
+                stderr += "\nCommand exceeded its memory limit and was killed"
                 
             return {
                 "success": success,
-                "stdout": process.stdout,
-                "stderr": process.stderr,
-                "returncode": process.returncode
+                "stdout": process["stdout"],
+                "stderr": stderr,
+                "returncode": process["returncode"],
+                "timed_out": timed_out,
+                "oom": oom
+            }
+            
+        except DockerAPIError as e:
+            # The container may have stopped since it was last checked
+            self._forget_status(container_name)
+            self.log_error(f"Docker API error executing command: {str(e)}")
+            
+            return {
+                "success": False,
+                "stdout": "",
+                "stderr": str(e),
+                "error": str(e)
             }
             
         except Exception as e:
@@ -152,6 +301,128 @@ class DockerAgent(BaseAgent):
                 "error": stack_trace
             }
     
+
+    def _limit_command(self, cmd, timeout=None, memory_limit_mb=None, cpu_seconds=None):
+        """
+        Wrap a shell command in timeout and prlimit
+        
+        Returns:
+            str: The wrapped command, or cmd unchanged without limits
+        """
+        limits = []
+        if memory_limit_mb:
+            limits.append(f"--as={int(memory_limit_mb) * 1024 * 1024}")
+        if cpu_seconds:
+            limits.append(f"--cpu={int(cpu_seconds)}")
+        
+        if not limits and not timeout:
+            return cmd
+        
+        wrapped = f"bash -c {shlex.quote(cmd)}"
+        if limits:
+            wrapped = f"prlimit {' '.join(limits)} {wrapped}"
+        if timeout:
+            wrapped = f"timeout --kill-after={self.kill_grace} {int(timeout)} {wrapped}"
+        return wrapped
+    
+    def _classify_kill(self, process, timeout, elapsed):
+        """
+        Tell commands killed for their limits apart from ordinary failures
+        
+        Returns:
+            tuple: (timed_out, oom)
+        """
+        returncode = process["returncode"]
+        if returncode == 0:
+            return False, False
+        
+        timed_out = bool(timeout) and (
+            returncode == self.TIMEOUT_EXIT or (returncode == self.KILLED_EXIT and elapsed >= timeout)
+        )
+        # Only the cgroup OOM killer SIGKILLs a command we did not time out - a
+        # MemoryError under the address-space limit is an ordinary failure
+        oom = not timed_out and returncode == self.KILLED_EXIT
+        return timed_out, oom
+    
+    def _decode(self, output):
+        """Text of partial subprocess output, which may be bytes or None"""
+        if isinstance(output, bytes):
+            return output.decode("utf-8", errors="replace")
+        return output or ""
+    
+    def _execute_streaming(self, container_name, cmd, on_output, host_timeout=None):
+        """
+        Run a shell command in a container, passing each output line to on_output as it is written
+        
+        Returns:
+            dict: returncode, stdout and stderr
+        """
+        feed, flush = self._line_splitter(on_output)
+        
+        try:
+            if self.api:
+                return self.api.exec_run_stream(container_name, ["bash", "-c", cmd], feed)
+            
+            process = subprocess.Popen(
+                ["docker", "exec", container_name, "bash", "-c", cmd],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+            
+            # Reader threads only queue chunks - on_output runs in this thread
+            chunks = queue.Queue()
+            
+            def pump(pipe, stream):
+                for chunk in iter(lambda: pipe.read1(4096), b''):
+                    chunks.put((stream, chunk))
+                chunks.put((stream, None))
+            
+            for pipe, stream in ((process.stdout, 'stdout'), (process.stderr, 'stderr')):
+                threading.Thread(target=pump, args=(pipe, stream), daemon=True).start()
+            
+            # Kill the CLI client if the in-container timeout somehow never fires
+            killer = threading.Timer(host_timeout, process.kill) if host_timeout else None
+            if killer:
+                killer.daemon = True
+                killer.start()
+            
+            output = {'stdout': [], 'stderr': []}
+            decoders = {stream: codecs.getincrementaldecoder('utf-8')(errors='replace') for stream in output}
+            open_streams = len(output)
+            
+            while open_streams:
+                stream, chunk = chunks.get()
+                if chunk is None:
+                    open_streams -= 1
+                    continue
+                text = decoders[stream].decode(chunk)
+                output[stream].append(text)
+                feed(stream, text)
+            
+            returncode = process.wait()
+            if killer:
+                killer.cancel()
+                if returncode == -9:
+                    returncode = self.TIMEOUT_EXIT
+            
+            return {
+                "returncode": returncode,
+                "stdout": "".join(output['stdout']),
+                "stderr": "".join(output['stderr'])
+            }
+            
+        finally:
+            flush()
+    
+    def _line_splitter(self, on_output):
+        """
+        Turn output chunks into lines for on_output
+        
+        Returns:
+            tuple: (feed(stream, text), flush()) callables
+        """
+        return line_splitter(on_output)
+    
     def copy_to_container(self, container_name, source_path, dest_path):
         """
         Copy a file from host to container
@@ -166,6 +437,11 @@ class DockerAgent(BaseAgent):
         """
         try:
             self.log_info(f"Copying {source_path} to container {container_name}:{dest_path}")
+            if self.api:
+                self.api.put_file(container_name, source_path, dest_path)
+                self.log_info(f"Successfully copied file to container")
+                return True
+            
             copy_cmd = ["docker", "cp", source_path, f"{container_name}:{dest_path}"]
             result = subprocess.run(
                 copy_cmd, 
@@ -200,6 +476,11 @@ class DockerAgent(BaseAgent):
         """
         try:
             self.log_info(f"Copying from container {container_name}:{source_path} to {dest_path}")
+            if self.api:
+                self.api.get_file(container_name, source_path, dest_path)
+                self.log_info(f"Successfully copied file from container")
+                return True
+            
             copy_cmd = ["docker", "cp", f"{container_name}:{source_path}", dest_path]
             result = subprocess.run(
                 copy_cmd, 
@@ -220,6 +501,107 @@ class DockerAgent(BaseAgent):
             self.log_error(f"Error copying file from container: {str(e)}")
             return False
     
+    def create_container(self, container_name, image, volumes=None, working_dir=None, resource_limits=None):
+        """
+        Create and start a detached container from an image
+        
+        Args:
+            container_name (str): Name for the new container
+            image (str): Image to run
+            volumes (list, optional): Bind mounts as "host_path:container_path" strings
+            working_dir (str, optional): Working directory in container
+            resource_limits (dict, optional): cgroup limits - memory (e.g. "4g"), cpus (e.g. "2")
+                                              and pids_limit; empty values are not limited
+            
+        Returns:
+            bool: True if the container was started, False otherwise
+        """
+        try:
+            self.log_info(f"Creating Docker container {container_name} from {image}")
+            # The hostname names the render daemon's socket after the container
+            run_cmd = ["docker", "run", "-d", "--name", container_name, "--hostname", container_name]
+            for volume in volumes or []:
+                run_cmd.extend(["-v", volume])
+            if working_dir:
+                run_cmd.extend(["-w", working_dir])
+            limits = resource_limits or {}
+            if limits.get('memory'):
+                # Same swap limit as memory so the OOM killer fires instead of swapping
+                run_cmd.extend(["--memory", str(limits['memory']), "--memory-swap", str(limits['memory'])])
+            if limits.get('cpus'):
+                run_cmd.extend(["--cpus", str(limits['cpus'])])
+            if limits.get('pids_limit'):
+                run_cmd.extend(["--pids-limit", str(limits['pids_limit'])])
+            run_cmd.append(image)
+            
+            result = subprocess.run(
+                run_cmd, 
+                capture_output=True, 
+                text=True,
+                encoding="utf-8", 
+                errors="replace"
+            )
+            
+            if result.returncode == 0:
+                self.log_info(f"Successfully created Docker container {container_name}")
+                self._update_container_status(container_name, True)
+                return True
+            else:
+                self.log_error(f"Failed to create Docker container: {result.stderr}")
+                return False
+                
+        except Exception as e:
+            self.log_error(f"Error creating Docker container: {str(e)}")
+            return False
+    
+    def remove_container(self, container_name):
+        """
+        Stop and remove a container
+        
+        Args:
+            container_name (str): Name of the container to remove
+            
+        Returns:
+            bool: True if the container was removed, False otherwise
+        """
+        try:
+            self.log_info(f"Removing Docker container {container_name}")
+            result = subprocess.run(
+                ["docker", "rm", "-f", container_name], 
+                capture_output=True, 
+                text=True,
+                encoding="utf-8", 
+                errors="replace"
+            )
+            
+            if result.returncode == 0:
+                self._forget_status(container_name)
+                self._update_container_status(container_name, False)
+                return True
+            else:
+                self.log_error(f"Failed to remove Docker container: {result.stderr}")
+                return False
+                
+        except Exception as e:
+            self.log_error(f"Error removing Docker container: {str(e)}")
+            return False
+    
+    def _remember_status(self, container_name, is_running):
+        """Cache the result of a running check"""
+        if is_running:
+            DockerAgent._running_since_check[container_name] = time.monotonic()
+        else:
+            self._forget_status(container_name)
+    
+    def _forget_status(self, container_name):
+        """Drop the cached running state of a container"""
+        DockerAgent._running_since_check.pop(container_name, None)
+    
+    def _recently_running(self, container_name):
+        """Whether the container was seen running within the status cache TTL"""
+        checked_at = DockerAgent._running_since_check.get(container_name)
+        return checked_at is not None and time.monotonic() - checked_at < self.status_cache_ttl
+    
     def _update_container_status(self, container_name, is_running):
         """
         Update container status in database if container model exists
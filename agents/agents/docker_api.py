@@ -0,0 +1,339 @@
+import io
+import json
+import codecs
+import queue
+import socket
+import struct
+import tarfile
+import threading
+import http.client
+from urllib.parse import quote, urlencode
+
+class DockerAPIError(Exception):
+    """Error response from the Docker Engine API"""
+
+    def __init__(self, status, message):
+        super().__init__(f"Docker API error {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a unix domain socket"""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class DockerAPIClient:
+    """
+    Minimal Docker Engine API client with a pool of keep-alive connections.
+    Covers the calls DockerAgent needs: container inspect/start, exec
+    create/start/inspect and archive put/get.
+    """
+
+    API_VERSION = 'v1.41'
+
+    # One client per socket so every agent in the process shares the pool
+    _clients = {}
+    _clients_lock = threading.Lock()
+
+    def __init__(self, socket_path='/var/run/docker.sock', pool_size=8, timeout=None):
+        """
+        Initialize the client
+
+        Args:
+            socket_path (str, optional): Path to the Docker Engine socket
+            pool_size (int, optional): Maximum number of idle connections kept open
+            timeout (float, optional): Socket timeout in seconds, None blocks forever
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    @classmethod
+    def shared(cls, socket_path='/var/run/docker.sock'):
+        """Get the process-wide client for a socket"""
+        with cls._clients_lock:
+            if socket_path not in cls._clients:
+                cls._clients[socket_path] = cls(socket_path)
+            return cls._clients[socket_path]
+
+    def ping(self):
+        """Check the daemon is reachable"""
+        status, _ = self._request('GET', '/_ping')
+        return status == 200
+
+    def inspect_container(self, container_name):
+        """
+        Inspect a container
+
+        Returns:
+            dict: Container details, or None if the container does not exist
+        """
+        status, body = self._request('GET', f"/containers/{quote(container_name)}/json")
+        if status == 404:
+            return None
+        self._raise_for_status(status, body)
+        return json.loads(body)
+
+    def start_container(self, container_name):
+        """Start a container, returns True if it is running afterwards"""
+        status, body = self._request('POST', f"/containers/{quote(container_name)}/start")
+        # 304 means the container was already running
+        if status in (204, 304):
+            return True
+        self._raise_for_status(status, body)
+        return False
+
+    def exec_create(self, container_name, cmd, working_dir=None):
+        """
+        Create an exec instance
+
+        Args:
+            container_name (str): Container to run in
+            cmd (list): Command and arguments
+            working_dir (str, optional): Working directory in container
+
+        Returns:
+            str: Exec instance id
+        """
+        config = {
+            'Cmd': cmd,
+            'AttachStdout': True,
+            'AttachStderr': True,
+            'Tty': False
+        }
+        if working_dir:
+            config['WorkingDir'] = working_dir
+
+        status, body = self._request(
+            'POST', f"/containers/{quote(container_name)}/exec", json_body=config
+        )
+        self._raise_for_status(status, body)
+        return json.loads(body)['Id']
+
+    def exec_start(self, exec_id):
+        """
+        Run an exec instance to completion
+
+        Returns:
+            tuple: (stdout bytes, stderr bytes)
+        """
+        status, body = self._request(
+            'POST', f"/exec/{exec_id}/start", json_body={'Detach': False, 'Tty': False}
+        )
+        self._raise_for_status(status, body)
+        return self._demultiplex(body)
+
+    def exec_inspect(self, exec_id):
+        """Inspect an exec instance (ExitCode, Running, Pid)"""
+        status, body = self._request('GET', f"/exec/{exec_id}/json")
+        self._raise_for_status(status, body)
+        return json.loads(body)
+
+    def exec_run(self, container_name, cmd, working_dir=None):
+        """
+        Create, start and inspect an exec instance
+
+        Returns:
+            dict: returncode, stdout and stderr (decoded text)
+        """
+        exec_id = self.exec_create(container_name, cmd, working_dir)
+        stdout, stderr = self.exec_start(exec_id)
+        exit_code = self.exec_inspect(exec_id).get('ExitCode')
+
+        return {
+            "returncode": exit_code,
+            "stdout": stdout.decode('utf-8', errors='replace'),
+            "stderr": stderr.decode('utf-8', errors='replace')
+        }
+
+    def exec_stream(self, exec_id):
+        """
+        Run an exec instance, yielding its output as it arrives
+
+        Exec start hijacks the connection, so a dedicated connection is used
+        and closed afterwards instead of going back to the pool.
+
+        Yields:
+            tuple: (stream name 'stdout' or 'stderr', payload bytes)
+        """
+        body = json.dumps({'Detach': False, 'Tty': False}).encode('utf-8')
+        conn = UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+
+        try:
+            conn.request(
+                'POST', f"/{self.API_VERSION}/exec/{exec_id}/start",
+                body=body, headers={'Content-Type': 'application/json'}
+            )
+            response = conn.getresponse()
+            if not 200 <= response.status < 300:
+                self._raise_for_status(response.status, response.read())
+
+            while True:
+                header = response.read(8)
+                if len(header) < 8:
+                    return
+                stream_type, size = struct.unpack('>BxxxL', header)
+                yield ('stderr' if stream_type == 2 else 'stdout'), response.read(size)
+        finally:
+            conn.close()
+
+    def exec_run_stream(self, container_name, cmd, on_output, working_dir=None):
+        """
+        Like exec_run, but passes output chunks to on_output as they arrive
+
+        Args:
+            container_name (str): Container to run in
+            cmd (list): Command and arguments
+            on_output (callable): Called with (stream name, decoded text chunk)
+            working_dir (str, optional): Working directory in container
+
+        Returns:
+            dict: returncode, stdout and stderr (decoded text)
+        """
+        exec_id = self.exec_create(container_name, cmd, working_dir)
+        output = {'stdout': [], 'stderr': []}
+
+        # Frames may split multi-byte characters
+        decoders = {stream: codecs.getincrementaldecoder('utf-8')(errors='replace') for stream in output}
+
+        for stream, payload in self.exec_stream(exec_id):
+            output[stream].append(payload)
+            on_output(stream, decoders[stream].decode(payload))
+
+        return {
+            "returncode": self.exec_inspect(exec_id).get('ExitCode'),
+            "stdout": b''.join(output['stdout']).decode('utf-8', errors='replace'),
+            "stderr": b''.join(output['stderr']).decode('utf-8', errors='replace')
+        }
+
+    def put_archive(self, container_name, path, data):
+        """Extract a tar archive into a directory of the container"""
+        status, body = self._request(
+            'PUT',
+            f"/containers/{quote(container_name)}/archive?{urlencode({'path': path})}",
+            body=data,
+            headers={'Content-Type': 'application/x-tar'}
+        )
+        self._raise_for_status(status, body)
+        return True
+
+    def get_archive(self, container_name, path):
+        """Get a path from the container as tar archive bytes"""
+        status, body = self._request(
+            'GET', f"/containers/{quote(container_name)}/archive?{urlencode({'path': path})}"
+        )
+        self._raise_for_status(status, body)
+        return body
+
+    def put_file(self, container_name, source_path, dest_path):
+        """Copy a single host file to a path in the container"""
+        dest_dir, dest_name = dest_path.rsplit('/', 1) if '/' in dest_path else ('.', dest_path)
+
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w') as archive:
+            archive.add(source_path, arcname=dest_name)
+
+        return self.put_archive(container_name, dest_dir or '/', buffer.getvalue())
+
+    def get_file(self, container_name, source_path, dest_path):
+        """Copy a single file from the container to a host path"""
+        data = self.get_archive(container_name, source_path)
+
+        with tarfile.open(fileobj=io.BytesIO(data), mode='r') as archive:
+            member = next((m for m in archive.getmembers() if m.isfile()), None)
+            if member is None:
+                raise DockerAPIError(404, f"No file at {source_path}")
+
+            with archive.extractfile(member) as source, open(dest_path, 'wb') as dest:
+                dest.write(source.read())
+        return True
+
+    def close(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _request(self, method, path, json_body=None, body=None, headers=None):
+        """
+        Send a request on a pooled connection, retrying once on a dropped keep-alive
+
+        Returns:
+            tuple: (status code, response body bytes)
+        """
+        headers = dict(headers or {})
+        if json_body is not None:
+            body = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+
+        url = f"/{self.API_VERSION}{path}"
+
+        for attempt in range(2):
+            conn = self._get_connection()
+            try:
+                conn.request(method, url, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError, socket.timeout, OSError):
+                conn.close()
+                # An idle connection closed by the daemon - retry on a fresh one
+                if attempt == 0:
+                    continue
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release_connection(conn)
+            return response.status, data
+
+    def _get_connection(self):
+        """Take an idle connection from the pool or open a new one"""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+
+    def _release_connection(self, conn):
+        """Return a connection to the pool, closing it if the pool is full"""
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _raise_for_status(self, status, body):
+        """Raise DockerAPIError for non-2xx responses"""
+        if 200 <= status < 300:
+            return
+
+        try:
+            message = json.loads(body).get('message', '')
+        except Exception:
+            message = body.decode('utf-8', errors='replace')
+        raise DockerAPIError(status, message)
+
+    @staticmethod
+    def _demultiplex(data):
+        """Split Docker's multiplexed stdout/stderr stream"""
+        stdout, stderr = [], []
+        offset = 0
+
+        while offset + 8 <= len(data):
+            stream_type, size = struct.unpack('>BxxxL', data[offset:offset + 8])
+            payload = data[offset + 8:offset + 8 + size]
+            (stderr if stream_type == 2 else stdout).append(payload)
+            offset += 8 + size
+
+        return b''.join(stdout), b''.join(stderr)
@@ -0,0 +1,339 @@
+import re
+from .package_index import resolve_distribution
+from .api_migrations import migration_rules
+
+# Failure categories stored in Execution.error_category
+SYNTAX = 'syntax'
+IMPORT = 'import'
+API = 'api'
+LATEX = 'latex'
+FFMPEG = 'ffmpeg'
+TIMEOUT = 'timeout'
+OOM = 'oom'
+INFRA = 'infra'
+ENVIRONMENT = 'environment'
+RUNTIME = 'runtime'
+
+# Remedies, cheapest first
+REWRITE = 'rewrite'
+DEPENDENCY = 'dependency'
+INFRA_RETRY = 'infra_retry'
+LLM = 'llm'
+FAIL = 'fail'
+
+# Failures of the container, the Docker daemon or the host - retrying the same
+# script is the fix, the script itself is fine
+INFRA_PATTERNS = [
+    r"Cannot connect to the Docker daemon",
+    r"Error response from daemon",
+    r"Docker API error",
+    r"No such container",
+    r"Container \S+ is not running",
+    r"Failed to start container",
+    r"OCI runtime",
+    r"Render daemon error",
+    r"Render daemon closed the connection",
+    r"No space left on device",
+    r"Connection reset by peer",
+]
+
+# Tools Manim runs that are missing from the image - neither retrying nor
+# debugging can help, the render fails right away
+ENVIRONMENT_RE = re.compile(
+    r"No such file or directory: '(latex|dvisvgm|ffmpeg)'|\b(latex|dvisvgm|ffmpeg): (?:command )?not found"
+)
+
+LATEX_PATTERNS = [
+    r"LaTeX Error",
+    r"latex error converting",
+    r"^! ",
+    r"Emergency stop",
+    r"dvisvgm.*(error|failed)",
+]
+
+FFMPEG_PATTERNS = [
+    r"Conversion failed!",
+    r"ffmpeg.*(error|failed|not found)",
+    r"\bav\.error\.",
+    r"\[Errno 32\] Broken pipe",
+]
+
+# Last "SomeError: message" line of a traceback
+EXCEPTION_RE = re.compile(r"^\s*((?:[A-Za-z_]\w*\.)*[A-Za-z_]\w*(?:Error|Exception|Exit))(?::\s*(.*))?$")
+
+# Frames of plain and rich (Manim) tracebacks
+FRAME_RE = re.compile(r'File "([^"]+)", line (\d+)(?:, in (\S+))?')
+RICH_FRAME_RE = re.compile(r"(\S+\.py):(\d+) in (\S+)")
+
+# Pre-flight diagnostics, see PreflightAgent.format_diagnostics
+DIAGNOSTIC_RE = re.compile(r"^- \[([\w-]+)\] (?:line (\d+): )?(.*)$")
+
+# Box drawing and marker characters of rich tracebacks
+RICH_CHARS = "│╭╮╰╯─❱"
+
+
+def classify_error(error_text, timed_out=False, oom=False):
+    """
+    Parse the error of a failed render into a category and the cheapest remedy
+
+    Args:
+        error_text (str): Error of the render - stderr, a pre-flight report or an exception message
+        timed_out (bool, optional): The render was killed for exceeding its time limit
+        oom (bool, optional): The render was killed for exceeding its memory limit
+
+    Returns:
+        dict: category, remedy, exception, message, line (int or None), code
+              (failing source line), symbol (failing name), symbols (every
+              failing name), module (missing module) and summary (one line)
+    """
+    text = _strip_rich(error_text or "")
+    classification = {
+        "category": RUNTIME,
+        "remedy": LLM,
+        "exception": None,
+        "message": None,
+        "line": None,
+        "code": None,
+        "symbol": None,
+        "symbols": [],
+        "module": None,
+    }
+    classification.update(_parse_traceback(text))
+
+    missing_tool = ENVIRONMENT_RE.search(text)
+    if timed_out or oom:
+        classification["category"] = TIMEOUT if timed_out else OOM
+    elif missing_tool:
+        tool = missing_tool.group(1) or missing_tool.group(2)
+        classification.update(
+            category=ENVIRONMENT,
+            remedy=FAIL,
+            symbol=tool,
+            message=f"The Manim container has no {tool} executable - install it in the Manim image"
+        )
+    elif _matches(INFRA_PATTERNS, text):
+        classification.update(category=INFRA, remedy=INFRA_RETRY)
+        classification["message"] = classification["message"] or _matching_line(INFRA_PATTERNS, text)
+    elif text.lstrip().startswith("Pre-flight check failed"):
+        classification.update(_classify_preflight(text))
+    elif _matches(LATEX_PATTERNS, text):
+        classification["category"] = LATEX
+        tex_errors = [line.strip() for line in text.splitlines() if line.startswith("! ") or "LaTeX Error" in line]
+        if tex_errors:
+            classification["message"] = " / ".join(tex_errors[:3])
+        missing = re.search(r"File `([^']+)' not found", text)
+        classification["symbol"] = missing.group(1) if missing else None
+    elif _matches(FFMPEG_PATTERNS, text):
+        classification.update(category=FFMPEG, remedy=INFRA_RETRY)
+    elif classification["exception"]:
+        classification.update(_classify_exception(classification["exception"], classification["message"] or ""))
+
+    if classification["symbol"] and not classification["symbols"]:
+        classification["symbols"] = [classification["symbol"]]
+    if classification["remedy"] == LLM and classification["category"] in (API, IMPORT) \
+            and can_rewrite(classification):
+        classification["remedy"] = REWRITE
+
+    classification["summary"] = _summarize(classification)
+    return classification
+
+
+def can_rewrite(classification):
+    """Whether the API migration table has a rule for a failing name of the classification"""
+    return bool(classification.get("symbols")) and bool(migration_rules(classification["symbols"]))
+
+
+def trim_error(error_text, max_lines=40):
+    """
+    Relevant part of a render error, for the AI debugger
+
+    Rich traceback boxes are stripped and library frames dropped, keeping the
+    frames in the script, the frame that raised and the exception. LaTeX logs
+    are cut down to their error lines.
+
+    Args:
+        error_text (str): Error of the render
+        max_lines (int, optional): Lines to keep at most. Defaults to 40.
+
+    Returns:
+        str: The trimmed error
+    """
+    lines = _strip_rich(error_text or "").strip().splitlines()
+    if len(lines) <= max_lines or lines[0].startswith("Pre-flight check failed"):
+        return "\n".join(lines[:max_lines])
+
+    kept = []
+    frames = []
+    for index, line in enumerate(lines):
+        match = FRAME_RE.search(line) or RICH_FRAME_RE.search(line)
+        if match:
+            frames.append((match, index))
+    for position, (match, index) in enumerate(frames):
+        if _is_library_path(match.group(1)) and position != len(frames) - 1:
+            if kept[-1:] != ["  ..."]:
+                kept.append("  ...")
+            continue
+        kept.append(lines[index].strip())
+        code = _frame_code(lines, index, int(match.group(2)))
+        if code:
+            kept.append(f"    {code}")
+    if frames:
+        kept.insert(0, "Traceback (most recent call last):")
+
+    # TeX reports "! <error>" followed by "l.<line> <source>"
+    for index, line in enumerate(lines):
+        if line.startswith("! ") or "LaTeX Error" in line:
+            kept.append(line.strip())
+            kept.extend(next_line.strip() for next_line in lines[index + 1:index + 4] if re.match(r"^l\.\d+", next_line))
+
+    exception_index = next((index for index in range(len(lines) - 1, -1, -1) if EXCEPTION_RE.match(lines[index])), None)
+    if exception_index is not None:
+        kept.extend(lines[exception_index:exception_index + 10])
+
+    kept = kept or lines
+    return "\n".join(kept[-max_lines:])
+
+
+def _strip_rich(text):
+    """Error text without the boxes of rich tracebacks"""
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip(" " + RICH_CHARS)
+        if stripped or not lines or lines[-1]:
+            lines.append(stripped if any(char in line for char in RICH_CHARS) else line.rstrip())
+    return "\n".join(lines)
+
+
+def _matches(patterns, text):
+    return any(re.search(pattern, text, re.IGNORECASE | re.MULTILINE) for pattern in patterns)
+
+
+def _matching_line(patterns, text):
+    """First line of text that matches one of the patterns"""
+    for line in text.splitlines():
+        if _matches(patterns, line):
+            return line.strip()
+    return None
+
+
+def _parse_traceback(text):
+    """Exception, message, failing line number and source line of a traceback"""
+    parsed = {}
+    lines = text.splitlines()
+
+    for line in reversed(lines):
+        match = EXCEPTION_RE.match(line)
+        if match:
+            parsed["exception"] = match.group(1).split(".")[-1]
+            parsed["message"] = (match.group(2) or "").strip()
+            break
+
+    # The deepest frame in the script itself, not in Manim or the standard library
+    frames = []
+    for index, line in enumerate(lines):
+        match = FRAME_RE.search(line) or RICH_FRAME_RE.search(line)
+        if match:
+            frames.append((match.group(1), int(match.group(2)), index))
+    script_frames = [frame for frame in frames if not _is_library_path(frame[0])]
+    frame = (script_frames or frames or [None])[-1]
+
+    if frame:
+        path, line_number, index = frame
+        parsed["line"] = line_number
+        parsed["code"] = _frame_code(lines, index, line_number)
+    return parsed
+
+
+def _is_library_path(path):
+    return any(part in path for part in ("site-packages", "dist-packages", "/lib/python", "<frozen"))
+
+
+def _frame_code(lines, index, line_number):
+    """Source line shown with a traceback frame"""
+    # Rich marks the failing line with ❱, which _strip_rich turned into "N │ code"
+    for line in lines[index + 1:index + 12]:
+        match = re.match(rf"^{line_number}\s+(.*)$", line.strip())
+        if match:
+            return match.group(1).strip(" " + RICH_CHARS) or None
+        if FRAME_RE.search(line) or RICH_FRAME_RE.search(line):
+            break
+
+    # Plain tracebacks print the line right below the frame
+    if index + 1 < len(lines) and not FRAME_RE.search(lines[index + 1]):
+        code = lines[index + 1].strip()
+        if code and not EXCEPTION_RE.match(code):
+            return code
+    return None
+
+
+def _classify_preflight(text):
+    """Classify the first diagnostics of a failed pre-flight check"""
+    diagnostics = [match.groups() for match in map(DIAGNOSTIC_RE.match, text.splitlines()) if match]
+    if not diagnostics:
+        return {}
+
+    code, line, message = diagnostics[0]
+    result = {"exception": None, "message": message, "line": int(line) if line else None, "code": None}
+    if code == 'syntax-error':
+        result["category"] = SYNTAX
+        return result
+
+    # Unknown imports and undefined names are usually names Manim renamed
+    symbols = []
+    for diagnostic_code, _, diagnostic_message in diagnostics:
+        name = re.match(r"'([^']+)'", diagnostic_message)
+        if name and diagnostic_code in ('unknown-import', 'undefined-name'):
+            symbols.append(name.group(1))
+    if code in ('unknown-import', 'undefined-name'):
+        result.update(category=API, symbol=symbols[0] if symbols else None, symbols=symbols)
+    return result
+
+
+def _classify_exception(exception, message):
+    """Category, remedy and failing name of a Python exception"""
+    if exception in ('SyntaxError', 'IndentationError', 'TabError'):
+        return {"category": SYNTAX}
+
+    missing = re.search(r"No module named ['\"]([\w.]+)['\"]", message)
+    if exception == 'ModuleNotFoundError' or missing:
+        module = missing.group(1) if missing else None
+        base = module.split(".")[0] if module else None
+        if base and migration_rules([base]):
+            return {"category": API, "module": module, "symbol": base}
+        # Missing packages are installed, anything that cannot be installed goes to the LLM
+        remedy = DEPENDENCY if base and base != 'manim' and resolve_distribution(base) else LLM
+        return {"category": IMPORT, "remedy": remedy, "module": module, "symbol": base}
+
+    if exception == 'ImportError':
+        name = re.search(r"cannot import name ['\"]?(\w+)['\"]? from ['\"]?([\w.]+)", message)
+        if name:
+            category = API if name.group(2).split(".")[0] == 'manim' else IMPORT
+            return {"category": category, "symbol": name.group(1), "module": name.group(2)}
+        return {"category": IMPORT}
+
+    if exception == 'NameError':
+        name = re.search(r"name '(\w+)' is not defined", message)
+        return {"category": API, "symbol": name.group(1) if name else None}
+
+    if exception == 'AttributeError':
+        name = re.search(r"has no attribute '(\w+)'", message)
+        return {"category": API, "symbol": name.group(1) if name else None}
+
+    if exception == 'TypeError':
+        keyword = re.search(r"unexpected keyword argument '(\w+)'", message)
+        if keyword:
+            return {"category": API, "symbol": keyword.group(1)}
+
+    return {"category": RUNTIME}
+
+
+def _summarize(classification):
+    """One line describing a classification, e.g. for logs and events"""
+    parts = [classification["category"]]
+    if classification["exception"]:
+        parts.append(classification["exception"])
+    if classification["symbol"]:
+        parts.append(f"'{classification['symbol']}'")
+    if classification["line"]:
+        parts.append(f"at line {classification['line']}")
+    return f"{' '.join(parts)} -> {classification['remedy']}"
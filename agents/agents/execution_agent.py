@@ -1,16 +1,29 @@
 import os
 import re
+import time
 import uuid
-import glob
 import shutil
-import tempfile
+import threading
 import traceback
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from .base_agent import BaseAgent
 from .docker_agent import DockerAgent
+from .daemon_client import RenderDaemonClient
+from .container_pool import ContainerPoolAgent
+from .render_cache import RenderCacheAgent
+from .preflight import PreflightAgent
+from .scene_analysis import find_scene_classes
 from .dependency_agent import DependencyAgent
 from .ai_agent import AIScriptDebuggingAgent
+from .retry_policy import RetryPolicy
+from .error_classifier import classify_error, INFRA, INFRA_RETRY, DEPENDENCY, REWRITE, FAIL
+from .progress import ExecutionEventPublisher
+from .scratch import ScratchSpaceAgent
+from .quality import QUALITY_PRESETS, quality_rank, get_preview_quality, get_rendition_qualities
+from .queue_agent import RenderQueueAgent
+from .patching import strip_fences
 
 class ManimExecutionAgent(BaseAgent):
     """
@@ -18,14 +31,30 @@ class ManimExecutionAgent(BaseAgent):
     Manages temporary files, Docker execution, and results tracking.
     """
     
-    def __init__(self, debug=False):
-        """Initialize the Manim Execution Agent"""
+    def __init__(self, debug=False, worker_id=None, claim_lost=None):
+        """
+        Initialize the Manim Execution Agent
+        
+        Args:
+            debug (bool, optional): Enable debug logging
+            worker_id (str, optional): Queue worker that claimed the execution being run
+            claim_lost (threading.Event, optional): Set by the worker's heartbeat once the
+                                                    execution was requeued or claimed by another worker
+        """
         super().__init__(debug)
         self.docker_agent = DockerAgent(debug)
+        self.daemon_client = RenderDaemonClient(debug)
         self.dependency_agent = DependencyAgent(debug)
         self.debug_agent = AIScriptDebuggingAgent(debug)
+        self.container_pool = ContainerPoolAgent(debug)
+        self.render_cache = RenderCacheAgent(debug)
+        self.preflight = PreflightAgent(debug)
+        self.scratch = ScratchSpaceAgent(debug)
+        
+        # Publishes status, progress and log events of the current execution
+        self.events = ExecutionEventPublisher()
         
-        # Container name - can be overridden in configuration
+        # Default container name - the pool picks the container for each execution
         self.container_name = getattr(settings, 'MANIM_CONTAINER_NAME', 'omega-manim')
         
         # Container working directory
@@ -33,8 +62,37 @@ class ManimExecutionAgent(BaseAgent):
         
         # Output media directory
         self.media_root = settings.MEDIA_ROOT
+        
+        # 'shared_volume' hands files over through the bind-mounted media directory,
+        # 'daemon' does the same but renders through the container's warm render daemon,
+        # 'copy' uses docker cp for containers without the shared volume
+        self.transport = getattr(settings, 'MANIM_TRANSPORT', 'daemon')
+        
+        # Where MEDIA_ROOT is mounted inside the container (defaults to <working_dir>/media)
+        self.container_media_root = getattr(settings, 'MANIM_CONTAINER_MEDIA_ROOT', None)
+        
+        # Quality preset of the current render - see _set_quality
+        self._set_quality(get_preview_quality())
+        
+        # Render every scene of a multi-scene script in one Manim invocation
+        self.render_all_scenes = getattr(settings, 'MANIM_RENDER_ALL_SCENES', True)
+        
+        # Validate that construct() runs before each full render: 'dry_run', 'last_frame' or '' (off)
+        self.smoke_mode = getattr(settings, 'MANIM_SMOKE_RENDER', 'dry_run')
+        
+        # Per-render limits - a render exceeding them is killed with its whole process tree
+        self.render_timeout = getattr(settings, 'MANIM_RENDER_TIMEOUT', 600)
+        self.memory_limit_mb = getattr(settings, 'MANIM_RENDER_MEMORY_LIMIT_MB', 0)
+        self.cpu_seconds = getattr(settings, 'MANIM_RENDER_CPU_SECONDS', 0)
+        
+        # Renders retried without debugging after container or Docker failures
+        self.infra_retries = getattr(settings, 'MANIM_INFRA_RETRIES', 2)
+        
+        # A queued execution is only written while its row still names this worker
+        self.worker_id = worker_id
+        self.claim_lost = claim_lost or threading.Event()
     
-    def execute(self, script, max_attempts=100):
+    def execute(self, script, max_attempts=None, execution=None):
         """
         Execute a Manim script
         
@@ -43,53 +101,137 @@ class ManimExecutionAgent(BaseAgent):
                 - Script model object
                 - String with script content
                 - Dict with script content and other properties
-            max_attempts (int, optional): Maximum number of execution attempts. Defaults to 100.
+            max_attempts (int, optional): Maximum number of execution attempts.
+                                          Defaults to MANIM_MAX_ATTEMPTS.
+            execution (Execution, optional): Existing execution record to run,
+                                             e.g. a job claimed from the render queue
             
         Returns:
             dict: Result with execution status, output path, and details
         """
+        # Renditions re-render a successful preview at a higher quality and are never debugged
+        is_rendition = bool(execution and execution.source_execution_id)
+        
         # Extract script content and ID based on input type
-        script_id, script_content, script_obj = self._prepare_script(script)
+        script_id, script_content, script_obj = self._prepare_script(script, update_status=not is_rendition)
+        if is_rendition and execution.original_script:
+            script_content = execution.original_script
+        
+        # Previews render at the cheap preview quality, queued jobs at the quality they were queued with
+        self._set_quality(execution.quality if execution else get_preview_quality())
+        
+        # Reuse the queued execution record or create a new one if script_obj is available
+        if execution:
+            execution_obj = self._claim_execution_record(execution)
+        else:
+            execution_id = str(uuid.uuid4())
+            execution_obj = self._create_execution_record(script_obj, execution_id)
         
-        # Create a new execution record if script_obj is available
-        execution_id = str(uuid.uuid4())
-        execution_obj = self._create_execution_record(script_obj, execution_id)
+        self.events = ExecutionEventPublisher(execution_obj)
+        
+        # Schedule the render on the least-loaded container
+        self._select_container(execution_obj)
+        self.events.status('running', container=self.container_name, quality=self.quality)
+        
+        # Identical renders are served from the cache without touching the container
+        cache_keys, image_version = self._get_cache_keys(script_content)
+        cached_result = self._serve_from_cache(cache_keys, execution_obj, script_obj)
+        if cached_result:
+            if not is_rendition:
+                self._enqueue_renditions(execution_obj, self._find_rendered_script(execution_obj, script_content))
+            return cached_result
+        
+        if execution_obj and cache_keys:
+            execution_obj.cache_key = next(iter(cache_keys.values()))
+        
+        # Execute with retry logic, bounded by attempts, time, tokens and progress.
+        # A rendition gets a single attempt - debugging only ever runs on the preview.
+        policy = RetryPolicy(1 if is_rendition else max_attempts)
+        policy.start(script_content)
         
-        # Execute with retry logic
         attempt = 0
         last_error = None
+        last_kill = None
+        termination_reason = None
+        infra_retries = 0
         current_script = script_content
         
+        # Debug fix whose render has not been reported to the fix cache yet, and cached fixes tried
+        pending_fix = None
+        tried_fixes = set()
+        
         # Track timing
         start_time = timezone.now()
         
-        while attempt < max_attempts:
+        while True:
             attempt += 1
-            self.log_info(f"Executing script {script_id} (attempt {attempt}/{max_attempts})")
+            
+            # The job was requeued or claimed by another worker - leave it to them
+            if self.claim_lost.is_set():
+                return self._lost_claim_result(execution_obj, script_obj, attempt - 1)
+            
+            self.log_info(f"Executing script {script_id} (attempt {attempt}/{policy.max_attempts})")
             
             # Update execution record if available
             if execution_obj:
                 execution_obj.attempt_number = attempt
-                execution_obj.save()
+                if not self._save_execution(execution_obj):
+                    return self._lost_claim_result(execution_obj, script_obj, attempt - 1)
+            self.events.status('attempt', attempt=attempt, max_attempts=policy.max_attempts)
             
+            last_kill = None
             try:
-                # Find scene class in script
-                scene_class = self._extract_scene_class(current_script)
-                if not scene_class:
-                    raise ValueError("Could not find a Scene class in the script")
+                # Renamed Manim APIs are rewritten on the host before anything is rendered
+                if not is_rendition:
+                    current_script = self._migrate_script(current_script, policy, execution_obj, attempt)
+                
+                # Static checks on the host - their failures never reach the container
+                preflight = self.preflight.check(self._clean_script_content(current_script), self.container_name)
                 
-                # Execute the script
-                result = self._execute_script(current_script, scene_class, script_id)
+                if not preflight["success"]:
+                    self.log_warning(f"Pre-flight check failed for script {script_id}")
+                    self.events.status('preflight_failed', diagnostics=preflight["diagnostics"])
+                    result = {"success": False, "error": preflight["error"]}
+                else:
+                    # Find the scene classes in the script
+                    scene_classes = self._select_scenes(preflight["scenes"] or self._extract_scene_classes(current_script))
+                    if not scene_classes:
+                        raise ValueError("Could not find a Scene class in the script")
+                    
+                    # A cheap smoke render catches exceptions in construct() before the full render
+                    result = None
+                    if self.smoke_mode and not is_rendition:
+                        smoke = self._smoke_render(current_script, scene_classes, script_id, attempt, execution_obj)
+                        if not smoke["success"]:
+                            result = smoke
+                    
+                    # Execute the script
+                    if result is None:
+                        render_start = time.monotonic()
+                        result = self._execute_script(current_script, scene_classes, script_id)
+                        if execution_obj:
+                            execution_obj.render_seconds += round(time.monotonic() - render_start, 3)
                 
                 # If successful, update records and return
                 if result["success"]:
-                    self._update_success_records(execution_obj, result, start_time)
+                    self._settle_fix(pending_fix, current_script)
+                    self._store_in_cache(result["scene_outputs"], image_version, cache_keys, current_script)
+                    if execution_obj and current_script != script_content:
+                        # Renditions and later cache hits render the debugged script
+                        execution_obj.modified_script = current_script
+                    self._update_success_records(execution_obj, result, start_time, policy)
+                    if self.claim_lost.is_set():
+                        return self._lost_claim_result(execution_obj, script_obj, attempt)
+                    if not is_rendition:
+                        self._enqueue_renditions(execution_obj, current_script)
                     return {
                         "success": True,
                         "output_path": result["output_path"],
+                        "scene_outputs": result["scene_outputs"],
                         "execution": execution_obj,
                         "script": script_obj,
-                        "scene_class": scene_class,
+                        "scene_class": scene_classes[0],
+                        "quality": self.quality,
                         "attempt": attempt
                     }
                 
@@ -97,86 +239,365 @@ class ManimExecutionAgent(BaseAgent):
                 last_error = result.get("error", "Unknown error")
                 self.log_error(f"Execution failed: {last_error}")
                 
-                # Check for missing dependencies and install if needed
-                if self._try_dependency_fix(last_error) and attempt < max_attempts:
-                    self.log_info(f"Installed missing dependencies, retrying execution")
-                    continue
-                
-                # Always try debugging the script with AI when there's an error
-                if attempt < max_attempts:
-                    self.log_info(f"Sending script to AI debugger (attempt {attempt})")
-                    debug_result = self.debug_agent.debug(current_script, last_error, execution=execution_obj)
-                    
-                    # Always use the returned script, even if it's unchanged
-                    current_script = debug_result["fixed_script"]
-                    
-                    if debug_result["changed"]:
-                        self.log_info(f"AI provided a fixed script, retrying execution")
-                    else:
-                        self.log_warning(f"AI debugging did not change the script but will retry anyway")
-                    
-                    # Continue to retry with the current script (fixed or unchanged)
-                    continue
+                # Renders killed for their limits need a different fix than exceptions
+                last_kill = 'timeout' if result.get("timed_out") else 'oom' if result.get("oom") else None
+                if last_kill:
+                    self.events.status(last_kill, attempt=attempt)
+                    last_error = self._describe_kill(last_kill, last_error)
                 
             except Exception as e:
                 error_msg = str(e)
                 stack_trace = traceback.format_exc()
                 self.log_error(f"Error in execution process: {error_msg}\n{stack_trace}")
                 last_error = error_msg
-                
-                # Try debugging with AI if this is not the last attempt
-                if attempt < max_attempts:
-                    self.log_info(f"Sending script to AI debugger after exception (attempt {attempt})")
-                    debug_result = self.debug_agent.debug(current_script, error_msg, execution=execution_obj)
-                    current_script = debug_result["fixed_script"]
+            
+            pending_fix = self._settle_fix(pending_fix, current_script, last_error, last_kill)
+            
+            # Route the failure to its cheapest fix - only what nothing else can fix reaches the LLM
+            classification = classify_error(last_error, timed_out=last_kill == 'timeout', oom=last_kill == 'oom')
+            self.log_info(f"Classified failure of script {script_id}: {classification['summary']}")
+            self.events.status(
+                'classified',
+                attempt=attempt,
+                category=classification["category"],
+                remedy=classification["remedy"],
+                line=classification["line"],
+                symbol=classification["symbol"]
+            )
+            if execution_obj:
+                execution_obj.error_category = classification["category"]
+            
+            # A tool missing from the image fails every render - stop with a clear error
+            if classification["remedy"] == FAIL:
+                self.log_error(f"Cannot render script {script_id}: {classification['message']}")
+                last_error = f"{classification['message']}\n\n{last_error}"
+                termination_reason = RetryPolicy.ENVIRONMENT
+                break
+            
+            termination_reason = policy.check_budget(attempt)
+            if termination_reason:
+                break
+            
+            # Container and Docker failures are retried as they are, never debugged
+            if classification["remedy"] == INFRA_RETRY:
+                infra_retries += 1
+                if infra_retries <= self.infra_retries:
+                    self.log_warning(f"Retrying script {script_id} after {classification['category']} failure "
+                                     f"({infra_retries}/{self.infra_retries})")
+                    policy.backoff(infra_retries)
+                    self._select_container(execution_obj)
+                    continue
+                if classification["category"] == INFRA:
+                    termination_reason = RetryPolicy.INFRA
+                    break
+                # An encoder failure that survives retries is caused by the scene - debug it
+            
+            # Install missing packages
+            if classification["remedy"] == DEPENDENCY and self._try_dependency_fix(last_error):
+                self.log_info(f"Installed missing dependencies, retrying execution")
+                continue
+            
+            # Replace renamed Manim APIs without asking the LLM
+            if classification["remedy"] == REWRITE:
+                migration = self.preflight.migrate(current_script, self.container_name, classification["symbols"])
+                if migration["fired"] and not policy.record_fix(migration["script"]):
+                    self._record_migrations(execution_obj, migration, 'error', attempt)
+                    self.log_info(f"Rewrote renamed Manim APIs in script {script_id}, retrying execution")
+                    current_script = migration["script"]
                     continue
+            
+            # Debug the script with AI
+            self.log_info(f"Sending script to AI debugger (attempt {attempt})")
+            self.events.status('debugging', attempt=attempt)
+            debug_result = self.debug_agent.debug_script(
+                current_script, last_error, execution=execution_obj, tried_fixes=tried_fixes
+            )
+            policy.record_tokens(debug_result.get("tokens"))
+            fixed_script = debug_result.get("fixed_script") or current_script
+            
+            # The fix cache learns whether the fix resolved the error from the next render
+            if debug_result.get("fix_id"):
+                tried_fixes.add(debug_result["fix_id"])
+                self.events.status('cached_fix', attempt=attempt, fix_id=debug_result["fix_id"])
+            if debug_result.get("signature") and fixed_script != current_script:
+                pending_fix = {
+                    "signature": debug_result["signature"],
+                    "before": current_script,
+                    "after": fixed_script,
+                    "fix_id": debug_result.get("fix_id")
+                }
+            
+            # Stop when the debugger repeats itself - the render cannot change
+            termination_reason = policy.record_fix(fixed_script)
+            if termination_reason:
+                self.log_warning(f"Stopping retries for script {script_id}: {termination_reason}")
+                break
+            
+            current_script = fixed_script
+            policy.backoff(attempt)
         
-        # All attempts failed, update records
-        self._update_failure_records(execution_obj, last_error, start_time)
+        # Retries exhausted, update records
+        self._update_failure_records(execution_obj, last_error, start_time, policy, termination_reason, last_kill)
+        if self.claim_lost.is_set():
+            return self._lost_claim_result(execution_obj, script_obj, attempt)
         
         return {
             "success": False,
             "error": last_error,
             "execution": execution_obj,
             "script": script_obj,
-            "attempts": attempt
+            "attempts": attempt,
+            "termination_reason": termination_reason,
+            "status": last_kill or 'failed'
         }
     
-    def _execute_script(self, script_content, scene_class, script_id):
+    def _execute_script(self, script_content, scene_classes, script_id, smoke=False):
         """
-        Execute a Manim script in Docker
+        Execute a Manim script in Docker using the configured transport
         
         Args:
             script_content (str): The script content to execute
-            scene_class (str): The scene class to render
+            scene_classes (list): Scene classes to render in one Manim invocation
             script_id (str): Unique identifier for the script execution
+            smoke (bool, optional): Only validate the script with a smoke render, see _smoke_render
             
         Returns:
-            dict: Result with execution status, output path, and details
+            dict: Result with execution status, output path of the first scene,
+                  scene_outputs (output path per scene) and details
+        """
+        if isinstance(scene_classes, str):
+            scene_classes = [scene_classes]
+        
+        if self.transport in ('shared_volume', 'daemon'):
+            return self._execute_script_shared(script_content, scene_classes, script_id, smoke)
+        
+        return self._execute_script_copy(script_content, scene_classes, script_id, smoke)
+    
+    def _smoke_render(self, script_content, scene_classes, script_id, attempt, execution_obj=None):
+        """
+        Check that construct() runs without rendering the video
+        
+        Runs Manim with --dry_run, or with -s (last frame only) and caching
+        disabled, which executes the whole scene but encodes no video. The
+        outcome and duration are recorded on the execution.
+        
+        Args:
+            script_content (str): The script content to check
+            scene_classes (list): Scene classes to check
+            script_id (str): Unique identifier for the script execution
+            attempt (int): Attempt number the smoke render belongs to
+            execution_obj (Execution, optional): Execution to record the run on
+            
+        Returns:
+            dict: Result with success, error and output
+        """
+        start = time.monotonic()
+        result = self._execute_script(script_content, scene_classes, script_id, smoke=True)
+        seconds = round(time.monotonic() - start, 3)
+        
+        self.log_info(f"Smoke render ({self.smoke_mode}) of script {script_id} "
+                      f"{'passed' if result['success'] else 'failed'} in {seconds}s")
+        self.events.status('smoke_render', attempt=attempt, mode=self.smoke_mode,
+                           success=result["success"], seconds=seconds)
+        
+        if execution_obj:
+            execution_obj.smoke_runs = list(execution_obj.smoke_runs or []) + [{
+                "attempt": attempt,
+                "mode": self.smoke_mode,
+                "success": result["success"],
+                "seconds": seconds
+            }]
+            execution_obj.smoke_seconds += seconds
+        
+        return result
+    
+    def _run_manim(self, args):
+        """
+        Run `python -m manim` in the selected container
+        
+        Uses the container's render daemon with the 'daemon' transport and
+        falls back to docker exec when the daemon is not reachable.
+        
+        Args:
+            args (list): Manim CLI arguments
+            
+        Returns:
+            dict: Result with success, stdout, stderr and returncode
+        """
+        if self.transport == 'daemon':
+            result = self.daemon_client.run(
+                self.container_name,
+                args,
+                working_dir=self.working_dir,
+                on_output=self.events.on_output,
+                **self._render_limits()
+            )
+            if result is not None:
+                return result
+        
+        return self.docker_agent.execute_command(
+            self.container_name,
+            f"python -m manim {' '.join(args)}",
+            working_dir=self.working_dir,
+            on_output=self.events.on_output,
+            **self._render_limits()
+        )
+    
+    def _render_limits(self):
+        """Per-render limits for DockerAgent.execute_command and RenderDaemonClient.run"""
+        return {
+            "timeout": self.render_timeout,
+            "memory_limit_mb": self.memory_limit_mb,
+            "cpu_seconds": self.cpu_seconds
+        }
+    
+    def _describe_kill(self, kill, error):
+        """
+        Explain a render killed for exceeding its limits to the AI debugger
+        
+        Args:
+            kill (str): 'timeout' or 'oom'
+            error (str): Output of the killed render
+            
+        Returns:
+            str: Error message with the cause and what to change
+        """
+        if kill == 'timeout':
+            cause = (
+                f"The render was killed because it ran longer than {self.render_timeout} seconds. "
+                "construct() probably never finishes (an unbounded loop, updater or wait) or animates "
+                "far too much: bound every loop, shorten run_time values and reduce the number of animations."
+            )
+        else:
+            cause = (
+                "The render was killed because it ran out of memory. "
+                "Reduce the number of mobjects, points, copies or frames the scene keeps alive."
+            )
+        return f"{cause}\n\n{error}"
+    
+    def _smoke_flags(self):
+        """Manim flags of the configured smoke render mode"""
+        if self.smoke_mode == 'last_frame':
+            return "-ql -s --disable_caching"
+        return "-ql --dry_run"
+    
+    def _execute_script_shared(self, script_content, scene_classes, script_id, smoke=False):
+        """
+        Execute a Manim script through the volume shared with the container
+        
+        The script is written into a per-job directory under MEDIA_ROOT and
+        Manim renders into the same directory with --media_dir, so no file
+        is copied in or out of the container.
+        
+        Args:
+            script_content (str): The script content to execute
+            scene_classes (list): Scene classes to render
+            script_id (str): Unique identifier for the script execution
+            smoke (bool, optional): Run a smoke render and keep no output
+            
+        Returns:
+            dict: Result with execution status, output paths, and details
         """
-        # Create a unique identifier for this execution
-        execution_id = str(uuid.uuid4())
-        temp_files = []
+        job_id = str(uuid.uuid4())
+        job_dir = os.path.join(self.media_root, "jobs", job_id)
+        container_media_root = self.container_media_root or f"{self.working_dir}/media"
+        container_job_dir = f"{container_media_root}/jobs/{job_id}"
+        success = False
         
         try:
-            # Create temporary script file
-            with tempfile.NamedTemporaryFile(suffix=".py", delete=False, mode="w+", encoding="utf-8") as script_file:
-                script_file.write(script_content)
-                script_path = script_file.name
-                temp_files.append(script_path)
-                self.log_info(f"Created temporary script file at {script_path}")
+            # Write the cleaned script atomically so the container never sees a partial file
+            os.makedirs(job_dir, exist_ok=True)
+            script_path = os.path.join(job_dir, "script.py")
+            self._write_file_atomic(script_path, self._clean_script_content(script_content))
+            self.log_info(f"Wrote job script to {script_path}")
+            
+            # Render straight into the job directory on the shared volume
+            flags = self._smoke_flags() if smoke else self.quality_flag
+            result = self._run_manim(
+                [f"{container_job_dir}/script.py", *scene_classes, *flags.split(), "--media_dir", container_job_dir]
+            )
+            output = result["stdout"] + "\n" + result["stderr"]
+            
+            if smoke:
+                return {
+                    "success": result["success"],
+                    "error": None if result["success"] else (result["stderr"] or output),
+                    "output": output,
+                    "timed_out": result.get("timed_out", False),
+                    "oom": result.get("oom", False)
+                }
+            
+            # Manim writes <media_dir>/videos/<module>/<quality>/<scene>.mp4
+            scene_outputs = {
+                scene: f"jobs/{job_id}/videos/script/{self.quality_folder}/{scene}.mp4" for scene in scene_classes
+            }
+            missing = [
+                scene for scene, path in scene_outputs.items()
+                if not os.path.exists(os.path.join(self.media_root, path))
+            ]
+            
+            if result["success"] and not missing:
+                self.log_info(f"Output files created for {', '.join(scene_classes)}")
+                success = True
+                return {
+                    "success": True,
+                    "output": output,
+                    "output_path": scene_outputs[scene_classes[0]],
+                    "scene_outputs": scene_outputs
+                }
+            
+            error_info = result["stderr"] or "No output file generated"
+            self.log_error(f"Output file not found: {error_info}")
+            return {
+                "success": False,
+                "error": error_info,
+                "output": output,
+                "timed_out": result.get("timed_out", False),
+                "oom": result.get("oom", False)
+            }
+            
+        except Exception as e:
+            error_msg = str(e)
+            stack_trace = traceback.format_exc()
+            self.log_error(f"Error in script execution: {error_msg}\n{stack_trace}")
             
-            # Create temp file for output capture
-            with tempfile.NamedTemporaryFile(prefix="manim_output_", suffix=".txt", delete=False, mode="w+", encoding="utf-8") as output_file:
-                output_file_path = output_file.name
-                temp_files.append(output_file_path)
+            return {
+                "success": False,
+                "error": error_msg,
+                "traceback": stack_trace
+            }
+            
+        finally:
+            self._cleanup_job_dir(job_dir, keep_output=success)
+    
+    def _execute_script_copy(self, script_content, scene_classes, script_id, smoke=False):
+        """
+        Execute a Manim script in Docker, copying files in and out of the container
+        
+        Used for containers that do not share a volume with this host.
+        
+        Args:
+            script_content (str): The script content to execute
+            scene_classes (list): Scene classes to render
+            script_id (str): Unique identifier for the script execution
+            smoke (bool, optional): Run a smoke render and copy nothing back
             
-            # Clean script if needed
-            self._clean_script_file(script_path)
+        Returns:
+            dict: Result with execution status, output paths, and details
+        """
+        scratch = None
+        
+        try:
+            # The job's own scratch directories on this host and in the container
+            scratch = self.scratch.create(self.container_name)
+            script_path = scratch.file(f"{scratch.name}.py", self._clean_script_content(script_content))
+            output_file_path = scratch.file("manim_output.txt")
+            self.log_info(f"Created job script at {script_path}")
             
             # Prepare variables
-            script_basename = os.path.basename(script_path).replace('.py', '')
-            container_script_path = f"{self.working_dir}/{os.path.basename(script_path)}"
+            script_basename = scratch.name
+            container_script_path = f"{scratch.container_path}/{os.path.basename(script_path)}"
+            container_media_dir = f"{scratch.container_path}/media"
             
             # Copy script to container
             self.docker_agent.copy_to_container(
@@ -185,52 +606,76 @@ class ManimExecutionAgent(BaseAgent):
                 container_script_path
             )
             
+            if smoke:
+                # Smoke outputs stay in the scratch directory and go with it
+                cmd = (
+                    f"python -m manim {container_script_path} {' '.join(scene_classes)} "
+                    f"{self._smoke_flags()} --media_dir {container_media_dir}"
+                )
+                result = self.docker_agent.execute_command(
+                    self.container_name,
+                    cmd,
+                    working_dir=self.working_dir,
+                    on_output=self.events.on_output,
+                    **self._render_limits()
+                )
+                output = result["stdout"] + "\n" + result["stderr"]
+                return {
+                    "success": result["success"],
+                    "error": None if result["success"] else (result["stderr"] or output),
+                    "output": output,
+                    "timed_out": result.get("timed_out", False),
+                    "oom": result.get("oom", False)
+                }
+            
             # Execute manim in container
-            cmd = f"python -m manim {os.path.basename(script_path)} {scene_class} -qm"
+            cmd = (
+                f"python -m manim {container_script_path} {' '.join(scene_classes)} {self.quality_flag} "
+                f"--media_dir {container_media_dir}"
+            )
             result = self.docker_agent.execute_command(
                 self.container_name,
                 cmd,
-                working_dir=self.working_dir
+                working_dir=self.working_dir,
+                on_output=self.events.on_output,
+                **self._render_limits()
             )
             
             # Process output
             with open(output_file_path, "w", encoding="utf-8", errors="replace") as f:
                 f.write(result["stdout"] + "\n" + result["stderr"])
             
-            # Determine output path - Manim creates outputs in videos/script_basename/quality/scene.mp4
-            output_dir = f"videos/{script_basename}/720p30"
-            expected_output = f"{output_dir}/{scene_class}.mp4"
-            full_output_path = os.path.join(self.media_root, expected_output)
-            
-            # Copy output from container if successful
-            container_output_path = f"{self.working_dir}/{expected_output}"
-            target_output_dir = os.path.join(self.media_root, output_dir)
+            # Determine output paths - Manim creates outputs in videos/script_basename/quality/scene.mp4
+            output_dir = f"videos/{script_basename}/{self.quality_folder}"
+            scene_outputs = {scene: f"{output_dir}/{scene}.mp4" for scene in scene_classes}
             
             # Ensure target directory exists
-            os.makedirs(target_output_dir, exist_ok=True)
+            os.makedirs(os.path.join(self.media_root, output_dir), exist_ok=True)
             
-            # Try to copy the output file from container
+            # Try to copy the output files from container
             if result["success"]:
-                # Copy output file from container
-                copy_result = self.docker_agent.copy_from_container(
-                    self.container_name,
-                    container_output_path,
-                    full_output_path
-                )
-                
-                if copy_result:
-                    self.log_info(f"Copied output file to {full_output_path}")
-                else:
-                    self.log_error(f"Failed to copy output file from container")
-                    result["success"] = False
+                for expected_output in scene_outputs.values():
+                    full_output_path = os.path.join(self.media_root, expected_output)
+                    copy_result = self.docker_agent.copy_from_container(
+                        self.container_name,
+                        f"{container_media_dir}/{expected_output}",
+                        full_output_path
+                    )
+                    
+                    if copy_result:
+                        self.log_info(f"Copied output file to {full_output_path}")
+                    else:
+                        self.log_error(f"Failed to copy output file from container")
+                        result["success"] = False
             
-            # Final check if output file exists
-            if os.path.exists(full_output_path):
-                self.log_info(f"Output file created: {full_output_path}")
+            # Final check if every output file exists
+            if all(os.path.exists(os.path.join(self.media_root, path)) for path in scene_outputs.values()):
+                self.log_info(f"Output files created for {', '.join(scene_classes)}")
                 return {
                     "success": True,
                     "output": result["stdout"] + "\n" + result["stderr"],
-                    "output_path": expected_output
+                    "output_path": scene_outputs[scene_classes[0]],
+                    "scene_outputs": scene_outputs
                 }
             else:
                 # Extract error information
@@ -240,7 +685,9 @@ class ManimExecutionAgent(BaseAgent):
                 return {
                     "success": False,
                     "error": error_info,
-                    "output": result["stdout"] + "\n" + result["stderr"]
+                    "output": result["stdout"] + "\n" + result["stderr"],
+                    "timed_out": result.get("timed_out", False),
+                    "oom": result.get("oom", False)
                 }
                 
         except Exception as e:
@@ -255,15 +702,233 @@ class ManimExecutionAgent(BaseAgent):
             }
             
         finally:
-            # Clean up temporary files
-            self._cleanup_temporary_files(temp_files, script_id)
+            # Remove exactly what this job created, here and in the container
+            if scratch:
+                scratch.cleanup()
+    
+    def _select_container(self, execution_obj):
+        """
+        Point this agent at the container picked by the pool scheduler
+        
+        Args:
+            execution_obj (Execution): The execution record, if any
+            
+        Returns:
+            str: Name of the container used for this execution
+        """
+        try:
+            container = self.container_pool.acquire(execution_obj)
+            if container:
+                self.container_name = container.name
+                self.working_dir = container.working_dir
+        except Exception as e:
+            # Fall back to the configured container when the pool is unavailable
+            self.log_warning(f"Container pool unavailable, using {self.container_name}: {str(e)}")
+            
+        return self.container_name
     
-    def _prepare_script(self, script):
+    def _get_cache_keys(self, script_content):
+        """
+        Build the render cache keys for a script on the selected container
+        
+        Args:
+            script_content (str): The script content
+            
+        Returns:
+            tuple: (cache_keys, image_version) - cache_keys maps each scene that
+                   will be rendered to its key, None if no scene class is found
+        """
+        try:
+            scene_classes = self._select_scenes(self._extract_scene_classes(self._clean_script_content(script_content)))
+            if not scene_classes:
+                return None, None
+            
+            image_version = self.render_cache.get_image_version(self.container_name)
+            cache_keys = {
+                scene: self.render_cache.make_key(script_content, scene, self.quality_flag, image_version)
+                for scene in scene_classes
+            }
+            return cache_keys, image_version
+            
+        except Exception as e:
+            self.log_warning(f"Could not build render cache key: {str(e)}")
+            return None, None
+    
+    def _serve_from_cache(self, cache_keys, execution_obj, script_obj):
+        """
+        Complete the execution from the render cache if every scene is cached
+        
+        Args:
+            cache_keys (dict): Render cache key per scene
+            execution_obj (Execution): The execution record
+            script_obj (Script): The script being executed
+            
+        Returns:
+            dict: Execution result, or None on a cache miss
+        """
+        if not cache_keys:
+            return None
+        
+        entries = {}
+        try:
+            for scene, key in cache_keys.items():
+                entry = self.render_cache.lookup(key)
+                if not entry:
+                    return None
+                entries[scene] = entry
+            
+            # The execution keeps its own video, eviction only removes the cache's copy
+            scene_outputs = {scene: self.render_cache.checkout(entry) for scene, entry in entries.items()}
+        except Exception as e:
+            self.log_warning(f"Render cache lookup failed: {str(e)}")
+            return None
+        
+        scene_classes = list(cache_keys)
+        cache_key = cache_keys[scene_classes[0]]
+        
+        if execution_obj:
+            execution_obj.cache_key = cache_key
+            execution_obj.is_cached = True
+        
+        self._update_success_records(execution_obj, {
+            "output": f"Served from render cache ({cache_key[:12]})",
+            "output_path": scene_outputs[scene_classes[0]],
+            "scene_outputs": scene_outputs
+        }, timezone.now())
+        if self.claim_lost.is_set():
+            return self._lost_claim_result(execution_obj, script_obj, 0)
+        
+        return {
+            "success": True,
+            "output_path": scene_outputs[scene_classes[0]],
+            "scene_outputs": scene_outputs,
+            "execution": execution_obj,
+            "script": script_obj,
+            "scene_class": scene_classes[0],
+            "quality": self.quality,
+            "attempt": 0,
+            "cached": True
+        }
+    
+    def _store_in_cache(self, scene_outputs, image_version, cache_keys, final_script):
+        """
+        Cache each rendered scene under the original and the final (debugged) script
+        
+        Args:
+            scene_outputs (dict): Rendered video per scene, relative to MEDIA_ROOT
+            image_version (str): Manim image version
+            cache_keys (dict): Keys of the script as submitted, per scene
+            final_script (str): Script content that rendered successfully
+        """
+        try:
+            image_version = image_version or self.render_cache.get_image_version(self.container_name)
+            for scene, output_path in scene_outputs.items():
+                final_key = self.render_cache.make_key(final_script, scene, self.quality_flag, image_version)
+                for key in {(cache_keys or {}).get(scene), final_key}:
+                    if key:
+                        self.render_cache.store(key, output_path, scene, self.quality_flag, image_version)
+        except Exception as e:
+            self.log_warning(f"Could not store render in cache: {str(e)}")
+    
+    def _enqueue_renditions(self, execution_obj, script_content):
+        """
+        Queue the higher-quality renditions of a successful preview
+        
+        Args:
+            execution_obj (Execution): The successful preview execution
+            script_content (str): The script content that rendered
+            
+        Returns:
+            list: The queued rendition executions
+        """
+        if not execution_obj:
+            return []
+        
+        jobs = []
+        queue_agent = RenderQueueAgent(self.debug)
+        for quality in get_rendition_qualities():
+            if quality == execution_obj.quality or quality in execution_obj.renditions:
+                continue
+            try:
+                jobs.append(queue_agent.enqueue_rendition(execution_obj, quality, script_content))
+            except Exception as e:
+                self.log_warning(f"Could not queue {quality} rendition of {execution_obj.id}: {str(e)}")
+        return jobs
+    
+    def _find_rendered_script(self, execution_obj, script_content):
+        """
+        Script that actually rendered a preview served from the cache
+        
+        The cache maps the submitted script to the video of its debugged version,
+        so renditions must start from the debugged script of the original render.
+        
+        Args:
+            execution_obj (Execution): The cached preview execution
+            script_content (str): The submitted script content
+            
+        Returns:
+            str: The debugged script, or script_content if it rendered unchanged
+        """
+        if not execution_obj or not execution_obj.cache_key:
+            return script_content
+        
+        try:
+            from ..models import Execution
+            
+            origin = (
+                Execution.objects
+                .filter(cache_key=execution_obj.cache_key, is_successful=True, is_cached=False)
+                .exclude(pk=execution_obj.pk)
+                .order_by('-completed_at')
+                .first()
+            )
+            if origin and origin.modified_script:
+                return origin.modified_script
+        except Exception as e:
+            self.log_warning(f"Could not find the rendered script of {execution_obj.id}: {str(e)}")
+        
+        return script_content
+    
+    def _record_rendition(self, execution_obj, output_path, scene_outputs):
+        """
+        Add a finished render to the renditions of its preview execution
+        
+        A preview records itself. A rendition updates its preview under a row lock,
+        since renditions of one preview can finish concurrently, and promotes its
+        video to the preview's output_path once it is the best quality available.
+        
+        Args:
+            execution_obj (Execution): The finished execution
+            output_path (str): Video of the first scene
+            scene_outputs (dict): Video per scene
+        """
+        rendition = {"output_path": output_path, "scene_outputs": scene_outputs}
+        
+        if not execution_obj.source_execution_id:
+            execution_obj.renditions = dict(execution_obj.renditions or {}, **{self.quality: rendition})
+            return
+        
+        from ..models import Execution
+        
+        with transaction.atomic():
+            source = Execution.objects.select_for_update().get(pk=execution_obj.source_execution_id)
+            source.renditions = dict(source.renditions or {}, **{self.quality: rendition})
+            update_fields = ['renditions', 'updated_at']
+            
+            if self.quality == max(source.renditions, key=quality_rank):
+                source.output_path = output_path
+                source.scene_outputs = scene_outputs
+                update_fields += ['output_path', 'scene_outputs']
+            
+            source.save(update_fields=update_fields)
+    
+    def _prepare_script(self, script, update_status=True):
         """
         Extract script content and ID from different input types
         
         Args:
             script (Script/str/dict): The script to execute
+            update_status (bool, optional): Mark a Script object as executing
             
         Returns:
             tuple: (script_id, script_content, script_object)
@@ -284,7 +949,7 @@ class ManimExecutionAgent(BaseAgent):
             script_obj = script
             
             # Update script status
-            if hasattr(script, 'status'):
+            if update_status and hasattr(script, 'status'):
                 script.status = 'executing'
                 script.save()
                 
@@ -301,7 +966,7 @@ class ManimExecutionAgent(BaseAgent):
     
     def _extract_scene_class(self, script_content):
         """
-        Extract the scene class name from script content
+        Extract the first scene class name from script content
         
         Args:
             script_content (str): Manim script content
@@ -309,92 +974,147 @@ class ManimExecutionAgent(BaseAgent):
         Returns:
             str: Scene class name or None if not found
         """
-        # Look for class definition with Scene inheritance
-        for line in script_content.split('\n'):
-            if line.strip().startswith('class ') and '(Scene)' in line:
-                return line.strip().split('class ')[1].split('(')[0].strip()
-        
-        return None
+        scene_classes = self._extract_scene_classes(script_content)
+        return scene_classes[0] if scene_classes else None
     
-    def _clean_script_file(self, script_path):
+    def _extract_scene_classes(self, script_content):
         """
-        Clean up script file content if needed
+        Extract every renderable scene class from script content
         
         Args:
-            script_path (str): Path to the script file
+            script_content (str): Manim script content
             
         Returns:
-            bool: True if cleaning was performed
+            list: Scene class names in source order
         """
-        try:
-            with open(script_path, "r", encoding="utf-8", errors="replace") as f:
-                content = f.read()
-                
-            if "```python" in content or "```" in content:
-                self.log_info(f"Cleaning script file: {script_path}")
-                cleaned_content = content.replace("```python", "").replace("```", "").strip()
-                
-                with open(script_path, "w", encoding="utf-8", errors="replace") as f:
-                    f.write(cleaned_content)
-                self.log_info("Script cleaned")
-                
-                return True
-                
-        except Exception as e:
-            self.log_error(f"Error cleaning script: {e}")
+        return find_scene_classes(script_content)
+    
+    def _select_scenes(self, scene_classes):
+        """Scenes to render - all of them, or only the first when batching is disabled"""
+        return scene_classes if self.render_all_scenes else scene_classes[:1]
+    
+    def _set_quality(self, quality):
+        """Render at a quality preset - sets the Manim flag and the folder it renders into"""
+        self.quality = quality if quality in QUALITY_PRESETS else get_preview_quality()
+        self.quality_flag, self.quality_folder = QUALITY_PRESETS[self.quality]
+    
+    def _clean_script_content(self, content):
+        """
+        Strip markdown code fences an AI provider may have wrapped around the script
+        
+        Args:
+            content (str): Script content
             
-        return False
+        Returns:
+            str: Cleaned script content
+        """
+        return strip_fences(content)
     
-    def _cleanup_temporary_files(self, temp_files, script_id):
+    def _write_file_atomic(self, path, content):
         """
-        Clean up temporary files and directories
+        Write a file so readers see either nothing or the complete content
         
         Args:
-            temp_files (list): List of temporary file paths to clean up
-            script_id (str): Script ID for identifying related files
+            path (str): Destination path
+            content (str): File content
+        """
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8", errors="replace") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    
+    def _cleanup_job_dir(self, job_dir, keep_output=False):
+        """
+        Remove a shared-volume job directory
+        
+        Args:
+            job_dir (str): Host path of the job directory
+            keep_output (bool, optional): Keep the rendered videos and remove everything else
             
         Returns:
             bool: True if cleanup was successful
         """
         try:
-            # Delete specific temp files
-            for file_path in temp_files:
-                if os.path.exists(file_path):
-                    os.unlink(file_path)
-                    self.log_debug(f"Deleted temp file: {file_path}")
-            
-            # Clean up Docker container temp files
-            self.docker_agent.execute_command(
-                self.container_name,
-                f"rm -f {self.working_dir}/tmp*.py",
-                working_dir=self.working_dir
-            )
-            
-            # Comprehensive cleanup of other related temp files
-            patterns = [
-                os.path.join(tempfile.gettempdir(), "tmp*manim*"),
-                os.path.join(tempfile.gettempdir(), f"*{script_id}*"),
-                os.path.join(os.path.dirname(self.media_root), "tmp*.py")
-            ]
-            
-            # Find and clean up matching files
-            for pattern in patterns:
-                for path in glob.glob(pattern):
-                    try:
-                        if os.path.isdir(path):
-                            shutil.rmtree(path, ignore_errors=True)
-                        else:
-                            os.unlink(path)
-                        self.log_debug(f"Cleaned up temp file: {path}")
-                    except Exception as e:
-                        self.log_debug(f"Failed to remove {path}: {str(e)}")
+            if not keep_output:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                return True
             
+            # Keep only the final videos - drop the script, partial movie files and caches
+            for root, dirs, files in os.walk(job_dir, topdown=False):
+                for name in dirs:
+                    if name == "partial_movie_files":
+                        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+                for name in files:
+                    if not name.endswith(".mp4"):
+                        os.unlink(os.path.join(root, name))
             return True
             
         except Exception as e:
-            self.log_error(f"Error cleaning up temporary files: {str(e)}")
+            self.log_error(f"Error cleaning up job directory {job_dir}: {str(e)}")
             return False
     
+    def _settle_fix(self, pending_fix, script, error=None, kill=None):
+        """
+        Report the render of a debugged script to the fix cache
+        
+        Args:
+            pending_fix (dict): Fix awaiting its render, if any
+            script (str): Script that was rendered
+            error (str, optional): Error of the render, None if it succeeded
+            kill (str, optional): 'timeout' or 'oom' if the render was killed for its limits
+            
+        Returns:
+            dict: The fix if its render said nothing about it yet, otherwise None
+        """
+        # Migrations and other rewrites changed the script - it is no longer the fix's render
+        if not pending_fix or pending_fix["after"] != script:
+            return None
+        if kill:
+            return pending_fix
+        
+        worked = self.debug_agent.fix_cache.resolve(pending_fix, error, script)
+        return pending_fix if worked is None else None
+    
+    def _migrate_script(self, script_content, policy, execution_obj, attempt):
+        """
+        Apply the API migration table to a script version before it is rendered
+        
+        Args:
+            script_content (str): Script version about to be rendered
+            policy (RetryPolicy): Retry policy of the execution
+            execution_obj (Execution): The execution record, if any
+            attempt (int): Current attempt
+            
+        Returns:
+            str: The migrated script, or script_content if no rule fired
+        """
+        migration = self.preflight.migrate(self._clean_script_content(script_content), self.container_name)
+        if not migration["fired"]:
+            return script_content
+        
+        policy.record_rewrite(migration["script"])
+        self._record_migrations(execution_obj, migration, 'preflight', attempt)
+        return migration["script"]
+    
+    def _record_migrations(self, execution_obj, migration, phase, attempt):
+        """
+        Record the API migration rules that fired on the execution and publish them
+        
+        Args:
+            execution_obj (Execution): The execution record, if any
+            migration (dict): Result of PreflightAgent.migrate
+            phase (str): 'preflight' before a render, 'error' after a failed one
+            attempt (int): Current attempt
+        """
+        self.events.status('rewritten', attempt=attempt, phase=phase, rules=migration["fired"])
+        if execution_obj:
+            execution_obj.api_migrations = execution_obj.api_migrations + [
+                {"rule": rule, "phase": phase, "attempt": attempt, "version": migration["version"]}
+                for rule in migration["fired"]
+            ]
+    
     def _try_dependency_fix(self, error_message):
         """
         Try to fix missing dependencies
@@ -439,6 +1159,7 @@ class ManimExecutionAgent(BaseAgent):
                 id=execution_id,
                 script=script_obj,
                 attempt_number=1,
+                quality=self.quality,
                 container=container,
                 is_successful=False
             )
@@ -449,7 +1170,94 @@ class ManimExecutionAgent(BaseAgent):
             self.log_debug(f"Could not create execution record: {str(e)}")
             return None
     
-    def _update_success_records(self, execution_obj, result, start_time):
+    def _claim_execution_record(self, execution_obj):
+        """
+        Attach an existing (queued) execution record to this run
+        
+        Args:
+            execution_obj (Execution): The execution record to run
+            
+        Returns:
+            Execution: The updated execution record
+        """
+        try:
+            from ..models import Container
+            
+            execution_obj.status = 'running'
+            if not execution_obj.container:
+                execution_obj.container = Container.objects.filter(name=self.container_name).first()
+            self._save_execution(execution_obj)
+            
+        except Exception as e:
+            self.log_debug(f"Could not update execution record: {str(e)}")
+            
+        return execution_obj
+    
+    def _owns_execution(self, execution_obj):
+        """
+        Whether the execution is still running on this worker
+        
+        Always True outside the render queue. Sets claim_lost otherwise.
+        """
+        if not self.worker_id:
+            return True
+        
+        from ..models import Execution
+        
+        if Execution.objects.filter(pk=execution_obj.pk, status='running', worker_id=self.worker_id).exists():
+            return True
+        self._lose_claim(execution_obj)
+        return False
+    
+    def _save_execution(self, execution_obj):
+        """
+        Save the execution record unless another worker has taken the job over
+        
+        A queued execution is written with one UPDATE conditioned on the row still
+        running on this worker, so a worker whose job was requeued as stale cannot
+        overwrite the record of the worker that claimed it next.
+        
+        Args:
+            execution_obj (Execution): The execution record
+            
+        Returns:
+            bool: True if the record was saved
+        """
+        if not self.worker_id:
+            execution_obj.save()
+            return True
+        
+        from ..models import Execution
+        
+        execution_obj.updated_at = timezone.now()
+        values = {
+            field.attname: getattr(execution_obj, field.attname)
+            for field in Execution._meta.concrete_fields if not field.primary_key
+        }
+        if Execution.objects.filter(pk=execution_obj.pk, status='running', worker_id=self.worker_id).update(**values):
+            return True
+        self._lose_claim(execution_obj)
+        return False
+    
+    def _lose_claim(self, execution_obj):
+        """Stop running an execution that was requeued or claimed by another worker"""
+        if not self.claim_lost.is_set():
+            self.log_warning(f"Execution {execution_obj.pk} is no longer claimed by {self.worker_id}, stopping")
+        self.claim_lost.set()
+    
+    def _lost_claim_result(self, execution_obj, script_obj, attempt):
+        """Result of an execution given up because another worker holds it now - its record is left alone"""
+        return {
+            "success": False,
+            "error": f"Execution {execution_obj.pk} was taken over by another worker",
+            "execution": execution_obj,
+            "script": script_obj,
+            "attempts": attempt,
+            "termination_reason": None,
+            "status": 'lost_claim'
+        }
+    
+    def _update_success_records(self, execution_obj, result, start_time, policy=None):
         """
         Update records after successful execution
         
@@ -457,23 +1265,37 @@ class ManimExecutionAgent(BaseAgent):
             execution_obj (Execution): The execution record
             result (dict): Execution result
             start_time (datetime): When execution started
+            policy (RetryPolicy, optional): Retry policy that ran the execution
             
         Returns:
             Execution: Updated execution record
         """
-        if not execution_obj:
+        if not execution_obj or not self._owns_execution(execution_obj):
             return None
             
         try:
             # Update execution record
             execution_obj.is_successful = True
+            execution_obj.status = 'completed'
             execution_obj.output = result.get("output", "")
             execution_obj.output_path = result.get("output_path", "")
+            execution_obj.scene_outputs = result.get("scene_outputs", {})
+            execution_obj.termination_reason = RetryPolicy.CACHED if execution_obj.is_cached else RetryPolicy.COMPLETED
+            execution_obj.debug_tokens = policy.tokens_used if policy else 0
+            self._record_rendition(execution_obj, execution_obj.output_path, execution_obj.scene_outputs)
+            
+            # Publish before completed_at is saved so event streams never end early
+            pending = [] if execution_obj.source_execution_id else get_rendition_qualities()
+            self.events.status('completed', output_path=execution_obj.output_path,
+                               scene_outputs=execution_obj.scene_outputs, cached=execution_obj.is_cached,
+                               quality=self.quality, pending_renditions=pending)
+            
             execution_obj.completed_at = timezone.now()
-            execution_obj.save()
+            if not self._save_execution(execution_obj):
+                return None
             
-            # Update script status
-            if hasattr(execution_obj, 'script') and execution_obj.script:
+            # Update script status - a rendition leaves the script as its preview did
+            if execution_obj.script and not execution_obj.source_execution_id:
                 execution_obj.script.status = 'successful'
                 execution_obj.script.save()
                 
@@ -483,7 +1305,8 @@ class ManimExecutionAgent(BaseAgent):
             self.log_error(f"Error updating success records: {str(e)}")
             return execution_obj
     
-    def _update_failure_records(self, execution_obj, error, start_time):
+    def _update_failure_records(self, execution_obj, error, start_time, policy=None, termination_reason=None,
+                                kill=None):
         """
         Update records after failed execution
         
@@ -491,22 +1314,33 @@ class ManimExecutionAgent(BaseAgent):
             execution_obj (Execution): The execution record
             error (str): Error message
             start_time (datetime): When execution started
+            policy (RetryPolicy, optional): Retry policy that ran the execution
+            termination_reason (str, optional): Why the retries stopped
+            kill (str, optional): 'timeout' or 'oom' if the last render was killed for its limits
             
         Returns:
             Execution: Updated execution record
         """
-        if not execution_obj:
+        if not execution_obj or not self._owns_execution(execution_obj):
             return None
             
         try:
             # Update execution record
             execution_obj.is_successful = False
+            execution_obj.status = kill or 'failed'
             execution_obj.error = error
+            execution_obj.termination_reason = termination_reason or RetryPolicy.ERROR
+            execution_obj.debug_tokens = policy.tokens_used if policy else 0
+            
+            # Publish before completed_at is saved so event streams never end early
+            self.events.status(execution_obj.status, termination_reason=execution_obj.termination_reason, error=error)
+            
             execution_obj.completed_at = timezone.now()
-            execution_obj.save()
+            if not self._save_execution(execution_obj):
+                return None
             
-            # Update script status
-            if hasattr(execution_obj, 'script') and execution_obj.script:
+            # Update script status - a failed rendition does not undo a successful preview
+            if execution_obj.script and not execution_obj.source_execution_id:
                 execution_obj.script.status = 'failed'
                 execution_obj.script.save()
                 
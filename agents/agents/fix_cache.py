@@ -0,0 +1,309 @@
+import re
+import hashlib
+from django.conf import settings
+from django.db.models import F, Count, Sum
+from django.utils import timezone
+from .base_agent import BaseAgent
+from .error_classifier import classify_error, INFRA, ENVIRONMENT, TIMEOUT, OOM, FFMPEG
+from .patching import HUNK_HEADER_RE, make_diff, parse_hunks, apply_diff, strip_fences
+
+# Failures that depend on the machine or the load, not on the script - never cached
+UNCACHED_CATEGORIES = {INFRA, ENVIRONMENT, TIMEOUT, OOM, FFMPEG}
+
+# Import statements, which a fix may add or change anywhere in the script
+IMPORT_LINE_RE = re.compile(r"^\s*(import|from)\s+[\w.]+")
+
+
+class FixCacheAgent(BaseAgent):
+    """
+    Agent responsible for reusing debug fixes across scripts.
+
+    Each failure is normalized into a signature: category, exception, message
+    with names, paths and numbers masked, and the failing source line. Fixes
+    the LLM produced for a signature are stored as unified diffs once the next
+    render no longer fails the same way. Before the LLM is called, the cached
+    diffs of the signature are tried in order of their success rate.
+
+    Scripts are taken as rendered, without markdown fences, since the line
+    numbers of the errors refer to the rendered file.
+    """
+
+    def __init__(self, debug=False):
+        """Initialize the Fix Cache Agent"""
+        super().__init__(debug)
+        self.enabled = getattr(settings, 'AI_FIX_CACHE_ENABLED', True)
+
+        # Lines around the failing line a stored fix may change, imports aside
+        self.window = getattr(settings, 'AI_FIX_CACHE_WINDOW', 5)
+
+        # Cached fixes failing this many times more often than they succeed are no longer tried
+        self.max_net_failures = getattr(settings, 'AI_FIX_CACHE_MAX_NET_FAILURES', 3)
+
+    def signature(self, script, error_message):
+        """
+        Normalize a failure into a debug signature
+
+        Args:
+            script (str): Script that failed
+            error_message (str): Error of the failed render
+
+        Returns:
+            dict: key, category, exception, message, source_line and line, or None
+                  for failures whose fix does not depend on the script
+        """
+        classification = classify_error(error_message)
+        if classification["category"] in UNCACHED_CATEGORIES:
+            return None
+
+        message = self._mask(classification["message"] or "")
+        source_line = classification["code"] or ""
+        line = classification["line"]
+        lines = (strip_fences(script) or "").splitlines()
+        if line and 0 < line <= len(lines):
+            source_line = lines[line - 1]
+        source_line = re.sub(r"\s+", " ", source_line).strip()
+
+        if not (classification["exception"] or message):
+            return None
+
+        parts = (classification["category"], classification["exception"] or "", message, source_line)
+        return {
+            "key": hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest(),
+            "category": classification["category"],
+            "exception": classification["exception"] or "",
+            "message": message,
+            "source_line": source_line,
+            "line": line
+        }
+
+    def lookup(self, script, signature, exclude=()):
+        """
+        Apply the best cached fix of a signature that applies cleanly to the script
+
+        Args:
+            script (str): Script that failed
+            signature (dict): Signature from signature()
+            exclude (iterable, optional): Ids of fixes already tried in this execution
+
+        Returns:
+            tuple: (patched script, DebugFix) or (None, None) on a miss
+        """
+        from ..models import DebugSignature, DebugFix
+
+        if not self.enabled or not signature:
+            return None, None
+        script = strip_fences(script)
+
+        try:
+            record = self._touch_signature(signature)
+            DebugSignature.objects.filter(pk=record.pk).update(lookups=F('lookups') + 1)
+
+            fixes = (
+                DebugFix.objects
+                .filter(signature=record, failures__lt=F('successes') + self.max_net_failures)
+                .exclude(pk__in=list(exclude))
+            )
+            for fix in fixes:
+                patched = apply_diff(script, fix.diff)
+                if patched is None or patched == script:
+                    continue
+
+                DebugSignature.objects.filter(pk=record.pk).update(hits=F('hits') + 1)
+                DebugFix.objects.filter(pk=fix.pk).update(
+                    applied_count=F('applied_count') + 1,
+                    last_used_at=timezone.now()
+                )
+                self.log_info(f"Fix cache hit for {signature['exception'] or signature['category']}: fix {fix.pk}")
+                return patched, fix
+
+        except Exception as e:
+            self.log_warning(f"Fix cache lookup failed: {str(e)}")
+
+        return None, None
+
+    def resolve(self, pending, error_message=None, script=None):
+        """
+        Settle a fix once the script it produced has rendered
+
+        A fix worked when the next render succeeded or failed with a different
+        signature. Cached fixes get their counters updated; LLM fixes that
+        worked are stored for the signature.
+
+        Args:
+            pending (dict): signature, before, after and fix_id (None for LLM fixes)
+            error_message (str, optional): Error of the render, None if it succeeded
+            script (str, optional): Script of the render, defaults to pending['after']
+
+        Returns:
+            bool: Whether the fix worked, or None if the render failed for a
+                  reason that says nothing about the fix, e.g. a container failure
+        """
+        from ..models import DebugSignature, DebugFix
+
+        if not self.enabled or not pending or not pending.get("signature"):
+            return False
+        if error_message and classify_error(error_message)["category"] in UNCACHED_CATEGORIES:
+            return None
+
+        next_signature = self.signature(script or pending["after"], error_message) if error_message else None
+        worked = not next_signature or next_signature["key"] != pending["signature"]["key"]
+
+        try:
+            if pending.get("fix_id"):
+                counter = 'successes' if worked else 'failures'
+                DebugFix.objects.filter(pk=pending["fix_id"]).update(**{counter: F(counter) + 1})
+                DebugSignature.objects.filter(key=pending["signature"]["key"]).update(**{counter: F(counter) + 1})
+            elif worked:
+                self.store(pending["signature"], pending["before"], pending["after"])
+        except Exception as e:
+            self.log_warning(f"Could not record fix outcome: {str(e)}")
+
+        return worked
+
+    def store(self, signature, before, after):
+        """
+        Store an LLM fix near the failing line as a unified diff
+
+        Args:
+            signature (dict): Signature the fix resolved
+            before (str): Script the LLM was given
+            after (str): Script the LLM returned
+
+        Returns:
+            DebugFix: The stored fix, or None if nothing worth caching changed
+        """
+        from ..models import DebugFix
+
+        diff = self._windowed_diff(strip_fences(before), strip_fences(after), signature.get("line"))
+        if not diff:
+            return None
+
+        record = self._touch_signature(signature)
+        fix, created = DebugFix.objects.get_or_create(
+            signature=record,
+            diff_hash=hashlib.sha256(diff.encode("utf-8")).hexdigest(),
+            defaults={"diff": diff, "successes": 1}
+        )
+        if not created:
+            DebugFix.objects.filter(pk=fix.pk).update(successes=F('successes') + 1)
+        self.log_info(f"Cached fix {fix.pk} for {signature['exception'] or signature['category']}")
+        return fix
+
+    def stats(self, limit=50):
+        """
+        Report hit and success rates per signature
+
+        Args:
+            limit (int, optional): Signatures to report, most looked up first
+
+        Returns:
+            dict: signatures, fixes, lookups, hits, hit_rate, success_rate and
+                  the per-signature counters
+        """
+        from ..models import DebugSignature, DebugFix
+
+        totals = DebugSignature.objects.aggregate(
+            lookups=Sum('lookups'), hits=Sum('hits'), successes=Sum('successes'), failures=Sum('failures')
+        )
+        lookups, hits = totals['lookups'] or 0, totals['hits'] or 0
+        settled = (totals['successes'] or 0) + (totals['failures'] or 0)
+
+        signatures = DebugSignature.objects.annotate(fix_count=Count('fixes'))[:limit]
+        return {
+            "enabled": self.enabled,
+            "signatures": DebugSignature.objects.count(),
+            "fixes": DebugFix.objects.count(),
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "success_rate": (totals['successes'] or 0) / settled if settled else 0.0,
+            "top": [
+                {
+                    "key": signature.key,
+                    "category": signature.category,
+                    "exception": signature.exception,
+                    "message": signature.message,
+                    "source_line": signature.source_line,
+                    "fixes": signature.fix_count,
+                    "lookups": signature.lookups,
+                    "hits": signature.hits,
+                    "hit_rate": signature.hits / signature.lookups if signature.lookups else 0.0,
+                    "success_rate": (
+                        signature.successes / (signature.successes + signature.failures)
+                        if signature.successes + signature.failures else 0.0
+                    )
+                }
+                for signature in signatures
+            ]
+        }
+
+    def _touch_signature(self, signature):
+        """Get or create the signature record and mark it as seen"""
+        from ..models import DebugSignature
+
+        record, created = DebugSignature.objects.get_or_create(
+            key=signature["key"],
+            defaults={
+                "category": signature["category"],
+                "exception": signature["exception"],
+                "message": signature["message"],
+                "source_line": signature["source_line"]
+            }
+        )
+        if not created:
+            DebugSignature.objects.filter(pk=record.pk).update(last_seen_at=timezone.now())
+        return record
+
+    def _mask(self, message):
+        """Mask names, paths and numbers in an error message"""
+        message = re.sub(r"(['\"`])[^'\"`]*\1", r"\1<name>\1", message)
+        message = re.sub(r"(/[\w.-]+)+", "<path>", message)
+        message = re.sub(r"\b0x[0-9a-fA-F]+\b", "<addr>", message)
+        message = re.sub(r"\b\d+(\.\d+)?\b", "<n>", message)
+        return re.sub(r"\s+", " ", message).strip()
+
+    def _windowed_diff(self, before, after, line):
+        """
+        Diff of a fix without context lines, or "" if it cannot be cached whole
+
+        Context lines differ between scripts, so hunks are found by the lines they
+        replace. An insertion is anchored on the line it follows; insertions at the
+        top of the script and import-only hunks may be anywhere. The fix is not
+        cached if a hunk has no usable anchor or lies outside the window around
+        the failing line, since a stored part of a fix would replay another fix.
+        """
+        diff = make_diff(before, after, context=0)
+        if not diff:
+            return ""
+
+        old_lines = before.splitlines()
+        kept = []
+        for block in re.split(r"(?m)^(?=@@ )", diff):
+            header = HUNK_HEADER_RE.match(block)
+            if not header:
+                continue
+            hunk = parse_hunks(block)[0]
+            old_start, new_start = int(header.group(1)), int(header.group(3))
+
+            # A pure insertion replaces the line it follows with that line and the new ones
+            if not hunk["before"] and old_start > 0:
+                anchor = old_lines[old_start - 1]
+                if not anchor.strip():
+                    return ""
+                block = "\n".join([
+                    f"@@ -{old_start},1 +{new_start - 1},{len(hunk['after']) + 1} @@",
+                    f" {anchor}",
+                    *(f"+{added}" for added in hunk["after"])
+                ])
+
+            changed = [text for text in hunk["before"] + hunk["after"] if text.strip()]
+            imports_only = all(IMPORT_LINE_RE.match(text) for text in changed)
+            if line and old_start != 0 and not imports_only \
+                    and abs(old_start - line) > self.window + len(hunk["before"]):
+                return ""
+            kept.append(block.rstrip("\n"))
+
+        # Without a failing line only small fixes are worth reusing
+        if not line and len(kept) > 3:
+            return ""
+        return "\n".join(kept)
@@ -0,0 +1,64 @@
+import sys
+from django.conf import settings
+
+# Import names whose PyPI distribution is named differently. Resolved offline -
+# nothing is looked up on the network at render time.
+IMPORT_DISTRIBUTIONS = {
+    'attr': 'attrs',
+    'bs4': 'beautifulsoup4',
+    'cairo': 'pycairo',
+    'Crypto': 'pycryptodome',
+    'cv2': 'opencv-python-headless',
+    'dateutil': 'python-dateutil',
+    'docx': 'python-docx',
+    'dotenv': 'python-dotenv',
+    'fitz': 'PyMuPDF',
+    'gi': 'PyGObject',
+    'google.protobuf': 'protobuf',
+    'jwt': 'PyJWT',
+    'magic': 'python-magic',
+    'manimpango': 'ManimPango',
+    'mpl_toolkits': 'matplotlib',
+    'OpenGL': 'PyOpenGL',
+    'PIL': 'Pillow',
+    'pptx': 'python-pptx',
+    'serial': 'pyserial',
+    'skimage': 'scikit-image',
+    'sklearn': 'scikit-learn',
+    'slugify': 'python-slugify',
+    'usb': 'pyusb',
+    'win32api': 'pywin32',
+    'yaml': 'PyYAML',
+    'zmq': 'pyzmq',
+}
+
+# Never installed at render time - they shadow the standard library or the system
+BLOCKED_IMPORTS = {'os', 'sys', 'subprocess', 'shutil', 'pathlib', 'logging'}
+
+
+def is_stdlib_module(import_name):
+    """Whether an import name belongs to the standard library of this interpreter"""
+    return import_name.split('.')[0] in getattr(sys, 'stdlib_module_names', ())
+
+
+def resolve_distribution(import_name):
+    """
+    Map an import name to the distribution that provides it
+
+    Args:
+        import_name (str): Top-level module name from an import error, e.g. 'cv2'
+
+    Returns:
+        str: Distribution name, e.g. 'opencv-python-headless', or None if the
+             module is part of the standard library or must not be installed
+    """
+    if not import_name:
+        return None
+
+    base = import_name.split('.')[0]
+    if base in BLOCKED_IMPORTS or is_stdlib_module(base):
+        return None
+
+    # Deployments extend or override the index with MANIM_PACKAGE_INDEX
+    index = {**IMPORT_DISTRIBUTIONS, **getattr(settings, 'MANIM_PACKAGE_INDEX', {})}
+    return index.get(import_name) or index.get(base) or base
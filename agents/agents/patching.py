@@ -0,0 +1,250 @@
+import re
+import difflib
+
+HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+# Line-range patches: "REPLACE 12-14" or "INSERT AFTER 3", the new lines, then "END"
+LINE_PATCH_RE = re.compile(r"^\s*(REPLACE|INSERT AFTER)\s+(?:lines?\s+)?(\d+)(?:\s*-\s*(\d+))?\s*:?\s*$", re.IGNORECASE)
+LINE_PATCH_END_RE = re.compile(r"^\s*END\s*$", re.IGNORECASE)
+
+# Prefix of the lines of number_lines(), which some models copy into their patches
+NUMBERED_LINE_RE = re.compile(r"^\s*\d+ \| ?")
+
+
+def make_diff(old_script, new_script, context=1):
+    """
+    Unified diff between two script versions
+
+    Args:
+        old_script (str): Script before the change
+        new_script (str): Script after the change
+        context (int, optional): Unchanged lines around each change. Defaults to 1.
+
+    Returns:
+        str: The diff, empty when the scripts are equal
+    """
+    lines = difflib.unified_diff(
+        old_script.splitlines(), new_script.splitlines(),
+        fromfile="script.py", tofile="script.py", n=context, lineterm=""
+    )
+    return "\n".join(lines)
+
+
+def parse_hunks(diff):
+    """
+    Split a unified diff into hunks
+
+    Args:
+        diff (str): Unified diff, with or without file headers
+
+    Returns:
+        list: Hunks as dicts with old_start (1-based line), before (context and
+              removed lines) and after (context and added lines)
+    """
+    hunks, hunk = [], None
+    for line in (diff or "").splitlines():
+        header = HUNK_HEADER_RE.match(line)
+        if header:
+            hunk = {"old_start": int(header.group(1)), "before": [], "after": []}
+            hunks.append(hunk)
+        elif hunk is None or line.startswith(("---", "+++", "\\")):
+            continue
+        elif line.startswith("-"):
+            hunk["before"].append(line[1:])
+        elif line.startswith("+"):
+            hunk["after"].append(line[1:])
+        else:
+            # Context lines - some generators drop the leading space of empty lines
+            hunk["before"].append(line[1:] if line.startswith(" ") else line)
+            hunk["after"].append(line[1:] if line.startswith(" ") else line)
+    return hunks
+
+
+def apply_diff(script, diff):
+    """
+    Apply a unified diff to a script it was not necessarily made from
+
+    Each hunk is located by its removed and context lines, ignoring indentation,
+    nearest to the line it was made at - the same change applies to a script
+    whose lines moved or are nested deeper. Added lines are re-indented to match.
+
+    Args:
+        script (str): Script to patch
+        diff (str): Unified diff
+
+    Returns:
+        str: The patched script, or None if a hunk does not apply cleanly
+    """
+    hunks = parse_hunks(diff)
+    if not hunks:
+        return None
+
+    lines = script.splitlines()
+    offset = 0
+    floor = 0
+    for hunk in hunks:
+        before, after = hunk["before"], hunk["after"]
+        expected = max(0, hunk["old_start"] - 1 + offset)
+
+        if before:
+            position = _find_block(lines, before, expected, floor)
+            if position is None:
+                return None
+            after = _reindent(after, before, lines[position:position + len(before)])
+        else:
+            # A pure insertion's old_start is the line it follows
+            position = min(hunk["old_start"] + offset, len(lines))
+
+        lines[position:position + len(before)] = after
+        offset += len(after) - len(before)
+        floor = position + len(after)
+
+    patched = "\n".join(lines)
+    return patched + "\n" if script.endswith("\n") else patched
+
+
+def _find_block(lines, block, expected, floor):
+    """Start of the occurrence of block in lines nearest to expected, at or after floor"""
+    wanted = [line.strip() for line in block]
+    stripped = [line.strip() for line in lines]
+    matches = [
+        index for index in range(floor, len(lines) - len(block) + 1)
+        if stripped[index:index + len(block)] == wanted
+    ]
+    if not matches:
+        return None
+    return min(matches, key=lambda index: abs(index - expected))
+
+
+def _reindent(after, before, matched):
+    """Shift added lines by the indentation difference between the hunk and the lines it matched"""
+    pairs = [(old, new) for old, new in zip(before, matched) if old.strip()]
+    if not pairs:
+        return after
+    old, new = pairs[0]
+    old_indent = old[:len(old) - len(old.lstrip())]
+    new_indent = new[:len(new) - len(new.lstrip())]
+    if old_indent == new_indent:
+        return after
+    return [new_indent + line[len(old_indent):] if line.startswith(old_indent) and line.strip() else line
+            for line in after]
+
+
+def strip_fences(script):
+    """
+    A script as it is rendered, without the markdown code fences an AI provider
+    may have wrapped around it - render errors number the lines of this text
+
+    Args:
+        script (str): Script content
+
+    Returns:
+        str: The script without fences, unchanged if it has none
+    """
+    if "```" in (script or ""):
+        return script.replace("```python", "").replace("```", "").strip()
+    return script
+
+
+def number_lines(script, start=1, end=None):
+    """
+    Lines of a script prefixed with their line numbers, e.g. "12 | self.play(...)"
+
+    Args:
+        script (str): Script to number
+        start (int, optional): First line, 1-based. Defaults to 1.
+        end (int, optional): Last line, inclusive. Defaults to the last line of the script.
+
+    Returns:
+        str: The numbered lines
+    """
+    lines = script.splitlines()
+    end = len(lines) if end is None else min(end, len(lines))
+    width = len(str(end))
+    return "\n".join(f"{number:>{width}} | {lines[number - 1]}" for number in range(max(1, start), end + 1))
+
+
+def parse_line_patch(patch):
+    """
+    Split a line-range patch into edits
+
+    Args:
+        patch (str): REPLACE a-b / INSERT AFTER n blocks, each closed by END
+
+    Returns:
+        list: Edits as dicts with start and end (1-based, inclusive; end is
+              start - 1 for insertions) and the new lines
+    """
+    edits, edit = [], None
+    for line in (patch or "").splitlines():
+        header = LINE_PATCH_RE.match(line)
+        if header:
+            first = int(header.group(2))
+            if header.group(1).upper() == 'REPLACE':
+                edit = {"start": first, "end": int(header.group(3) or first), "lines": []}
+            else:
+                edit = {"start": first + 1, "end": first, "lines": []}
+            edits.append(edit)
+        elif edit is None or line.strip().startswith("```"):
+            continue
+        elif LINE_PATCH_END_RE.match(line):
+            edit = None
+        else:
+            edit["lines"].append(line)
+
+    for edit in edits:
+        if all(NUMBERED_LINE_RE.match(line) for line in edit["lines"] if line.strip()):
+            edit["lines"] = [NUMBERED_LINE_RE.sub("", line, count=1) for line in edit["lines"]]
+    return edits
+
+
+def apply_line_patch(script, patch):
+    """
+    Apply a line-range patch to the script it was made against
+
+    Args:
+        script (str): Script whose line numbers the patch refers to
+        patch (str): Line-range patch, see parse_line_patch
+
+    Returns:
+        str: The patched script, or None if a range is out of bounds or ranges overlap
+    """
+    edits = sorted(parse_line_patch(patch), key=lambda edit: (edit["start"], edit["end"]))
+    if not edits:
+        return None
+
+    lines = script.splitlines()
+    previous_end = 0
+    for edit in edits:
+        if edit["start"] < 1 or edit["end"] < edit["start"] - 1 or edit["end"] > len(lines):
+            return None
+        if edit["start"] <= previous_end:
+            return None
+        previous_end = max(previous_end, edit["end"])
+
+    # Bottom up, so the line numbers of the remaining edits stay valid
+    for edit in reversed(edits):
+        lines[edit["start"] - 1:edit["end"]] = edit["lines"]
+
+    patched = "\n".join(lines)
+    return patched + "\n" if script.endswith("\n") else patched
+
+
+def apply_patch(script, patch):
+    """
+    Apply a unified diff or a line-range patch, whichever the patch is
+
+    Args:
+        script (str): Script to patch
+        patch (str): Unified diff or line-range patch
+
+    Returns:
+        str: The patched script, or None if the patch is neither or does not apply
+    """
+    # Models often wrap patches in markdown fences
+    lines = [line for line in (patch or "").splitlines() if not line.strip().startswith("```")]
+    if any(HUNK_HEADER_RE.match(line) for line in lines):
+        return apply_diff(script, "\n".join(lines))
+    if any(LINE_PATCH_RE.match(line) for line in lines):
+        return apply_line_patch(script, "\n".join(lines))
+    return None
@@ -0,0 +1,223 @@
+import ast
+import json
+import shlex
+import builtins
+import threading
+from django.conf import settings
+from .base_agent import BaseAgent
+from .docker_agent import DockerAgent
+from .render_cache import RenderCacheAgent
+from .scene_analysis import find_scene_classes
+from .api_migrations import migrate_script
+
+# Printed by the container: the names `from manim import *` provides
+MANIM_API_EXTRACTOR = (
+    "import json, manim; "
+    "names = getattr(manim, '__all__', None) or [n for n in dir(manim) if not n.startswith('_')]; "
+    "print(json.dumps({'version': getattr(manim, '__version__', ''), 'names': sorted(names)}))"
+)
+
+class PreflightAgent(BaseAgent):
+    """
+    Agent responsible for static checks of a script before it is rendered.
+    Catches syntax errors, scripts without a Scene subclass, names that are
+    not imported from the installed Manim API and undefined names on the host,
+    so those failures never cost a container render.
+    """
+
+    # Manim API indexes per image version, shared by all agents in the process
+    _api_indexes = {}
+    _api_lock = threading.Lock()
+
+    def __init__(self, debug=False):
+        """Initialize the Preflight Agent"""
+        super().__init__(debug)
+        self.docker_agent = DockerAgent(debug)
+        self.render_cache = RenderCacheAgent(debug)
+        self.enabled = getattr(settings, 'MANIM_PREFLIGHT_ENABLED', True)
+        self.migrations_enabled = getattr(settings, 'MANIM_API_MIGRATIONS_ENABLED', True)
+
+    def check(self, script_content, container_name=None):
+        """
+        Statically validate a script
+
+        Args:
+            script_content (str): Script content
+            container_name (str, optional): Container whose Manim API the imports are checked against
+
+        Returns:
+            dict: success, scenes (renderable scene class names), diagnostics
+                  (list of dicts with code, message, line) and error (formatted diagnostics)
+        """
+        if not self.enabled:
+            return {"success": True, "scenes": [], "diagnostics": [], "error": None}
+
+        try:
+            tree = ast.parse(script_content)
+        except SyntaxError as e:
+            diagnostic = {
+                "code": "syntax-error",
+                "message": f"{e.msg}: {(e.text or '').strip()}",
+                "line": e.lineno
+            }
+            return self._result([], [diagnostic])
+
+        api_names = self.get_api_index(container_name) if container_name else None
+
+        diagnostics = []
+        diagnostics.extend(self._check_imports(tree, api_names))
+        scenes = find_scene_classes(script_content)
+        if not scenes:
+            diagnostics.append({
+                "code": "no-scene",
+                "message": "No class derives from Scene (or MovingCameraScene, ThreeDScene, ...), nothing can be rendered",
+                "line": None
+            })
+        diagnostics.extend(self._check_undefined_names(tree, api_names))
+
+        return self._result(scenes, diagnostics)
+
+    def migrate(self, script_content, container_name=None, symbols=None):
+        """
+        Rewrite renamed Manim APIs before the script is checked and rendered
+
+        Args:
+            script_content (str): Script content
+            container_name (str, optional): Container whose Manim API decides which renames apply
+            symbols (list, optional): Only apply the rules for these failing names
+
+        Returns:
+            dict: script, fired (ids of the rules that changed the script) and version
+                  of the migration table, see api_migrations.migrate_script
+        """
+        if not self.migrations_enabled:
+            return {"script": script_content, "fired": [], "version": None}
+
+        api_names = self.get_api_index(container_name) if container_name else None
+        result = migrate_script(script_content, api_names, symbols)
+        if result["fired"]:
+            self.log_info(f"Applied API migrations: {', '.join(result['fired'])}")
+        return result
+
+    def get_api_index(self, container_name):
+        """
+        Get the names exported by the Manim installed in a container's image
+
+        The index is extracted from the container once per image version.
+
+        Args:
+            container_name (str): Name of the container
+
+        Returns:
+            set: Exported names, or None if the index could not be extracted
+        """
+        try:
+            image_version = self.render_cache.get_image_version(container_name)
+        except Exception as e:
+            self.log_warning(f"Could not resolve image version of {container_name}: {str(e)}")
+            return None
+
+        with PreflightAgent._api_lock:
+            if image_version in PreflightAgent._api_indexes:
+                return PreflightAgent._api_indexes[image_version]
+
+            result = self.docker_agent.execute_command(
+                container_name, f"python -c {shlex.quote(MANIM_API_EXTRACTOR)}"
+            )
+            if not result["success"]:
+                # Don't cache a failed extraction - the container may just be starting
+                self.log_warning(f"Could not extract the Manim API from {container_name}")
+                return None
+
+            try:
+                index = json.loads(result["stdout"].strip().splitlines()[-1])
+            except (ValueError, IndexError):
+                self.log_warning(f"Unreadable Manim API index from {container_name}")
+                return None
+
+            names = frozenset(index["names"])
+            PreflightAgent._api_indexes[image_version] = names
+            self.log_info(f"Indexed {len(names)} names of Manim {index.get('version')} ({image_version})")
+            return names
+
+    def format_diagnostics(self, diagnostics):
+        """Render diagnostics as an error message for the AI debugger"""
+        lines = ["Pre-flight check failed before rendering:"]
+        for diagnostic in diagnostics:
+            location = f"line {diagnostic['line']}: " if diagnostic.get('line') else ""
+            lines.append(f"- [{diagnostic['code']}] {location}{diagnostic['message']}")
+        return "\n".join(lines)
+
+    def _result(self, scenes, diagnostics):
+        return {
+            "success": not diagnostics,
+            "scenes": scenes,
+            "diagnostics": diagnostics,
+            "error": self.format_diagnostics(diagnostics) if diagnostics else None
+        }
+
+    def _check_imports(self, tree, api_names):
+        """Names imported from manim that the installed version does not export"""
+        if api_names is None:
+            return []
+
+        diagnostics = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module == 'manim':
+                for alias in node.names:
+                    if alias.name != '*' and alias.name not in api_names:
+                        diagnostics.append({
+                            "code": "unknown-import",
+                            "message": f"'{alias.name}' cannot be imported from manim - it does not exist in the installed version",
+                            "line": node.lineno
+                        })
+        return diagnostics
+
+    def _check_undefined_names(self, tree, api_names):
+        """
+        Names that are read but never bound anywhere in the script
+
+        Deliberately loose about scopes so it never flags valid code. Skipped when
+        a star import comes from a module whose names are unknown.
+        """
+        star_modules = {node.module for node in ast.walk(tree)
+                        if isinstance(node, ast.ImportFrom) and any(a.name == '*' for a in node.names)}
+        if star_modules - {'manim'} or ('manim' in star_modules and api_names is None):
+            return []
+
+        bound = set(dir(builtins)) | {'__name__', '__file__'}
+        if 'manim' in star_modules:
+            bound |= api_names
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+                bound.add(node.id)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                bound.add(node.name)
+            elif isinstance(node, ast.arg):
+                bound.add(node.arg)
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                for alias in node.names:
+                    bound.add((alias.asname or alias.name).split('.')[0])
+            elif isinstance(node, ast.ExceptHandler) and node.name:
+                bound.add(node.name)
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                bound.update(node.names)
+            elif isinstance(node, ast.MatchAs) and node.name:
+                bound.add(node.name)
+            elif isinstance(node, ast.MatchStar) and node.name:
+                bound.add(node.name)
+            elif isinstance(node, ast.MatchMapping) and node.rest:
+                bound.add(node.rest)
+
+        diagnostics, reported = [], set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) \
+                    and node.id not in bound and node.id not in reported:
+                reported.add(node.id)
+                diagnostics.append({
+                    "code": "undefined-name",
+                    "message": f"'{node.id}' is not defined, imported or provided by manim",
+                    "line": node.lineno
+                })
+        return diagnostics
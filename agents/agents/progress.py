@@ -0,0 +1,299 @@
+import re
+import time
+import asyncio
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+
+# Manim's tqdm bar, e.g. "Animation 2: Create(Circle):  45%|####5     | 27/60 [00:01<00:01, 25.3it/s]"
+PROGRESS_PATTERN = re.compile(
+    r"Animation\s+(?P<index>\d+)\s*:\s*(?P<name>.*?):\s*(?P<percent>\d+)%\|.*?\|\s*(?P<frames>\d+)/(?P<total>\d+)"
+)
+
+
+def parse_progress(line):
+    """
+    Parse a Manim progress bar line
+
+    Args:
+        line (str): One line (or carriage-return segment) of Manim output
+
+    Returns:
+        dict: animation, name, percent, frames and total_frames, or None for other output
+    """
+    match = PROGRESS_PATTERN.search(line)
+    if not match:
+        return None
+
+    return {
+        "animation": int(match.group("index")),
+        "name": match.group("name").strip(),
+        "percent": int(match.group("percent")),
+        "frames": int(match.group("frames")),
+        "total_frames": int(match.group("total"))
+    }
+
+
+def line_splitter(on_output):
+    """
+    Turn output chunks into lines for on_output
+
+    Splits on newlines and on the carriage returns progress bars redraw with.
+
+    Args:
+        on_output (callable): Called with (stream, line) for every complete line
+
+    Returns:
+        tuple: (feed(stream, text), flush()) callables
+    """
+    buffers = {'stdout': '', 'stderr': ''}
+
+    def feed(stream, text):
+        parts = re.split(r'\r\n|\r|\n', buffers[stream] + text)
+        buffers[stream] = parts.pop()
+        for line in parts:
+            on_output(stream, line)
+
+    def flush():
+        for stream, rest in buffers.items():
+            if rest:
+                on_output(stream, rest)
+            buffers[stream] = ''
+
+    return feed, flush
+
+
+class ExecutionEventPublisher:
+    """
+    Records status, progress and log events of an execution as ExecutionEvent
+    rows, which the SSE endpoint streams to clients. Progress bars redraw many
+    times a second, so progress events are throttled per animation, and log
+    lines are buffered and stored as one event per batch.
+    """
+
+    def __init__(self, execution=None):
+        """
+        Initialize the publisher
+
+        Args:
+            execution (Execution, optional): Execution the events belong to - without one nothing is recorded
+        """
+        self.execution = execution
+        self.enabled = execution is not None and getattr(settings, 'EXECUTION_EVENTS_ENABLED', True)
+        self.progress_interval = getattr(settings, 'EXECUTION_EVENT_PROGRESS_INTERVAL', 0.5)
+
+        # Log lines are flushed after this many seconds or lines, or before any other event
+        self.log_interval = getattr(settings, 'EXECUTION_EVENT_LOG_INTERVAL', 1.0)
+        self.log_batch = getattr(settings, 'EXECUTION_EVENT_LOG_BATCH', 100)
+
+        # animation index -> (percent, time) of the last published progress event
+        self._last_progress = {}
+
+        # Buffered (stream, line) pairs and when the first of them arrived
+        self._log_lines = []
+        self._log_started = 0.0
+        self._log_lock = threading.Lock()
+
+    def status(self, status, **data):
+        """Publish a status change, e.g. running, attempt, debugging, completed"""
+        self.publish('status', dict(data, status=status))
+
+    def on_output(self, stream, line):
+        """
+        Handle one line of container output
+
+        Args:
+            stream (str): 'stdout' or 'stderr'
+            line (str): Output line without its line ending
+        """
+        if not line.strip():
+            return
+
+        progress = parse_progress(line)
+        if progress is None:
+            self._buffer_log(stream, line)
+            return
+
+        now = time.monotonic()
+        last_percent, last_time = self._last_progress.get(progress["animation"], (None, 0.0))
+        if progress["percent"] == last_percent:
+            return
+        if progress["percent"] < 100 and now - last_time < self.progress_interval:
+            return
+
+        self._last_progress[progress["animation"]] = (progress["percent"], now)
+        self.publish('progress', progress)
+
+    def publish(self, kind, data):
+        """Store an event for the execution, after any buffered log lines"""
+        if not self.enabled:
+            return None
+
+        self.flush()
+        return self._store(kind, data)
+
+    def flush(self):
+        """Store the buffered log lines, one log event per run of lines from the same stream"""
+        with self._log_lock:
+            lines, self._log_lines = self._log_lines, []
+
+        runs = []
+        for stream, line in lines:
+            if runs and runs[-1]["stream"] == stream:
+                runs[-1]["lines"].append(line)
+            else:
+                runs.append({"stream": stream, "lines": [line]})
+        for run in runs:
+            self._store('log', run)
+
+    def _buffer_log(self, stream, line):
+        if not self.enabled:
+            return
+
+        now = time.monotonic()
+        with self._log_lock:
+            if not self._log_lines:
+                self._log_started = now
+            self._log_lines.append((stream, line))
+            due = len(self._log_lines) >= self.log_batch or now - self._log_started >= self.log_interval
+        if due:
+            self.flush()
+
+    def _store(self, kind, data):
+        try:
+            # Import here to avoid circular imports
+            from ..models import ExecutionEvent
+
+            return ExecutionEvent.objects.create(execution=self.execution, kind=kind, data=data)
+        except Exception:
+            # Events are best effort - they must never fail a render
+            return None
+
+
+def prune_events(retention):
+    """
+    Delete the progress and log events of executions that finished over retention seconds ago
+
+    Status events are kept as the execution's history.
+
+    Returns:
+        int: Number of events deleted
+    """
+    # Import here to avoid circular imports
+    from ..models import ExecutionEvent
+
+    cutoff = timezone.now() - timedelta(seconds=retention)
+    deleted, _ = (
+        ExecutionEvent.objects
+        .filter(execution__completed_at__lt=cutoff)
+        .exclude(kind='status')
+        .delete()
+    )
+    return deleted
+
+
+class EventSubscription:
+    """An open SSE stream waiting for the events of one execution"""
+
+    def __init__(self, execution_id, last_event_id):
+        self.execution_id = execution_id
+        self.last_event_id = last_event_id
+        self.queue = asyncio.Queue()
+
+
+class ExecutionEventHub:
+    """
+    Reads new events for every open SSE stream of the process with one query
+    per poll interval, instead of each connection polling the database on its
+    own. Subscriptions receive (kind, data, id) tuples and a final ('end', ...)
+    once their execution has finished and its events are drained.
+    """
+
+    # Events read per query
+    BATCH_SIZE = 500
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._task = None
+        self._loop = None
+
+    def subscribe(self, execution_id, last_event_id):
+        """
+        Start receiving the events of an execution after last_event_id
+
+        Must be called from the event loop that serves the stream.
+
+        Returns:
+            EventSubscription: Subscription whose queue receives the events
+        """
+        subscription = EventSubscription(execution_id, last_event_id)
+        self._subscriptions.add(subscription)
+
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._task = loop.create_task(self._poll())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop delivering events to a subscription, e.g. after its client disconnected"""
+        self._subscriptions.discard(subscription)
+
+    async def _poll(self):
+        poll_interval = getattr(settings, 'EXECUTION_EVENTS_POLL_INTERVAL', 0.5)
+        while self._subscriptions:
+            try:
+                more = await self.poll_once()
+            except Exception:
+                # A failed read is retried on the next interval
+                more = False
+            if not more:
+                await asyncio.sleep(poll_interval)
+
+    async def poll_once(self):
+        """
+        Deliver new events to every subscription
+
+        Returns:
+            bool: True if a full batch was read and more events may be waiting
+        """
+        # Import here to avoid circular imports
+        from ..models import Execution, ExecutionEvent
+
+        subscriptions = list(self._subscriptions)
+        if not subscriptions:
+            return False
+        execution_ids = {subscription.execution_id for subscription in subscriptions}
+
+        # Final events are written before completed_at, so events read after it is seen are complete
+        finished = {
+            pk: {'status': execution_status, 'output_path': output_path}
+            async for pk, execution_status, output_path in Execution.objects
+            .filter(pk__in=execution_ids, completed_at__isnull=False)
+            .values_list('pk', 'status', 'output_path')
+        }
+        events = [
+            event async for event in ExecutionEvent.objects
+            .filter(execution_id__in=execution_ids, id__gt=min(s.last_event_id for s in subscriptions))
+            .order_by('id')[:self.BATCH_SIZE]
+        ]
+
+        for event in events:
+            for subscription in subscriptions:
+                if subscription.execution_id == event.execution_id and event.id > subscription.last_event_id:
+                    subscription.last_event_id = event.id
+                    subscription.queue.put_nowait((event.kind, event.data, event.id))
+
+        if len(events) == self.BATCH_SIZE:
+            return True
+
+        for subscription in subscriptions:
+            if subscription.execution_id in finished:
+                subscription.queue.put_nowait(('end', finished[subscription.execution_id], None))
+                self.unsubscribe(subscription)
+        return False
+
+
+# Shared by every SSE stream in the process
+event_hub = ExecutionEventHub()
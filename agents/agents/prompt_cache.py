@@ -0,0 +1,236 @@
+import re
+import time
+import zlib
+import hashlib
+import threading
+import numpy as np
+from django.conf import settings
+from .base_agent import BaseAgent
+
+class PromptCacheAgent(BaseAgent):
+    """
+    Agent responsible for reusing scripts generated for earlier prompts.
+
+    Tier one matches an exact hash of (normalized prompt, provider, model,
+    temperature). Tier two, off unless AI_PROMPT_CACHE_SEMANTIC is set,
+    compares character n-gram vectors of the prompt against prompts of the
+    same provider and model whose scripts rendered successfully. A prompt
+    above AI_PROMPT_CACHE_SIMILARITY only matches if it has the same numbers
+    and names the shared words in the same order - n-grams alone cannot tell
+    "5 bars" from "10 bars" or "circle to square" from "square to circle".
+    """
+
+    # Candidates above the threshold checked for numbers and word order
+    MAX_CANDIDATES = 5
+
+    # Dimension of the hashed character n-gram vectors
+    VECTOR_SIZE = 4096
+    NGRAM_SIZES = (3, 4, 5)
+
+    # Similarity index shared by all agents in the process
+    _index_lock = threading.Lock()
+    _vectors = np.zeros((0, VECTOR_SIZE), dtype=np.float32)
+    _script_ids = []
+    _scopes = []
+    _watermark = None
+    _last_refresh = 0.0
+
+    def __init__(self, debug=False):
+        """Initialize the Prompt Cache Agent"""
+        super().__init__(debug)
+        self.enabled = getattr(settings, 'AI_PROMPT_CACHE_ENABLED', True)
+        self.semantic_enabled = getattr(settings, 'AI_PROMPT_CACHE_SEMANTIC', False)
+        self.similarity_threshold = getattr(settings, 'AI_PROMPT_CACHE_SIMILARITY', 0.95)
+        self.max_entries = getattr(settings, 'AI_PROMPT_CACHE_MAX_ENTRIES', 20000)
+
+        # Seconds between pulls of newly successful scripts into the index
+        self.refresh_interval = getattr(settings, 'AI_PROMPT_CACHE_REFRESH_INTERVAL', 30)
+
+    def normalize_prompt(self, prompt):
+        """Lowercase and collapse whitespace and trailing punctuation"""
+        prompt = re.sub(r"\s+", " ", (prompt or "").lower()).strip()
+        return prompt.rstrip(".!? ")
+
+    def make_key(self, prompt, provider, model_name, temperature):
+        """
+        Build the exact-match key for a generation request
+
+        Args:
+            prompt (str): The user prompt
+            provider (AIProvider/str): Provider used for generation
+            model_name (str): Model name or deployment
+            temperature (float): Sampling temperature
+
+        Returns:
+            str: sha256 hex digest
+        """
+        parts = (self.normalize_prompt(prompt), self.make_scope(provider, model_name), f"{temperature:.2f}")
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def make_scope(self, provider, model_name):
+        """Provider and model a script was generated with, as one string"""
+        provider_key = str(provider.pk) if hasattr(provider, 'pk') else str(provider)
+        return f"{provider_key}\0{model_name or ''}"
+
+    def lookup(self, prompt, prompt_key, provider=None, model_name=None):
+        """
+        Find a previously successful script for a prompt
+
+        Args:
+            prompt (str): The user prompt
+            prompt_key (str): Exact-match key from make_key
+            provider (AIProvider/str, optional): Provider of the request, needed for a semantic hit
+            model_name (str, optional): Model name or deployment of the request
+
+        Returns:
+            tuple: (Script, tier, similarity) or (None, None, 0.0) on a miss
+        """
+        if not self.enabled:
+            return None, None, 0.0
+
+        try:
+            script = self._lookup_exact(prompt_key)
+            if script:
+                self.log_info(f"Prompt cache exact hit: script {script.id}")
+                return script, "exact", 1.0
+
+            if not self.semantic_enabled or provider is None:
+                return None, None, 0.0
+
+            script, similarity = self._lookup_similar(prompt, self.make_scope(provider, model_name))
+            if script:
+                self.log_info(f"Prompt cache semantic hit ({similarity:.3f}): script {script.id}")
+                return script, "semantic", similarity
+
+        except Exception as e:
+            # The cache must never break generation
+            self.log_warning(f"Prompt cache lookup failed: {str(e)}")
+
+        return None, None, 0.0
+
+    def vectorize(self, prompt):
+        """
+        Embed a prompt as an L2-normalized hashed character n-gram vector
+
+        Args:
+            prompt (str): The prompt text
+
+        Returns:
+            numpy.ndarray: float32 vector of VECTOR_SIZE
+        """
+        text = f" {self.normalize_prompt(prompt)} "
+        vector = np.zeros(self.VECTOR_SIZE, dtype=np.float32)
+
+        for size in self.NGRAM_SIZES:
+            for i in range(len(text) - size + 1):
+                bucket = zlib.crc32(text[i:i + size].encode("utf-8")) % self.VECTOR_SIZE
+                vector[bucket] += 1.0
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def is_same_request(self, prompt, other):
+        """
+        Whether two similar prompts ask for the same thing
+
+        Args:
+            prompt (str): The user prompt
+            other (str): Prompt of a cached script
+
+        Returns:
+            bool: Both have the same numbers and their shared words in the same order
+        """
+        words = re.findall(r"[a-z]+|\d+(?:\.\d+)?", self.normalize_prompt(prompt))
+        other_words = re.findall(r"[a-z]+|\d+(?:\.\d+)?", self.normalize_prompt(other))
+
+        numbers = [word for word in words if word[0].isdigit()]
+        if numbers != [word for word in other_words if word[0].isdigit()]:
+            return False
+
+        shared = set(words) & set(other_words)
+        first = [word for word in dict.fromkeys(words) if word in shared]
+        second = [word for word in dict.fromkeys(other_words) if word in shared]
+        return first == second
+
+    def _lookup_exact(self, prompt_key):
+        """Most recent successfully rendered script with the same key"""
+        from ..models import Script
+
+        return (
+            Script.objects
+            .filter(prompt_hash=prompt_key, executions__is_successful=True)
+            .order_by('-created_at')
+            .first()
+        )
+
+    def _lookup_similar(self, prompt, scope):
+        """Closest successfully rendered prompt of the same provider and model above the similarity threshold"""
+        from ..models import Script
+
+        self._refresh_index()
+
+        with PromptCacheAgent._index_lock:
+            vectors = PromptCacheAgent._vectors
+            script_ids = list(PromptCacheAgent._script_ids)
+            scopes = np.array(PromptCacheAgent._scopes, dtype=object)
+
+        if not script_ids:
+            return None, 0.0
+
+        # Rows are unit vectors, so the dot product is the cosine similarity
+        similarities = np.where(scopes == scope, vectors @ self.vectorize(prompt), -1.0)
+        best_similarity = float(similarities.max())
+
+        for index in np.argsort(similarities)[::-1][:self.MAX_CANDIDATES]:
+            similarity = float(similarities[index])
+            if similarity < self.similarity_threshold:
+                break
+            script = Script.objects.filter(id=script_ids[index], executions__is_successful=True).first()
+            if script and self.is_same_request(prompt, script.prompt):
+                return script, similarity
+
+        return None, best_similarity
+
+    def _refresh_index(self):
+        """Add scripts whose executions succeeded since the last refresh"""
+        from ..models import Execution
+
+        now = time.monotonic()
+        if now - PromptCacheAgent._last_refresh < self.refresh_interval:
+            return
+
+        with PromptCacheAgent._index_lock:
+            PromptCacheAgent._last_refresh = now
+
+            successes = Execution.objects.filter(is_successful=True, completed_at__isnull=False)
+            if PromptCacheAgent._watermark:
+                successes = successes.filter(completed_at__gt=PromptCacheAgent._watermark)
+
+            rows = list(
+                successes.order_by('-completed_at')
+                .values_list('script_id', 'script__prompt', 'script__provider_id', 'script__model_name',
+                             'completed_at')[:self.max_entries]
+            )
+            if not rows:
+                return
+
+            PromptCacheAgent._watermark = rows[0][-1]
+
+            known = set(PromptCacheAgent._script_ids)
+            new_ids, new_scopes, new_vectors = [], [], []
+            for script_id, prompt, provider_id, model_name, _ in reversed(rows):
+                if script_id in known:
+                    continue
+                known.add(script_id)
+                new_ids.append(script_id)
+                new_scopes.append(self.make_scope(provider_id, model_name))
+                new_vectors.append(self.vectorize(prompt))
+
+            if not new_ids:
+                return
+
+            # Keep the most recent max_entries prompts
+            PromptCacheAgent._vectors = np.vstack([PromptCacheAgent._vectors, np.array(new_vectors)])[-self.max_entries:]
+            PromptCacheAgent._script_ids = (PromptCacheAgent._script_ids + new_ids)[-self.max_entries:]
+            PromptCacheAgent._scopes = (PromptCacheAgent._scopes + new_scopes)[-self.max_entries:]
+            self.log_info(f"Prompt cache index now holds {len(PromptCacheAgent._script_ids)} prompts")
@@ -0,0 +1,193 @@
+import time
+import hashlib
+import threading
+from collections import deque
+import google.generativeai as genai
+from google.generativeai import client as genai_client
+from openai import AzureOpenAI
+
+AZURE_OPENAI_API_VERSION = "2023-07-01-preview"
+
+
+class ProviderClient:
+    """An AI provider client shared across requests, with latency statistics"""
+
+    # Number of recent calls kept for latency percentiles
+    LATENCY_WINDOW = 200
+
+    def __init__(self, key, provider_type, client):
+        self.key = key
+        self.provider_type = provider_type
+        self.client = client
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def call(self, func, *args, **kwargs):
+        """Invoke a client method and record how long it took"""
+        started = time.monotonic()
+        failed = False
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.record(time.monotonic() - started, failed)
+
+    def record(self, seconds, failed=False):
+        """Record the latency of one call"""
+        with self._lock:
+            self.calls += 1
+            self.errors += int(failed)
+            self.total_seconds += seconds
+            if not failed:
+                self.latencies.append(seconds)
+
+    def percentile(self, percent, min_samples=1):
+        """Latency percentile over the recent window, None with fewer than min_samples calls"""
+        with self._lock:
+            ordered = sorted(self.latencies)
+        if not ordered or len(ordered) < min_samples:
+            return None
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def stats(self):
+        """Summary of the client's calls"""
+        return {
+            "provider_id": self.key[0],
+            "provider_type": self.provider_type,
+            "endpoint": self.key[2],
+            "calls": self.calls,
+            "errors": self.errors,
+            "mean_seconds": self.total_seconds / self.calls if self.calls else None,
+            "p50_seconds": self.percentile(50),
+            "p95_seconds": self.percentile(95)
+        }
+
+
+class ProviderClientRegistry:
+    """
+    Process-wide registry of AI provider clients.
+
+    Clients are keyed by (provider id, credentials hash, endpoint) so every
+    generation and debug call reuses the same HTTP connection pool instead of
+    building a new client and TLS session each time.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+        # Gemini service clients per credentials hash, shared by every model of the key
+        self._gemini_services = {}
+
+    def make_key(self, provider_id, api_key, endpoint=None, name=None):
+        """Registry key for a client - never holds the raw credential"""
+        credentials_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+        return (str(provider_id), credentials_hash, endpoint or "", name or "")
+
+    def get_azure_openai(self, provider_id, api_key, endpoint):
+        """
+        Get the shared Azure OpenAI client for a provider
+
+        Args:
+            provider_id: AIProvider id, or a label such as 'settings'
+            api_key (str): Azure OpenAI API key
+            endpoint (str): Azure OpenAI endpoint
+
+        Returns:
+            ProviderClient: Wrapper around an AzureOpenAI client
+        """
+        key = self.make_key(provider_id, api_key, endpoint)
+
+        with self._lock:
+            if key not in self._clients:
+                client = AzureOpenAI(
+                    api_key=api_key,
+                    api_version=AZURE_OPENAI_API_VERSION,
+                    azure_endpoint=endpoint
+                )
+                self._clients[key] = ProviderClient(key, 'azure_openai', client)
+            return self._clients[key]
+
+    def get_gemini(self, provider_id, api_key, model_name):
+        """
+        Get the shared Gemini model handle for a provider
+
+        Args:
+            provider_id: AIProvider id, or a label such as 'settings'
+            api_key (str): Gemini API key
+            model_name (str): Gemini model name
+
+        Returns:
+            ProviderClient: Wrapper around a GenerativeModel
+        """
+        key = self.make_key(provider_id, api_key, name=model_name)
+
+        with self._lock:
+            if key not in self._clients:
+                model = genai.GenerativeModel(model_name)
+                model._client = self._gemini_service(key[1], api_key)
+                self._clients[key] = ProviderClient(key, 'gemini', model)
+            return self._clients[key]
+
+    def _gemini_service(self, credentials_hash, api_key):
+        """
+        Gemini service client bound to one API key
+
+        genai.configure() sets a single key for the whole process, so switching
+        keys would send requests already in flight with the wrong one. Each key
+        gets its own client manager instead, configured like the library's default.
+        """
+        if credentials_hash not in self._gemini_services:
+            manager = genai_client._ClientManager()
+            manager.configure(api_key=api_key)
+            self._gemini_services[credentials_hash] = manager.get_default_client('generative')
+        return self._gemini_services[credentials_hash]
+
+    def invalidate(self, provider_id):
+        """
+        Drop every client built for a provider, e.g. after its credentials change
+
+        Returns:
+            int: Number of clients dropped
+        """
+        with self._lock:
+            stale = [key for key in self._clients if key[0] == str(provider_id)]
+            for key in stale:
+                client = self._clients.pop(key).client
+                if hasattr(client, 'close'):
+                    client.close()
+            return len(stale)
+
+    def latency_percentile(self, provider_id, percent, min_samples=1):
+        """
+        Latency percentile of a provider's clients, e.g. to decide when to hedge a call
+
+        Args:
+            provider_id: AIProvider id, or a label such as 'settings'
+            percent (float): Percentile, e.g. 95
+            min_samples (int, optional): Calls a client needs before its percentile counts
+
+        Returns:
+            float: Highest percentile among the provider's clients in seconds, or None
+        """
+        with self._lock:
+            clients = [client for key, client in self._clients.items() if key[0] == str(provider_id)]
+        values = [client.percentile(percent, min_samples) for client in clients]
+        values = [value for value in values if value is not None]
+        return max(values) if values else None
+
+    def stats(self):
+        """Latency statistics for every cached client"""
+        with self._lock:
+            clients = list(self._clients.values())
+        return [client.stats() for client in clients]
+
+
+# Shared by every agent in the process
+provider_clients = ProviderClientRegistry()
@@ -0,0 +1,58 @@
+from django.conf import settings
+
+# Manim quality presets, cheapest first: name -> (CLI flag, folder Manim renders into)
+QUALITY_PRESETS = {
+    'low': ('-ql', '480p15'),
+    'medium': ('-qm', '720p30'),
+    'high': ('-qh', '1080p60'),
+    'production': ('-qp', '1440p60'),
+    'fourk': ('-qk', '2160p60'),
+}
+
+
+def quality_flag(quality):
+    """Manim CLI flag of a quality preset, e.g. '-ql'"""
+    return QUALITY_PRESETS[quality][0]
+
+
+def quality_folder(quality):
+    """Folder Manim writes videos of a quality preset into, e.g. '480p15'"""
+    return QUALITY_PRESETS[quality][1]
+
+
+def quality_rank(quality):
+    """Position of a quality on the ladder - higher renders better and slower"""
+    return list(QUALITY_PRESETS).index(quality) if quality in QUALITY_PRESETS else -1
+
+
+def get_preview_quality():
+    """
+    Quality of the first render of a script
+
+    The preview is the only render the AI debugger works against, so it
+    should be the cheapest quality that still shows errors.
+
+    Returns:
+        str: Quality preset name from MANIM_PREVIEW_QUALITY
+    """
+    quality = getattr(settings, 'MANIM_PREVIEW_QUALITY', 'low')
+    return quality if quality in QUALITY_PRESETS else 'low'
+
+
+def get_rendition_qualities():
+    """
+    Qualities rendered in the background once the preview succeeded
+
+    Returns:
+        list: Quality preset names from MANIM_RENDITION_QUALITIES above the
+              preview quality, cheapest first
+    """
+    qualities = getattr(settings, 'MANIM_RENDITION_QUALITIES', ['medium'])
+    if isinstance(qualities, str):
+        qualities = [q.strip() for q in qualities.split(',')]
+
+    preview_rank = quality_rank(get_preview_quality())
+    return sorted(
+        {q for q in qualities if q in QUALITY_PRESETS and quality_rank(q) > preview_rank},
+        key=quality_rank
+    )
@@ -0,0 +1,404 @@
+import os
+import time
+import socket
+import threading
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from .base_agent import BaseAgent
+from .container_pool import ContainerPoolAgent
+from .progress import ExecutionEventPublisher, prune_events
+from .quality import get_preview_quality
+from .scratch import ScratchSpaceAgent
+
+class RenderQueueAgent(BaseAgent):
+    """
+    Agent responsible for the persistent render job queue.
+    Jobs are Execution rows in the 'queued' state; workers claim them with
+    SELECT ... FOR UPDATE SKIP LOCKED so no external broker is needed.
+    """
+
+    # Seconds between two prunes of execution events in this process
+    PRUNE_INTERVAL = 300
+    _last_prune = 0.0
+
+    def __init__(self, debug=False, worker_id=None):
+        """Initialize the Render Queue Agent"""
+        super().__init__(debug)
+        self.container_pool = ContainerPoolAgent(debug)
+        self.scratch = ScratchSpaceAgent(debug)
+
+        # Identifies this worker on claimed executions
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+        # Seconds to sleep when the queue is empty
+        self.poll_interval = getattr(settings, 'RENDER_QUEUE_POLL_INTERVAL', 2)
+
+        # Seconds between heartbeats of a running job, and without one after which it is
+        # considered abandoned - at least three missed heartbeats
+        self.heartbeat_interval = getattr(settings, 'RENDER_QUEUE_HEARTBEAT_INTERVAL', 30)
+        self.stale_after = max(
+            getattr(settings, 'RENDER_QUEUE_STALE_AFTER', 300),
+            3 * self.heartbeat_interval
+        )
+
+        # Progress and log events of finished executions are kept this many seconds
+        self.events_retention = getattr(settings, 'EXECUTION_EVENTS_RETENTION', 3600)
+
+        # Batches queue behind interactive renders and render this many jobs at once by default
+        self.batch_priority = getattr(settings, 'RENDER_BATCH_PRIORITY', 20)
+        self.batch_concurrency = getattr(settings, 'RENDER_BATCH_CONCURRENCY', 2)
+
+    def enqueue(self, script, priority=10, batch=None):
+        """
+        Add a script to the render queue
+
+        Args:
+            script (Script): The script to render
+            priority (int, optional): Queue priority, lower is picked first. Defaults to 10.
+            batch (ExecutionBatch, optional): Batch the execution belongs to
+
+        Returns:
+            Execution: The queued execution record
+        """
+        from ..models import Execution
+
+        execution = Execution.objects.create(
+            script=script,
+            batch=batch,
+            status='queued',
+            priority=priority,
+            quality=get_preview_quality(),
+            queued_at=timezone.now(),
+            is_successful=False
+        )
+
+        # Reflect the queued state on the script
+        script.status = 'pending'
+        script.save(update_fields=['status', 'updated_at'])
+
+        self.log_info(f"Queued script {script.id} as execution {execution.id}")
+        return execution
+
+    def enqueue_batch(self, scripts, max_concurrency=None, priority=None):
+        """
+        Queue many scripts as one batch
+
+        The batch only bounds how many of its executions run at once - workers
+        skip its queued jobs while max_concurrency of them are running.
+
+        Args:
+            scripts (list): Scripts to render
+            max_concurrency (int, optional): Executions of the batch rendered at once, 0 for no limit
+            priority (int, optional): Queue priority of the executions
+
+        Returns:
+            ExecutionBatch: The batch record
+        """
+        from ..models import ExecutionBatch
+
+        with transaction.atomic():
+            batch = ExecutionBatch.objects.create(
+                max_concurrency=self.batch_concurrency if max_concurrency is None else max_concurrency
+            )
+            for script in scripts:
+                self.enqueue(script, priority=self.batch_priority if priority is None else priority, batch=batch)
+
+        self.log_info(f"Queued batch {batch.id} of {len(scripts)} scripts")
+        return batch
+
+    def enqueue_rendition(self, source_execution, quality, script_content):
+        """
+        Queue a higher-quality render of a successful preview
+
+        Renditions run behind new previews and are never debugged - they render
+        the script exactly as the preview rendered it.
+
+        Args:
+            source_execution (Execution): The successful preview execution
+            quality (str): Quality preset to render
+            script_content (str): The script content the preview rendered
+
+        Returns:
+            Execution: The queued rendition execution
+        """
+        from ..models import Execution
+
+        execution = Execution.objects.create(
+            script=source_execution.script,
+            source_execution=source_execution,
+            status='queued',
+            priority=getattr(settings, 'MANIM_RENDITION_PRIORITY', 50),
+            quality=quality,
+            original_script=script_content,
+            queued_at=timezone.now(),
+            is_successful=False
+        )
+
+        self.log_info(f"Queued {quality} rendition of execution {source_execution.id} as {execution.id}")
+        return execution
+
+    def claim_next(self):
+        """
+        Claim the next queued execution for this worker
+
+        Returns:
+            Execution: The claimed execution or None if the queue is empty
+        """
+        from ..models import Execution
+
+        with transaction.atomic():
+            full_batches = set()
+            while True:
+                # Concurrent workers skip rows another transaction has locked
+                execution = (
+                    Execution.objects
+                    .select_for_update(skip_locked=True)
+                    .filter(status='queued')
+                    .exclude(batch__in=self._saturated_batches())
+                    .exclude(batch__in=full_batches)
+                    .order_by('priority', 'queued_at')
+                    .first()
+                )
+
+                if not execution:
+                    return None
+
+                # Re-check the batch under its row lock so workers cannot overshoot its limit together
+                if execution.batch_id and not self._batch_has_capacity(execution.batch_id):
+                    full_batches.add(execution.batch_id)
+                    continue
+                break
+
+            execution.status = 'running'
+            execution.claimed_at = timezone.now()
+            execution.heartbeat_at = execution.claimed_at
+            execution.worker_id = self.worker_id
+            execution.save(update_fields=['status', 'claimed_at', 'heartbeat_at', 'worker_id', 'updated_at'])
+
+        self.log_info(f"Worker {self.worker_id} claimed execution {execution.id}")
+        return execution
+
+    def _saturated_batches(self):
+        """Batches already running max_concurrency executions"""
+        from ..models import ExecutionBatch
+
+        return (
+            ExecutionBatch.objects
+            .filter(max_concurrency__gt=0)
+            .annotate(running=Count('executions', filter=Q(executions__status='running')))
+            .filter(running__gte=F('max_concurrency'))
+            .values('id')
+        )
+
+    def _batch_has_capacity(self, batch_id):
+        """Lock a batch and check that another of its executions may start"""
+        from ..models import Execution, ExecutionBatch
+
+        batch = ExecutionBatch.objects.select_for_update().get(pk=batch_id)
+        if not batch.max_concurrency:
+            return True
+        return Execution.objects.filter(batch_id=batch_id, status='running').count() < batch.max_concurrency
+
+    def run_next(self):
+        """
+        Claim and execute a single job from the queue
+
+        Returns:
+            dict: Execution result, or None if the queue was empty
+        """
+        execution = self.claim_next()
+        if not execution:
+            return None
+
+        return self.run(execution)
+
+    def run(self, execution):
+        """
+        Execute a claimed job
+
+        Args:
+            execution (Execution): A claimed execution in the 'running' state
+
+        Returns:
+            dict: Result from ManimExecutionAgent.execute
+        """
+        # Import here to avoid circular imports
+        from .execution_agent import ManimExecutionAgent
+
+        # Renders, smoke renders and debugging can go minutes without saving the execution.
+        # A heartbeat that finds the job requeued or claimed elsewhere stops the run.
+        stop_heartbeat = threading.Event()
+        claim_lost = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(execution, stop_heartbeat, claim_lost), daemon=True,
+            name=f"heartbeat-{execution.id}"
+        )
+        heartbeat.start()
+
+        try:
+            execution_agent = ManimExecutionAgent(self.debug, worker_id=self.worker_id, claim_lost=claim_lost)
+            return execution_agent.execute(execution.script, execution=execution)
+
+        except Exception as e:
+            error_msg = str(e)
+            stack_trace = traceback.format_exc()
+            self.log_error(f"Worker failed on execution {execution.id}: {error_msg}\n{stack_trace}")
+
+            # Never leave a crashed job in the running state - unless another worker runs it now
+            if self._owns(execution):
+                execution.status = 'failed'
+                execution.error = error_msg
+                execution.termination_reason = 'error'
+                ExecutionEventPublisher(execution).status('failed', termination_reason='error', error=error_msg)
+                execution.completed_at = timezone.now()
+                self._owned_executions(execution).update(
+                    status='failed', error=error_msg, termination_reason='error',
+                    completed_at=execution.completed_at, updated_at=execution.completed_at
+                )
+
+            return {
+                "success": False,
+                "error": error_msg,
+                "execution": execution
+            }
+
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+
+    def beat(self, execution):
+        """
+        Refresh the heartbeat of an execution this worker is running
+
+        Returns:
+            bool: False once the execution is no longer running on this worker
+        """
+        return bool(self._owned_executions(execution).update(heartbeat_at=timezone.now()))
+
+    def _owned_executions(self, execution):
+        """The execution's row, as long as it is running on this worker"""
+        from ..models import Execution
+
+        return Execution.objects.filter(pk=execution.pk, status='running', worker_id=self.worker_id)
+
+    def _owns(self, execution):
+        """Whether the execution is still running on this worker"""
+        return self._owned_executions(execution).exists()
+
+    def _heartbeat(self, execution, stop, claim_lost=None):
+        """
+        Beat every heartbeat interval until stop is set - runs in the heartbeat thread
+
+        Sets claim_lost and stops once the execution is no longer running on this worker.
+        """
+        try:
+            while not stop.wait(self.heartbeat_interval):
+                try:
+                    if not self.beat(execution):
+                        self.log_warning(f"Execution {execution.id} was taken over, stopping worker {self.worker_id}")
+                        if claim_lost is not None:
+                            claim_lost.set()
+                        break
+                except Exception as e:
+                    self.log_warning(f"Heartbeat of execution {execution.id} failed: {str(e)}")
+        finally:
+            # The thread's own database connection
+            connection.close()
+
+    def requeue_stale(self):
+        """
+        Put back running executions whose worker stopped sending heartbeats
+
+        Returns:
+            int: Number of executions requeued
+        """
+        from ..models import Execution
+
+        # Full saves of the execution count as a sign of life too
+        cutoff = timezone.now() - timedelta(seconds=self.stale_after)
+        requeued = Execution.objects.filter(
+            Q(heartbeat_at__isnull=True) | Q(heartbeat_at__lt=cutoff),
+            updated_at__lt=cutoff,
+            status='running',
+            completed_at__isnull=True,
+            queued_at__isnull=False
+        ).update(status='queued', worker_id='', claimed_at=None, heartbeat_at=None)
+
+        if requeued:
+            self.log_warning(f"Requeued {requeued} stale executions")
+        return requeued
+
+    def work(self, max_jobs=None, once=False):
+        """
+        Drain the queue until stopped
+
+        Args:
+            max_jobs (int, optional): Stop after processing this many jobs
+            once (bool, optional): Stop as soon as the queue is empty
+
+        Returns:
+            int: Number of jobs processed
+        """
+        processed = 0
+        self.log_info(f"Render worker {self.worker_id} started")
+
+        # Warm the container pool before taking jobs
+        try:
+            self.container_pool.ensure_min_size()
+        except Exception as e:
+            self.log_warning(f"Could not warm container pool: {str(e)}")
+
+        while max_jobs is None or processed < max_jobs:
+            self.requeue_stale()
+            self._reap_scratch()
+            self._prune_events()
+
+            result = self.run_next()
+            if result is None:
+                # Shrink the container pool while there is nothing to render
+                self._scale_pool_down()
+                if once:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+
+            processed += 1
+
+        return processed
+
+    def _reap_scratch(self):
+        """Remove scratch directories orphaned by crashed jobs, ignoring errors"""
+        from ..models import Container
+
+        try:
+            container_names = list(
+                Container.objects.filter(is_active=True, is_running=True).values_list('name', flat=True)
+            )
+            self.scratch.reap_if_due(container_names)
+        except Exception as e:
+            self.log_warning(f"Could not reap scratch directories: {str(e)}")
+
+    def _prune_events(self):
+        """Drop the progress and log events of long-finished executions, ignoring errors"""
+        now = time.monotonic()
+        if RenderQueueAgent._last_prune and now - RenderQueueAgent._last_prune < self.PRUNE_INTERVAL:
+            return
+        RenderQueueAgent._last_prune = now
+
+        try:
+            deleted = prune_events(self.events_retention)
+            if deleted:
+                self.log_info(f"Pruned {deleted} execution events")
+        except Exception as e:
+            self.log_warning(f"Could not prune execution events: {str(e)}")
+
+    def _scale_pool_down(self):
+        """Release idle pooled containers, ignoring pool errors"""
+        try:
+            self.container_pool.scale_down()
+        except Exception as e:
+            self.log_warning(f"Could not scale container pool down: {str(e)}")
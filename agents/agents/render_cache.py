@@ -0,0 +1,265 @@
+import io
+import os
+import ast
+import uuid
+import shutil
+import hashlib
+import tokenize
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+from .base_agent import BaseAgent
+from .docker_agent import DockerAgent
+
+class RenderCacheAgent(BaseAgent):
+    """
+    Agent responsible for the content-addressed render cache.
+    Videos are keyed by the normalized script, scene class, quality flag and
+    Manim image version, stored under MEDIA_ROOT/render_cache and evicted
+    least-recently-used first once the cache exceeds its size budget.
+    The cache owns its copies: renders served from it get their own link or
+    copy under MEDIA_ROOT/jobs, so eviction never breaks an execution.
+    """
+
+    # Image ids resolved per container, shared by all agents in the process
+    _image_versions = {}
+
+    def __init__(self, debug=False):
+        """Initialize the Render Cache Agent"""
+        super().__init__(debug)
+        self.docker_agent = DockerAgent(debug)
+
+        self.enabled = getattr(settings, 'MANIM_RENDER_CACHE_ENABLED', True)
+        self.max_bytes = getattr(settings, 'MANIM_RENDER_CACHE_MAX_BYTES', 5 * 1024 ** 3)
+
+        # Pin the image version explicitly, otherwise it is read from the container
+        self.image_version = getattr(settings, 'MANIM_IMAGE_VERSION', '')
+
+        self.media_root = settings.MEDIA_ROOT
+        self.cache_dir = "render_cache"
+
+    def normalize_script(self, script_content):
+        """
+        Reduce a script to a form that ignores formatting, comments and markdown fences
+
+        Args:
+            script_content (str): Script content
+
+        Returns:
+            str: Normalized script
+        """
+        content = script_content.replace("```python", "").replace("```", "").strip()
+
+        # The AST drops comments, blank lines and formatting differences
+        try:
+            return ast.dump(ast.parse(content))
+        except SyntaxError:
+            pass
+
+        # Unparseable scripts still render deterministically - strip comments token by token
+        try:
+            tokens = tokenize.generate_tokens(io.StringIO(content).readline)
+            return " ".join(
+                token.string for token in tokens
+                if token.type not in (tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE,
+                                      tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER)
+            )
+        except (tokenize.TokenError, IndentationError, SyntaxError):
+            lines = (line.strip() for line in content.splitlines())
+            return "\n".join(line for line in lines if line and not line.startswith("#"))
+
+    def get_image_version(self, container_name):
+        """
+        Get the Manim image version used by a container
+
+        Args:
+            container_name (str): Name of the container
+
+        Returns:
+            str: Configured version, image id, or the image name from the Container record
+        """
+        if self.image_version:
+            return self.image_version
+
+        if container_name not in RenderCacheAgent._image_versions:
+            image_id = self.docker_agent.get_image_id(container_name)
+            if not image_id:
+                # Don't cache a failed lookup - fall back to the configured image name
+                from ..models import Container
+                container = Container.objects.filter(name=container_name).first()
+                return container.image if container else ""
+            RenderCacheAgent._image_versions[container_name] = image_id
+
+        return RenderCacheAgent._image_versions[container_name]
+
+    def make_key(self, script_content, scene_class, quality, image_version):
+        """
+        Build the cache key for a render
+
+        Returns:
+            str: sha256 hex digest
+        """
+        digest = hashlib.sha256()
+        for part in (self.normalize_script(script_content), scene_class or "", quality, image_version or ""):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def lookup(self, key):
+        """
+        Look up a cached render and mark it as recently used
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            RenderCacheEntry: The cache entry or None on a miss
+        """
+        if not self.enabled or not key:
+            return None
+
+        from ..models import RenderCacheEntry
+
+        entry = RenderCacheEntry.objects.filter(key=key).first()
+        if not entry:
+            return None
+
+        # The file may have been removed behind the cache's back
+        if not os.path.exists(os.path.join(self.media_root, entry.output_path)):
+            entry.delete()
+            return None
+
+        RenderCacheEntry.objects.filter(pk=entry.pk).update(
+            hit_count=F('hit_count') + 1,
+            last_used_at=timezone.now()
+        )
+        entry.refresh_from_db()
+        self.log_info(f"Render cache hit for {key[:12]}")
+        return entry
+
+    def store(self, key, output_path, scene_class, quality, image_version):
+        """
+        Add a rendered video to the cache
+
+        Args:
+            key (str): Cache key
+            output_path (str): Rendered video relative to MEDIA_ROOT
+            scene_class (str): Rendered scene class
+            quality (str): Manim quality flag
+            image_version (str): Manim image version
+
+        Returns:
+            RenderCacheEntry: The stored entry or None if caching is disabled or failed
+        """
+        if not self.enabled or not key:
+            return None
+
+        from ..models import RenderCacheEntry
+
+        try:
+            source_path = os.path.join(self.media_root, output_path)
+            cached_path = f"{self.cache_dir}/{key[:2]}/{key}.mp4"
+            full_cached_path = os.path.join(self.media_root, cached_path)
+
+            if not os.path.exists(full_cached_path):
+                os.makedirs(os.path.dirname(full_cached_path), exist_ok=True)
+                # A copy, not a link - the size budget has to bound the disk the cache uses
+                temp_path = f"{full_cached_path}.{uuid.uuid4().hex}.tmp"
+                try:
+                    shutil.copyfile(source_path, temp_path)
+                    os.replace(temp_path, full_cached_path)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.unlink(temp_path)
+
+            entry, _ = RenderCacheEntry.objects.update_or_create(
+                key=key,
+                defaults={
+                    'scene_class': scene_class or "",
+                    'quality': quality,
+                    'image_version': image_version or "",
+                    'output_path': cached_path,
+                    'size_bytes': os.path.getsize(full_cached_path),
+                    'last_used_at': timezone.now()
+                }
+            )
+
+            self.evict()
+            return entry
+
+        except Exception as e:
+            self.log_error(f"Error storing render in cache: {str(e)}")
+            return None
+
+    def checkout(self, entry):
+        """
+        Give a render served from the cache its own video, outside the cache
+
+        Args:
+            entry (RenderCacheEntry): Cache entry returned by lookup
+
+        Returns:
+            str: The video relative to MEDIA_ROOT, under jobs/
+        """
+        output_path = f"jobs/{uuid.uuid4()}/{entry.scene_class or 'scene'}.mp4"
+        full_path = os.path.join(self.media_root, output_path)
+        cached_path = os.path.join(self.media_root, entry.output_path)
+
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # A link costs no disk space and outlives the cache entry
+        try:
+            os.link(cached_path, full_path)
+        except OSError:
+            shutil.copyfile(cached_path, full_path)
+        return output_path
+
+    def evict(self):
+        """
+        Remove least-recently-used entries until the cache fits its size budget
+
+        Returns:
+            int: Number of entries evicted
+        """
+        from ..models import RenderCacheEntry
+
+        total = RenderCacheEntry.objects.aggregate(total=Sum('size_bytes'))['total'] or 0
+        evicted = 0
+
+        for entry in RenderCacheEntry.objects.order_by('last_used_at').iterator():
+            if total <= self.max_bytes:
+                break
+
+            full_path = os.path.join(self.media_root, entry.output_path)
+            if os.path.exists(full_path):
+                os.unlink(full_path)
+
+            total -= entry.size_bytes
+            entry.delete()
+            evicted += 1
+
+        if evicted:
+            self.log_info(f"Evicted {evicted} render cache entries")
+        return evicted
+
+    def stats(self):
+        """
+        Report cache size and hit/miss counters
+
+        Returns:
+            dict: entries, size_bytes, max_bytes, hits, misses and hit_rate
+        """
+        from ..models import Execution, RenderCacheEntry
+
+        totals = RenderCacheEntry.objects.aggregate(size=Sum('size_bytes'))
+        hits = Execution.objects.filter(is_cached=True).count()
+        misses = Execution.objects.filter(is_cached=False).exclude(cache_key='').count()
+
+        return {
+            "enabled": self.enabled,
+            "entries": RenderCacheEntry.objects.count(),
+            "size_bytes": totals['size'] or 0,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0
+        }
@@ -0,0 +1,135 @@
+import time
+import hashlib
+from django.conf import settings
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed render gets another debug-and-retry attempt.
+
+    One execution is bounded by an attempt cap, a wall-clock budget and a
+    budget of LLM tokens spent on debugging. It also stops when the debugger
+    keeps returning the same script or proposes a script version that was
+    already tried, since neither can render differently.
+    """
+
+    # Values stored in Execution.termination_reason
+    COMPLETED = 'completed'
+    CACHED = 'cached'
+    MAX_ATTEMPTS = 'max_attempts'
+    WALL_CLOCK = 'wall_clock_budget'
+    TOKEN_BUDGET = 'token_budget'
+    NO_PROGRESS = 'no_progress'
+    CYCLE = 'fix_cycle'
+    INFRA = 'infra_error'
+    ENVIRONMENT = 'environment_error'
+    ERROR = 'error'
+
+    def __init__(self, max_attempts=None):
+        """
+        Initialize the policy from settings
+
+        Args:
+            max_attempts (int, optional): Overrides MANIM_MAX_ATTEMPTS
+        """
+        self.max_attempts = max_attempts or getattr(settings, 'MANIM_MAX_ATTEMPTS', 5)
+        self.wall_clock_budget = getattr(settings, 'MANIM_RETRY_WALL_CLOCK_BUDGET', 600)
+        self.token_budget = getattr(settings, 'MANIM_RETRY_TOKEN_BUDGET', 60000)
+        self.max_unchanged = getattr(settings, 'MANIM_RETRY_MAX_UNCHANGED', 2)
+        self.backoff_base = getattr(settings, 'MANIM_RETRY_BACKOFF_BASE', 1.0)
+        self.backoff_max = getattr(settings, 'MANIM_RETRY_BACKOFF_MAX', 30.0)
+
+        self.started = None
+        self.tokens_used = 0
+        self.unchanged = 0
+        self.seen = set()
+        self.current = None
+
+    def start(self, script_content):
+        """Start the budget clock for an execution of script_content"""
+        self.started = time.monotonic()
+        self.tokens_used = 0
+        self.unchanged = 0
+        self.current = self.fingerprint(script_content)
+        self.seen = {self.current}
+
+    def fingerprint(self, script_content):
+        """Hash of a script version, ignoring trailing whitespace"""
+        lines = (line.rstrip() for line in (script_content or "").strip().splitlines())
+        return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+    def elapsed(self):
+        """Seconds since start()"""
+        return time.monotonic() - self.started if self.started else 0.0
+
+    def check_budget(self, attempt):
+        """
+        Check whether another attempt may start
+
+        Args:
+            attempt (int): Number of attempts made so far
+
+        Returns:
+            str: Termination reason, or None if the execution may continue
+        """
+        if attempt >= self.max_attempts:
+            return self.MAX_ATTEMPTS
+        if self.wall_clock_budget and self.elapsed() >= self.wall_clock_budget:
+            return self.WALL_CLOCK
+        if self.token_budget and self.tokens_used >= self.token_budget:
+            return self.TOKEN_BUDGET
+        return None
+
+    def record_tokens(self, tokens):
+        """Add LLM tokens spent on a debug call"""
+        self.tokens_used += tokens or 0
+
+    def record_fix(self, fixed_script):
+        """
+        Register the script proposed by the debugger
+
+        Args:
+            fixed_script (str): Script returned by the debug step
+
+        Returns:
+            str: Termination reason, or None if the fix is worth rendering
+        """
+        fingerprint = self.fingerprint(fixed_script)
+
+        if fingerprint == self.current:
+            self.unchanged += 1
+            return self.NO_PROGRESS if self.unchanged >= self.max_unchanged else None
+
+        # Going back to an earlier version renders exactly like it did before
+        if fingerprint in self.seen:
+            return self.CYCLE
+
+        self.seen.add(fingerprint)
+        self.current = fingerprint
+        self.unchanged = 0
+        return None
+
+    def record_rewrite(self, script):
+        """Register a deterministic rewrite as the current script version, without judging it"""
+        fingerprint = self.fingerprint(script)
+        self.seen.add(fingerprint)
+        self.current = fingerprint
+        self.unchanged = 0
+
+    def backoff(self, attempt):
+        """
+        Sleep before the next attempt, never past the wall-clock budget
+
+        Args:
+            attempt (int): Number of attempts made so far
+
+        Returns:
+            float: Seconds slept
+        """
+        delay = min(self.backoff_max, self.backoff_base * (2 ** max(0, attempt - 1)))
+        if self.wall_clock_budget:
+            delay = min(delay, max(0.0, self.wall_clock_budget - self.elapsed()))
+
+        if delay > 0:
+            time.sleep(delay)
+        return delay
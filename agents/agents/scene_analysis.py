@@ -0,0 +1,192 @@
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Manim scene classes - any other base whose name ends in "Scene" and is not
+# defined in the script is treated as a Manim scene too
+KNOWN_SCENE_BASES = {
+    'Scene', 'MovingCameraScene', 'ThreeDScene', 'ZoomedScene',
+    'VectorScene', 'LinearTransformationScene', 'SpecialThreeDScene'
+}
+
+# Methods of Scene that produce at least one animation
+ANIMATION_METHODS = {'play', 'wait', 'wait_until', 'move_camera', 'begin_ambient_camera_rotation'}
+
+# Iterations assumed for loops whose length is not a literal
+DEFAULT_LOOP_ITERATIONS = 3
+
+# Analyses of recently seen scripts, keyed by content hash
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+CACHE_SIZE = 512
+
+
+def analyze_scenes(script_content):
+    """
+    Find the renderable scene classes of a Manim script
+
+    Results are memoized per script hash.
+
+    Args:
+        script_content (str): Script content
+
+    Returns:
+        dict: scenes - list of dicts with name, bases (chain from the class up to
+              the Manim scene it derives from), line and animations (estimated
+              number of animations in construct) - and error (str or None if the
+              script does not parse)
+    """
+    key = hashlib.sha256((script_content or "").encode("utf-8")).hexdigest()
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    analysis = _analyze(script_content or "")
+
+    with _cache_lock:
+        _cache[key] = analysis
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return analysis
+
+
+def find_scene_classes(script_content):
+    """
+    Names of the renderable scene classes in a script, in source order
+
+    Args:
+        script_content (str): Script content
+
+    Returns:
+        list: Scene class names, empty if there are none or the script does not parse
+    """
+    return [scene["name"] for scene in analyze_scenes(script_content)["scenes"]]
+
+
+def _analyze(script_content):
+    try:
+        tree = ast.parse(script_content)
+    except SyntaxError as e:
+        return {"scenes": [], "error": f"line {e.lineno}: {e.msg}"}
+
+    classes = {node.name: node for node in tree.body if isinstance(node, ast.ClassDef)}
+
+    scenes = []
+    for name, node in classes.items():
+        chain = _scene_chain(name, classes)
+        if not chain or not _defines_construct(name, classes):
+            continue
+
+        scenes.append({
+            "name": name,
+            "bases": chain,
+            "line": node.lineno,
+            "animations": _count_animations(_find_construct(name, classes))
+        })
+
+    return {"scenes": scenes, "error": None}
+
+
+def _base_name(node):
+    """Name of a class base - Scene, manim.Scene or Generic[...] style"""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Subscript):
+        return _base_name(node.value)
+    return None
+
+
+def _is_manim_scene(name, classes):
+    return name in KNOWN_SCENE_BASES or (name.endswith('Scene') and name not in classes)
+
+
+def _scene_chain(name, classes, seen=()):
+    """Base chain from a class up to a Manim scene, or None if it is not a scene"""
+    node = classes.get(name)
+    if node is None or name in seen:
+        return None
+
+    for base in filter(None, map(_base_name, node.bases)):
+        if _is_manim_scene(base, classes):
+            return [base]
+        chain = _scene_chain(base, classes, seen + (name,))
+        if chain:
+            return [base] + chain
+    return None
+
+
+def _find_construct(name, classes, seen=()):
+    """construct() of a class or of the nearest local base that defines it"""
+    node = classes.get(name)
+    if node is None or name in seen:
+        return None
+
+    for item in node.body:
+        if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name == 'construct':
+            return item
+
+    for base in filter(None, map(_base_name, node.bases)):
+        construct = _find_construct(base, classes, seen + (name,))
+        if construct:
+            return construct
+    return None
+
+
+def _defines_construct(name, classes):
+    return _find_construct(name, classes) is not None
+
+
+def _count_animations(node):
+    """Estimate the animations a construct() body plays, unrolling loops"""
+    if node is None:
+        return 0
+
+    def count(statements):
+        total = 0
+        for statement in statements:
+            if isinstance(statement, (ast.For, ast.AsyncFor, ast.While)):
+                total += count(statement.body) * _loop_iterations(statement) + count(statement.orelse)
+            elif isinstance(statement, ast.If):
+                total += max(count(statement.body), count(statement.orelse))
+            elif isinstance(statement, (ast.With, ast.AsyncWith)):
+                total += count(statement.body)
+            elif isinstance(statement, ast.Try):
+                total += count(statement.body) + count(statement.finalbody)
+            elif not isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                total += sum(1 for call in ast.walk(statement) if _is_animation_call(call))
+        return total
+
+    return count(node.body)
+
+
+def _is_animation_call(node):
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr in ANIMATION_METHODS
+        and isinstance(node.func.value, ast.Name)
+        and node.func.value.id == 'self'
+    )
+
+
+def _loop_iterations(node):
+    """Literal length of range(...) or a literal sequence, otherwise a default"""
+    iterable = getattr(node, 'iter', None)
+
+    if isinstance(iterable, (ast.List, ast.Tuple, ast.Set)):
+        return len(iterable.elts)
+
+    if isinstance(iterable, ast.Call) and isinstance(iterable.func, ast.Name) and iterable.func.id == 'range':
+        args = iterable.args
+        if args and all(isinstance(arg, ast.Constant) and isinstance(arg.value, int) for arg in args):
+            values = [arg.value for arg in args]
+            if len(values) < 3 or values[2]:
+                return len(range(*values))
+
+    return DEFAULT_LOOP_ITERATIONS
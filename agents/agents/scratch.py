@@ -0,0 +1,244 @@
+import os
+import time
+import uuid
+import shutil
+import tempfile
+from django.conf import settings
+from .base_agent import BaseAgent
+
+# Scratch directories are named <prefix><hex>, so the reaper only ever touches its own
+SCRATCH_PREFIX = "job_"
+
+
+class ScratchDir:
+    """
+    Scratch directory of one render job on the host, and optionally in a container.
+    Removes exactly what it created - nothing is found by globbing.
+    """
+
+    def __init__(self, agent, path, container_name=None, container_path=None):
+        self.agent = agent
+        self.path = path
+        self.name = os.path.basename(path)
+        self.container_name = container_name
+        self.container_path = container_path
+        self.container_files = []
+
+    def file(self, filename, content=None):
+        """
+        Host path of a file in the scratch directory
+
+        Args:
+            filename (str): File name
+            content (str, optional): Text to write to the file
+
+        Returns:
+            str: Path of the file
+        """
+        path = os.path.join(self.path, filename)
+        if content is not None:
+            with open(path, "w", encoding="utf-8", errors="replace") as f:
+                f.write(content)
+        return path
+
+    def track_container_file(self, path, container_name=None):
+        """
+        Remove a file outside the container scratch directory on cleanup
+
+        Args:
+            path (str): Path of the file in the container
+            container_name (str, optional): Container of the file, if the scratch
+                                            directory was created without one
+
+        Returns:
+            str: The tracked path
+        """
+        if container_name:
+            self.container_name = container_name
+        self.container_files.append(path)
+        return path
+
+    def cleanup(self):
+        """Remove the scratch directory and everything tracked in the container"""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+        targets = ([self.container_path] if self.container_path else []) + self.container_files
+        if self.container_name and targets:
+            try:
+                self.agent.docker_agent.execute_command(
+                    self.container_name,
+                    f"rm -rf {' '.join(targets)}"
+                )
+            except Exception as e:
+                self.agent.log_warning(f"Could not remove container scratch of {self.name}: {str(e)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
+
+
+class ScratchSpaceAgent(BaseAgent):
+    """
+    Agent responsible for per-job scratch directories.
+    Each render gets its own directory under MANIM_SCRATCH_DIR (on tmpfs when
+    MANIM_SCRATCH_TMPFS is set), removed when the job ends. Directories left
+    behind by crashed workers are reaped once they are older than MANIM_SCRATCH_TTL,
+    as are the shared-volume job directories under MEDIA_ROOT/jobs they orphaned.
+    """
+
+    # Monotonic time of the last reap per process, shared by all agents
+    _last_reap = 0.0
+
+    def __init__(self, debug=False):
+        """Initialize the Scratch Space Agent"""
+        super().__init__(debug)
+
+        self.root = getattr(settings, 'MANIM_SCRATCH_DIR', '') or self._default_root()
+
+        # Matching directory inside the Manim containers
+        self.container_root = getattr(settings, 'MANIM_CONTAINER_SCRATCH_DIR', '/tmp/omega-scratch')
+
+        # Job directories of the shared-volume transports - finished ones hold served videos
+        self.jobs_root = os.path.join(settings.MEDIA_ROOT, "jobs")
+
+        # Orphans older than ttl seconds are removed at most every reap_interval seconds
+        self.ttl = getattr(settings, 'MANIM_SCRATCH_TTL', 3600)
+        self.reap_interval = getattr(settings, 'MANIM_SCRATCH_REAP_INTERVAL', 300)
+
+        self._docker_agent = None
+
+    @property
+    def docker_agent(self):
+        """Docker agent, created only for jobs that use a container"""
+        if self._docker_agent is None:
+            from .docker_agent import DockerAgent
+            self._docker_agent = DockerAgent(self.debug)
+        return self._docker_agent
+
+    def _default_root(self):
+        """/dev/shm when tmpfs scratch is requested and available, the temp dir otherwise"""
+        if getattr(settings, 'MANIM_SCRATCH_TMPFS', False) and os.path.isdir("/dev/shm"):
+            return "/dev/shm/omega-scratch"
+        return os.path.join(tempfile.gettempdir(), "omega-scratch")
+
+    def create(self, container_name=None):
+        """
+        Create a scratch directory for one job
+
+        Args:
+            container_name (str, optional): Also create a matching directory in this container
+
+        Returns:
+            ScratchDir: The scratch directory - use it as a context manager or call cleanup()
+        """
+        name = f"{SCRATCH_PREFIX}{uuid.uuid4().hex}"
+        path = os.path.join(self.root, name)
+        os.makedirs(path)
+
+        container_path = None
+        if container_name:
+            container_path = f"{self.container_root}/{name}"
+            self.docker_agent.execute_command(container_name, f"mkdir -p {container_path}")
+
+        return ScratchDir(self, path, container_name, container_path)
+
+    def reap(self, container_names=None, ttl=None):
+        """
+        Remove scratch directories older than the TTL
+
+        Orphaned job directories under MEDIA_ROOT/jobs are removed too, see
+        _is_orphaned_job_dir - the videos of finished jobs are never touched.
+
+        Args:
+            container_names (list, optional): Containers whose scratch directories are reaped too
+            ttl (int, optional): Age in seconds, defaults to MANIM_SCRATCH_TTL
+
+        Returns:
+            int: Number of host directories removed
+        """
+        ttl = self.ttl if ttl is None else ttl
+        cutoff = time.time() - ttl
+        removed = 0
+
+        try:
+            entries = list(os.scandir(self.root))
+        except FileNotFoundError:
+            entries = []
+
+        for entry in entries:
+            try:
+                if entry.name.startswith(SCRATCH_PREFIX) and entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+            except OSError:
+                continue
+
+        try:
+            job_dirs = list(os.scandir(self.jobs_root))
+        except FileNotFoundError:
+            job_dirs = []
+
+        for entry in job_dirs:
+            try:
+                if entry.is_dir(follow_symlinks=False) and self._is_orphaned_job_dir(entry.path, cutoff):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+            except OSError:
+                continue
+
+        for container_name in container_names or []:
+            self.docker_agent.execute_command(
+                container_name,
+                f"find {self.container_root} -mindepth 1 -maxdepth 1 -name '{SCRATCH_PREFIX}*' "
+                f"-mmin +{max(1, ttl // 60)} -exec rm -rf {{}} + 2>/dev/null; true"
+            )
+
+        if removed:
+            self.log_info(f"Reaped {removed} orphaned scratch directories")
+        return removed
+
+    def _is_orphaned_job_dir(self, path, cutoff):
+        """
+        Whether a job directory was left behind by a render that never finished
+
+        A finished job keeps nothing but its videos, so a directory that still
+        holds script.py or has no video at all is an orphan once nothing in it
+        changed since the cutoff.
+
+        Args:
+            path (str): Host path of the job directory
+            cutoff (float): Modification time orphans are older than
+
+        Returns:
+            bool: True if the directory can be removed
+        """
+        newest = os.stat(path, follow_symlinks=False).st_mtime
+        has_script = has_video = False
+        for root, dirs, files in os.walk(path):
+            if root == path and "script.py" in files:
+                has_script = True
+            for name in files + dirs:
+                try:
+                    newest = max(newest, os.stat(os.path.join(root, name), follow_symlinks=False).st_mtime)
+                except OSError:
+                    continue
+                has_video = has_video or name.endswith(".mp4")
+            if newest >= cutoff or (has_video and not has_script):
+                return False
+        return has_script or not has_video
+
+    def reap_if_due(self, container_names=None):
+        """
+        Reap orphans if the last reap in this process is older than the reap interval
+
+        Returns:
+            int: Number of host directories removed, or None if no reap was due
+        """
+        now = time.monotonic()
+        if ScratchSpaceAgent._last_reap and now - ScratchSpaceAgent._last_reap < self.reap_interval:
+            return None
+        ScratchSpaceAgent._last_reap = now
+        return self.reap(container_names)
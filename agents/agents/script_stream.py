@@ -0,0 +1,166 @@
+import ast
+import re
+from .scene_analysis import find_scene_classes
+
+# Syntax errors that only mean the code has not fully arrived yet
+INCOMPLETE_ERRORS = re.compile(
+    r"was never closed|unexpected EOF|expected an indented block|unterminated triple-quoted|incomplete input"
+)
+
+# Line endings that a statement continues after
+CONTINUATIONS = ("\\", ",", "(", "[", "{", ":", "+", "-", "*", "/", "=", "|", "&", ".")
+
+# Lines that are markdown rather than Python
+MARKDOWN_RE = re.compile(r"^\s*(\*\*|#{1,6} |[-*] |\d+\. |> |\|)")
+
+# Top-level imports and the scene class header of a script
+IMPORT_RE = re.compile(r"^(import|from)\s+\w")
+CLASS_HEADER_RE = re.compile(r"^class\s+\w+\s*(\([^)]*\))?\s*:")
+
+
+class ScriptStreamParser:
+    """
+    Checks a generated script while its completion streams in.
+
+    Chunks are split into lines; an opening markdown fence is dropped and a
+    closing one ends the script, as does prose after a complete scene. The
+    code received so far is re-parsed every few lines: errors that only mean
+    the code is incomplete are ignored, anything else - prose or markdown
+    instead of code, or a real syntax error - rejects the stream so it can be
+    resampled before the whole completion has been paid for.
+    """
+
+    # New lines between two parses of the code received so far
+    CHECK_EVERY = 5
+
+    def __init__(self):
+        self.text = ""
+        self.code_lines = []
+        self.header = None
+        self.rejection = None
+        self.complete = False
+        self._pending = ""
+        self._fenced = False
+        self._has_imports = False
+        self._checked_lines = 0
+        self._recheck = False
+
+    def feed(self, chunk):
+        """
+        Add a chunk of the completion
+
+        Args:
+            chunk (str): Text as it arrived from the provider
+
+        Returns:
+            str: Reason to reject the stream, or None while it still looks like code
+        """
+        self.text += chunk or ""
+        self._pending += chunk or ""
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            self._add_line(line)
+            if self.complete or self.rejection:
+                break
+        else:
+            if len(self.code_lines) - self._checked_lines >= self.CHECK_EVERY:
+                self._check()
+        return self.rejection
+
+    def finish(self):
+        """
+        Parse the rest of the completion once the stream has ended
+
+        Returns:
+            str: Reason to reject the script, or None
+        """
+        if self._pending and not (self.complete or self.rejection):
+            self._add_line(self._pending)
+        self._pending = ""
+        if not (self.complete or self.rejection):
+            self._check(final=True)
+        return self.rejection
+
+    def script(self):
+        """The code received so far, without markdown fences or trailing prose"""
+        code_lines = self.code_lines
+        if self._pending and not self.complete:
+            code_lines = code_lines + [self._pending]
+        return "\n".join(code_lines).strip("\n")
+
+    def _add_line(self, line):
+        stripped = line.strip()
+        started = any(code_line.strip() for code_line in self.code_lines)
+
+        if stripped.startswith("```"):
+            if started:
+                self.complete = True
+            elif self._fenced:
+                self.rejection = "markdown instead of code"
+            else:
+                self._fenced = True
+            return
+
+        self.code_lines.append(line)
+        if not stripped:
+            return
+
+        if IMPORT_RE.match(line):
+            self._has_imports = True
+        elif self.header is None and self._has_imports and CLASS_HEADER_RE.match(line):
+            self.header = "\n".join(self.code_lines)
+
+        # The first line decides whether the model is writing code at all; code
+        # that only looked incomplete is checked again on the next line
+        if not started or self._recheck:
+            self._check()
+
+    def _check(self, final=False):
+        """Parse the code received so far and reject it on a real syntax error"""
+        self._checked_lines = len(self.code_lines)
+        self._recheck = False
+        source = "\n".join(self.code_lines)
+        try:
+            ast.parse(source)
+            return
+        except SyntaxError as e:
+            if not final and self._is_incomplete(e):
+                self._recheck = self._trailing_error(e)
+                return
+            line, message = min(e.lineno or len(self.code_lines), len(self.code_lines)), e.msg
+
+        # Prose after a complete scene ends the script, e.g. an explanation of the code
+        prefix = "\n".join(self.code_lines[:line - 1])
+        if line > 1 and not self.code_lines[line - 1][:1].isspace() and self._parses(prefix) \
+                and find_scene_classes(prefix):
+            self.code_lines = self.code_lines[:line - 1]
+            self.complete = True
+            return
+
+        text = self.code_lines[line - 1] if line > 0 else ""
+        if MARKDOWN_RE.match(text):
+            self.rejection = f"markdown instead of code at line {line}"
+        elif re.match(r"^[A-Z][a-z']*( [\w',]+){2,}", text.strip()):
+            self.rejection = f"prose instead of code at line {line}"
+        else:
+            self.rejection = f"syntax error at line {line}: {message}"
+
+    def _is_incomplete(self, error):
+        """Whether a syntax error may go away once more of the code arrives"""
+        if INCOMPLETE_ERRORS.search(error.msg or ""):
+            return True
+        if self._trailing_error(error):
+            line = self.code_lines[-1].rstrip() if self.code_lines else ""
+            return line.endswith(CONTINUATIONS) or line.lstrip().startswith("@")
+        return False
+
+    def _trailing_error(self, error):
+        """Whether a syntax error is on the last line received"""
+        return bool(error.lineno) and error.lineno >= len(self.code_lines)
+
+    def _parses(self, source):
+        try:
+            ast.parse(source)
+            return True
+        except SyntaxError:
+            return False
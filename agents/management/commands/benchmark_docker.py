@@ -0,0 +1,163 @@
+import io
+import os
+import json
+import time
+import struct
+import tarfile
+import tempfile
+import statistics
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler
+from django.core.management.base import BaseCommand
+from agents.agents.docker_agent import DockerAgent
+from agents.agents.docker_api import DockerAPIClient
+
+
+class FakeEngineHandler(BaseHTTPRequestHandler):
+    """Answers the Engine API calls DockerAgent makes, without a Docker daemon"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path.endswith('/json') and '/exec/' in self.path:
+            return self._send_json({'ExitCode': 0, 'Running': False})
+        if self.path.endswith('/json'):
+            return self._send_json({'State': {'Running': True}})
+        if '/archive' in self.path:
+            buffer = io.BytesIO()
+            with tarfile.open(fileobj=buffer, mode='w') as archive:
+                data = self.server.files.get('last', b'')
+                info = tarfile.TarInfo('output.mp4')
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+            return self._send(200, buffer.getvalue(), 'application/x-tar')
+        if self.path.endswith('/_ping'):
+            return self._send(200, b'OK', 'text/plain')
+        self._send_json({'message': 'not found'}, 404)
+
+    def do_POST(self):
+        self._read_body()
+        if self.path.endswith('/start') and '/exec/' in self.path:
+            # Exec start hijacks the connection and streams until the command exits
+            payload = b'ok\n'
+            frame = struct.pack('>BxxxL', 1, len(payload)) + payload
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/vnd.docker.raw-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.write(frame)
+            self.close_connection = True
+            return
+        if self.path.endswith('/exec'):
+            return self._send_json({'Id': 'bench'}, 201)
+        if self.path.endswith('/start'):
+            return self._send(304, b'', 'text/plain')
+        self._send_json({'message': 'not found'}, 404)
+
+    def do_PUT(self):
+        self.server.files['last'] = self._read_body()
+        self._send(200, b'', 'text/plain')
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send_json(self, data, status=200):
+        self._send(status, json.dumps(data).encode('utf-8'), 'application/json')
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        return 'unix'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeEngineServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded unix socket server standing in for dockerd"""
+    daemon_threads = True
+
+    def __init__(self, socket_path):
+        super().__init__(socket_path, FakeEngineHandler)
+        self.files = {}
+
+
+class Command(BaseCommand):
+    """Compare per-render Docker overhead of the CLI and Engine API transports"""
+    help = "Benchmark the Docker operations of one render attempt for each DockerAgent transport"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--container', default='omega-manim', help="Container to run against")
+        parser.add_argument('--iterations', type=int, default=20, help="Simulated renders per transport")
+        parser.add_argument('--fake', action='store_true',
+                            help="Serve the Engine API from an in-process fake socket (API transport only)")
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        container = options['container']
+
+        server = None
+        transports = ['cli', 'api']
+        socket_path = None
+
+        if options['fake']:
+            socket_path = os.path.join(tempfile.mkdtemp(), 'docker.sock')
+            server = FakeEngineServer(socket_path)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            transports = ['api']
+
+        try:
+            for transport in transports:
+                agent = DockerAgent()
+                agent.transport = transport
+                agent.api = DockerAPIClient(socket_path or agent.socket_path) if transport == 'api' else None
+
+                timings = self._run(agent, container, iterations)
+                self.stdout.write(
+                    f"{transport:>4}: mean {statistics.mean(timings) * 1000:.1f} ms, "
+                    f"p50 {statistics.median(timings) * 1000:.1f} ms, "
+                    f"p95 {self._percentile(timings, 95) * 1000:.1f} ms per render "
+                    f"({iterations} renders)"
+                )
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+
+    def _run(self, agent, container, iterations):
+        """Time the Docker calls one _execute_script attempt makes"""
+        with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as script_file:
+            script_file.write(b"from manim import *\n")
+            script_path = script_file.name
+        output_path = f"{script_path}.out"
+
+        timings = []
+        try:
+            for _ in range(iterations):
+                # Measure the cold status check every real render pays at least once
+                DockerAgent._running_since_check.clear()
+
+                started = time.perf_counter()
+                agent.copy_to_container(container, script_path, '/tmp/omega_bench.py')
+                agent.execute_command(container, "true", working_dir="/tmp")
+                agent.copy_from_container(container, '/tmp/omega_bench.py', output_path)
+                agent.execute_command(container, "rm -f /tmp/omega_bench.py", working_dir="/tmp")
+                timings.append(time.perf_counter() - started)
+        finally:
+            for path in (script_path, output_path):
+                if os.path.exists(path):
+                    os.unlink(path)
+
+        return timings
+
+    @staticmethod
+    def _percentile(values, percent):
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
@@ -0,0 +1,65 @@
+import os
+import subprocess
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from agents.models import DependencyRequest
+
+
+class Command(BaseCommand):
+    """Bake frequently requested packages into the Manim image"""
+    help = "Add packages requested at render time at least --threshold times to requirements-promoted.txt"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold', type=int,
+            default=getattr(settings, 'MANIM_DEPENDENCY_PROMOTE_THRESHOLD', 5),
+            help="Requests after which a package is promoted"
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only list the packages that would be promoted")
+        parser.add_argument('--build', action='store_true', help="Rebuild the Manim image afterwards")
+
+    def handle(self, *args, **options):
+        requirements_path = os.path.join(settings.BASE_DIR, 'requirements-promoted.txt')
+        candidates = list(
+            DependencyRequest.objects.filter(is_promoted=False, request_count__gte=options['threshold'])
+        )
+
+        if not candidates:
+            self.stdout.write("No packages to promote")
+        for request in candidates:
+            self.stdout.write(f"{request.distribution}: {request.request_count} requests")
+
+        if options['dry_run']:
+            return
+
+        if candidates:
+            lines = self._read_requirements(requirements_path)
+            known = {line.lower() for line in lines if not line.startswith('#')}
+            lines += [request.distribution for request in candidates if request.distribution.lower() not in known]
+            with open(requirements_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+
+            DependencyRequest.objects.filter(pk__in=[request.pk for request in candidates]).update(
+                is_promoted=True,
+                promoted_at=timezone.now()
+            )
+            self.stdout.write(self.style.SUCCESS(f"Promoted {len(candidates)} packages into {requirements_path}"))
+
+        if options['build']:
+            image = getattr(settings, 'MANIM_POOL_IMAGE', 'omega-manim')
+            self.stdout.write(f"Building {image}")
+            # Only the promoted-packages layer and the ones after it are rebuilt
+            completed = subprocess.run(['docker', 'build', '-t', image, str(settings.BASE_DIR)])
+            if completed.returncode != 0:
+                raise CommandError(f"docker build failed with exit code {completed.returncode}")
+            self.stdout.write(self.style.SUCCESS(
+                f"Built {image} - new pooled containers use it; recreate omega-manim with docker compose up -d"
+            ))
+
+    def _read_requirements(self, path):
+        """Lines of the promoted requirements file, without blank lines"""
+        if not os.path.exists(path):
+            return ["# Packages promoted from render-time installs by manage.py promote_dependencies"]
+        with open(path, encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from agents.agents.queue_agent import RenderQueueAgent
+
+
+class Command(BaseCommand):
+    """Drain the render queue - run one process per render slot"""
+    help = "Run a render worker that executes queued Manim scripts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+        parser.add_argument('--max-jobs', type=int, default=None, help="Exit after processing this many jobs")
+        parser.add_argument('--worker-id', default=None, help="Identifier recorded on claimed executions")
+        parser.add_argument('--debug', action='store_true', help="Enable agent debug mode")
+
+    def handle(self, *args, **options):
+        queue_agent = RenderQueueAgent(debug=options['debug'], worker_id=options['worker_id'])
+
+        self.stdout.write(f"Render worker {queue_agent.worker_id} waiting for jobs")
+        processed = queue_agent.work(max_jobs=options['max_jobs'], once=options['once'])
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs"))
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+def set_historical_status(apps, schema_editor):
+    """Executions created before the queue existed are all finished or abandoned"""
+    Execution = apps.get_model('agents', 'Execution')
+    Execution.objects.filter(is_successful=True).update(status='completed')
+    Execution.objects.filter(is_successful=False).update(status='failed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='execution',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='priority',
+            field=models.IntegerField(default=10),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='running', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='worker_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='execution',
+            index=models.Index(fields=['status', 'priority', 'queued_at'], name='execution_queue_idx'),
+        ),
+        migrations.RunPython(set_historical_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0002_execution_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('scene_class', models.CharField(max_length=100)),
+                ('quality', models.CharField(max_length=10)),
+                ('image_version', models.CharField(blank=True, max_length=255)),
+                ('output_path', models.CharField(max_length=255)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('hit_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['last_used_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='cache_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='is_cached',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0003_render_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='script',
+            name='prompt_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
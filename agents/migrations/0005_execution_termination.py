@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0004_script_prompt_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='execution',
+            name='debug_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='termination_reason',
+            field=models.CharField(blank=True, choices=[('completed', 'Completed'), ('cached', 'Served from cache'), ('max_attempts', 'Attempt limit reached'), ('wall_clock_budget', 'Time budget exhausted'), ('token_budget', 'Token budget exhausted'), ('no_progress', 'Debugger made no changes'), ('fix_cycle', 'Debugger repeated an earlier fix'), ('error', 'Error')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0005_execution_termination'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='execution',
+            name='scene_outputs',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
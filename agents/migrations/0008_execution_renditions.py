@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0007_execution_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='execution',
+            name='quality',
+            field=models.CharField(choices=[('low', '480p15'), ('medium', '720p30'), ('high', '1080p60'), ('production', '1440p60'), ('fourk', '2160p60')], default='medium', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='source_execution',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rendition_jobs', to='agents.execution'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0008_execution_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='execution',
+            name='render_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='smoke_runs',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='execution',
+            name='smoke_seconds',
+            field=models.FloatField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0009_execution_smoke_renders'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='execution',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('timeout', 'Timed out'), ('oom', 'Out of memory')], default='running', max_length=20),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0010_execution_kill_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DependencyRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distribution', models.CharField(max_length=100, unique=True)),
+                ('import_name', models.CharField(max_length=100)),
+                ('request_count', models.IntegerField(default=0)),
+                ('is_promoted', models.BooleanField(default=False)),
+                ('promoted_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_requested_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-request_count'],
+            },
+        ),
+        migrations.AddField(
+            model_name='container',
+            name='installed_packages',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
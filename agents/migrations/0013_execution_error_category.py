@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0012_execution_batches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='execution',
+            name='error_category',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='execution',
+            name='termination_reason',
+            field=models.CharField(blank=True, choices=[('completed', 'Completed'), ('cached', 'Served from cache'), ('max_attempts', 'Attempt limit reached'), ('wall_clock_budget', 'Time budget exhausted'), ('token_budget', 'Token budget exhausted'), ('no_progress', 'Debugger made no changes'), ('fix_cycle', 'Debugger repeated an earlier fix'), ('infra_error', 'Infrastructure kept failing'), ('error', 'Error')], max_length=20),
+        ),
+    ]
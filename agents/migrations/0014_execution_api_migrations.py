@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0013_execution_error_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='execution',
+            name='api_migrations',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
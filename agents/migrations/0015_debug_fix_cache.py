@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0014_execution_api_migrations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DebugSignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('category', models.CharField(blank=True, max_length=20)),
+                ('exception', models.CharField(blank=True, max_length=100)),
+                ('message', models.TextField(blank=True)),
+                ('source_line', models.TextField(blank=True)),
+                ('lookups', models.IntegerField(default=0)),
+                ('hits', models.IntegerField(default=0)),
+                ('successes', models.IntegerField(default=0)),
+                ('failures', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_seen_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-lookups'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DebugFix',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('diff', models.TextField()),
+                ('diff_hash', models.CharField(max_length=64)),
+                ('applied_count', models.IntegerField(default=0)),
+                ('successes', models.IntegerField(default=0)),
+                ('failures', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('signature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fixes', to='agents.debugsignature')),
+            ],
+            options={
+                'ordering': ['-successes', 'failures'],
+                'constraints': [models.UniqueConstraint(fields=('signature', 'diff_hash'), name='unique_debug_fix')],
+            },
+        ),
+    ]
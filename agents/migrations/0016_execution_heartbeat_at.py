@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0015_debug_fix_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='execution',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0016_execution_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='script',
+            name='model_name',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0017_script_model_name'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='execution',
+            name='termination_reason',
+            field=models.CharField(blank=True, choices=[('completed', 'Completed'), ('cached', 'Served from cache'), ('max_attempts', 'Attempt limit reached'), ('wall_clock_budget', 'Time budget exhausted'), ('token_budget', 'Token budget exhausted'), ('no_progress', 'Debugger made no changes'), ('fix_cycle', 'Debugger repeated an earlier fix'), ('infra_error', 'Infrastructure kept failing'), ('environment_error', 'Render environment is missing a tool'), ('error', 'Error')], max_length=20),
+        ),
+    ]
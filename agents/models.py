@@ -44,6 +44,9 @@ class Container(models.Model):
     is_running = models.BooleanField(default=False)
     last_checked = models.DateTimeField(default=timezone.now)
     
+    # Distributions installed at render time on top of the image
+    installed_packages = models.JSONField(default=list, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -55,6 +58,11 @@ class Script(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     prompt = models.TextField()
     content = models.TextField()
+    
+    # Exact-match key of (normalized prompt, provider, model, temperature) for the prompt cache
+    prompt_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # Model or Azure deployment that generated the script, scopes near-duplicate prompt matches
+    model_name = models.CharField(max_length=100, blank=True)
     scene_class = models.CharField(max_length=100, null=True, blank=True)
     
     # Relationship to the AI provider that generated it
@@ -82,11 +90,74 @@ class Script(models.Model):
     def __str__(self):
         return f"Script {self.id} - {self.scene_class or 'Unknown'}"
 
+class ExecutionBatch(models.Model):
+    """Model for a batch of scripts queued in one call, rendered with bounded concurrency"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    
+    # Most executions of the batch render at once (0 = no limit) - enforced when workers claim jobs
+    max_concurrency = models.IntegerField(default=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Batch {self.id}"
+    
+    def get_progress(self):
+        """
+        Aggregate the states of the batch's executions
+        
+        Returns:
+            dict: total, queued, running, succeeded and failed counts, percent done and finished flag
+        """
+        counts = self.executions.aggregate(
+            total=models.Count('id'),
+            queued=models.Count('id', filter=models.Q(status='queued')),
+            running=models.Count('id', filter=models.Q(status='running')),
+            succeeded=models.Count('id', filter=models.Q(status='completed')),
+            failed=models.Count('id', filter=models.Q(status__in=['failed', 'timeout', 'oom']))
+        )
+        done = counts['succeeded'] + counts['failed']
+        return {
+            **counts,
+            'percent': round(100 * done / counts['total'], 1) if counts['total'] else 100.0,
+            'finished': done == counts['total']
+        }
+
+
 class Execution(models.Model):
     """Model for tracking script execution attempts"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     script = models.ForeignKey(Script, on_delete=models.CASCADE, related_name='executions')
     
+    # Queue status - executions double as render jobs drained by the render worker
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('timeout', 'Timed out'),
+        ('oom', 'Out of memory')
+    ]
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    
+    # Queue ordering (lower is picked first) and worker bookkeeping
+    priority = models.IntegerField(default=10)
+    batch = models.ForeignKey(
+        ExecutionBatch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='executions'
+    )
+    queued_at = models.DateTimeField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    worker_id = models.CharField(max_length=255, blank=True)
+    
+    # Refreshed by the worker's heartbeat thread while the job runs
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    
     # Attempt details
     attempt_number = models.IntegerField(default=1)
     container = models.ForeignKey(Container, on_delete=models.SET_NULL, null=True)
@@ -99,13 +170,190 @@ class Execution(models.Model):
     # Output file path (relative to MEDIA_ROOT)
     output_path = models.CharField(max_length=255, blank=True)
     
+    # Output file path per scene when a multi-scene script is rendered in one batch
+    scene_outputs = models.JSONField(default=dict, blank=True)
+
+    # Quality ladder - a low-quality preview is rendered (and debugged) first, higher
+    # qualities are queued as rendition jobs pointing back at the preview execution
+    QUALITY_CHOICES = [
+        ('low', '480p15'),
+        ('medium', '720p30'),
+        ('high', '1080p60'),
+        ('production', '1440p60'),
+        ('fourk', '2160p60')
+    ]
+    quality = models.CharField(max_length=20, choices=QUALITY_CHOICES, default='medium')
+    source_execution = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='rendition_jobs'
+    )
+
+    # Finished renditions of the preview: quality -> {output_path, scene_outputs}
+    renditions = models.JSONField(default=dict, blank=True)
+
     # Execution timestamps
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
+    # Refreshed on every save
+    updated_at = models.DateTimeField(auto_now=True)
+    
     # Any modifications made by debugging
     original_script = models.TextField(blank=True)
     modified_script = models.TextField(blank=True)
     
+    # Render cache key and whether the output was served from the cache
+    cache_key = models.CharField(max_length=64, blank=True, db_index=True)
+    is_cached = models.BooleanField(default=False)
+    
+    # Why the retry loop stopped and the LLM tokens spent on debugging
+    TERMINATION_CHOICES = [
+        ('completed', 'Completed'),
+        ('cached', 'Served from cache'),
+        ('max_attempts', 'Attempt limit reached'),
+        ('wall_clock_budget', 'Time budget exhausted'),
+        ('token_budget', 'Token budget exhausted'),
+        ('no_progress', 'Debugger made no changes'),
+        ('fix_cycle', 'Debugger repeated an earlier fix'),
+        ('infra_error', 'Infrastructure kept failing'),
+        ('environment_error', 'Render environment is missing a tool'),
+        ('error', 'Error')
+    ]
+    termination_reason = models.CharField(max_length=20, choices=TERMINATION_CHOICES, blank=True)
+    debug_tokens = models.IntegerField(default=0)
+    
+    # Category of the last failure, see agents.agents.error_classifier
+    error_category = models.CharField(max_length=20, blank=True)
+    
+    # API migration rules that rewrote the script: [{rule, phase, attempt, version}]
+    api_migrations = models.JSONField(default=list, blank=True)
+    
+    # Smoke renders (--dry_run / last frame) that validated each attempt before the full
+    # render: [{attempt, mode, success, seconds}], and container seconds spent on each kind
+    smoke_runs = models.JSONField(default=list, blank=True)
+    smoke_seconds = models.FloatField(default=0)
+    render_seconds = models.FloatField(default=0)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'priority', 'queued_at'], name='execution_queue_idx')
+        ]
+    
     def __str__(self):
         return f"Execution {self.id} - Attempt #{self.attempt_number} - {'Success' if self.is_successful else 'Failed'}"
+
+
+class ExecutionEvent(models.Model):
+    """Model for a status, progress or log event of an execution, streamed to clients over SSE"""
+    KIND_CHOICES = [
+        ('status', 'Status'),
+        ('progress', 'Progress'),
+        ('log', 'Log')
+    ]
+    
+    execution = models.ForeignKey(Execution, on_delete=models.CASCADE, related_name='events')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"{self.kind} event {self.id} of execution {self.execution_id}"
+
+
+class DependencyRequest(models.Model):
+    """Model for a package that scripts needed at render time, counted for promotion into the image"""
+    distribution = models.CharField(max_length=100, unique=True)
+    import_name = models.CharField(max_length=100)
+    request_count = models.IntegerField(default=0)
+    
+    # Promoted packages are installed in the Manim image and never installed at render time
+    is_promoted = models.BooleanField(default=False)
+    promoted_at = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_requested_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-request_count']
+    
+    def __str__(self):
+        return f"{self.distribution} ({self.request_count} requests{', promoted' if self.is_promoted else ''})"
+
+
+class RenderCacheEntry(models.Model):
+    """Model for a rendered video stored in the content-addressed render cache"""
+    # sha256 of the normalized script, scene class, quality flag and Manim image version
+    key = models.CharField(max_length=64, unique=True)
+    scene_class = models.CharField(max_length=100)
+    quality = models.CharField(max_length=10)
+    image_version = models.CharField(max_length=255, blank=True)
+    
+    # Cached video (relative to MEDIA_ROOT)
+    output_path = models.CharField(max_length=255)
+    size_bytes = models.BigIntegerField(default=0)
+    
+    # Usage for LRU eviction and reporting
+    hit_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        ordering = ['last_used_at']
+    
+    def __str__(self):
+        return f"Render cache {self.key[:12]} - {self.scene_class} ({self.hit_count} hits)"
+
+
+class DebugSignature(models.Model):
+    """Model for a normalized debugging error, with hit and success counters of its cached fixes"""
+    # sha256 of the category, exception, masked message and failing source line
+    key = models.CharField(max_length=64, unique=True)
+    category = models.CharField(max_length=20, blank=True)
+    exception = models.CharField(max_length=100, blank=True)
+    message = models.TextField(blank=True)
+    source_line = models.TextField(blank=True)
+    
+    # Lookups before an LLM call, lookups a cached fix applied to, and how the applied fixes rendered
+    lookups = models.IntegerField(default=0)
+    hits = models.IntegerField(default=0)
+    successes = models.IntegerField(default=0)
+    failures = models.IntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-lookups']
+    
+    def __str__(self):
+        return f"{self.exception or self.category}: {self.message[:60]} ({self.hits}/{self.lookups} hits)"
+
+
+class DebugFix(models.Model):
+    """Model for an LLM fix that resolved a debug signature, stored as a unified diff"""
+    signature = models.ForeignKey(DebugSignature, on_delete=models.CASCADE, related_name='fixes')
+    diff = models.TextField()
+    diff_hash = models.CharField(max_length=64)
+    
+    # Times the fix was applied from the cache and how those renders went
+    applied_count = models.IntegerField(default=0)
+    successes = models.IntegerField(default=0)
+    failures = models.IntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-successes', 'failures']
+        constraints = [
+            models.UniqueConstraint(fields=['signature', 'diff_hash'], name='unique_debug_fix')
+        ]
+    
+    def __str__(self):
+        return f"Fix {self.diff_hash[:12]} for {self.signature.key[:12]} ({self.successes} successes)"
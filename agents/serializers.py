@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Script, Execution, AIProvider, Container
+from django.conf import settings
+from .models import Script, Execution, ExecutionBatch, AIProvider, Container
 
 class AIProviderSerializer(serializers.ModelSerializer):
     """Serializer for AIProvider model"""
@@ -19,8 +20,8 @@ class ContainerSerializer(serializers.ModelSerializer):
     """Serializer for Container model"""
     class Meta:
         model = Container
-        fields = ['id', 'name', 'image', 'is_active', 'working_dir', 'python_path', 'is_running', 'last_checked', 'created_at', 'updated_at']
-        read_only_fields = ['is_running', 'last_checked', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'image', 'is_active', 'working_dir', 'python_path', 'is_running', 'installed_packages', 'last_checked', 'created_at', 'updated_at']
+        read_only_fields = ['is_running', 'installed_packages', 'last_checked', 'created_at', 'updated_at']
 
 class ScriptSerializer(serializers.ModelSerializer):
     """Serializer for Script model"""
@@ -44,8 +45,8 @@ class ExecutionSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Execution
-        fields = ['id', 'script', 'script_id', 'attempt_number', 'container', 'container_name', 'is_successful', 'output', 'error', 'output_path', 'started_at', 'completed_at']
-        read_only_fields = ['id', 'script', 'script_id', 'container_name', 'started_at', 'completed_at']
+        fields = ['id', 'script', 'script_id', 'status', 'priority', 'batch', 'attempt_number', 'container', 'container_name', 'is_successful', 'output', 'error', 'output_path', 'scene_outputs', 'quality', 'source_execution', 'renditions', 'is_cached', 'termination_reason', 'error_category', 'api_migrations', 'debug_tokens', 'smoke_runs', 'smoke_seconds', 'render_seconds', 'queued_at', 'started_at', 'completed_at']
+        read_only_fields = ['id', 'script', 'script_id', 'status', 'batch', 'container_name', 'scene_outputs', 'quality', 'source_execution', 'renditions', 'is_cached', 'termination_reason', 'error_category', 'api_migrations', 'debug_tokens', 'smoke_runs', 'smoke_seconds', 'render_seconds', 'queued_at', 'started_at', 'completed_at']
     
     def get_container_name(self, obj):
         """Get container name if container exists"""
@@ -63,4 +64,32 @@ class ScriptGenerationSerializer(serializers.Serializer):
     """Serializer for script generation request"""
     prompt = serializers.CharField(required=True)
     provider = serializers.CharField(required=False, allow_null=True)
-    auto_execute = serializers.BooleanField(required=False, default=False) 
\ No newline at end of file
+    auto_execute = serializers.BooleanField(required=False, default=False)
+    hedged = serializers.BooleanField(required=False, allow_null=True, default=None)
+    premium = serializers.BooleanField(required=False, default=False) 
+
+class BatchExecuteSerializer(serializers.Serializer):
+    """Serializer for a batch execution request"""
+    script_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=getattr(settings, 'RENDER_BATCH_MAX_SIZE', 500)
+    )
+    max_concurrency = serializers.IntegerField(required=False, min_value=0)
+    
+    def validate_script_ids(self, value):
+        """Drop duplicate ids, keeping the requested order"""
+        return list(dict.fromkeys(value))
+
+class ExecutionBatchSerializer(serializers.ModelSerializer):
+    """Serializer for ExecutionBatch model with aggregate progress"""
+    progress = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ExecutionBatch
+        fields = ['id', 'max_concurrency', 'progress', 'created_at']
+        read_only_fields = fields
+    
+    def get_progress(self, obj):
+        """Counts of queued, running, succeeded and failed executions"""
+        return obj.get_progress()
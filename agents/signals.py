@@ -1,7 +1,17 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Script, Execution
-from .agents.execution_agent import ManimExecutionAgent
+from django.utils import timezone
+from .models import Script, Execution, AIProvider
+from .agents.queue_agent import RenderQueueAgent
+from .agents.provider_clients import provider_clients
+
+@receiver([post_save, post_delete], sender=AIProvider)
+def invalidate_provider_clients(sender, instance, **kwargs):
+    """
+    Drop cached clients of a provider whose credentials or endpoint may have changed
+    """
+    provider_clients.invalidate(instance.pk)
 
 @receiver(post_save, sender=Script)
 def execute_new_script(sender, instance, created, **kwargs):
@@ -10,19 +20,8 @@ def execute_new_script(sender, instance, created, **kwargs):
     """
     # Check if this is a new script with auto_execute flag
     if created and getattr(instance, 'auto_execute', False):
-        # Create execution agent
-        execution_agent = ManimExecutionAgent()
-        
-        # Execute script asynchronously (in a separate thread)
-        # In a real production environment, this should use a task queue like Celery
-        import threading
-        execution_thread = threading.Thread(
-            target=execution_agent.execute,
-            args=(instance,),
-            kwargs={'max_attempts': 100}
-        )
-        execution_thread.daemon = True
-        execution_thread.start()
+        # Queue the script - the render worker picks it up
+        RenderQueueAgent().enqueue(instance)
 
 @receiver(post_save, sender=Execution)
 def notify_execution_complete(sender, instance, created, **kwargs):
@@ -35,10 +34,18 @@ def notify_execution_complete(sender, instance, created, **kwargs):
         
     # Check if this is a completed execution (has completed_at set)
     if instance.completed_at and instance.script:
-        pass
-        # Here you could add code to:
-        # 1. Send notifications (email, websocket, etc.)
-        # 2. Update related models
-        # 3. Trigger other workflows
-        
-        # Example: Update script.latest_execution reference if you add that field 
\ No newline at end of file
+        # Propagate the result to any ManimScript waiting on this execution
+        if instance.is_successful:
+            instance.manim_scripts.update(
+                status='completed',
+                output_path=instance.output_path,
+                output_url=f"{settings.BASE_URL}/media/{instance.output_path}",
+                error_message=None,
+                updated_at=timezone.now()
+            )
+        else:
+            instance.manim_scripts.update(
+                status='failed',
+                error_message=instance.error or 'Unknown error during execution',
+                updated_at=timezone.now()
+            ) 
\ No newline at end of file
@@ -0,0 +1,115 @@
+from django.test import SimpleTestCase, TestCase
+from agents.agents.api_migrations import MIGRATIONS_VERSION, migrate_script, migration_rules, migration_stats
+from agents.models import Execution, Script
+
+OLD_SCRIPT = """from manim import *
+
+class Demo(Scene):
+    def construct(self):
+        text = TextMobject("Hi")  # greeting
+        self.play(ShowCreation(text))
+        self.play(FadeInFrom(text, LEFT))
+        self.play(FadeOutAndShift(text, direction=UP))
+        self.play(FadeInFromDown(text))
+        graph = axes.get_graph(lambda x: x)
+"""
+
+GRAPH_SCENE = """from manim import *
+
+class Plot(GraphScene):
+    CONFIG = {"x_min": 0, "x_max": 5, "y_axis_height": 4}
+    def construct(self):
+        self.setup_axes()
+        graph = self.get_graph(lambda x: x ** 2)
+        self.play(Create(graph))
+"""
+
+
+class MigrateScriptTests(SimpleTestCase):
+    """Rewrites of renamed Manim APIs"""
+
+    def test_renames_keep_formatting_and_comments(self):
+        result = migrate_script(OLD_SCRIPT)
+
+        self.assertEqual(result["version"], MIGRATIONS_VERSION)
+        self.assertEqual(result["fired"], [
+            'show-creation', 'text-mobject', 'fade-in-from', 'fade-in-from-down', 'fade-out-and-shift', 'get-graph'
+        ])
+        self.assertIn('text = Tex("Hi")  # greeting', result["script"])
+        self.assertIn("self.play(Create(text))", result["script"])
+        self.assertIn("graph = axes.plot(lambda x: x)", result["script"])
+
+    def test_direction_arguments_become_keywords(self):
+        script = migrate_script(OLD_SCRIPT)["script"]
+
+        # FadeInFrom took the direction the mobject comes from, FadeIn takes the shift
+        self.assertIn("FadeIn(text, shift=-LEFT)", script)
+        self.assertIn("FadeOut(text, shift=UP)", script)
+        self.assertIn("FadeIn(text, shift=UP)", script)
+
+    def test_manimlib_imports(self):
+        result = migrate_script("from manimlib.imports import *\n\nclass A(Scene):\n    pass\n")
+
+        self.assertEqual(result["fired"], ['manimlib'])
+        self.assertTrue(result["script"].startswith("from manim import *\n"))
+
+    def test_graph_scene_draws_on_axes(self):
+        result = migrate_script(GRAPH_SCENE)
+
+        self.assertEqual(result["fired"], ['graph-scene'])
+        self.assertIn("class Plot(Scene):", result["script"])
+        self.assertIn("self.axes = Axes(x_range=[0, 5, 1], y_range=[-1, 10, 1], y_length=4)", result["script"])
+        self.assertIn("graph = self.axes.plot(lambda x: x ** 2)", result["script"])
+
+    def test_only_rules_for_the_failing_names(self):
+        result = migrate_script(OLD_SCRIPT, symbols=['TextMobject'])
+
+        self.assertEqual(result["fired"], ['text-mobject'])
+        self.assertIn("ShowCreation(text)", result["script"])
+
+    def test_names_the_installed_manim_still_has_are_kept(self):
+        result = migrate_script(OLD_SCRIPT, api_names={'ShowCreation', 'Create', 'Tex'})
+
+        self.assertNotIn('show-creation', result["fired"])
+        self.assertIn('text-mobject', result["fired"])
+        self.assertIn("ShowCreation(text)", result["script"])
+
+    def test_names_defined_by_the_script_are_kept(self):
+        script = "from manim import *\n\ndef ShowCreation(m):\n    return Create(m)\n\nx = ShowCreation(Circle())\n"
+
+        self.assertEqual(migrate_script(script), {"script": script, "fired": [], "version": MIGRATIONS_VERSION})
+
+    def test_unparsable_script_is_unchanged(self):
+        script = "class Demo(Scene:\n    ShowCreation(x)\n"
+
+        self.assertEqual(migrate_script(script)["script"], script)
+
+    def test_rules_for_symbols(self):
+        self.assertEqual([rule["id"] for rule in migration_rules(['ShowCreation'])], ['show-creation'])
+        self.assertEqual([rule["id"] for rule in migration_rules(['get_graph'])], ['get-graph', 'graph-scene'])
+        self.assertEqual(migration_rules(['Circle']), [])
+
+
+class MigrationStatsTests(TestCase):
+    """Counts of the rewrites recorded on executions"""
+
+    def test_counts_rules_and_saved_calls(self):
+        script = Script.objects.create(prompt='p', content=OLD_SCRIPT)
+        Execution.objects.create(script=script, is_successful=True, debug_tokens=0, api_migrations=[
+            {"rule": "show-creation", "phase": "preflight", "attempt": 1, "version": 1},
+            {"rule": "text-mobject", "phase": "preflight", "attempt": 1, "version": 1},
+        ])
+        Execution.objects.create(script=script, is_successful=False, debug_tokens=500, api_migrations=[
+            {"rule": "show-creation", "phase": "error", "attempt": 2, "version": 1},
+        ])
+        Execution.objects.create(script=script)
+
+        stats = migration_stats()
+
+        self.assertEqual(stats["executions"], 2)
+        self.assertEqual(stats["llm_calls_saved"], 2)
+        self.assertEqual(stats["rules"]["show-creation"], {
+            "fired": 2, "preflight": 1, "after_error": 1, "executions": 2, "succeeded": 1,
+            "succeeded_without_debugging": 1
+        })
+        self.assertEqual(set(stats["rules"]), {"show-creation", "text-mobject"})
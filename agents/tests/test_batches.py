@@ -0,0 +1,83 @@
+import uuid
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from agents.models import Execution, ExecutionBatch, Script
+from agents.agents.queue_agent import RenderQueueAgent
+
+
+@override_settings(MANIM_RENDITION_QUALITIES=[], RENDER_BATCH_PRIORITY=20, RENDER_BATCH_CONCURRENCY=2)
+class ExecutionBatchTests(TestCase):
+    """Batch execution requests, their queueing and progress"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('batch@example.com'))
+        self.scripts = [Script.objects.create(prompt=f'p{i}', content='from manim import *') for i in range(3)]
+        self.queue = RenderQueueAgent(worker_id='worker-a')
+
+    def test_batch_execute_queues_every_script(self):
+        ids = [str(script.id) for script in self.scripts]
+
+        response = self.client.post('/api/agents/scripts/batch_execute/', {'script_ids': ids + ids[:1]}, format='json')
+
+        self.assertEqual(response.status_code, 202)
+        batch = ExecutionBatch.objects.get(pk=response.data['batch_id'])
+        self.assertEqual(response.data['max_concurrency'], 2)
+        self.assertEqual(response.data['progress']['total'], 3)
+        self.assertEqual(response.data['progress']['queued'], 3)
+        executions = batch.executions.all()
+        self.assertEqual({str(execution.script_id) for execution in executions}, set(ids))
+        self.assertEqual({execution.priority for execution in executions}, {20})
+
+    def test_unknown_script_ids_are_rejected(self):
+        unknown = str(uuid.uuid4())
+
+        response = self.client.post('/api/agents/scripts/batch_execute/',
+                                    {'script_ids': [str(self.scripts[0].id), unknown]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['missing'], [unknown])
+        self.assertFalse(ExecutionBatch.objects.exists())
+
+    def test_empty_batch_is_rejected(self):
+        response = self.client.post('/api/agents/scripts/batch_execute/', {'script_ids': []}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_interactive_renders_go_first(self):
+        self.queue.enqueue_batch(self.scripts[:2], max_concurrency=0)
+        interactive = self.queue.enqueue(self.scripts[2])
+
+        self.assertEqual(self.queue.claim_next().pk, interactive.pk)
+
+    def test_batch_without_limit_runs_everything(self):
+        self.queue.enqueue_batch(self.scripts, max_concurrency=0)
+
+        claimed = [self.queue.claim_next() for _ in range(3)]
+
+        self.assertTrue(all(claimed))
+        self.assertIsNone(self.queue.claim_next())
+
+    def test_full_batch_does_not_block_other_jobs(self):
+        self.queue.enqueue_batch(self.scripts[:2], max_concurrency=1)
+        other = self.queue.enqueue(self.scripts[2], priority=30)
+
+        self.queue.claim_next()
+
+        self.assertEqual(self.queue.claim_next().pk, other.pk)
+
+    def test_progress_and_executions(self):
+        batch = self.queue.enqueue_batch(self.scripts, max_concurrency=0)
+        executions = list(batch.executions.order_by('queued_at'))
+        Execution.objects.filter(pk=executions[0].pk).update(status='completed')
+        Execution.objects.filter(pk=executions[1].pk).update(status='oom')
+
+        response = self.client.get(f'/api/agents/batches/{batch.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['progress'], {
+            'total': 3, 'queued': 1, 'running': 0, 'succeeded': 1, 'failed': 1, 'percent': 66.7, 'finished': False
+        })
+        listed = self.client.get(f'/api/agents/batches/{batch.id}/executions/')
+        self.assertEqual([item['id'] for item in listed.data], [str(execution.id) for execution in executions])
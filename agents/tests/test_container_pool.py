@@ -0,0 +1,88 @@
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from agents.models import Script, Execution, Container
+from agents.agents.container_pool import ContainerPoolAgent
+
+
+@override_settings(MANIM_CONTAINER_NAME='omega-manim', MANIM_POOL_MIN_SIZE=1, MANIM_POOL_MAX_SIZE=3,
+                   MANIM_POOL_JOBS_PER_CONTAINER=1, MANIM_POOL_HEALTH_TTL=3600)
+class ContainerPoolAgentTests(TestCase):
+    """Least-loaded scheduling and scaling of the container pool"""
+
+    def setUp(self):
+        self.pool = ContainerPoolAgent()
+        self.pool.docker_agent = mock.Mock()
+        self.pool.docker_agent.create_container.side_effect = self._start
+        self.pool.docker_agent.remove_container.return_value = True
+        # A data migration registers the compose-managed container
+        self.base, _ = Container.objects.update_or_create(
+            name='omega-manim',
+            defaults={'image': 'omega-manim', 'is_active': True, 'is_running': True, 'last_checked': timezone.now()}
+        )
+        self.script = Script.objects.create(prompt='p', content='from manim import *')
+
+    def _start(self, name, *args):
+        Container.objects.filter(name=name).update(is_running=True, last_checked=timezone.now())
+        return True
+
+    def _run_on(self, container):
+        return Execution.objects.create(script=self.script, status='running', container=container)
+
+    def test_acquire_uses_idle_container(self):
+        execution = Execution.objects.create(script=self.script, status='running')
+
+        container = self.pool.acquire(execution)
+
+        self.assertEqual(container, self.base)
+        execution.refresh_from_db()
+        self.assertEqual(execution.container, self.base)
+        self.pool.docker_agent.create_container.assert_not_called()
+
+    def test_acquire_scales_up_when_saturated(self):
+        self._run_on(self.base)
+
+        container = self.pool.acquire()
+
+        self.assertEqual(container.name, 'omega-manim-pool-1')
+        self.assertTrue(container.is_running)
+        self.assertEqual(self.pool.pool_size(), 2)
+
+    def test_acquire_picks_least_loaded_at_max_size(self):
+        first = self.pool.scale_up()
+        second = self.pool.scale_up()
+        self._run_on(self.base)
+        self._run_on(self.base)
+        self._run_on(first)
+
+        self.assertEqual(self.pool.acquire(), second)
+
+    def test_failed_scale_up_deactivates_record(self):
+        self.pool.docker_agent.create_container.side_effect = None
+        self.pool.docker_agent.create_container.return_value = False
+
+        self.assertIsNone(self.pool.scale_up())
+        self.assertFalse(Container.objects.get(name='omega-manim-pool-1').is_active)
+
+    def test_scale_down_keeps_busy_and_minimum(self):
+        idle = self.pool.scale_up()
+        busy = self.pool.scale_up()
+        self._run_on(busy)
+
+        self.assertEqual(self.pool.scale_down(), 1)
+
+        self.assertFalse(Container.objects.get(pk=idle.pk).is_active)
+        self.assertTrue(Container.objects.get(pk=busy.pk).is_active)
+        self.assertTrue(Container.objects.get(pk=self.base.pk).is_active)
+
+    def test_ensure_min_size_registers_base_container(self):
+        Container.objects.all().delete()
+
+        with override_settings(MANIM_POOL_MIN_SIZE=2):
+            pool = ContainerPoolAgent()
+            pool.docker_agent = self.pool.docker_agent
+            started = pool.ensure_min_size()
+
+        self.assertEqual(started, 1)
+        self.assertTrue(Container.objects.filter(name='omega-manim').exists())
+        self.assertEqual(pool.pool_size(), 2)
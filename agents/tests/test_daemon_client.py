@@ -0,0 +1,136 @@
+import os
+import json
+import shutil
+import socket
+import tempfile
+import threading
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from agents.agents.daemon_client import RenderDaemonClient
+from agents.agents.execution_agent import ManimExecutionAgent
+
+
+class FakeDaemon:
+    """Unix socket server that records one request and answers with the given messages"""
+
+    def __init__(self, path, replies):
+        self.requests = []
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(1)
+        self.thread = threading.Thread(target=self._serve, args=(replies,), daemon=True)
+        self.thread.start()
+
+    def _serve(self, replies):
+        conn, _ = self.server.accept()
+        with conn:
+            self.requests.append(json.loads(conn.makefile("rb").readline()))
+            for reply in replies:
+                conn.sendall((json.dumps(reply) + "\n").encode("utf-8"))
+
+    def close(self):
+        self.thread.join(timeout=5)
+        self.server.close()
+
+
+class RenderDaemonClientTests(SimpleTestCase):
+    """Jobs sent to the render daemon with the limits of the caller"""
+
+    def setUp(self):
+        self.socket_dir = tempfile.mkdtemp()
+        overrides = override_settings(MANIM_DAEMON_SOCKET_DIR=self.socket_dir, MANIM_DAEMON_RETRY_AFTER=30)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(shutil.rmtree, self.socket_dir, ignore_errors=True)
+        self.addCleanup(RenderDaemonClient._unavailable_since.clear)
+        self.client = RenderDaemonClient()
+
+    def _daemon(self, replies):
+        daemon = FakeDaemon(self.client.socket_path('omega-manim'), replies)
+        self.addCleanup(daemon.close)
+        return daemon
+
+    def test_sends_the_limits_of_the_call(self):
+        daemon = self._daemon([
+            {"type": "output", "stream": "stdout", "data": "rendered\n"},
+            {"type": "result", "returncode": 0, "timed_out": False, "oom": False, "seconds": 1.5},
+        ])
+
+        result = self.client.run('omega-manim', ['script.py', 'A'], working_dir='/manim',
+                                 timeout=120, memory_limit_mb=1024, cpu_seconds=60)
+        daemon.close()
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['stdout'], "rendered\n")
+        self.assertEqual(result['seconds'], 1.5)
+        self.assertEqual(daemon.requests, [{
+            "args": ['script.py', 'A'], "cwd": '/manim', "timeout": 120, "memory_mb": 1024, "cpu_seconds": 60
+        }])
+
+    def test_kill_messages_name_the_limits_of_the_call(self):
+        self._daemon([{"type": "result", "returncode": -9, "timed_out": True, "oom": False}])
+
+        result = self.client.run('omega-manim', ['script.py'], timeout=45)
+
+        self.assertFalse(result['success'])
+        self.assertTrue(result['timed_out'])
+        self.assertIn("(45 seconds)", result['stderr'])
+
+    def test_unavailable_daemon_falls_back(self):
+        self.assertIsNone(self.client.run('omega-manim', ['script.py']))
+
+    def test_closed_connection_is_a_failure(self):
+        self._daemon([{"type": "output", "stream": "stderr", "data": "partial"}])
+
+        result = self.client.run('omega-manim', ['script.py'], timeout=10)
+
+        self.assertFalse(result['success'])
+        self.assertIn("Render daemon closed the connection", result['stderr'])
+        self.assertTrue(result['stderr'].startswith("partial"))
+
+
+class RenderTransportTests(SimpleTestCase):
+    """Both render paths of the execution agent share one default and one set of limits"""
+
+    def _agent(self, **overrides):
+        with override_settings(MANIM_RENDER_TIMEOUT=300, MANIM_RENDER_MEMORY_LIMIT_MB=1536,
+                               MANIM_RENDER_CPU_SECONDS=200, **overrides):
+            agent = ManimExecutionAgent()
+        agent.docker_agent = mock.Mock()
+        agent.daemon_client = mock.Mock()
+        return agent
+
+    def test_agent_default_matches_the_settings_default(self):
+        from core import settings as project_settings
+
+        with override_settings():
+            from django.conf import settings
+            del settings.MANIM_TRANSPORT
+            agent = ManimExecutionAgent()
+
+        self.assertEqual(agent.transport, project_settings.MANIM_TRANSPORT)
+
+    def test_daemon_gets_the_render_limits(self):
+        agent = self._agent(MANIM_TRANSPORT='daemon')
+        agent.daemon_client.run.return_value = {"success": True}
+
+        agent._run_manim(['script.py', 'A'])
+
+        agent.daemon_client.run.assert_called_once_with(
+            agent.container_name, ['script.py', 'A'], working_dir=agent.working_dir,
+            on_output=agent.events.on_output, timeout=300, memory_limit_mb=1536, cpu_seconds=200
+        )
+        agent.docker_agent.execute_command.assert_not_called()
+
+    def test_fallback_gets_the_same_limits(self):
+        agent = self._agent(MANIM_TRANSPORT='daemon')
+        agent.daemon_client.run.return_value = None
+
+        agent._run_manim(['script.py', 'A'])
+
+        daemon_limits = {key: agent.daemon_client.run.call_args.kwargs[key]
+                         for key in ('timeout', 'memory_limit_mb', 'cpu_seconds')}
+        exec_limits = {key: agent.docker_agent.execute_command.call_args.kwargs[key]
+                       for key in ('timeout', 'memory_limit_mb', 'cpu_seconds')}
+        self.assertEqual(daemon_limits, exec_limits)
+        self.assertEqual(exec_limits, agent._render_limits())
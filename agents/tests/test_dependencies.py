@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from agents.agents.dependency_agent import DependencyAgent
+from agents.agents.package_index import resolve_distribution
+from agents.models import Container, DependencyRequest
+
+
+class ResolveDistributionTests(SimpleTestCase):
+    """Import names mapped to the distributions that provide them"""
+
+    def test_renamed_distributions(self):
+        self.assertEqual(resolve_distribution('cv2'), 'opencv-python-headless')
+        self.assertEqual(resolve_distribution('PIL.Image'), 'Pillow')
+        self.assertEqual(resolve_distribution('google.protobuf'), 'protobuf')
+
+    def test_other_names_are_their_own_distribution(self):
+        self.assertEqual(resolve_distribution('requests'), 'requests')
+
+    def test_standard_library_and_blocked_names(self):
+        self.assertIsNone(resolve_distribution('json'))
+        self.assertIsNone(resolve_distribution('subprocess'))
+        self.assertIsNone(resolve_distribution(''))
+
+    @override_settings(MANIM_PACKAGE_INDEX={'cv2': 'opencv-contrib-python-headless', 'foo': 'foo-bar'})
+    def test_settings_extend_the_index(self):
+        self.assertEqual(resolve_distribution('cv2'), 'opencv-contrib-python-headless')
+        self.assertEqual(resolve_distribution('foo'), 'foo-bar')
+
+
+@override_settings(MANIM_WHEELHOUSE_DIR='/manim/wheelhouse', DOCKER_TRANSPORT='cli',
+                   DOCKER_SOCKET='/nonexistent/docker.sock')
+class WheelhouseInstallTests(TestCase):
+    """Render-time installs from the wheelhouse on the shared volume"""
+
+    def _agent(self, results, download=True):
+        with override_settings(MANIM_WHEELHOUSE_DOWNLOAD=download):
+            agent = DependencyAgent()
+        agent.docker_agent = mock.Mock()
+        agent.docker_agent.execute_command.side_effect = [
+            {"success": success, "stdout": "", "stderr": "" if success else "no wheel"} for success in results
+        ]
+        return agent
+
+    def _commands(self, agent):
+        return [call.args[1] for call in agent.docker_agent.execute_command.call_args_list]
+
+    def test_installs_from_the_wheelhouse_only(self):
+        agent = self._agent([True])
+
+        result = agent.install_dependency('cv2', 'omega-manim')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['distribution'], 'opencv-python-headless')
+        self.assertEqual(self._commands(agent), [
+            "pip install --quiet --no-index --find-links /manim/wheelhouse opencv-python-headless"
+        ])
+
+    def test_missing_wheel_is_downloaded_once(self):
+        agent = self._agent([False, True, True])
+
+        self.assertTrue(agent.install_dependency('yaml', 'omega-manim')['success'])
+
+        commands = self._commands(agent)
+        self.assertEqual(commands[1], "pip download --quiet --dest /manim/wheelhouse PyYAML")
+        self.assertEqual(commands[0], commands[2])
+
+    def test_no_download_when_disabled(self):
+        agent = self._agent([False], download=False)
+
+        result = agent.install_dependency('yaml', 'omega-manim')
+
+        self.assertFalse(result['success'])
+        self.assertEqual(len(self._commands(agent)), 1)
+
+    def test_standard_library_is_never_installed(self):
+        agent = self._agent([])
+
+        self.assertFalse(agent.install_dependency('json', 'omega-manim')['success'])
+        agent.docker_agent.execute_command.assert_not_called()
+
+    def test_requests_and_installs_are_recorded(self):
+        Container.objects.update_or_create(name='omega-manim', defaults={'installed_packages': []})
+        agent = self._agent([True, True])
+        error = "ModuleNotFoundError: No module named 'cv2'"
+
+        agent.detect_and_install_missing_dependencies(error, 'omega-manim')
+        agent.detect_and_install_missing_dependencies(error, 'omega-manim')
+
+        request = DependencyRequest.objects.get(distribution='opencv-python-headless')
+        self.assertEqual(request.import_name, 'cv2')
+        self.assertEqual(request.request_count, 2)
+        self.assertEqual(Container.objects.get(name='omega-manim').installed_packages, ['opencv-python-headless'])
+
+
+class PromoteDependenciesTests(TestCase):
+    """manage.py promote_dependencies"""
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir, ignore_errors=True)
+        self.requirements = os.path.join(self.base_dir, 'requirements-promoted.txt')
+        DependencyRequest.objects.create(distribution='PyYAML', import_name='yaml', request_count=6)
+        DependencyRequest.objects.create(distribution='requests', import_name='requests', request_count=2)
+
+    def _promote(self, *args):
+        out = StringIO()
+        with override_settings(BASE_DIR=self.base_dir):
+            call_command('promote_dependencies', '--threshold', '5', *args, stdout=out)
+        return out.getvalue()
+
+    def test_frequent_packages_are_promoted(self):
+        with open(self.requirements, 'w') as f:
+            f.write("# promoted\nscipy\n")
+
+        self._promote()
+
+        with open(self.requirements) as f:
+            self.assertEqual(f.read(), "# promoted\nscipy\nPyYAML\n")
+        self.assertTrue(DependencyRequest.objects.get(distribution='PyYAML').is_promoted)
+        self.assertFalse(DependencyRequest.objects.get(distribution='requests').is_promoted)
+
+    def test_dry_run_changes_nothing(self):
+        output = self._promote('--dry-run')
+
+        self.assertIn("PyYAML: 6 requests", output)
+        self.assertFalse(os.path.exists(self.requirements))
+        self.assertFalse(DependencyRequest.objects.get(distribution='PyYAML').is_promoted)
+
+    def test_promoted_packages_are_not_promoted_again(self):
+        self._promote()
+
+        self.assertIn("No packages to promote", self._promote())
+        with open(self.requirements) as f:
+            self.assertEqual(f.read().count("PyYAML"), 1)
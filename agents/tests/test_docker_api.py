@@ -0,0 +1,257 @@
+import io
+import os
+import json
+import shutil
+import struct
+import tarfile
+import tempfile
+import threading
+import socketserver
+import subprocess
+from http.server import BaseHTTPRequestHandler
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, override_settings
+from agents.agents.docker_api import DockerAPIClient, DockerAPIError
+from agents.agents.docker_agent import DockerAgent
+
+
+def frame(stream_type, payload):
+    """One frame of Docker's multiplexed exec output"""
+    return struct.pack('>BxxxL', stream_type, len(payload)) + payload
+
+
+class FakeEngineHandler(BaseHTTPRequestHandler):
+    """Answers the Engine API calls DockerAPIClient makes"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_POST(self):
+        self._route('POST')
+
+    def do_PUT(self):
+        self._route('PUT')
+
+    def _route(self, method):
+        engine = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        engine.requests.append((method, self.path, body))
+
+        path, _, query = self.path.partition('?')
+        if method == 'GET' and path == '/v1.41/containers/web/json':
+            self._send(200, json.dumps({'State': {'Running': engine.running}, 'Image': 'sha256:abc'}).encode())
+        elif method == 'GET' and path.startswith('/v1.41/containers/') and path.endswith('/json'):
+            self._send(404, b'{"message": "No such container"}')
+        elif method == 'POST' and path == '/v1.41/containers/web/start':
+            engine.running = True
+            self._send(204, b'')
+        elif method == 'POST' and path == '/v1.41/containers/web/exec':
+            engine.exec_config = json.loads(body)
+            self._send(201, b'{"Id": "e1"}')
+        elif method == 'POST' and path == '/v1.41/exec/e1/start':
+            self._send(200, engine.exec_output, 'application/vnd.docker.raw-stream')
+        elif method == 'GET' and path == '/v1.41/exec/e1/json':
+            self._send(200, json.dumps({'ExitCode': engine.exit_code, 'Running': False}).encode())
+        elif method == 'PUT' and path == '/v1.41/containers/web/archive':
+            engine.archives[query] = body
+            self._send(200, b'')
+        elif method == 'GET' and path == '/v1.41/containers/web/archive':
+            self._send(200, engine.download)
+        else:
+            self._send(404, b'{"message": "page not found"}')
+
+    def _send(self, status, body, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        # Drop the keep-alive connection without announcing it, like an idle timeout in the daemon
+        if self.server.drop_next:
+            self.server.drop_next = False
+            self.close_connection = True
+
+
+class FakeEngine(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        super().__init__(path, FakeEngineHandler)
+        self.connections = 0
+        self.requests = []
+        self.running = True
+        self.exec_config = None
+        self.exec_output = b''
+        self.exit_code = 0
+        self.archives = {}
+        self.download = b''
+        self.drop_next = False
+
+
+class EngineTestMixin:
+    """Runs a fake Docker Engine on a unix socket for each test"""
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmp, 'docker.sock')
+        self.engine = FakeEngine(self.socket_path)
+        threading.Thread(target=self.engine.serve_forever, args=(0.05,), daemon=True).start()
+        self.client = DockerAPIClient(self.socket_path, timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.engine.shutdown()
+        self.engine.server_close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        super().tearDown()
+
+
+class DockerAPIClientTests(EngineTestMixin, SimpleTestCase):
+    """DockerAPIClient against a fake Engine API socket"""
+
+    def test_inspect_container(self):
+        self.assertTrue(self.client.inspect_container('web')['State']['Running'])
+        self.assertIsNone(self.client.inspect_container('missing'))
+
+    def test_error_response_raises(self):
+        with self.assertRaises(DockerAPIError) as raised:
+            self.client.exec_create('missing', ['true'])
+        self.assertEqual(raised.exception.status, 404)
+        self.assertEqual(raised.exception.message, 'page not found')
+
+    def test_exec_run_demultiplexes_streams(self):
+        self.engine.exec_output = frame(1, b'out 1\n') + frame(2, b'err\n') + frame(1, b'out 2\n')
+        self.engine.exit_code = 3
+
+        result = self.client.exec_run('web', ['bash', '-c', 'echo'], working_dir='/manim')
+
+        self.assertEqual(result, {'returncode': 3, 'stdout': 'out 1\nout 2\n', 'stderr': 'err\n'})
+        self.assertEqual(self.engine.exec_config['Cmd'], ['bash', '-c', 'echo'])
+        self.assertEqual(self.engine.exec_config['WorkingDir'], '/manim')
+
+    def test_exec_run_stream_passes_chunks_in_order(self):
+        # A multi-byte character split across two frames
+        snowman = '☃'.encode('utf-8')
+        self.engine.exec_output = frame(1, b'a' + snowman[:1]) + frame(2, b'warn') + frame(1, snowman[1:] + b'b')
+        chunks = []
+
+        result = self.client.exec_run_stream('web', ['true'], lambda stream, text: chunks.append((stream, text)))
+
+        self.assertEqual(chunks, [('stdout', 'a'), ('stderr', 'warn'), ('stdout', '☃b')])
+        self.assertEqual(result['stdout'], 'a☃b')
+        self.assertEqual(result['returncode'], 0)
+
+    def test_put_file_sends_tar_archive(self):
+        source = os.path.join(self.tmp, 'scene.py')
+        with open(source, 'w') as f:
+            f.write('print(1)')
+
+        self.client.put_file('web', source, '/manim/jobs/scene.py')
+
+        (query, data), = self.engine.archives.items()
+        self.assertEqual(query, 'path=%2Fmanim%2Fjobs')
+        with tarfile.open(fileobj=io.BytesIO(data)) as archive:
+            self.assertEqual(archive.getnames(), ['scene.py'])
+            self.assertEqual(archive.extractfile('scene.py').read(), b'print(1)')
+
+    def test_get_file_extracts_first_file(self):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w') as archive:
+            info = tarfile.TarInfo('video.mp4')
+            info.size = 4
+            archive.addfile(info, io.BytesIO(b'data'))
+        self.engine.download = buffer.getvalue()
+        dest = os.path.join(self.tmp, 'video.mp4')
+
+        self.client.get_file('web', '/manim/media/video.mp4', dest)
+
+        with open(dest, 'rb') as f:
+            self.assertEqual(f.read(), b'data')
+
+    def test_keep_alive_connection_is_reused(self):
+        for _ in range(5):
+            self.client.inspect_container('web')
+
+        self.assertEqual(self.engine.connections, 1)
+
+    def test_retries_on_connection_dropped_by_daemon(self):
+        self.engine.drop_next = True
+        self.client.inspect_container('web')
+
+        self.assertTrue(self.client.inspect_container('web')['State']['Running'])
+        self.assertEqual(self.engine.connections, 2)
+
+
+@override_settings(DOCKER_TRANSPORT='api', MANIM_RENDER_KILL_GRACE=10)
+class DockerAgentAPITests(EngineTestMixin, TestCase):
+    """DockerAgent routed through the Engine API"""
+
+    def setUp(self):
+        super().setUp()
+        DockerAgent._running_since_check.clear()
+        with override_settings(DOCKER_SOCKET=self.socket_path):
+            self.agent = DockerAgent()
+        self.agent.api = self.client
+
+    def test_execute_command_over_api(self):
+        self.engine.exec_output = frame(1, b'done\n')
+
+        result = self.agent.execute_command('web', 'echo done', working_dir='/manim')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['stdout'], 'done\n')
+        self.assertEqual(self.engine.exec_config['Cmd'], ['bash', '-c', 'cd /manim && echo done'])
+
+    def test_starts_stopped_container(self):
+        self.engine.running = False
+
+        self.assertTrue(self.agent.ensure_container_running('web'))
+        self.assertIn(('POST', '/v1.41/containers/web/start', b''), self.engine.requests)
+
+    def test_missing_container_is_not_running(self):
+        self.assertFalse(self.agent.check_container_status('missing'))
+
+
+@override_settings(DOCKER_TRANSPORT='auto', DOCKER_SOCKET='/nonexistent/docker.sock')
+class DockerAgentCLIFallbackTests(TestCase):
+    """DockerAgent falls back to the docker CLI without an Engine socket"""
+
+    def setUp(self):
+        DockerAgent._running_since_check.clear()
+        self.agent = DockerAgent()
+
+    def _completed(self, stdout='', returncode=0):
+        return subprocess.CompletedProcess([], returncode, stdout=stdout, stderr='')
+
+    def test_no_api_client_without_socket(self):
+        self.assertIsNone(self.agent.api)
+
+    def test_execute_command_uses_docker_exec(self):
+        with mock.patch('agents.agents.docker_agent.subprocess.run') as run:
+            run.side_effect = [self._completed('true\n'), self._completed('hello\n')]
+
+            result = self.agent.execute_command('web', 'echo hello')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['stdout'], 'hello\n')
+        self.assertEqual(run.call_args_list[0].args[0][:3], ['docker', 'container', 'inspect'])
+        self.assertEqual(run.call_args_list[1].args[0], ['docker', 'exec', 'web', 'bash', '-c', 'echo hello'])
+
+    def test_copy_uses_docker_cp(self):
+        with mock.patch('agents.agents.docker_agent.subprocess.run', return_value=self._completed()) as run:
+            self.assertTrue(self.agent.copy_to_container('web', '/tmp/a.py', '/manim/a.py'))
+
+        run.assert_called_once()
+        self.assertEqual(run.call_args.args[0], ['docker', 'cp', '/tmp/a.py', 'web:/manim/a.py'])
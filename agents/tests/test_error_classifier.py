@@ -0,0 +1,125 @@
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, override_settings
+from agents.agents import error_classifier
+from agents.agents.error_classifier import classify_error
+from agents.agents.execution_agent import ManimExecutionAgent
+from agents.models import Execution, Script
+
+SCRIPT = "from manim import *\n\nclass Demo(Scene):\n    def construct(self):\n        pass\n"
+
+TRACEBACK = """Traceback (most recent call last):
+  File "/usr/local/lib/python3.11/site-packages/manim/scene/scene.py", line 229, in render
+    self.construct()
+  File "/manim/media/jobs/x/script.py", line 7, in construct
+    self.play(ShowCreation(circle))
+NameError: name 'ShowCreation' is not defined
+"""
+
+
+class ClassifyErrorTests(SimpleTestCase):
+    """Categories and remedies of render failures"""
+
+    def test_traceback_frame_in_the_script(self):
+        classification = classify_error(TRACEBACK)
+
+        self.assertEqual(classification["category"], "api")
+        self.assertEqual(classification["remedy"], "rewrite")
+        self.assertEqual(classification["exception"], "NameError")
+        self.assertEqual(classification["symbol"], "ShowCreation")
+        self.assertEqual(classification["line"], 7)
+        self.assertEqual(classification["code"], "self.play(ShowCreation(circle))")
+        self.assertEqual(classification["summary"], "api NameError 'ShowCreation' at line 7 -> rewrite")
+
+    def test_syntax_error(self):
+        classification = classify_error('  File "script.py", line 3\n    def construct(self)\nSyntaxError: expected \':\'')
+
+        self.assertEqual((classification["category"], classification["remedy"]), ("syntax", "llm"))
+        self.assertEqual(classification["line"], 3)
+
+    def test_missing_package_is_installed(self):
+        classification = classify_error("ModuleNotFoundError: No module named 'cv2'")
+
+        self.assertEqual((classification["category"], classification["remedy"]), ("import", "dependency"))
+        self.assertEqual(classification["module"], "cv2")
+
+    def test_missing_standard_module_goes_to_the_debugger(self):
+        with mock.patch.object(error_classifier, 'resolve_distribution', return_value=None):
+            classification = classify_error("ModuleNotFoundError: No module named 'foo'")
+
+        self.assertEqual((classification["category"], classification["remedy"]), ("import", "llm"))
+
+    def test_kills(self):
+        self.assertEqual(classify_error("", timed_out=True)["category"], "timeout")
+        self.assertEqual(classify_error("Killed", oom=True)["category"], "oom")
+
+    def test_docker_failures_are_retried(self):
+        classification = classify_error("Error response from daemon: container abc is not running")
+
+        self.assertEqual((classification["category"], classification["remedy"]), ("infra", "infra_retry"))
+        self.assertEqual(classification["message"], "Error response from daemon: container abc is not running")
+
+    def test_missing_tool_fails_fast(self):
+        for error, tool in (
+            ("FileNotFoundError: [Errno 2] No such file or directory: 'latex'", 'latex'),
+            ("FileNotFoundError: [Errno 2] No such file or directory: 'dvisvgm'", 'dvisvgm'),
+            ("sh: 1: ffmpeg: not found", 'ffmpeg'),
+        ):
+            classification = classify_error(error)
+
+            self.assertEqual((classification["category"], classification["remedy"]), ("environment", "fail"))
+            self.assertEqual(classification["symbol"], tool)
+            self.assertIn(f"no {tool} executable", classification["message"])
+
+    def test_latex_error(self):
+        classification = classify_error("! LaTeX Error: File `physics.sty' not found.\nlatex error converting to dvi")
+
+        self.assertEqual((classification["category"], classification["remedy"]), ("latex", "llm"))
+        self.assertEqual(classification["symbol"], "physics.sty")
+
+    def test_encoder_failure(self):
+        classification = classify_error("Conversion failed!")
+
+        self.assertEqual((classification["category"], classification["remedy"]), ("ffmpeg", "infra_retry"))
+
+    def test_preflight_report(self):
+        report = ("Pre-flight check failed before rendering:\n"
+                  "- [undefined-name] line 4: 'ShowCreation' is not defined\n"
+                  "- [undefined-name] line 5: 'TextMobject' is not defined")
+
+        classification = classify_error(report)
+
+        self.assertEqual(classification["category"], "api")
+        self.assertEqual(classification["symbols"], ["ShowCreation", "TextMobject"])
+        self.assertEqual(classification["line"], 4)
+
+    def test_unknown_exception_is_a_runtime_error(self):
+        classification = classify_error("ValueError: math domain error")
+
+        self.assertEqual((classification["category"], classification["remedy"]), ("runtime", "llm"))
+
+
+@override_settings(MANIM_SMOKE_RENDER='', MANIM_MAX_ATTEMPTS=5, MANIM_INFRA_RETRIES=2, MANIM_RENDITION_QUALITIES=[])
+class EnvironmentFailureTests(TestCase):
+    """Renders that cannot succeed in the current image stop on the first failure"""
+
+    def test_missing_tool_is_not_retried_or_debugged(self):
+        script = Script.objects.create(prompt='p', content=SCRIPT)
+        agent = ManimExecutionAgent()
+        agent.debug_agent = mock.Mock()
+        checked = {"success": True, "scenes": ['Demo'], "diagnostics": [], "error": None}
+        error = "FileNotFoundError: [Errno 2] No such file or directory: 'latex'"
+
+        with mock.patch.object(agent.preflight, 'check', return_value=checked), \
+                mock.patch.object(agent, '_select_container'), \
+                mock.patch.object(agent, '_get_cache_keys', return_value=({}, None)), \
+                mock.patch.object(agent, '_execute_script', return_value={"success": False, "error": error}) as render:
+            result = agent.execute(script)
+
+        self.assertFalse(result["success"])
+        self.assertEqual(render.call_count, 1)
+        agent.debug_agent.debug_script.assert_not_called()
+        self.assertEqual(result["termination_reason"], "environment_error")
+        self.assertTrue(result["error"].startswith("The Manim container has no latex executable"))
+        execution = Execution.objects.get(script=script)
+        self.assertEqual(execution.error_category, "environment")
+        self.assertEqual(execution.termination_reason, "environment_error")
@@ -0,0 +1,82 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from agents.models import Execution, ExecutionEvent, Script
+from agents.views import EVENTS_TOKEN_SALT
+
+
+@override_settings(EXECUTION_EVENTS_POLL_INTERVAL=0.01, EXECUTION_EVENTS_TOKEN_TTL=60)
+class ExecutionEventsViewTests(TestCase):
+    """SSE stream of an execution and its events token"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('viewer@example.com')
+        script = Script.objects.create(prompt='Draw a circle', content='from manim import *')
+        self.execution = Execution.objects.create(
+            script=script, status='completed', output_path='jobs/x/Scene.mp4', completed_at=timezone.now()
+        )
+        self.event = ExecutionEvent.objects.create(execution=self.execution, kind='status', data={"status": "completed"})
+        self.url = f'/api/agents/executions/{self.execution.id}/events'
+
+    def _events_token(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(f'/api/agents/executions/{self.execution.id}/events_token/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['expires_in'], 60)
+        return response.data['token']
+
+    async def _async_events_token(self):
+        return await sync_to_async(self._events_token)()
+
+    async def _stream(self, url, **headers):
+        response = await self.async_client.get(url, **headers)
+        if response.status_code != 200:
+            return response.status_code, None
+        return 200, ''.join([chunk.decode() async for chunk in response.streaming_content])
+
+    def test_events_token_is_bound_to_the_execution(self):
+        payload = signing.loads(self._events_token(), salt=EVENTS_TOKEN_SALT)
+
+        self.assertEqual(payload, {'execution': str(self.execution.id), 'user': self.user.pk})
+
+    async def test_stream_with_events_token(self):
+        token = await self._async_events_token()
+
+        code, body = await self._stream(f'{self.url}?token={token}')
+
+        self.assertEqual(code, 200)
+        self.assertEqual(body, (
+            f'id: {self.event.id}\nevent: status\ndata: {{"status": "completed"}}\n\n'
+            'event: end\ndata: {"status": "completed", "output_path": "jobs/x/Scene.mp4"}\n\n'
+        ))
+
+    async def test_stream_with_authorization_header(self):
+        code, _ = await self._stream(self.url, headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'})
+
+        self.assertEqual(code, 200)
+
+    async def test_jwt_is_not_accepted_as_query_parameter(self):
+        code, _ = await self._stream(f'{self.url}?token={AccessToken.for_user(self.user)}')
+
+        self.assertEqual(code, 401)
+
+    async def test_events_token_of_another_execution_is_rejected(self):
+        other = await Execution.objects.acreate(script_id=self.execution.script_id)
+        token = signing.dumps({'execution': str(other.id), 'user': self.user.pk}, salt=EVENTS_TOKEN_SALT)
+
+        code, _ = await self._stream(f'{self.url}?token={token}')
+
+        self.assertEqual(code, 401)
+
+    @override_settings(EXECUTION_EVENTS_TOKEN_TTL=-1)
+    async def test_expired_events_token_is_rejected(self):
+        token = signing.dumps({'execution': str(self.execution.id), 'user': self.user.pk}, salt=EVENTS_TOKEN_SALT)
+
+        code, _ = await self._stream(f'{self.url}?token={token}')
+
+        self.assertEqual(code, 401)
@@ -0,0 +1,98 @@
+from django.test import TestCase, override_settings
+from agents.agents.fix_cache import FixCacheAgent
+from agents.models import DebugFix
+
+BEFORE = """from manim import *
+
+class Demo(Scene):
+    def construct(self):
+        circle = Circle()
+        self.play(Create(circle))
+        self.play(circle.animate.shift(RIGHT))
+
+        self.wait()
+"""
+
+ERROR = """Traceback (most recent call last):
+  File "/manim/media/jobs/x/script.py", line 7, in construct
+    self.play(circle.animate.shift(RIGHT))
+ValueError: Called animate() on a mobject that is not in the scene
+"""
+
+
+@override_settings(AI_FIX_CACHE_ENABLED=True, AI_FIX_CACHE_WINDOW=5)
+class FixCacheTests(TestCase):
+    """Debug fixes stored as diffs and replayed on other scripts"""
+
+    def setUp(self):
+        self.cache = FixCacheAgent()
+        self.signature = self.cache.signature(BEFORE, ERROR)
+
+    def test_signature(self):
+        self.assertEqual(self.signature["category"], "runtime")
+        self.assertEqual(self.signature["line"], 7)
+        self.assertEqual(self.signature["source_line"], "self.play(circle.animate.shift(RIGHT))")
+        self.assertIsNone(self.cache.signature(BEFORE, "Error response from daemon: gone"))
+
+    def test_fenced_script_is_read_as_rendered(self):
+        fenced = f"```python\n{BEFORE}```\n"
+
+        self.assertEqual(self.cache.signature(fenced, ERROR), self.signature)
+
+        after = BEFORE.replace("        self.play(circle.animate", "        self.add(circle)\n        self.play(circle.animate")
+        fix = self.cache.store(self.signature, fenced, f"```python\n{after}```\n")
+        self.assertIsNotNone(fix)
+        self.assertNotIn("```", fix.diff)
+        patched, hit = self.cache.lookup(fenced, self.signature)
+        self.assertEqual(hit.pk, fix.pk)
+        self.assertEqual(patched, after.strip())
+
+    def test_insertion_in_the_middle_is_kept(self):
+        after = BEFORE.replace(
+            "        self.play(Create(circle))\n",
+            "        self.play(Create(circle))\n        self.add(circle)\n"
+        )
+
+        fix = self.cache.store(self.signature, BEFORE, after)
+
+        self.assertIsNotNone(fix)
+        self.assertIn("+        self.add(circle)", fix.diff)
+        # Replayed on a script whose lines moved, the insertion lands after the same line
+        shifted = BEFORE.replace("class Demo(Scene):\n", "# A demo\nclass Demo(Scene):\n")
+        patched, hit = self.cache.lookup(shifted, self.signature)
+        self.assertEqual(hit.pk, fix.pk)
+        self.assertEqual(patched, after.replace("class Demo(Scene):\n", "# A demo\nclass Demo(Scene):\n"))
+
+    def test_every_hunk_is_kept(self):
+        after = BEFORE.replace("from manim import *\n", "from manim import *\nimport numpy as np\n").replace(
+            "        self.play(circle.animate.shift(RIGHT))\n",
+            "        self.add(circle)\n        self.play(circle.animate.shift(RIGHT))\n"
+        )
+
+        fix = self.cache.store(self.signature, BEFORE, after)
+
+        self.assertIn("+import numpy as np", fix.diff)
+        self.assertIn("+        self.add(circle)", fix.diff)
+        patched, _ = self.cache.lookup(BEFORE, self.signature)
+        self.assertEqual(patched, after)
+
+    def test_insertion_after_a_blank_line_is_not_cached(self):
+        after = BEFORE.replace("\n\n        self.wait()", "\n\n        self.add(circle)\n        self.wait()")
+
+        self.assertIsNone(self.cache.store(self.signature, BEFORE, after))
+        self.assertFalse(DebugFix.objects.exists())
+
+    def test_fix_with_a_change_outside_the_window_is_not_cached(self):
+        signature = dict(self.signature, line=20)
+        script = BEFORE + "".join(f"        self.wait({n})\n" for n in range(15))
+        after = script.replace("circle = Circle()", "circle = Circle(color=RED)")
+
+        self.assertIsNone(self.cache.store(signature, script, after))
+
+    def test_failed_replays_retire_a_fix(self):
+        after = BEFORE.replace("        self.play(Create(circle))\n",
+                               "        self.play(Create(circle))\n        self.add(circle)\n")
+        fix = self.cache.store(self.signature, BEFORE, after)
+        DebugFix.objects.filter(pk=fix.pk).update(failures=4)
+
+        self.assertEqual(self.cache.lookup(BEFORE, self.signature), (None, None))
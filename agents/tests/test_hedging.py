@@ -0,0 +1,120 @@
+import threading
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from agents.agents.ai_agent import AIScriptGenerationAgent, HedgedCall
+
+SCRIPT = "from manim import *\n\nclass Demo(Scene):\n    def construct(self):\n        pass\n"
+
+
+class FakeResponse:
+    """Streamed response whose close() ends the stream, like an HTTP response"""
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+
+@override_settings(AI_HEDGE_TIMEOUT=5, AI_HEDGE_DELAY=0.05, AI_HEDGE_MIN_SAMPLES=1000,
+                   AI_STREAMING_GENERATION=False, AI_STREAM_MAX_RESAMPLES=0)
+class HedgedGenerationTests(SimpleTestCase):
+    """Races between providers and the cancellation of the calls that lose"""
+
+    def setUp(self):
+        self.agent = AIScriptGenerationAgent()
+        self.responses = {}
+        self.finished = {}
+        for target, replacement in (
+            ('_stream_with_gemini', self._fake_stream('gemini')),
+            ('_stream_with_azure_openai', self._fake_stream('azure_openai')),
+            ('_start_warmup', lambda agent, header: None),
+        ):
+            patcher = mock.patch.object(AIScriptGenerationAgent, target, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        preflight = mock.patch('agents.agents.preflight.PreflightAgent.check', return_value={"success": True})
+        preflight.start()
+        self.addCleanup(preflight.stop)
+        self.behaviour = {}
+        self.slow_started = threading.Event()
+
+    def _fake_stream(self, provider_type):
+        test = self
+
+        def stream(agent, prompt, provider):
+            response = FakeResponse()
+            test.responses[provider_type] = response
+            test.finished[provider_type] = threading.Event()
+            agent._attach_response(response)
+            try:
+                if test.behaviour.get(provider_type) == 'slow':
+                    # Blocks like a request waiting for the provider, until its response is closed
+                    test.slow_started.set()
+                    if not response.closed.wait(5):
+                        yield "# never cancelled\n"
+                    raise ConnectionError("response closed")
+                if 'slow' in test.behaviour.values():
+                    # Answer once the slow call is in flight
+                    test.slow_started.wait(1)
+                yield SCRIPT
+            finally:
+                test.finished[provider_type].set()
+
+        return stream
+
+    def test_losing_call_is_cancelled(self):
+        self.behaviour = {'azure_openai': 'slow'}
+
+        script, winner = self.agent._generate_hedged("prompt", ['gemini', 'azure_openai'], premium=True)
+
+        self.assertEqual(winner, 'gemini')
+        self.assertEqual(script, SCRIPT.strip("\n"))
+        self.assertTrue(self.responses['azure_openai'].closed.wait(1))
+        self.assertTrue(self.finished['azure_openai'].wait(1))
+
+    def test_slow_primary_is_hedged_and_cancelled(self):
+        self.behaviour = {'gemini': 'slow'}
+
+        script, winner = self.agent._generate_hedged("prompt", ['gemini', 'azure_openai'])
+
+        self.assertEqual(winner, 'azure_openai')
+        self.assertTrue(self.finished['gemini'].wait(1))
+
+    def test_hedged_calls_stream_when_streaming_is_off(self):
+        self.assertFalse(self.agent.streaming_enabled)
+
+        self.agent._generate_hedged("prompt", ['gemini'])
+
+        self.assertIn('gemini', self.responses)
+
+    def test_no_executor_is_created_at_import(self):
+        from agents.agents import ai_agent
+
+        self.assertFalse(hasattr(ai_agent, '_hedge_executor'))
+
+    def test_every_provider_failing(self):
+        with mock.patch.object(AIScriptGenerationAgent, '_generate_candidate', side_effect=RuntimeError('down')):
+            with self.assertRaisesRegex(RuntimeError, "Every provider failed: gemini: down"):
+                self.agent._generate_hedged("prompt", ['gemini'])
+
+
+class HedgedCallTests(SimpleTestCase):
+    """Cancellation handle of one hedged call"""
+
+    def test_cancel_closes_the_response(self):
+        call, response = HedgedCall(), FakeResponse()
+        call.attach(response)
+
+        call.cancel()
+
+        self.assertTrue(call.cancelled.is_set())
+        self.assertTrue(response.closed.is_set())
+
+    def test_response_of_a_cancelled_call_is_closed_on_arrival(self):
+        call, response = HedgedCall(), FakeResponse()
+        call.cancel()
+
+        call.attach(response)
+
+        self.assertTrue(response.closed.is_set())
@@ -0,0 +1,155 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from agents.agents.ai_agent import AIScriptDebuggingAgent
+from agents.agents.error_classifier import trim_error
+from agents.agents.patching import apply_diff, apply_patch, make_diff, number_lines, parse_line_patch
+
+SCRIPT = """from manim import *
+
+class Demo(Scene):
+    def construct(self):
+        circle = Circle()
+        self.play(ShowCreation(circle))
+        self.wait()
+"""
+
+FAILING = SCRIPT.replace("ShowCreation(circle)", "FadeIn(circle, shift=2)")
+
+
+class NumberLinesTests(SimpleTestCase):
+    """Numbered script lines shown to the debugger"""
+
+    def test_numbers_every_line(self):
+        self.assertEqual(number_lines("a\nb\n"), "1 | a\n2 | b")
+
+    def test_range_is_padded_to_its_last_number(self):
+        script = "\n".join(f"line {n}" for n in range(1, 13))
+
+        self.assertEqual(number_lines(script, 9, 10), " 9 | line 9\n10 | line 10")
+        self.assertEqual(number_lines(script, 12, 40), "12 | line 12")
+
+
+class LinePatchTests(SimpleTestCase):
+    """REPLACE / INSERT AFTER patches against the numbered script"""
+
+    def test_parse(self):
+        edits = parse_line_patch("REPLACE 6\n        self.play(Create(circle))\nEND\nINSERT AFTER lines 2:\n# added\nEND")
+
+        self.assertEqual(edits, [
+            {"start": 6, "end": 6, "lines": ["        self.play(Create(circle))"]},
+            {"start": 3, "end": 2, "lines": ["# added"]},
+        ])
+
+    def test_copied_line_numbers_are_stripped(self):
+        edits = parse_line_patch("REPLACE 5-6\n5 |         circle = Circle()\n6 |         self.add(circle)\nEND")
+
+        self.assertEqual(edits[0]["lines"], ["        circle = Circle()", "        self.add(circle)"])
+
+    def test_replace_and_insert(self):
+        patch = "```\nREPLACE 6\n        self.play(Create(circle))\nEND\nINSERT AFTER 1\nimport numpy as np\nEND\n```"
+
+        patched = apply_patch(SCRIPT, patch)
+
+        self.assertEqual(patched, SCRIPT.replace("ShowCreation", "Create").replace(
+            "from manim import *\n", "from manim import *\nimport numpy as np\n"))
+
+    def test_out_of_range_or_overlapping_edits_are_rejected(self):
+        self.assertIsNone(apply_patch(SCRIPT, "REPLACE 7-9\nx\nEND"))
+        self.assertIsNone(apply_patch(SCRIPT, "REPLACE 5-6\nx\nEND\nREPLACE 6\ny\nEND"))
+
+
+class UnifiedDiffTests(SimpleTestCase):
+    """Unified diffs applied to scripts they were not made from"""
+
+    def test_round_trip(self):
+        after = SCRIPT.replace("ShowCreation", "Create")
+
+        self.assertEqual(apply_patch(SCRIPT, make_diff(SCRIPT, after)), after)
+
+    def test_applies_to_moved_and_reindented_lines(self):
+        diff = make_diff(SCRIPT, SCRIPT.replace("ShowCreation", "Create"), context=0)
+        nested = SCRIPT.replace("        ", "            ").replace("class Demo", "# moved\n\nclass Demo")
+
+        patched = apply_diff(nested, diff)
+
+        self.assertIn("\n            self.play(Create(circle))\n", patched)
+        self.assertIn("# moved", patched)
+
+    def test_missing_lines_do_not_apply(self):
+        diff = make_diff(SCRIPT, SCRIPT.replace("ShowCreation", "Create"))
+
+        self.assertIsNone(apply_diff(SCRIPT.replace("ShowCreation(circle)", "FadeIn(circle)"), diff))
+
+    def test_text_that_is_no_patch(self):
+        self.assertIsNone(apply_patch(SCRIPT, "Replace ShowCreation with Create."))
+
+
+class TrimErrorTests(SimpleTestCase):
+    """The part of a render error the debugger gets"""
+
+    def test_short_errors_are_kept(self):
+        self.assertEqual(trim_error("ValueError: bad\n"), "ValueError: bad")
+
+    def test_library_frames_are_dropped(self):
+        frames = []
+        for n in range(30):
+            frames.append(f'  File "/usr/local/lib/python3.11/site-packages/manim/mod{n}.py", line {n}, in f{n}')
+            frames.append(f"    call_{n}()")
+        error = "\n".join([
+            "Traceback (most recent call last):",
+            '  File "/manim/media/jobs/x/script.py", line 6, in construct',
+            "    self.play(Thing(circle))",
+            *frames,
+            "TypeError: Thing() takes no arguments",
+        ])
+
+        trimmed = trim_error(error).splitlines()
+
+        self.assertEqual(trimmed[:4], [
+            "Traceback (most recent call last):",
+            'File "/manim/media/jobs/x/script.py", line 6, in construct',
+            "    self.play(Thing(circle))",
+            "  ...",
+        ])
+        # The frame that raised is kept, and the exception
+        self.assertIn('File "/usr/local/lib/python3.11/site-packages/manim/mod29.py", line 29, in f29', trimmed)
+        self.assertEqual(trimmed[-1], "TypeError: Thing() takes no arguments")
+        self.assertLessEqual(len(trimmed), 40)
+
+    def test_latex_logs_keep_their_errors(self):
+        log = [f"(/usr/share/texmf/tex/latex/base/file{n}.sty)" for n in range(60)]
+        error = "\n".join(log + ["! Undefined control sequence.", "l.7 \\foo", "", "Emergency stop."])
+
+        self.assertEqual(trim_error(error), "! Undefined control sequence.\nl.7 \\foo")
+
+    def test_preflight_reports_are_cut_to_max_lines(self):
+        report = "Pre-flight check failed before rendering:\n" + "\n".join(f"- [x] line {n}: bad" for n in range(50))
+
+        self.assertEqual(len(trim_error(report, max_lines=10).splitlines()), 10)
+
+
+@override_settings(AI_DEBUG_PATCH_MODE=True, AI_FIX_CACHE_ENABLED=False)
+class PatchDebuggingTests(SimpleTestCase):
+    """Patches asked for against the script as it was rendered"""
+
+    def test_fenced_script_is_numbered_as_rendered(self):
+        agent = AIScriptDebuggingAgent()
+        agent.script_generator._get_provider = lambda provider: 'gemini'
+        error = "\n".join([
+            "Traceback (most recent call last):",
+            '  File "/manim/media/jobs/x/script.py", line 6, in construct',
+            "    self.play(FadeIn(circle, shift=2))",
+            "ValueError: shift must be a vector",
+        ])
+        prompts = []
+
+        def reply(prompt, provider, provider_type):
+            prompts.append(prompt)
+            return "REPLACE 6\n        self.play(FadeIn(circle, shift=2 * UP))\nEND"
+
+        with mock.patch.object(agent, '_call_debug_provider', side_effect=reply):
+            result = agent.debug_script(f"```python\n{FAILING}```\n", error)
+
+        self.assertEqual(result["mode"], "patch")
+        self.assertEqual(result["fixed_script"], FAILING.replace("shift=2)", "shift=2 * UP)").strip())
+        self.assertIn("6 |         self.play(FadeIn(circle, shift=2))", prompts[0])
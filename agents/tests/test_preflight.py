@@ -0,0 +1,92 @@
+import json
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from agents.agents.preflight import PreflightAgent
+
+MANIM_NAMES = ['Circle', 'Create', 'Scene', 'Square', 'Transform', 'BLUE']
+
+SCRIPT = """from manim import *
+
+class Demo(Scene):
+    def construct(self):
+        circle = Circle(color=BLUE)
+        self.play(Create(circle))
+"""
+
+
+@override_settings(MANIM_IMAGE_VERSION='v1', MANIM_PREFLIGHT_ENABLED=True)
+class PreflightTests(SimpleTestCase):
+    """Static checks run on the host before a render"""
+
+    def setUp(self):
+        PreflightAgent._api_indexes = {}
+        self.agent = PreflightAgent()
+        self.agent.docker_agent = mock.Mock()
+        self.agent.docker_agent.execute_command.return_value = {
+            "success": True, "stdout": json.dumps({"version": "0.19.0", "names": MANIM_NAMES})
+        }
+
+    def test_valid_script(self):
+        result = self.agent.check(SCRIPT, 'omega-manim')
+
+        self.assertEqual(result, {"success": True, "scenes": ['Demo'], "diagnostics": [], "error": None})
+
+    def test_syntax_error(self):
+        result = self.agent.check("class Demo(Scene:\n    pass\n")
+
+        self.assertFalse(result["success"])
+        self.assertEqual(result["diagnostics"][0]["code"], "syntax-error")
+        self.assertEqual(result["diagnostics"][0]["line"], 1)
+        self.assertTrue(result["error"].startswith("Pre-flight check failed before rendering:\n- [syntax-error] line 1: "))
+
+    def test_script_without_scene(self):
+        result = self.agent.check("from manim import *\nx = Circle()\n", 'omega-manim')
+
+        self.assertEqual([d["code"] for d in result["diagnostics"]], ["no-scene"])
+
+    def test_unknown_import_and_undefined_name(self):
+        script = SCRIPT.replace("from manim import *", "from manim import *\nfrom manim import ShowCreation")
+        script = script.replace("Create(circle)", "Write(circle)")
+
+        result = self.agent.check(script, 'omega-manim')
+
+        self.assertEqual([(d["code"], d["line"]) for d in result["diagnostics"]],
+                         [("unknown-import", 2), ("undefined-name", 7)])
+        self.assertIn("'Write' is not defined", result["error"])
+
+    def test_without_api_index_names_are_not_judged(self):
+        self.agent.docker_agent.execute_command.return_value = {"success": False, "stdout": ""}
+
+        result = self.agent.check(SCRIPT.replace("Create(", "Write("), 'omega-manim')
+
+        self.assertTrue(result["success"])
+
+    def test_locally_bound_names_are_defined(self):
+        script = SCRIPT + """
+    def helper(self, *items, scale=1):
+        for index, item in enumerate(items):
+            try:
+                total = index * scale
+            except ValueError as error:
+                raise error
+        return [value for value in items if value], total
+"""
+        self.assertTrue(self.agent.check(script, 'omega-manim')["success"])
+
+    def test_api_index_is_extracted_once_per_image_version(self):
+        self.agent.check(SCRIPT, 'omega-manim')
+        self.agent.check(SCRIPT, 'omega-manim')
+
+        self.assertEqual(self.agent.docker_agent.execute_command.call_count, 1)
+        self.assertEqual(self.agent.get_api_index('omega-manim'), frozenset(MANIM_NAMES))
+
+    def test_failed_extraction_is_not_cached(self):
+        self.agent.docker_agent.execute_command.return_value = {"success": False, "stdout": ""}
+        self.assertIsNone(self.agent.get_api_index('omega-manim'))
+
+        self.agent.docker_agent.execute_command.return_value = {"success": True, "stdout": json.dumps({"names": ['Scene']})}
+        self.assertEqual(self.agent.get_api_index('omega-manim'), frozenset(['Scene']))
+
+    @override_settings(MANIM_PREFLIGHT_ENABLED=False)
+    def test_disabled(self):
+        self.assertTrue(PreflightAgent().check("not python (")["success"])
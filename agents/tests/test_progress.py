@@ -0,0 +1,152 @@
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from agents.agents.progress import (
+    ExecutionEventHub, ExecutionEventPublisher, line_splitter, parse_progress, prune_events
+)
+from agents.models import Execution, ExecutionEvent, Script
+
+
+def create_execution(**fields):
+    script = Script.objects.create(prompt='Draw a circle', content='from manim import *')
+    return Execution.objects.create(script=script, **fields)
+
+
+class ProgressParsingTests(TestCase):
+    """Manim progress bars and output line splitting"""
+
+    def test_parse_progress(self):
+        line = "Animation 2: Create(Circle):  45%|####5     | 27/60 [00:01<00:01, 25.3it/s]"
+
+        self.assertEqual(parse_progress(line), {
+            "animation": 2, "name": "Create(Circle)", "percent": 45, "frames": 27, "total_frames": 60
+        })
+        self.assertIsNone(parse_progress("File ready at media/videos/Scene.mp4"))
+
+    def test_line_splitter_splits_on_carriage_returns(self):
+        lines = []
+        feed, flush = line_splitter(lambda stream, line: lines.append((stream, line)))
+
+        feed('stdout', "one\r\ntwo\rthr")
+        feed('stderr', "err")
+        feed('stdout', "ee\n")
+        flush()
+
+        self.assertEqual(lines, [('stdout', 'one'), ('stdout', 'two'), ('stdout', 'three'), ('stderr', 'err')])
+
+
+@override_settings(EXECUTION_EVENTS_ENABLED=True, EXECUTION_EVENT_LOG_INTERVAL=60, EXECUTION_EVENT_LOG_BATCH=3,
+                   EXECUTION_EVENT_PROGRESS_INTERVAL=0)
+class ExecutionEventPublisherTests(TestCase):
+    """Events recorded while an execution renders"""
+
+    def setUp(self):
+        self.execution = create_execution()
+        self.events = ExecutionEventPublisher(self.execution)
+
+    def _stored(self):
+        return [(event.kind, event.data) for event in ExecutionEvent.objects.filter(execution=self.execution)]
+
+    def test_log_lines_are_stored_in_batches(self):
+        for line in ("one", "two", "", "three", "four"):
+            self.events.on_output('stdout', line)
+
+        self.assertEqual(self._stored(), [('log', {"stream": "stdout", "lines": ["one", "two", "three"]})])
+
+    def test_other_events_flush_the_log_first(self):
+        self.events.on_output('stdout', "one")
+        self.events.on_output('stderr', "warning")
+        self.events.status('completed')
+
+        self.assertEqual(self._stored(), [
+            ('log', {"stream": "stdout", "lines": ["one"]}),
+            ('log', {"stream": "stderr", "lines": ["warning"]}),
+            ('status', {"status": "completed"})
+        ])
+
+    @override_settings(EXECUTION_EVENT_LOG_INTERVAL=0)
+    def test_log_lines_are_flushed_after_the_interval(self):
+        ExecutionEventPublisher(self.execution).on_output('stdout', "one")
+
+        self.assertEqual(self._stored(), [('log', {"stream": "stdout", "lines": ["one"]})])
+
+    def test_progress_is_recorded_once_per_percent(self):
+        line = "Animation 0: FadeIn(Square):  50%|#####     | 5/10"
+        self.events.on_output('stderr', line)
+        self.events.on_output('stderr', line)
+
+        self.assertEqual([kind for kind, _ in self._stored()], ['progress'])
+
+    def test_without_execution_nothing_is_recorded(self):
+        events = ExecutionEventPublisher()
+        events.on_output('stdout', "one")
+        events.status('running')
+        events.flush()
+
+        self.assertFalse(ExecutionEvent.objects.exists())
+
+
+class PruneEventsTests(TestCase):
+    """Retention of execution events"""
+
+    def test_prunes_progress_and_logs_of_long_finished_executions(self):
+        old = create_execution(completed_at=timezone.now() - timedelta(hours=2))
+        recent = create_execution(completed_at=timezone.now())
+        running = create_execution()
+        for execution in (old, recent, running):
+            for kind in ('status', 'progress', 'log'):
+                ExecutionEvent.objects.create(execution=execution, kind=kind)
+
+        self.assertEqual(prune_events(3600), 2)
+        self.assertEqual(list(old.events.values_list('kind', flat=True)), ['status'])
+        self.assertEqual(recent.events.count(), 3)
+        self.assertEqual(running.events.count(), 3)
+
+
+class ExecutionEventHubTests(TestCase):
+    """One shared poller for the open SSE streams"""
+
+    def setUp(self):
+        self.hub = ExecutionEventHub()
+        self.execution = create_execution()
+        self.other = create_execution()
+
+    def _drain(self, subscription):
+        items = []
+        while not subscription.queue.empty():
+            items.append(subscription.queue.get_nowait())
+        return items
+
+    async def _poll(self, *subscribe):
+        subscriptions = [self.hub.subscribe(*args) for args in subscribe]
+        # Poll by hand instead of on the hub's interval
+        self.hub._task.cancel()
+        await self.hub.poll_once()
+        return subscriptions
+
+    async def test_delivers_each_stream_its_own_events(self):
+        first = await ExecutionEvent.objects.acreate(execution=self.execution, kind='status', data={"status": "running"})
+        await ExecutionEvent.objects.acreate(execution=self.other, kind='log', data={})
+        second = await ExecutionEvent.objects.acreate(execution=self.execution, kind='log', data={"lines": ["x"]})
+
+        fresh, resumed = await self._poll((self.execution.id, 0), (self.execution.id, first.id))
+
+        self.assertEqual(self._drain(fresh), [
+            ('status', {"status": "running"}, first.id), ('log', {"lines": ["x"]}, second.id)
+        ])
+        self.assertEqual(self._drain(resumed), [('log', {"lines": ["x"]}, second.id)])
+        self.assertEqual(len(self.hub._subscriptions), 2)
+
+    async def test_ends_finished_executions_after_their_events(self):
+        event = await ExecutionEvent.objects.acreate(execution=self.execution, kind='status', data={"status": "completed"})
+        await Execution.objects.filter(pk=self.execution.pk).aupdate(
+            completed_at=timezone.now(), status='completed', output_path='jobs/x/Scene.mp4'
+        )
+
+        subscription, = await self._poll((self.execution.id, 0))
+
+        self.assertEqual(self._drain(subscription), [
+            ('status', {"status": "completed"}, event.id),
+            ('end', {"status": "completed", "output_path": "jobs/x/Scene.mp4"}, None)
+        ])
+        self.assertEqual(self.hub._subscriptions, set())
@@ -0,0 +1,99 @@
+import numpy as np
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from agents.agents.prompt_cache import PromptCacheAgent
+from agents.models import AIProvider, Execution, Script
+
+
+class PromptCacheTestMixin:
+
+    def setUp(self):
+        self.provider = AIProvider.objects.create(name='Gemini', provider_type='gemini', api_key='key')
+        self.other_provider = AIProvider.objects.create(name='Azure', provider_type='azure_openai', api_key='key')
+
+        # The similarity index is shared by the process
+        PromptCacheAgent._vectors = np.zeros((0, PromptCacheAgent.VECTOR_SIZE), dtype=np.float32)
+        PromptCacheAgent._script_ids = []
+        PromptCacheAgent._scopes = []
+        PromptCacheAgent._watermark = None
+        PromptCacheAgent._last_refresh = 0.0
+        self.cache = PromptCacheAgent()
+        self.cache.refresh_interval = 0
+
+    def _rendered(self, prompt, provider=None, model_name='flash'):
+        provider = provider or self.provider
+        script = Script.objects.create(
+            prompt=prompt, content='from manim import *', provider=provider, model_name=model_name,
+            prompt_hash=self.cache.make_key(prompt, provider, model_name, 0.2)
+        )
+        Execution.objects.create(script=script, is_successful=True, status='completed', completed_at=timezone.now())
+        return script
+
+    def _lookup(self, prompt, provider=None, model_name='flash'):
+        provider = provider or self.provider
+        return self.cache.lookup(prompt, self.cache.make_key(prompt, provider, model_name, 0.2), provider, model_name)
+
+
+class PromptCacheTests(PromptCacheTestMixin, TestCase):
+    """Exact prompt cache tier"""
+
+    def test_key_ignores_case_whitespace_and_trailing_punctuation(self):
+        key = self.cache.make_key("Draw a  blue circle.", self.provider, 'flash', 0.2)
+
+        self.assertEqual(key, self.cache.make_key("draw a blue circle", self.provider, 'flash', 0.2))
+        self.assertNotEqual(key, self.cache.make_key("draw a blue circle", self.other_provider, 'flash', 0.2))
+        self.assertNotEqual(key, self.cache.make_key("draw a blue circle", self.provider, 'pro', 0.2))
+
+    def test_exact_hit(self):
+        script = self._rendered("Draw a blue circle")
+
+        self.assertEqual(self._lookup("draw a blue circle!"), (script, "exact", 1.0))
+
+    def test_only_successful_scripts_are_served(self):
+        Script.objects.create(prompt="Draw a blue circle", content="", provider=self.provider,
+                              prompt_hash=self.cache.make_key("Draw a blue circle", self.provider, 'flash', 0.2))
+
+        self.assertEqual(self._lookup("Draw a blue circle"), (None, None, 0.0))
+
+    def test_semantic_tier_is_off_by_default(self):
+        self._rendered("Draw a blue circle that slowly turns into a red square")
+
+        self.assertFalse(self.cache.semantic_enabled)
+        self.assertIsNone(self._lookup("Draw a blue circle that slowly turns into a red square please")[0])
+
+
+@override_settings(AI_PROMPT_CACHE_SEMANTIC=True)
+class SemanticPromptCacheTests(PromptCacheTestMixin, TestCase):
+    """Near-duplicate prompt cache tier"""
+
+    PROMPT = "Draw a blue circle that slowly turns into a red square"
+
+    def test_near_duplicate_hit(self):
+        script = self._rendered(self.PROMPT)
+
+        hit, tier, similarity = self._lookup("Now " + self.PROMPT.lower())
+
+        self.assertEqual((hit, tier), (script, "semantic"))
+        self.assertGreaterEqual(similarity, self.cache.similarity_threshold)
+
+    def test_swapped_objects_miss(self):
+        self._rendered("Transform a circle into a square")
+
+        self.assertIsNone(self._lookup("Transform a square into a circle")[0])
+
+    def test_different_numbers_miss(self):
+        self._rendered("Draw a bar chart with 5 bars")
+
+        self.assertIsNone(self._lookup("Draw a bar chart with 10 bars")[0])
+
+    def test_other_provider_or_model_misses(self):
+        self._rendered(self.PROMPT)
+
+        self.assertIsNone(self._lookup(self.PROMPT + " please", provider=self.other_provider)[0])
+        self.assertIsNone(self._lookup(self.PROMPT + " please", model_name='pro')[0])
+
+    def test_is_same_request(self):
+        self.assertTrue(self.cache.is_same_request("Show 3 dots, then a line", "show 3 dots and then a line"))
+        self.assertFalse(self.cache.is_same_request("circle to square", "square to circle"))
+        self.assertFalse(self.cache.is_same_request("5 bars", "10 bars"))
+        self.assertFalse(self.cache.is_same_request("a 2.5 second fade", "a 2 second fade"))
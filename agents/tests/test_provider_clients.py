@@ -0,0 +1,70 @@
+from unittest import mock
+from django.test import SimpleTestCase
+from agents.agents.provider_clients import ProviderClient, ProviderClientRegistry
+
+
+class GeminiClientTests(SimpleTestCase):
+    """Gemini model handles bound to their own API key"""
+
+    def setUp(self):
+        self.registry = ProviderClientRegistry()
+
+    def test_each_key_gets_its_own_service_client(self):
+        first = self.registry.get_gemini(1, 'key-one', 'flash')
+        second = self.registry.get_gemini(2, 'key-two', 'flash')
+
+        self.assertEqual(first.client._client._client_options.api_key, 'key-one')
+        self.assertEqual(second.client._client._client_options.api_key, 'key-two')
+
+    def test_switching_keys_keeps_existing_clients(self):
+        first = self.registry.get_gemini(1, 'key-one', 'flash')
+        self.registry.get_gemini(2, 'key-two', 'flash')
+
+        self.assertIs(self.registry.get_gemini(1, 'key-one', 'flash'), first)
+        self.assertEqual(first.client._client._client_options.api_key, 'key-one')
+
+    def test_models_of_one_key_share_the_service_client(self):
+        flash = self.registry.get_gemini(1, 'key-one', 'flash')
+        pro = self.registry.get_gemini(1, 'key-one', 'pro')
+
+        self.assertIsNot(flash, pro)
+        self.assertIs(flash.client._client, pro.client._client)
+
+    def test_does_not_configure_the_library_globally(self):
+        with mock.patch('agents.agents.provider_clients.genai.configure') as configure:
+            self.registry.get_gemini(1, 'key-one', 'flash')
+
+        configure.assert_not_called()
+
+    def test_invalidate_drops_the_providers_clients(self):
+        first = self.registry.get_gemini(1, 'key-one', 'flash')
+        self.registry.get_gemini(2, 'key-two', 'flash')
+
+        self.assertEqual(self.registry.invalidate(1), 1)
+        self.assertIsNot(self.registry.get_gemini(1, 'key-one', 'flash'), first)
+
+    def test_key_never_holds_the_credential(self):
+        self.assertNotIn('key-one', ''.join(self.registry.make_key(1, 'key-one', 'https://example.com')))
+
+
+class ProviderClientTests(SimpleTestCase):
+    """Latency statistics of a provider client"""
+
+    def test_percentiles_skip_failed_calls(self):
+        client = ProviderClient(('1', 'hash', '', ''), 'gemini', object())
+        for seconds in (1.0, 2.0, 3.0, 4.0):
+            client.record(seconds)
+        client.record(60.0, failed=True)
+
+        self.assertEqual(client.percentile(50), 3.0)
+        self.assertEqual(client.percentile(95), 4.0)
+        self.assertIsNone(client.percentile(95, min_samples=5))
+        self.assertEqual((client.stats()["calls"], client.stats()["errors"]), (5, 1))
+
+    def test_call_records_errors(self):
+        client = ProviderClient(('1', 'hash', '', ''), 'gemini', object())
+
+        with self.assertRaises(ValueError):
+            client.call(mock.Mock(side_effect=ValueError))
+
+        self.assertEqual((client.calls, client.errors), (1, 1))
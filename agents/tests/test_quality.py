@@ -0,0 +1,63 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from agents.agents.execution_agent import ManimExecutionAgent
+from agents.agents.quality import (
+    get_preview_quality, get_rendition_qualities, quality_flag, quality_folder, quality_rank
+)
+from agents.models import Execution, Script
+
+
+class QualityPresetTests(SimpleTestCase):
+    """Quality ladder of previews and renditions"""
+
+    def test_presets(self):
+        self.assertEqual((quality_flag('low'), quality_folder('low')), ('-ql', '480p15'))
+        self.assertEqual((quality_flag('high'), quality_folder('high')), ('-qh', '1080p60'))
+        self.assertLess(quality_rank('low'), quality_rank('medium'))
+        self.assertEqual(quality_rank('unknown'), -1)
+
+    @override_settings(MANIM_PREVIEW_QUALITY='bogus')
+    def test_unknown_preview_quality_falls_back_to_low(self):
+        self.assertEqual(get_preview_quality(), 'low')
+
+    @override_settings(MANIM_PREVIEW_QUALITY='medium', MANIM_RENDITION_QUALITIES='fourk, low, high,medium,bogus')
+    def test_renditions_are_above_the_preview_cheapest_first(self):
+        self.assertEqual(get_rendition_qualities(), ['high', 'fourk'])
+
+    @override_settings(MANIM_PREVIEW_QUALITY='low', MANIM_RENDITION_QUALITIES=['medium'])
+    def test_rendition_list_setting(self):
+        self.assertEqual(get_rendition_qualities(), ['medium'])
+
+
+@override_settings(MANIM_PREVIEW_QUALITY='low', MANIM_RENDITION_QUALITIES=['medium', 'high'])
+class RenditionTests(TestCase):
+    """Background renditions of a successful preview"""
+
+    def setUp(self):
+        script = Script.objects.create(prompt='Draw a circle', content='from manim import *')
+        self.preview = Execution.objects.create(
+            script=script, quality='low', is_successful=True, status='completed',
+            output_path='jobs/a/480p15/Scene.mp4', renditions={'low': {'output_path': 'jobs/a/480p15/Scene.mp4'}}
+        )
+
+    def test_enqueues_each_missing_quality_once(self):
+        agent = ManimExecutionAgent()
+
+        jobs = agent._enqueue_renditions(self.preview, 'from manim import *  # rendered')
+        self.preview.renditions['medium'] = {'output_path': 'jobs/b/720p30/Scene.mp4'}
+
+        self.assertEqual([(job.quality, job.status, job.source_execution_id) for job in jobs],
+                         [('medium', 'queued', self.preview.id), ('high', 'queued', self.preview.id)])
+        self.assertEqual(jobs[0].original_script, 'from manim import *  # rendered')
+        self.assertEqual([job.quality for job in agent._enqueue_renditions(self.preview, '')], ['high'])
+
+    def test_best_rendition_becomes_the_preview_output(self):
+        for quality, output_path in (('high', 'jobs/c/1080p60/Scene.mp4'), ('medium', 'jobs/b/720p30/Scene.mp4')):
+            job = Execution.objects.create(script=self.preview.script, source_execution=self.preview, quality=quality)
+            agent = ManimExecutionAgent()
+            agent._set_quality(quality)
+            agent._record_rendition(job, output_path, {'Scene': output_path})
+
+        self.preview.refresh_from_db()
+        self.assertEqual(sorted(self.preview.renditions), ['high', 'low', 'medium'])
+        self.assertEqual(self.preview.output_path, 'jobs/c/1080p60/Scene.mp4')
+        self.assertEqual(self.preview.scene_outputs, {'Scene': 'jobs/c/1080p60/Scene.mp4'})
@@ -0,0 +1,196 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from agents.models import Script, Execution
+from agents.agents.execution_agent import ManimExecutionAgent
+from agents.agents.queue_agent import RenderQueueAgent
+
+SCRIPT = "from manim import *\n\nclass Demo(Scene):\n    def construct(self):\n        pass\n"
+
+
+@override_settings(MANIM_RENDITION_QUALITIES=[], RENDER_QUEUE_HEARTBEAT_INTERVAL=30, RENDER_QUEUE_STALE_AFTER=300)
+class RenderQueueAgentTests(TestCase):
+    """Claiming, batching and stale-job recovery of the render queue"""
+
+    def setUp(self):
+        self.queue = RenderQueueAgent(worker_id='worker-a')
+        self.script = Script.objects.create(prompt='p', content='from manim import *')
+
+    def test_claims_by_priority_then_age(self):
+        low = self.queue.enqueue(self.script, priority=20)
+        first = self.queue.enqueue(self.script, priority=10)
+        second = self.queue.enqueue(self.script, priority=10)
+
+        self.assertEqual(self.queue.claim_next().pk, first.pk)
+        self.assertEqual(self.queue.claim_next().pk, second.pk)
+        self.assertEqual(self.queue.claim_next().pk, low.pk)
+        self.assertIsNone(self.queue.claim_next())
+
+    def test_claim_marks_worker_and_heartbeat(self):
+        self.queue.enqueue(self.script)
+
+        claimed = self.queue.claim_next()
+
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, 'running')
+        self.assertEqual(claimed.worker_id, 'worker-a')
+        self.assertIsNotNone(claimed.heartbeat_at)
+
+    def test_batch_concurrency_limit(self):
+        batch = self.queue.enqueue_batch([self.script] * 3, max_concurrency=1)
+
+        claimed = self.queue.claim_next()
+        self.assertEqual(claimed.batch_id, batch.pk)
+        self.assertIsNone(self.queue.claim_next())
+
+        Execution.objects.filter(pk=claimed.pk).update(status='completed')
+        self.assertIsNotNone(self.queue.claim_next())
+
+    def test_requeues_job_without_recent_heartbeat(self):
+        self.queue.enqueue(self.script)
+        claimed = self.queue.claim_next()
+        long_ago = timezone.now() - timedelta(seconds=600)
+        Execution.objects.filter(pk=claimed.pk).update(heartbeat_at=long_ago, updated_at=long_ago)
+
+        self.assertEqual(self.queue.requeue_stale(), 1)
+
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, 'queued')
+        self.assertEqual(claimed.worker_id, '')
+
+    def test_keeps_job_with_recent_heartbeat(self):
+        self.queue.enqueue(self.script)
+        claimed = self.queue.claim_next()
+        long_ago = timezone.now() - timedelta(seconds=600)
+
+        # A long render saves nothing, only the heartbeat thread writes
+        Execution.objects.filter(pk=claimed.pk).update(updated_at=long_ago)
+        self.assertTrue(self.queue.beat(claimed))
+
+        self.assertEqual(self.queue.requeue_stale(), 0)
+
+    def test_keeps_job_saved_after_its_last_heartbeat(self):
+        self.queue.enqueue(self.script)
+        claimed = self.queue.claim_next()
+        long_ago = timezone.now() - timedelta(seconds=600)
+        Execution.objects.filter(pk=claimed.pk).update(heartbeat_at=long_ago)
+
+        self.assertEqual(self.queue.requeue_stale(), 0)
+
+    def test_beat_stops_once_job_moved_to_another_worker(self):
+        self.queue.enqueue(self.script)
+        claimed = self.queue.claim_next()
+        Execution.objects.filter(pk=claimed.pk).update(worker_id='worker-b')
+
+        self.assertFalse(self.queue.beat(claimed))
+
+    def test_stale_cutoff_covers_three_heartbeats(self):
+        with override_settings(RENDER_QUEUE_HEARTBEAT_INTERVAL=200, RENDER_QUEUE_STALE_AFTER=60):
+            self.assertEqual(RenderQueueAgent().stale_after, 600)
+
+    def test_run_marks_crashed_job_failed(self):
+        self.queue.enqueue(self.script)
+        claimed = self.queue.claim_next()
+
+        with mock.patch('agents.agents.execution_agent.ManimExecutionAgent.execute', side_effect=RuntimeError('boom')):
+            result = self.queue.run(claimed)
+
+        self.assertFalse(result["success"])
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, 'failed')
+        self.assertEqual(claimed.termination_reason, 'error')
+
+
+@override_settings(MANIM_RENDITION_QUALITIES=[], MANIM_SMOKE_RENDER='', RENDER_QUEUE_HEARTBEAT_INTERVAL=30,
+                   RENDER_QUEUE_STALE_AFTER=300)
+class LostClaimTests(TestCase):
+    """A worker whose job was requeued and claimed by another worker leaves it alone"""
+
+    def setUp(self):
+        self.first = RenderQueueAgent(worker_id='worker-a')
+        self.second = RenderQueueAgent(worker_id='worker-b')
+        self.script = Script.objects.create(prompt='p', content=SCRIPT)
+        checked = {"success": True, "scenes": ['Demo'], "diagnostics": [], "error": None}
+        for patcher in (
+            mock.patch('agents.agents.preflight.PreflightAgent.check', return_value=checked),
+            mock.patch.object(ManimExecutionAgent, '_select_container'),
+            mock.patch.object(ManimExecutionAgent, '_get_cache_keys', return_value=({}, None)),
+            mock.patch.object(ManimExecutionAgent, '_store_in_cache'),
+            mock.patch('agents.agents.retry_policy.RetryPolicy.backoff'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _take_over(self, execution):
+        """Let the first worker's job go stale and the second worker claim it"""
+        long_ago = timezone.now() - timedelta(seconds=600)
+        Execution.objects.filter(pk=execution.pk).update(heartbeat_at=long_ago, updated_at=long_ago)
+        self.assertEqual(self.second.requeue_stale(), 1)
+        self.assertEqual(self.second.claim_next().pk, execution.pk)
+
+    def test_render_finishing_after_a_takeover_does_not_overwrite_the_new_claim(self):
+        self.first.enqueue(self.script)
+        claimed = self.first.claim_next()
+
+        def render(*args, **kwargs):
+            self._take_over(claimed)
+            return {"success": True, "output": "", "output_path": "out.mp4", "scene_outputs": {"Demo": "out.mp4"}}
+
+        with mock.patch.object(ManimExecutionAgent, '_execute_script', side_effect=render):
+            result = self.first.run(claimed)
+
+        self.assertFalse(result["success"])
+        self.assertEqual(result["status"], 'lost_claim')
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, 'running')
+        self.assertEqual(claimed.worker_id, 'worker-b')
+        self.assertEqual(claimed.output_path, '')
+        self.script.refresh_from_db()
+        self.assertNotEqual(self.script.status, 'successful')
+
+    def test_failed_attempt_after_a_takeover_stops_the_run(self):
+        self.first.enqueue(self.script)
+        claimed = self.first.claim_next()
+        renders = []
+
+        def render(*args, **kwargs):
+            renders.append(args)
+            self._take_over(claimed)
+            return {"success": False, "error": "ValueError: boom"}
+
+        with mock.patch.object(ManimExecutionAgent, '_execute_script', side_effect=render), \
+                mock.patch('agents.agents.ai_agent.AIScriptDebuggingAgent.debug_script',
+                           return_value={"fixed_script": SCRIPT + "\n# fixed\n"}):
+            result = self.first.run(claimed)
+
+        self.assertEqual(result["status"], 'lost_claim')
+        self.assertEqual(len(renders), 1)
+        claimed.refresh_from_db()
+        self.assertEqual((claimed.status, claimed.worker_id, claimed.error), ('running', 'worker-b', ''))
+
+    def test_lost_claim_stops_the_next_attempt(self):
+        self.first.enqueue(self.script)
+        claimed = self.first.claim_next()
+        claim_lost = threading.Event()
+        claim_lost.set()
+        agent = ManimExecutionAgent(worker_id='worker-a', claim_lost=claim_lost)
+
+        with mock.patch.object(agent, '_execute_script') as render:
+            result = agent.execute(self.script, execution=claimed)
+
+        render.assert_not_called()
+        self.assertEqual(result["status"], 'lost_claim')
+
+    def test_heartbeat_reports_a_lost_claim(self):
+        self.first.heartbeat_interval = 0.01
+        stop, claim_lost = threading.Event(), threading.Event()
+
+        with mock.patch.object(self.first, 'beat', return_value=False):
+            thread = threading.Thread(target=self.first._heartbeat, args=(mock.Mock(id='x'), stop, claim_lost))
+            thread.start()
+            thread.join(5)
+
+        self.assertTrue(claim_lost.is_set())
+        self.assertFalse(thread.is_alive())
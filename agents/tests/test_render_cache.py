@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from agents.agents.render_cache import RenderCacheAgent
+from agents.models import RenderCacheEntry
+
+
+class RenderCacheTests(TestCase):
+    """Content-addressed render cache"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=self.media_root, MANIM_IMAGE_VERSION='v1',
+                                      MANIM_RENDER_CACHE_MAX_BYTES=10)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.cache = RenderCacheAgent()
+
+    def _render(self, name, content=b'video'):
+        output_path = f"jobs/{name}/videos/script/480p15/Scene.mp4"
+        full_path = os.path.join(self.media_root, output_path)
+        os.makedirs(os.path.dirname(full_path))
+        with open(full_path, 'wb') as f:
+            f.write(content)
+        return output_path
+
+    def _path(self, output_path):
+        return os.path.join(self.media_root, output_path)
+
+    def test_key_ignores_formatting_and_comments(self):
+        first = self.cache.make_key("```python\nx = 1  # one\n```", 'Scene', '-ql', 'v1')
+        second = self.cache.make_key("\n\nx=1\n", 'Scene', '-ql', 'v1')
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, self.cache.make_key("x = 2", 'Scene', '-ql', 'v1'))
+        self.assertNotEqual(first, self.cache.make_key("x = 1", 'Scene', '-qh', 'v1'))
+        self.assertNotEqual(first, self.cache.make_key("x = 1", 'Scene', '-ql', 'v2'))
+
+    def test_store_copies_the_render(self):
+        output_path = self._render('a')
+
+        entry = self.cache.store('ab' * 32, output_path, 'Scene', '-ql', 'v1')
+
+        self.assertEqual(entry.output_path, f"render_cache/ab/{'ab' * 32}.mp4")
+        self.assertEqual(entry.size_bytes, 5)
+        self.assertNotEqual(os.stat(self._path(output_path)).st_ino, os.stat(self._path(entry.output_path)).st_ino)
+        self.assertEqual(os.listdir(os.path.dirname(self._path(entry.output_path))), [f"{'ab' * 32}.mp4"])
+
+    def test_checkout_survives_eviction(self):
+        entry = self.cache.store('ab' * 32, self._render('a'), 'Scene', '-ql', 'v1')
+        hit = self.cache.lookup('ab' * 32)
+
+        served = self.cache.checkout(hit)
+        self.cache.max_bytes = 6
+        self.cache.store('cd' * 32, self._render('b', b'other'), 'Scene', '-ql', 'v1')
+
+        self.assertTrue(served.startswith('jobs/') and served.endswith('/Scene.mp4'))
+        self.assertNotEqual(served, self.cache.checkout(self.cache.lookup('cd' * 32)))
+        self.assertFalse(RenderCacheEntry.objects.filter(key='ab' * 32).exists())
+        self.assertFalse(os.path.exists(self._path(entry.output_path)))
+        with open(self._path(served), 'rb') as f:
+            self.assertEqual(f.read(), b'video')
+
+    def test_lookup_counts_hits_and_drops_missing_files(self):
+        entry = self.cache.store('ab' * 32, self._render('a'), 'Scene', '-ql', 'v1')
+
+        self.assertEqual(self.cache.lookup('ab' * 32).hit_count, 1)
+        self.assertIsNone(self.cache.lookup('ef' * 32))
+
+        os.unlink(self._path(entry.output_path))
+        self.assertIsNone(self.cache.lookup('ab' * 32))
+        self.assertFalse(RenderCacheEntry.objects.exists())
+
+    def test_evicts_least_recently_used_first(self):
+        self.cache.max_bytes = 10
+        for key, name in (('ab', 'a'), ('cd', 'b')):
+            self.cache.store(key * 32, self._render(name), 'Scene', '-ql', 'v1')
+        RenderCacheEntry.objects.filter(key='cd' * 32).update(last_used_at=timezone.now() - timedelta(hours=1))
+
+        self.cache.store('ef' * 32, self._render('c'), 'Scene', '-ql', 'v1')
+
+        self.assertEqual(sorted(RenderCacheEntry.objects.values_list('key', flat=True)), ['ab' * 32, 'ef' * 32])
+
+    @override_settings(MANIM_RENDER_CACHE_ENABLED=False)
+    def test_disabled_cache_stores_nothing(self):
+        cache = RenderCacheAgent()
+
+        self.assertIsNone(cache.store('ab' * 32, self._render('a'), 'Scene', '-ql', 'v1'))
+        self.assertIsNone(cache.lookup('ab' * 32))
+
+    def test_execution_served_from_cache_gets_its_own_video(self):
+        from agents.agents.execution_agent import ManimExecutionAgent
+
+        self.cache.max_bytes = 100
+        self.cache.store('ab' * 32, self._render('a'), 'Scene', '-ql', 'v1')
+        agent = ManimExecutionAgent()
+        agent.render_cache = self.cache
+
+        result = agent._serve_from_cache({'Scene': 'ab' * 32}, None, None)
+        self.cache.max_bytes = 0
+        self.cache.evict()
+
+        self.assertTrue(result['cached'])
+        self.assertTrue(result['output_path'].startswith('jobs/'))
+        self.assertEqual(result['scene_outputs'], {'Scene': result['output_path']})
+        self.assertTrue(os.path.exists(self._path(result['output_path'])))
+        self.assertIsNone(agent._serve_from_cache({'Scene': 'cd' * 32}, None, None))
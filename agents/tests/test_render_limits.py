@@ -0,0 +1,122 @@
+import json
+import os
+import stat
+import shutil
+import signal
+import socket
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+import render_daemon
+from agents.agents.docker_agent import DockerAgent
+
+
+@override_settings(DOCKER_TRANSPORT='cli', DOCKER_SOCKET='/nonexistent/docker.sock', MANIM_RENDER_KILL_GRACE=10)
+class LimitCommandTests(SimpleTestCase):
+    """Limits wrapped around docker exec renders"""
+
+    def setUp(self):
+        self.agent = DockerAgent()
+
+    def test_no_limits_leave_the_command_alone(self):
+        self.assertEqual(self.agent._limit_command("python -m manim"), "python -m manim")
+
+    def test_timeout_and_rlimits(self):
+        wrapped = self.agent._limit_command("cd /manim && python -m manim", timeout=60,
+                                            memory_limit_mb=1024, cpu_seconds=30)
+
+        self.assertEqual(
+            wrapped,
+            "timeout --kill-after=10 60 prlimit --as=1073741824 --cpu=30 bash -c 'cd /manim && python -m manim'"
+        )
+
+    def test_memory_error_is_not_oom(self):
+        process = {"returncode": 1, "stderr": "Traceback ...\nMemoryError"}
+
+        self.assertEqual(self.agent._classify_kill(process, 60, 5), (False, False))
+
+    def test_sigkill_before_the_deadline_is_oom(self):
+        process = {"returncode": DockerAgent.KILLED_EXIT, "stderr": ""}
+
+        self.assertEqual(self.agent._classify_kill(process, 60, 5), (False, True))
+
+    def test_sigkill_after_the_deadline_is_a_timeout(self):
+        process = {"returncode": DockerAgent.KILLED_EXIT, "stderr": ""}
+
+        self.assertEqual(self.agent._classify_kill(process, 60, 70), (True, False))
+        self.assertEqual(self.agent._classify_kill({"returncode": DockerAgent.TIMEOUT_EXIT, "stderr": ""}, 60, 60),
+                         (True, False))
+
+
+class RenderDaemonJobTests(SimpleTestCase):
+    """Results the render daemon reports for jobs that fail or get killed"""
+
+    def _run(self, run_module, **request):
+        """Serve one job over a socket pair with manim replaced by run_module"""
+        client, server = socket.socketpair()
+        self.addCleanup(client.close)
+        client.sendall((json.dumps({"args": ["script.py"], "cwd": os.getcwd(), **request}) + "\n").encode())
+
+        with mock.patch.object(render_daemon.runpy, 'run_module', side_effect=run_module):
+            render_daemon.handle_connection(server, "test")
+        server.close()
+
+        messages = [json.loads(line) for line in client.makefile("rb")]
+        return messages[-1], "".join(m["data"] for m in messages if m["type"] == "output")
+
+    def test_memory_error_is_an_ordinary_failure(self):
+        def run_module(*args, **kwargs):
+            raise MemoryError()
+
+        result, output = self._run(run_module, memory_mb=0)
+
+        self.assertEqual(result["returncode"], 1)
+        self.assertFalse(result["oom"])
+        self.assertIn("MemoryError", output)
+
+    def test_sigkill_is_oom(self):
+        def run_module(*args, **kwargs):
+            os.kill(os.getpid(), signal.SIGKILL)
+
+        result, _ = self._run(run_module)
+
+        self.assertEqual(result["returncode"], -signal.SIGKILL)
+        self.assertTrue(result["oom"])
+        self.assertFalse(result["timed_out"])
+
+    def test_timeout_kills_the_job(self):
+        def run_module(*args, **kwargs):
+            signal.pause()
+
+        result, _ = self._run(run_module, timeout=0.2)
+
+        self.assertTrue(result["timed_out"])
+        self.assertFalse(result["oom"])
+
+
+class RenderDaemonSocketTests(SimpleTestCase):
+    """Who may connect to the render daemon's job socket"""
+
+    def test_socket_is_only_open_to_the_group_of_its_directory(self):
+        socket_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, socket_dir, ignore_errors=True)
+        socket_path = os.path.join(socket_dir, "render_daemon", "omega-manim.sock")
+
+        server = render_daemon.bind_socket(socket_path)
+        self.addCleanup(server.close)
+
+        status = os.stat(socket_path)
+        self.assertEqual(stat.S_IMODE(status.st_mode), 0o660)
+        self.assertEqual(status.st_gid, os.stat(os.path.dirname(socket_path)).st_gid)
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.dirname(socket_path)).st_mode) & 0o007, 0)
+
+    def test_stale_socket_is_replaced(self):
+        socket_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, socket_dir, ignore_errors=True)
+        socket_path = os.path.join(socket_dir, "omega-manim.sock")
+
+        render_daemon.bind_socket(socket_path).close()
+        server = render_daemon.bind_socket(socket_path)
+        self.addCleanup(server.close)
+
+        self.assertTrue(stat.S_ISSOCK(os.stat(socket_path).st_mode))
@@ -0,0 +1,59 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from agents.agents.retry_policy import RetryPolicy
+
+
+@override_settings(MANIM_MAX_ATTEMPTS=3, MANIM_RETRY_WALL_CLOCK_BUDGET=60, MANIM_RETRY_TOKEN_BUDGET=1000,
+                   MANIM_RETRY_MAX_UNCHANGED=2, MANIM_RETRY_BACKOFF_BASE=1.0, MANIM_RETRY_BACKOFF_MAX=4.0)
+class RetryPolicyTests(SimpleTestCase):
+    """Bounds of the debug-and-retry loop"""
+
+    def setUp(self):
+        self.policy = RetryPolicy()
+        self.policy.start("a = 1\n")
+
+    def test_attempt_cap(self):
+        self.assertIsNone(self.policy.check_budget(2))
+        self.assertEqual(self.policy.check_budget(3), RetryPolicy.MAX_ATTEMPTS)
+        self.assertEqual(RetryPolicy(max_attempts=1).max_attempts, 1)
+
+    def test_token_budget(self):
+        self.policy.record_tokens(600)
+        self.assertIsNone(self.policy.check_budget(1))
+
+        self.policy.record_tokens(400)
+        self.assertEqual(self.policy.check_budget(1), RetryPolicy.TOKEN_BUDGET)
+
+    def test_wall_clock_budget(self):
+        with mock.patch('agents.agents.retry_policy.time.monotonic', return_value=self.policy.started + 61):
+            self.assertEqual(self.policy.check_budget(1), RetryPolicy.WALL_CLOCK)
+
+    def test_unchanged_fixes_stop_after_the_cap(self):
+        self.assertIsNone(self.policy.record_fix("a = 1   \n\n"))
+        self.assertEqual(self.policy.record_fix("a = 1"), RetryPolicy.NO_PROGRESS)
+
+    def test_returning_to_an_earlier_version_is_a_cycle(self):
+        self.assertIsNone(self.policy.record_fix("a = 2"))
+        self.assertIsNone(self.policy.record_fix("a = 3"))
+        self.assertEqual(self.policy.record_fix("a = 1"), RetryPolicy.CYCLE)
+
+    def test_progress_resets_the_unchanged_count(self):
+        self.assertIsNone(self.policy.record_fix("a = 1"))
+        self.assertIsNone(self.policy.record_fix("a = 2"))
+        self.assertIsNone(self.policy.record_fix("a = 2"))
+
+    def test_rewrite_becomes_the_current_version(self):
+        self.policy.record_rewrite("a = 2")
+
+        self.assertIsNone(self.policy.record_fix("a = 2"))
+        self.assertEqual(self.policy.record_fix("a = 1"), RetryPolicy.CYCLE)
+
+    @mock.patch('agents.agents.retry_policy.time.sleep')
+    def test_backoff_doubles_up_to_the_cap_and_the_budget(self, sleep):
+        self.assertEqual([self.policy.backoff(attempt) for attempt in (1, 2, 3, 4)], [1.0, 2.0, 4.0, 4.0])
+
+        with mock.patch('agents.agents.retry_policy.time.monotonic', return_value=self.policy.started + 58.5):
+            self.assertEqual(self.policy.backoff(3), 1.5)
+        with mock.patch('agents.agents.retry_policy.time.monotonic', return_value=self.policy.started + 70):
+            self.assertEqual(self.policy.backoff(3), 0.0)
+        self.assertEqual(sleep.call_count, 5)
@@ -0,0 +1,85 @@
+from django.test import SimpleTestCase
+from agents.agents import scene_analysis
+from agents.agents.scene_analysis import analyze_scenes, find_scene_classes
+
+
+class SceneAnalysisTests(SimpleTestCase):
+    """Scene discovery and animation estimates"""
+
+    def test_finds_scenes_in_source_order(self):
+        script = """
+from manim import *
+import manim
+
+class Intro(manim.MovingCameraScene):
+    def construct(self):
+        self.play(Create(Circle()))
+
+class Helper:
+    def construct(self):
+        pass
+
+class Outro(ThreeDScene):
+    def construct(self):
+        self.wait()
+"""
+        self.assertEqual(find_scene_classes(script), ['Intro', 'Outro'])
+
+    def test_follows_local_base_classes(self):
+        script = """
+class Base(Scene):
+    def construct(self):
+        self.play(FadeIn(Square()))
+
+class Child(Base):
+    pass
+
+class Abstract(Scene):
+    pass
+"""
+        scenes = {scene["name"]: scene for scene in analyze_scenes(script)["scenes"]}
+
+        self.assertEqual(list(scenes), ['Base', 'Child'])
+        self.assertEqual(scenes['Child']["bases"], ['Base', 'Scene'])
+        self.assertEqual(scenes['Child']["animations"], 1)
+
+    def test_unknown_scene_bases_count_as_manim_scenes(self):
+        script = "class Demo(VoiceoverScene):\n    def construct(self):\n        pass\n"
+
+        self.assertEqual(find_scene_classes(script), ['Demo'])
+
+    def test_class_cycles_are_not_scenes(self):
+        self.assertEqual(find_scene_classes("class A(B):\n    pass\nclass B(A):\n    def construct(self): pass\n"), [])
+
+    def test_counts_animations_with_loops_and_branches(self):
+        script = """
+class Demo(Scene):
+    def construct(self):
+        self.play(Write(Text("a")))
+        for i in range(4):
+            self.play(Indicate(dot))
+        for item in items:
+            self.wait()
+        if ready:
+            self.play(A())
+            self.play(B())
+        else:
+            self.play(C())
+        def later():
+            self.play(D())
+"""
+        scene = analyze_scenes(script)["scenes"][0]
+
+        self.assertEqual(scene["animations"], 1 + 4 + 3 + 2)
+
+    def test_syntax_error(self):
+        analysis = analyze_scenes("class Demo(Scene:\n")
+
+        self.assertEqual(analysis["scenes"], [])
+        self.assertTrue(analysis["error"].startswith("line 1:"))
+
+    def test_results_are_memoized(self):
+        script = "class Demo(Scene):\n    def construct(self):\n        pass\n"
+
+        self.assertIs(analyze_scenes(script), analyze_scenes(script))
+        self.assertLessEqual(len(scene_analysis._cache), scene_analysis.CACHE_SIZE)
@@ -0,0 +1,89 @@
+import os
+import time
+import shutil
+import tempfile
+from django.test import SimpleTestCase, override_settings
+from agents.agents.scratch import ScratchSpaceAgent
+
+
+class ScratchReapTests(SimpleTestCase):
+    """Orphans removed by the scratch reaper, and what it must leave alone"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.scratch_root = tempfile.mkdtemp()
+        overrides = override_settings(MEDIA_ROOT=self.media_root, MANIM_SCRATCH_DIR=self.scratch_root,
+                                      MANIM_SCRATCH_TTL=3600)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.scratch_root, ignore_errors=True)
+        self.agent = ScratchSpaceAgent()
+
+    def _job(self, name, files, age=7200):
+        """Job directory under MEDIA_ROOT/jobs with every file and directory aged by age seconds"""
+        path = os.path.join(self.media_root, 'jobs', name)
+        for relative in files:
+            full_path = os.path.join(path, relative)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'w') as f:
+                f.write('x')
+        os.makedirs(path, exist_ok=True)
+        stamp = time.time() - age
+        for root, dirs, names in os.walk(path):
+            for name in dirs + names:
+                os.utime(os.path.join(root, name), (stamp, stamp))
+        os.utime(path, (stamp, stamp))
+        return path
+
+    def test_old_scratch_directories_are_removed(self):
+        old = os.path.join(self.scratch_root, 'job_old')
+        new = os.path.join(self.scratch_root, 'job_new')
+        other = os.path.join(self.scratch_root, 'keep')
+        for path in (old, new, other):
+            os.makedirs(path)
+        stamp = time.time() - 7200
+        os.utime(old, (stamp, stamp))
+        os.utime(other, (stamp, stamp))
+
+        self.assertEqual(self.agent.reap(), 1)
+
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(new))
+        self.assertTrue(os.path.exists(other))
+
+    def test_crashed_job_directories_are_removed(self):
+        crashed = self._job('crashed', ['script.py', 'videos/script/480p15/partial_movie_files/A/1.mp4'])
+        empty = self._job('empty', [])
+        no_video = self._job('no-video', ['videos/script/480p15/partial_movie_files/A/list.txt'])
+
+        self.assertEqual(self.agent.reap(), 3)
+
+        for path in (crashed, empty, no_video):
+            self.assertFalse(os.path.exists(path))
+
+    def test_finished_jobs_keep_their_videos(self):
+        rendered = self._job('rendered', ['videos/script/480p15/A.mp4', 'videos/script/480p15/B.mp4'])
+        cached = self._job('cached', ['A.mp4'])
+
+        self.assertEqual(self.agent.reap(), 0)
+
+        self.assertTrue(os.path.exists(os.path.join(rendered, 'videos/script/480p15/A.mp4')))
+        self.assertTrue(os.path.exists(os.path.join(cached, 'A.mp4')))
+
+    def test_running_jobs_are_left_alone(self):
+        running = self._job('running', ['script.py'])
+        # Manim is still writing partial movie files deep in the tree
+        partial = os.path.join(running, 'videos/script/480p15/partial_movie_files/A/1.mp4')
+        os.makedirs(os.path.dirname(partial))
+        with open(partial, 'w') as f:
+            f.write('x')
+        fresh = self._job('fresh', ['script.py'], age=60)
+
+        self.assertEqual(self.agent.reap(), 0)
+
+        self.assertTrue(os.path.exists(running))
+        self.assertTrue(os.path.exists(fresh))
+
+    def test_missing_jobs_directory(self):
+        self.assertEqual(self.agent.reap(), 0)
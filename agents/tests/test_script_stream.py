@@ -0,0 +1,197 @@
+import threading
+from types import SimpleNamespace
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from agents.agents.ai_agent import AIScriptGenerationAgent, close_response
+from agents.agents.script_stream import ScriptStreamParser
+
+SCRIPT = """from manim import *
+
+class Demo(Scene):
+    def construct(self):
+        self.play(Create(Circle()))
+"""
+
+
+def stream(text, size=7):
+    """Feed text to a parser in chunks the way a provider streams it"""
+    parser = ScriptStreamParser()
+    for start in range(0, len(text), size):
+        if parser.feed(text[start:start + size]) or parser.complete:
+            return parser
+    parser.finish()
+    return parser
+
+
+class ScriptStreamParserTests(SimpleTestCase):
+    """Generated scripts checked while they stream in"""
+
+    def test_plain_script(self):
+        parser = stream(SCRIPT)
+
+        self.assertIsNone(parser.rejection)
+        self.assertEqual(parser.script(), SCRIPT.strip())
+
+    def test_closing_fence_ends_the_script(self):
+        parser = stream(f"```python\n{SCRIPT}```\nThis draws a circle.\n")
+
+        self.assertTrue(parser.complete)
+        self.assertIsNone(parser.rejection)
+        self.assertEqual(parser.script(), SCRIPT.strip())
+        self.assertNotIn("This draws", parser.text)
+
+    def test_prose_after_a_complete_scene_ends_the_script(self):
+        parser = stream(f"{SCRIPT}\nThis scene draws a circle for you.\n")
+
+        self.assertTrue(parser.complete)
+        self.assertIsNone(parser.rejection)
+        self.assertEqual(parser.script(), SCRIPT.strip())
+
+    def test_prose_instead_of_code(self):
+        parser = stream(f"Here is the script you asked for:\n{SCRIPT}")
+
+        self.assertEqual(parser.rejection, "prose instead of code at line 1")
+
+    def test_markdown_instead_of_code(self):
+        self.assertEqual(stream(f"**Script**\n{SCRIPT}").rejection, "markdown instead of code at line 1")
+        self.assertEqual(stream("```\n```\n").rejection, "markdown instead of code")
+
+    def test_syntax_error_rejects_the_stream_before_it_ends(self):
+        broken = SCRIPT.replace("Circle()))", "Circle())) )") + "        self.wait()\n" * 20
+
+        parser = stream(broken)
+
+        self.assertEqual(parser.rejection, "syntax error at line 5: unmatched ')'")
+        self.assertLess(len(parser.text), len(broken))
+
+    def test_incomplete_code_is_not_an_error(self):
+        parser = ScriptStreamParser()
+
+        for line in ("from manim import *\n", "\n", "class Demo(Scene):\n", "    def construct(self):\n",
+                     "        self.play(\n", "            Create(Circle()),\n"):
+            self.assertIsNone(parser.feed(line))
+        self.assertIsNone(parser.feed("        )\n"))
+        self.assertIsNone(parser.finish())
+
+    def test_header_is_found_once_imports_and_class_have_arrived(self):
+        parser = ScriptStreamParser()
+
+        parser.feed("from manim import *\n\n")
+        self.assertIsNone(parser.header)
+        parser.feed("class Demo(Scene):\n    def")
+        self.assertEqual(parser.header, "from manim import *\n\nclass Demo(Scene):")
+
+
+class GeminiStream:
+    """Gemini-like streamed response: no close() of its own, a cancellable stream underneath"""
+
+    def __init__(self, pieces):
+        self._iterator = mock.Mock(spec=["cancel"])
+        self.pieces = pieces
+        self.usage_metadata = SimpleNamespace(total_token_count=42)
+
+    def __iter__(self):
+        for piece in self.pieces:
+            yield SimpleNamespace(text=piece)
+
+
+@override_settings(AI_STREAM_MAX_RESAMPLES=0, AI_STREAM_WARMUP_TTL=30)
+class StreamedGenerationTests(SimpleTestCase):
+    """Provider streams are cancelled when the caller stops reading them"""
+
+    def setUp(self):
+        self.agent = AIScriptGenerationAgent()
+        self.model = mock.Mock()
+        patcher = mock.patch('agents.agents.ai_agent.provider_clients.get_gemini', return_value=self.model)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.provider = SimpleNamespace(api_key='key', model_name='gemini', pk=1)
+
+    def test_gemini_stream_is_cancelled_when_the_script_is_complete(self):
+        response = GeminiStream([f"```python\n{SCRIPT}```\n", "Some explanation\n" * 50])
+        self.model.client.generate_content.return_value = response
+
+        with mock.patch.object(self.agent, '_start_warmup'):
+            script = self.agent._generate_streaming("prompt", self.provider, 'gemini')
+
+        self.assertEqual(script, SCRIPT.strip())
+        response._iterator.cancel.assert_called_once_with()
+
+    def test_gemini_stream_is_cancelled_when_the_caller_stops(self):
+        response = GeminiStream(["from manim import *\n", "\n"])
+        self.model.client.generate_content.return_value = response
+
+        chunks = self.agent._stream_with_gemini("prompt", self.provider)
+        next(chunks)
+        response._iterator.cancel.assert_not_called()
+        chunks.close()
+
+        response._iterator.cancel.assert_called_once_with()
+        self.model.record.assert_not_called()
+
+    def test_complete_gemini_stream_reports_usage(self):
+        self.model.client.generate_content.return_value = GeminiStream([SCRIPT])
+
+        self.assertEqual("".join(self.agent._stream_with_gemini("prompt", self.provider)), SCRIPT)
+        self.assertEqual(self.agent.last_token_usage, 42)
+        self.model.record.assert_called_once_with(mock.ANY)
+
+    def test_close_response_prefers_the_response_itself(self):
+        response = mock.Mock()
+
+        close_response(response)
+
+        response.close.assert_called_once_with()
+        response._iterator.cancel.assert_not_called()
+
+
+class WarmupTests(SimpleTestCase):
+    """Warm-ups started by streamed generations"""
+
+    def setUp(self):
+        patcher = mock.patch.multiple(AIScriptGenerationAgent, _warmup_thread=None, _last_warmup=0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.warmed = []
+
+    def _agent(self, ttl):
+        with override_settings(AI_STREAM_WARMUP_TTL=ttl):
+            agent = AIScriptGenerationAgent()
+        agent._warm_up = lambda header: (self.warmed.append(header), self.release.wait(5))
+        return agent
+
+    def test_no_thread_before_the_first_warmup(self):
+        self.assertIsNone(AIScriptGenerationAgent._warmup_thread)
+
+    def test_warmup_runs_in_a_daemon_thread(self):
+        self._agent(0)._start_warmup("header")
+
+        thread = AIScriptGenerationAgent._warmup_thread
+        self.assertTrue(thread.daemon)
+        self.release.set()
+        thread.join(5)
+        self.assertEqual(self.warmed, ["header"])
+
+    def test_running_warmup_is_not_started_again(self):
+        first, second = self._agent(0), self._agent(0)
+
+        first._start_warmup("first")
+        thread = AIScriptGenerationAgent._warmup_thread
+        second._start_warmup("second")
+        self.release.set()
+        thread.join(5)
+
+        self.assertIs(AIScriptGenerationAgent._warmup_thread, thread)
+        self.assertEqual(self.warmed, ["first"])
+
+    def test_recent_warmup_is_not_repeated(self):
+        agent = self._agent(30)
+        self.release.set()
+
+        agent._start_warmup("first")
+        AIScriptGenerationAgent._warmup_thread.join(5)
+        agent._start_warmup("second")
+
+        self.assertEqual(self.warmed, ["first"])
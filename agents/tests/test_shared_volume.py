@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from agents.agents.execution_agent import ManimExecutionAgent
+
+
+class SharedVolumeTransportTests(SimpleTestCase):
+    """Scripts and videos handed over through the media directory shared with the container"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        overrides = override_settings(
+            MEDIA_ROOT=self.media_root, MANIM_TRANSPORT='shared_volume', MANIM_WORKING_DIR='/manim',
+            MANIM_CONTAINER_MEDIA_ROOT=None, MANIM_PREVIEW_QUALITY='low', DOCKER_TRANSPORT='cli',
+            DOCKER_SOCKET='/nonexistent/docker.sock'
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        self.agent = ManimExecutionAgent()
+        self.agent.docker_agent = mock.Mock()
+        self.commands = []
+
+    def _host_path(self, container_path):
+        return container_path.replace('/manim/media', self.media_root, 1)
+
+    def _render(self, scenes, success=True):
+        """Fake execute_command: check the script is in place and write a video per scene"""
+        def execute_command(container, command, **kwargs):
+            self.commands.append(command)
+            args = command.split()
+            script_path = self._host_path(args[3])
+            media_dir = self._host_path(args[args.index('--media_dir') + 1])
+            with open(script_path) as f:
+                self.scripts.append(f.read())
+            for scene in scenes:
+                video_dir = os.path.join(media_dir, 'videos', 'script', '480p15')
+                os.makedirs(os.path.join(video_dir, 'partial_movie_files'), exist_ok=True)
+                with open(os.path.join(video_dir, f'{scene}.mp4'), 'wb') as f:
+                    f.write(b'video')
+            return {"success": success, "stdout": "rendered", "stderr": "" if success else "boom"}
+
+        self.scripts = []
+        self.agent.docker_agent.execute_command.side_effect = execute_command
+
+    def test_renders_every_scene_in_one_invocation(self):
+        self._render(['A', 'B'])
+
+        result = self.agent._execute_script("```python\nfrom manim import *\n```", ['A', 'B'], 'id')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(self.scripts, ['from manim import *'])
+        self.assertEqual(len(self.commands), 1)
+        job = result['output_path'].split('/')[1]
+        self.assertEqual(result['scene_outputs'], {
+            'A': f'jobs/{job}/videos/script/480p15/A.mp4',
+            'B': f'jobs/{job}/videos/script/480p15/B.mp4'
+        })
+        self.assertIn(f'/manim/media/jobs/{job}/script.py A B -ql --media_dir /manim/media/jobs/{job}',
+                      self.commands[0])
+
+    def test_keeps_only_videos_of_successful_render(self):
+        self._render(['A'])
+
+        result = self.agent._execute_script("from manim import *", ['A'], 'id')
+
+        job_dir = os.path.join(self.media_root, os.path.dirname(result['output_path']).split('/videos')[0])
+        remaining = sorted(
+            os.path.relpath(os.path.join(root, name), job_dir)
+            for root, dirs, files in os.walk(job_dir) for name in files + dirs
+        )
+        self.assertEqual(remaining, ['videos', 'videos/script', 'videos/script/480p15', 'videos/script/480p15/A.mp4'])
+
+    def test_removes_job_directory_of_failed_render(self):
+        self._render([], success=False)
+
+        result = self.agent._execute_script("from manim import *", ['A'], 'id')
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'boom')
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'jobs')), [])
+
+    def test_missing_video_is_a_failure(self):
+        self._render(['A'])
+
+        result = self.agent._execute_script("from manim import *", ['A', 'B'], 'id')
+
+        self.assertFalse(result['success'])
+
+    def test_smoke_render_keeps_nothing(self):
+        self._render([])
+
+        result = self.agent._execute_script("from manim import *", ['A'], 'id', smoke=True)
+
+        self.assertTrue(result['success'])
+        self.assertIn('--dry_run', self.commands[0])
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'jobs')), [])
+
+    def test_custom_container_media_root(self):
+        self._render(['A'])
+        self.agent.container_media_root = '/manim/media'
+
+        self.assertTrue(self.agent._execute_script("from manim import *", ['A'], 'id')['success'])
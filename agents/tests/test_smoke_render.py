@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from agents.agents.execution_agent import ManimExecutionAgent
+
+
+class SmokeRenderTests(SimpleTestCase):
+    """Smoke renders that check construct() before the full render"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        overrides = override_settings(
+            MEDIA_ROOT=self.media_root, MANIM_TRANSPORT='shared_volume', MANIM_WORKING_DIR='/manim',
+            MANIM_CONTAINER_MEDIA_ROOT=None, MANIM_PREVIEW_QUALITY='low', DOCKER_TRANSPORT='cli',
+            DOCKER_SOCKET='/nonexistent/docker.sock'
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def _agent(self, mode):
+        with override_settings(MANIM_SMOKE_RENDER=mode):
+            agent = ManimExecutionAgent()
+        agent.docker_agent = mock.Mock()
+        agent.docker_agent.execute_command.return_value = {"success": True, "stdout": "", "stderr": ""}
+        return agent
+
+    def test_dry_run_is_the_default_mode(self):
+        agent = ManimExecutionAgent()
+
+        self.assertEqual(agent.smoke_mode, 'dry_run')
+        self.assertEqual(agent._smoke_flags(), "-ql --dry_run")
+
+    def test_last_frame_mode_renders_only_the_last_frame(self):
+        self.assertEqual(self._agent('last_frame')._smoke_flags(), "-ql -s --disable_caching")
+
+    def test_smoke_render_uses_the_smoke_flags(self):
+        agent = self._agent('dry_run')
+
+        result = agent._execute_script("from manim import *", ['A'], 'id', smoke=True)
+
+        self.assertTrue(result['success'])
+        command = agent.docker_agent.execute_command.call_args[0][1]
+        self.assertIn("--dry_run", command)
+        self.assertNotIn("-qh", command)
+
+    def test_runs_are_recorded_on_the_execution(self):
+        agent = self._agent('last_frame')
+        agent.events = mock.Mock()
+        execution = SimpleNamespace(smoke_runs=[], smoke_seconds=0)
+        outcomes = iter([{"success": False, "error": "boom"}, {"success": True}])
+
+        with mock.patch.object(agent, '_execute_script', side_effect=lambda *args, **kwargs: next(outcomes)):
+            first = agent._smoke_render("script", ['A'], 'id', 1, execution)
+            second = agent._smoke_render("script", ['A'], 'id', 2, execution)
+
+        self.assertFalse(first['success'])
+        self.assertTrue(second['success'])
+        self.assertEqual(
+            [(run['attempt'], run['mode'], run['success']) for run in execution.smoke_runs],
+            [(1, 'last_frame', False), (2, 'last_frame', True)]
+        )
+        self.assertEqual(execution.smoke_seconds, sum(run['seconds'] for run in execution.smoke_runs))
+        agent.events.status.assert_called_with('smoke_render', attempt=2, mode='last_frame',
+                                               success=True, seconds=mock.ANY)
+
+    def test_smoke_render_without_execution(self):
+        agent = self._agent('dry_run')
+        agent.events = mock.Mock()
+
+        with mock.patch.object(agent, '_execute_script', return_value={"success": True}) as execute:
+            self.assertTrue(agent._smoke_render("script", ['A'], 'id', 1)['success'])
+
+        execute.assert_called_once_with("script", ['A'], 'id', smoke=True)
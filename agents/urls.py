@@ -6,10 +6,14 @@ from . import views
 router = DefaultRouter()
 router.register(r'scripts', views.ScriptViewSet)
 router.register(r'executions', views.ExecutionViewSet)
+router.register(r'batches', views.ExecutionBatchViewSet)
 router.register(r'providers', views.AIProviderViewSet)
 router.register(r'containers', views.ContainerViewSet)
 
 urlpatterns = [
+    # Server-Sent Events stream of an execution's progress
+    path('executions/<uuid:pk>/events', views.execution_events, name='execution-events'),
+    
     # Include the router URLs
     path('', include(router.urls)),
 ] 
\ No newline at end of file
@@ -1,21 +1,37 @@
+import json
+import asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.shortcuts import get_object_or_404
 
-from .models import Script, Execution, AIProvider, Container
+from .models import Script, Execution, ExecutionBatch, ExecutionEvent, AIProvider, Container
 from .agents.ai_agent import AIScriptGenerationAgent
-from .agents.execution_agent import ManimExecutionAgent
+from .agents.queue_agent import RenderQueueAgent
+from .agents.progress import event_hub
 from .serializers import (
     ScriptSerializer,
     ExecutionSerializer,
     AIProviderSerializer,
     ContainerSerializer,
-    ScriptGenerationSerializer
+    ScriptGenerationSerializer,
+    BatchExecuteSerializer,
+    ExecutionBatchSerializer
 )
 
+# Salt of the short-lived tokens that open one execution's event stream
+EVENTS_TOKEN_SALT = 'agents.execution-events'
+
 class ScriptViewSet(viewsets.ModelViewSet):
     """API endpoint for Manim scripts"""
     queryset = Script.objects.all()
@@ -24,30 +40,48 @@ class ScriptViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def execute(self, request, pk=None):
-        """Execute the script"""
+        """Queue the script for execution"""
         script = self.get_object()
         
-        # Create execution agent
-        execution_agent = ManimExecutionAgent()
+        # Hand the render off to the worker processes
+        execution = RenderQueueAgent().enqueue(script)
         
-        # Execute the script
-        result = execution_agent.execute(script)
+        return Response({
+            'success': True,
+            'message': 'Script queued for execution',
+            'execution_id': str(execution.id),
+            'status': execution.status
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['post'])
+    def batch_execute(self, request):
+        """Queue many scripts as one batch rendered with bounded concurrency"""
+        serializer = BatchExecuteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        # Return the result
-        if result['success']:
-            return Response({
-                'success': True,
-                'message': 'Script executed successfully',
-                'output_path': result['output_path'],
-                'execution_id': result['execution'].id if 'execution' in result else None
-            }, status=status.HTTP_200_OK)
-        else:
+        script_ids = serializer.validated_data['script_ids']
+        scripts = Script.objects.in_bulk(script_ids)
+        missing = [str(script_id) for script_id in script_ids if script_id not in scripts]
+        if missing:
             return Response({
                 'success': False,
-                'message': 'Script execution failed',
-                'error': result.get('error', 'Unknown error'),
-                'execution_id': result['execution'].id if 'execution' in result else None
-            }, status=status.HTTP_200_OK)  # Still return 200 as the API call succeeded
+                'error': 'Unknown script ids',
+                'missing': missing
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        batch = RenderQueueAgent().enqueue_batch(
+            [scripts[script_id] for script_id in script_ids],
+            max_concurrency=serializer.validated_data.get('max_concurrency')
+        )
+        
+        return Response({
+            'success': True,
+            'message': f'{len(script_ids)} scripts queued for execution',
+            'batch_id': str(batch.id),
+            'max_concurrency': batch.max_concurrency,
+            'progress': batch.get_progress()
+        }, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=False, methods=['post'])
     def generate(self, request):
@@ -71,7 +105,12 @@ class ScriptViewSet(viewsets.ModelViewSet):
         generation_agent = AIScriptGenerationAgent()
         
         # Generate script
-        result = generation_agent.generate(prompt, provider)
+        result = generation_agent.generate(
+            prompt,
+            provider,
+            hedged=serializer.validated_data.get('hedged'),
+            premium=serializer.validated_data.get('premium', False)
+        )
         
         if not result['success']:
             return Response({
@@ -92,26 +131,25 @@ class ScriptViewSet(viewsets.ModelViewSet):
                 status='pending'
             )
         
-        # Execute if requested
+        # Queue execution if requested
         if auto_execute:
-            execution_agent = ManimExecutionAgent()
-            exec_result = execution_agent.execute(script_obj)
+            execution = RenderQueueAgent().enqueue(script_obj)
             
-            # Return combined result
             return Response({
                 'success': True,
-                'message': 'Script generated and executed',
+                'message': 'Script generated and queued for execution',
                 'script_id': str(script_obj.id),
-                'execution_success': exec_result['success'],
-                'output_path': exec_result.get('output_path'),
-                'error': exec_result.get('error')
-            }, status=status.HTTP_201_CREATED)
+                'execution_id': str(execution.id),
+                'status': execution.status,
+                'cache_hit': result.get('cache_hit')
+            }, status=status.HTTP_202_ACCEPTED)
         
         # Return generation result
         return Response({
             'success': True,
             'message': 'Script generated successfully',
-            'script_id': str(script_obj.id)
+            'script_id': str(script_obj.id),
+            'cache_hit': result.get('cache_hit')
         }, status=status.HTTP_201_CREATED)
 
 
@@ -123,31 +161,103 @@ class ExecutionViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=True, methods=['post'])
     def retry(self, request, pk=None):
-        """Retry a failed execution"""
+        """Queue a new execution of the script behind a failed execution"""
         execution = self.get_object()
-        script = execution.script
         
-        # Create execution agent
-        execution_agent = ManimExecutionAgent()
+        # Queue a fresh execution for the same script
+        retry_execution = RenderQueueAgent().enqueue(execution.script)
         
-        # Execute the script
-        result = execution_agent.execute(script)
+        return Response({
+            'success': True,
+            'message': 'Execution retry queued',
+            'execution_id': str(retry_execution.id),
+            'status': retry_execution.status
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['post'])
+    def events_token(self, request, pk=None):
+        """Issue a short-lived token that only opens the event stream of this execution"""
+        execution = self.get_object()
+        ttl = getattr(settings, 'EXECUTION_EVENTS_TOKEN_TTL', 60)
         
-        # Return the result
-        if result['success']:
-            return Response({
-                'success': True,
-                'message': 'Execution retried successfully',
-                'output_path': result['output_path'],
-                'execution_id': result['execution'].id if 'execution' in result else None
-            }, status=status.HTTP_200_OK)
-        else:
-            return Response({
-                'success': False,
-                'message': 'Execution retry failed',
-                'error': result.get('error', 'Unknown error'),
-                'execution_id': result['execution'].id if 'execution' in result else None
-            }, status=status.HTTP_200_OK)
+        return Response({
+            'success': True,
+            'token': signing.dumps({'execution': str(execution.id), 'user': request.user.pk}, salt=EVENTS_TOKEN_SALT),
+            'expires_in': ttl
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'])
+    def renditions(self, request, pk=None):
+        """List the rendered qualities of an execution and the ones still rendering"""
+        execution = self.get_object()
+        
+        # Renditions belong to the preview - resolve it when asked about a rendition job
+        preview = execution.source_execution or execution
+        pending = preview.rendition_jobs.filter(status__in=['queued', 'running'])
+        failed = preview.rendition_jobs.filter(status__in=['failed', 'timeout', 'oom']).exclude(quality__in=list(preview.renditions))
+        
+        return Response({
+            'success': True,
+            'execution_id': str(preview.id),
+            'output_path': preview.output_path,
+            'renditions': {
+                quality: dict(rendition, output_url=f"{settings.BASE_URL}/media/{rendition['output_path']}")
+                for quality, rendition in preview.renditions.items()
+            },
+            'pending': [
+                {'quality': job.quality, 'execution_id': str(job.id), 'status': job.status} for job in pending
+            ],
+            'failed': [
+                {'quality': job.quality, 'execution_id': str(job.id), 'error': job.error} for job in failed
+            ]
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'])
+    def cache_stats(self, request):
+        """Report render cache size and hit/miss counters"""
+        # Import here to avoid circular imports
+        from .agents.render_cache import RenderCacheAgent
+        
+        return Response({
+            'success': True,
+            **RenderCacheAgent().stats()
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'])
+    def fix_cache_stats(self, request):
+        """Report hit and success rates of cached debug fixes per error signature"""
+        # Import here to avoid circular imports
+        from .agents.fix_cache import FixCacheAgent
+        
+        return Response({
+            'success': True,
+            **FixCacheAgent().stats()
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'])
+    def migration_stats(self, request):
+        """Report how often each API migration rule rewrote a script"""
+        # Import here to avoid circular imports
+        from .agents.api_migrations import migration_stats
+        
+        return Response({
+            'success': True,
+            **migration_stats()
+        }, status=status.HTTP_200_OK)
+
+
+class ExecutionBatchViewSet(viewsets.ReadOnlyModelViewSet):
+    """API endpoint for batches of executions and their progress"""
+    queryset = ExecutionBatch.objects.all()
+    serializer_class = ExecutionBatchSerializer
+    permission_classes = [IsAuthenticated]
+    
+    @action(detail=True, methods=['get'])
+    def executions(self, request, pk=None):
+        """List the executions of a batch"""
+        batch = self.get_object()
+        executions = batch.executions.select_related('script', 'container').order_by('queued_at')
+        return Response(ExecutionSerializer(executions, many=True).data, status=status.HTTP_200_OK)
 
 
 class AIProviderViewSet(viewsets.ModelViewSet):
@@ -155,6 +265,17 @@ class AIProviderViewSet(viewsets.ModelViewSet):
     queryset = AIProvider.objects.all()
     serializer_class = AIProviderSerializer
     permission_classes = [IsAuthenticated]
+    
+    @action(detail=False, methods=['get'])
+    def client_stats(self, request):
+        """Report call counts and latency of the cached provider clients"""
+        # Import here to avoid circular imports
+        from .agents.provider_clients import provider_clients
+        
+        return Response({
+            'success': True,
+            'clients': provider_clients.stats()
+        }, status=status.HTTP_200_OK)
 
 
 class ContainerViewSet(viewsets.ModelViewSet):
@@ -163,6 +284,30 @@ class ContainerViewSet(viewsets.ModelViewSet):
     serializer_class = ContainerSerializer
     permission_classes = [IsAuthenticated]
     
+    @action(detail=False, methods=['get'])
+    def pool(self, request):
+        """Report the load of every active container in the render pool"""
+        # Import here to avoid circular imports
+        from .agents.container_pool import ContainerPoolAgent
+        
+        pool_agent = ContainerPoolAgent()
+        containers = list(Container.objects.filter(is_active=True).order_by('name'))
+        loads = pool_agent.get_loads(containers)
+        
+        return Response({
+            'success': True,
+            'min_size': pool_agent.min_size,
+            'max_size': pool_agent.max_size,
+            'containers': [
+                {
+                    'name': container.name,
+                    'is_running': container.is_running,
+                    'in_flight': loads[container.id]
+                }
+                for container in containers
+            ]
+        }, status=status.HTTP_200_OK)
+    
     @action(detail=True, methods=['post'])
     def check_status(self, request, pk=None):
         """Check container status"""
@@ -204,3 +349,82 @@ class ContainerViewSet(viewsets.ModelViewSet):
             'success': result,
             'is_running': container.is_running
         }, status=status.HTTP_200_OK)
+
+
+async def execution_events(request, pk):
+    """
+    Stream the status, progress and log events of an execution as Server-Sent Events
+    
+    Authenticates with the API's JWT in the Authorization header or - since
+    EventSource cannot set headers - a `token` query parameter holding a
+    short-lived token from the events_token action, which only opens this
+    execution's stream. Reconnecting clients resume after the Last-Event-ID
+    header or `last_event_id` parameter. Needs an ASGI server (core.asgi) to
+    stream without holding a worker thread.
+    """
+    user = await sync_to_async(_authenticate_stream)(request, pk)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'},
+                            status=status.HTTP_401_UNAUTHORIZED)
+    
+    if not await Execution.objects.filter(pk=pk).aexists():
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0
+    try:
+        last_event_id = int(last_event_id)
+    except ValueError:
+        last_event_id = 0
+    
+    response = StreamingHttpResponse(_event_stream(pk, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _authenticate_stream(request, execution_id):
+    """Resolve the user of an events token in the token parameter or a JWT in the Authorization header"""
+    raw_token = request.GET.get('token')
+    if raw_token:
+        try:
+            payload = signing.loads(raw_token, salt=EVENTS_TOKEN_SALT,
+                                    max_age=getattr(settings, 'EXECUTION_EVENTS_TOKEN_TTL', 60))
+        except signing.BadSignature:
+            return None
+        if payload.get('execution') != str(execution_id):
+            return None
+        return get_user_model().objects.filter(pk=payload.get('user'), is_active=True).first()
+    
+    try:
+        result = JWTAuthentication().authenticate(request)
+        return result[0] if result else None
+    except AuthenticationFailed:
+        return None
+
+
+async def _event_stream(execution_id, last_event_id):
+    """Yield SSE messages for new events until the execution has finished"""
+    heartbeat_interval = getattr(settings, 'EXECUTION_EVENTS_HEARTBEAT', 15)
+    
+    # One poller per process reads the events of every open stream
+    subscription = event_hub.subscribe(execution_id, last_event_id)
+    try:
+        while True:
+            try:
+                kind, data, event_id = await asyncio.wait_for(subscription.queue.get(), heartbeat_interval)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            
+            yield _format_sse(kind, data, event_id)
+            if kind == 'end':
+                return
+    finally:
+        event_hub.unsubscribe(subscription)
+
+
+def _format_sse(kind, data, event_id=None):
+    """Encode one Server-Sent Events message"""
+    message = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{message}event: {kind}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
@@ -151,6 +151,14 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media paths whose content never changes once written (content-addressed cache entries, per-job outputs)
+MEDIA_IMMUTABLE_PREFIXES = ('render_cache/', 'jobs/')
+# '' streams media from Django; 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache/lighttpd) hand the
+# transfer to the front server after the path has been checked
+MEDIA_ACCEL_MODE = os.getenv('MEDIA_ACCEL_MODE', '')
+# nginx `internal` location aliased to MEDIA_ROOT, used with x-accel-redirect
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
 # Ensure media directories exist
 os.makedirs(os.path.join(MEDIA_ROOT, 'videos'), exist_ok=True)
 os.makedirs(os.path.join(MEDIA_ROOT, 'images'), exist_ok=True)
@@ -222,11 +230,159 @@ GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
 AZURE_OPENAI_API_KEY = os.getenv('AZURE_OPENAI_API_KEY', '')
 AZURE_OPENAI_ENDPOINT = os.getenv('AZURE_OPENAI_ENDPOINT', '')
 AZURE_OPENAI_DEPLOYMENT = os.getenv('AZURE_OPENAI_DEPLOYMENT', 'gpt-4o')
+# Prompt cache - reuse scripts that already rendered for the same or a near-identical prompt
+AI_PROMPT_CACHE_ENABLED = os.getenv('AI_PROMPT_CACHE_ENABLED', 'True').lower() in ('true', '1', 't')
+# Near-duplicate prompt matching is opt-in: similar prompts can still ask for different animations
+AI_PROMPT_CACHE_SEMANTIC = os.getenv('AI_PROMPT_CACHE_SEMANTIC', 'False').lower() in ('true', '1', 't')
+AI_PROMPT_CACHE_SIMILARITY = float(os.getenv('AI_PROMPT_CACHE_SIMILARITY', 0.95))
+AI_PROMPT_CACHE_MAX_ENTRIES = int(os.getenv('AI_PROMPT_CACHE_MAX_ENTRIES', 20000))
+# Debug fix cache - LLM fixes stored as diffs per normalized error and reused across scripts
+AI_FIX_CACHE_ENABLED = os.getenv('AI_FIX_CACHE_ENABLED', 'True').lower() in ('true', '1', 't')
+AI_FIX_CACHE_WINDOW = int(os.getenv('AI_FIX_CACHE_WINDOW', 5))
+AI_FIX_CACHE_MAX_NET_FAILURES = int(os.getenv('AI_FIX_CACHE_MAX_NET_FAILURES', 3))
+# Debug patch mode - send the trimmed error and a numbered window around the failing line and
+# apply the line-range patch the provider returns; the whole script is only sent if it does not apply
+AI_DEBUG_PATCH_MODE = os.getenv('AI_DEBUG_PATCH_MODE', 'True').lower() in ('true', '1', 't')
+AI_DEBUG_CONTEXT_LINES = int(os.getenv('AI_DEBUG_CONTEXT_LINES', 15))
+AI_DEBUG_MAX_ERROR_LINES = int(os.getenv('AI_DEBUG_MAX_ERROR_LINES', 40))
+# Hedged generation - once the first provider is slower than its recent p95 latency, the prompt
+# also goes to the next provider by priority and the first script passing preflight wins
+AI_HEDGED_GENERATION = os.getenv('AI_HEDGED_GENERATION', 'False').lower() in ('true', '1', 't')
+AI_HEDGE_MAX_PROVIDERS = int(os.getenv('AI_HEDGE_MAX_PROVIDERS', 2))
+AI_HEDGE_PERCENTILE = float(os.getenv('AI_HEDGE_PERCENTILE', 95))
+AI_HEDGE_DELAY = float(os.getenv('AI_HEDGE_DELAY', 10))
+AI_HEDGE_MIN_SAMPLES = int(os.getenv('AI_HEDGE_MIN_SAMPLES', 20))
+AI_HEDGE_TIMEOUT = float(os.getenv('AI_HEDGE_TIMEOUT', 120))
+# Streamed generation - completions are checked as they arrive and resampled when they turn into
+# prose, markdown or invalid Python; the container pool is warmed once the class header is in
+AI_STREAMING_GENERATION = os.getenv('AI_STREAMING_GENERATION', 'True').lower() in ('true', '1', 't')
+AI_STREAM_MAX_RESAMPLES = int(os.getenv('AI_STREAM_MAX_RESAMPLES', 2))
+AI_STREAM_WARMUP_TTL = float(os.getenv('AI_STREAM_WARMUP_TTL', 30))
 BASE_URL = os.getenv('BASE_URL', 'http://localhost:8000')
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
 # Use 'localhost' for local development, 'omega-manim' for Docker
 MANIM_SERVICE = os.environ.get('MANIM_SERVICE', 'localhost')
 
+# Docker access - 'api' talks to the Engine socket, 'cli' shells out to docker, 'auto' prefers the socket
+DOCKER_TRANSPORT = os.getenv('DOCKER_TRANSPORT', 'auto')
+DOCKER_SOCKET = os.getenv('DOCKER_SOCKET', '/var/run/docker.sock')
+DOCKER_STATUS_CACHE_TTL = int(os.getenv('DOCKER_STATUS_CACHE_TTL', 10))
+
+# Manim container pool - renders are scheduled on the least-loaded container
+MANIM_CONTAINER_NAME = os.getenv('MANIM_CONTAINER_NAME', 'omega-manim')
+MANIM_WORKING_DIR = os.getenv('MANIM_WORKING_DIR', '/manim')
+MANIM_POOL_MIN_SIZE = int(os.getenv('MANIM_POOL_MIN_SIZE', 1))
+MANIM_POOL_MAX_SIZE = int(os.getenv('MANIM_POOL_MAX_SIZE', 1))
+MANIM_POOL_JOBS_PER_CONTAINER = int(os.getenv('MANIM_POOL_JOBS_PER_CONTAINER', 1))
+MANIM_POOL_IMAGE = os.getenv('MANIM_POOL_IMAGE', 'omega-manim')
+MANIM_POOL_HEALTH_TTL = int(os.getenv('MANIM_POOL_HEALTH_TTL', 30))
+# cgroup limits of each pooled container (docker run --memory/--cpus/--pids-limit, empty = none)
+MANIM_CONTAINER_MEMORY = os.getenv('MANIM_CONTAINER_MEMORY', '4g')
+MANIM_CONTAINER_CPUS = os.getenv('MANIM_CONTAINER_CPUS', '')
+MANIM_CONTAINER_PIDS_LIMIT = int(os.getenv('MANIM_CONTAINER_PIDS_LIMIT', 512))
+# Same bind mounts as docker-compose.yml so pooled containers see scripts and media
+MANIM_POOL_VOLUMES = [
+    volume for volume in os.getenv(
+        'MANIM_POOL_VOLUMES', f"{BASE_DIR}:/manim,{MEDIA_ROOT}:/manim/media"
+    ).split(',') if volume
+]
+
+# Script hand-off - 'shared_volume' renders through the bind-mounted media directory
+# with no docker cp; 'daemon' also renders through the container's warm render daemon
+# (render_daemon.py), falling back to docker exec; 'copy' is for containers that do
+# not share a volume with this host
+MANIM_TRANSPORT = os.getenv('MANIM_TRANSPORT', 'daemon')
+# Host path of the render daemon sockets (the containers' /manim/run/render_daemon). Kept
+# out of MEDIA_ROOT: whoever can connect runs code in the container, so the directory must
+# be mode 0770 with the group of the web and worker users - the daemon gives its socket
+# that group and mode 0660
+MANIM_DAEMON_SOCKET_DIR = os.getenv('MANIM_DAEMON_SOCKET_DIR', os.path.join(BASE_DIR, 'run', 'render_daemon'))
+MANIM_DAEMON_RETRY_AFTER = int(os.getenv('MANIM_DAEMON_RETRY_AFTER', 30))
+# Per-render limits, enforced by the daemon or around docker exec - a render over the time
+# or CPU limit is killed with its process tree and the execution ends as 'timeout' (0 = no
+# limit). The memory limit is a best-effort address-space cap that makes allocations fail
+# with MemoryError; memory and process counts are enforced by the container's cgroup
+# (MANIM_CONTAINER_MEMORY / MANIM_CONTAINER_PIDS_LIMIT, mem_limit / pids_limit in
+# docker-compose.yml), and a render its OOM killer kills ends as 'oom'
+MANIM_RENDER_TIMEOUT = int(os.getenv('MANIM_RENDER_TIMEOUT', 600))
+MANIM_RENDER_MEMORY_LIMIT_MB = int(os.getenv('MANIM_RENDER_MEMORY_LIMIT_MB', 0))
+MANIM_RENDER_CPU_SECONDS = int(os.getenv('MANIM_RENDER_CPU_SECONDS', 0))
+# Seconds between SIGTERM and SIGKILL of a docker exec render that ran out of time
+MANIM_RENDER_KILL_GRACE = int(os.getenv('MANIM_RENDER_KILL_GRACE', 10))
+MANIM_CONTAINER_MEDIA_ROOT = os.getenv('MANIM_CONTAINER_MEDIA_ROOT', f"{MANIM_WORKING_DIR}/media")
+# Per-job scratch directories, removed when the job ends (MANIM_SCRATCH_TMPFS puts them in
+# /dev/shm); render workers reap ones orphaned by crashed jobs after MANIM_SCRATCH_TTL seconds,
+# along with media/jobs directories that never got a video
+MANIM_SCRATCH_DIR = os.getenv('MANIM_SCRATCH_DIR', '')
+MANIM_SCRATCH_TMPFS = os.getenv('MANIM_SCRATCH_TMPFS', 'False').lower() in ('true', '1', 't')
+MANIM_CONTAINER_SCRATCH_DIR = os.getenv('MANIM_CONTAINER_SCRATCH_DIR', '/tmp/omega-scratch')
+MANIM_SCRATCH_TTL = int(os.getenv('MANIM_SCRATCH_TTL', 3600))
+MANIM_SCRATCH_REAP_INTERVAL = int(os.getenv('MANIM_SCRATCH_REAP_INTERVAL', 300))
+
+# Render-time dependencies - installed with pip --no-index from a wheelhouse on the shared
+# volume (MANIM_WORKING_DIR/wheelhouse is the repo's wheelhouse/ directory), which is filled
+# from the package index on first use; packages requested MANIM_DEPENDENCY_PROMOTE_THRESHOLD
+# times are baked into the image by manage.py promote_dependencies
+MANIM_WHEELHOUSE_DIR = os.getenv('MANIM_WHEELHOUSE_DIR', f"{MANIM_WORKING_DIR}/wheelhouse")
+MANIM_WHEELHOUSE_DOWNLOAD = os.getenv('MANIM_WHEELHOUSE_DOWNLOAD', 'True').lower() in ('true', '1', 't')
+MANIM_DEPENDENCY_PROMOTE_THRESHOLD = int(os.getenv('MANIM_DEPENDENCY_PROMOTE_THRESHOLD', 5))
+
+# Render cache - identical scripts are served from MEDIA_ROOT/render_cache
+MANIM_RENDER_CACHE_ENABLED = os.getenv('MANIM_RENDER_CACHE_ENABLED', 'True').lower() in ('true', '1', 't')
+MANIM_RENDER_CACHE_MAX_BYTES = int(os.getenv('MANIM_RENDER_CACHE_MAX_BYTES', 5 * 1024 ** 3))
+# Leave empty to key the cache on the container's image id
+MANIM_IMAGE_VERSION = os.getenv('MANIM_IMAGE_VERSION', '')
+
+# Render every scene of a multi-scene script in one Manim invocation (False renders only the first)
+MANIM_RENDER_ALL_SCENES = os.getenv('MANIM_RENDER_ALL_SCENES', 'True').lower() in ('true', '1', 't')
+
+# Quality ladder - scripts are rendered (and debugged) as a fast preview first, then the
+# rendition qualities are queued behind new previews. Presets: low, medium, high, production, fourk
+MANIM_PREVIEW_QUALITY = os.getenv('MANIM_PREVIEW_QUALITY', 'low')
+MANIM_RENDITION_QUALITIES = [q.strip() for q in os.getenv('MANIM_RENDITION_QUALITIES', 'medium').split(',') if q.strip()]
+MANIM_RENDITION_PRIORITY = int(os.getenv('MANIM_RENDITION_PRIORITY', 50))
+
+# Static checks (syntax, Scene subclasses, Manim imports) on the host before each render
+MANIM_PREFLIGHT_ENABLED = os.getenv('MANIM_PREFLIGHT_ENABLED', 'True').lower() in ('true', '1', 't')
+# Rewrite renamed Manim APIs (ShowCreation, GraphScene, get_graph, ...) before each render
+MANIM_API_MIGRATIONS_ENABLED = os.getenv('MANIM_API_MIGRATIONS_ENABLED', 'True').lower() in ('true', '1', 't')
+
+# Check that construct() runs before every full render: 'dry_run' (manim --dry_run),
+# 'last_frame' (-s --disable_caching) or '' to render straight away
+MANIM_SMOKE_RENDER = os.getenv('MANIM_SMOKE_RENDER', 'dry_run')
+
+# Debug-and-retry budget for one execution - whichever runs out first stops the retries
+MANIM_MAX_ATTEMPTS = int(os.getenv('MANIM_MAX_ATTEMPTS', 5))
+MANIM_RETRY_WALL_CLOCK_BUDGET = int(os.getenv('MANIM_RETRY_WALL_CLOCK_BUDGET', 600))
+MANIM_RETRY_TOKEN_BUDGET = int(os.getenv('MANIM_RETRY_TOKEN_BUDGET', 60000))
+MANIM_RETRY_MAX_UNCHANGED = int(os.getenv('MANIM_RETRY_MAX_UNCHANGED', 2))
+MANIM_RETRY_BACKOFF_BASE = float(os.getenv('MANIM_RETRY_BACKOFF_BASE', 1.0))
+MANIM_RETRY_BACKOFF_MAX = float(os.getenv('MANIM_RETRY_BACKOFF_MAX', 30.0))
+# Retries of container and Docker failures, which never go to the AI debugger
+MANIM_INFRA_RETRIES = int(os.getenv('MANIM_INFRA_RETRIES', 2))
+
+# Execution events - streamed to clients from /api/agents/executions/<id>/events
+EXECUTION_EVENTS_ENABLED = os.getenv('EXECUTION_EVENTS_ENABLED', 'True').lower() in ('true', '1', 't')
+EXECUTION_EVENT_PROGRESS_INTERVAL = float(os.getenv('EXECUTION_EVENT_PROGRESS_INTERVAL', 0.5))
+EXECUTION_EVENTS_POLL_INTERVAL = float(os.getenv('EXECUTION_EVENTS_POLL_INTERVAL', 0.5))
+EXECUTION_EVENTS_HEARTBEAT = int(os.getenv('EXECUTION_EVENTS_HEARTBEAT', 15))
+EXECUTION_EVENT_LOG_INTERVAL = float(os.getenv('EXECUTION_EVENT_LOG_INTERVAL', 1.0))
+EXECUTION_EVENT_LOG_BATCH = int(os.getenv('EXECUTION_EVENT_LOG_BATCH', 100))
+EXECUTION_EVENTS_RETENTION = int(os.getenv('EXECUTION_EVENTS_RETENTION', 3600))
+EXECUTION_EVENTS_TOKEN_TTL = int(os.getenv('EXECUTION_EVENTS_TOKEN_TTL', 60))
+
+# Render queue - executions are drained by `python manage.py render_worker`
+RENDER_QUEUE_POLL_INTERVAL = float(os.getenv('RENDER_QUEUE_POLL_INTERVAL', 2))
+# Running jobs refresh heartbeat_at every RENDER_QUEUE_HEARTBEAT_INTERVAL seconds and are requeued
+# after RENDER_QUEUE_STALE_AFTER seconds (at least three intervals) without one
+RENDER_QUEUE_HEARTBEAT_INTERVAL = float(os.getenv('RENDER_QUEUE_HEARTBEAT_INTERVAL', 30))
+RENDER_QUEUE_STALE_AFTER = int(os.getenv('RENDER_QUEUE_STALE_AFTER', 300))
+# Batch execution - batch jobs queue behind interactive renders (priority 10) and at most
+# RENDER_BATCH_CONCURRENCY of a batch's jobs render at once unless the request says otherwise
+RENDER_BATCH_PRIORITY = int(os.getenv('RENDER_BATCH_PRIORITY', 20))
+RENDER_BATCH_CONCURRENCY = int(os.getenv('RENDER_BATCH_CONCURRENCY', 2))
+RENDER_BATCH_MAX_SIZE = int(os.getenv('RENDER_BATCH_MAX_SIZE', 500))
+
 # Logging configuration
 LOGGING = {
     'version': 1,
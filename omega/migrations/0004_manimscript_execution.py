@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0002_execution_queue'),
+        ('omega', '0003_remove_manimscript_script_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='manimscript',
+            name='execution',
+            field=models.ForeignKey(blank=True, help_text='Queued render job for this script', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='manim_scripts', to='agents.execution'),
+        ),
+    ]
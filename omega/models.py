@@ -27,6 +27,14 @@ class ManimScript(models.Model):
         help_text="Status of the script execution"
     )
     error_message = models.TextField(null=True, blank=True, help_text="Error message if execution failed")
+    execution = models.ForeignKey(
+        'agents.Execution',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='manim_scripts',
+        help_text="Queued render job for this script"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
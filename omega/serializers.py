@@ -7,10 +7,10 @@ class ManimScriptSerializer(serializers.ModelSerializer):
         model = ManimScript
         fields = ['id', 'prompt', 'script', 'provider', 
                   'output_path', 'output_url', 'status', 'error_message', 
-                  'created_at', 'updated_at']
+                  'execution', 'created_at', 'updated_at']
         read_only_fields = ['id', 'script', 'output_path', 
                            'output_url', 'status', 'error_message', 
-                           'created_at', 'updated_at']
+                           'execution', 'created_at', 'updated_at']
 
 
 class ManimScriptGenerateSerializer(serializers.Serializer):
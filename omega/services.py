@@ -3,10 +3,14 @@ import uuid
 import requests
 import traceback
 import subprocess
-import tempfile
-import google.generativeai as genai
-from openai import AzureOpenAI
 from django.conf import settings
+from agents.agents.provider_clients import provider_clients
+from agents.agents.scene_analysis import find_scene_classes
+from agents.agents.quality import QUALITY_PRESETS, get_preview_quality
+from agents.agents.scratch import ScratchSpaceAgent
+from agents.agents.dependency_agent import DependencyAgent
+
+GEMINI_MODEL = 'gemini-2.5-flash-preview-04-17'
 
 
 def generate_manim_script(prompt, provider):
@@ -33,12 +37,9 @@ def generate_manim_script(prompt, provider):
         if not settings.GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY environment variable not set")
             
-        # Configure Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-            
-        # Call Gemini API
-        model = genai.GenerativeModel('gemini-2.5-flash-preview-04-17')
-        response = model.generate_content(manim_prompt)
+        # Call Gemini API on the shared model handle
+        model = provider_clients.get_gemini('settings', settings.GEMINI_API_KEY, GEMINI_MODEL)
+        response = model.call(model.client.generate_content, manim_prompt)
         
         # Extract the text from the response
         if hasattr(response, 'text'):
@@ -51,15 +52,14 @@ def generate_manim_script(prompt, provider):
         if not settings.AZURE_OPENAI_API_KEY or not settings.AZURE_OPENAI_ENDPOINT:
             raise ValueError("Azure OpenAI credentials not set in environment variables")
             
-        # Configure Azure OpenAI client
-        client = AzureOpenAI(
-            api_key=settings.AZURE_OPENAI_API_KEY,
-            api_version="2023-07-01-preview",
-            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT
+        # Shared Azure OpenAI client - reuses its connection pool
+        client = provider_clients.get_azure_openai(
+            'settings', settings.AZURE_OPENAI_API_KEY, settings.AZURE_OPENAI_ENDPOINT
         )
         
         # Call Azure OpenAI API
-        response = client.chat.completions.create(
+        response = client.call(
+            client.client.chat.completions.create,
             model=settings.AZURE_OPENAI_DEPLOYMENT,
             messages=[
                 {"role": "system", "content": "You are an expert Manim developer who creates beautiful animations."},
@@ -99,9 +99,8 @@ def debug_manim_script(script, error_message):
     # Try using Gemini first as it's less likely to have proxy issues
     if settings.GEMINI_API_KEY:
         try:
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            model = genai.GenerativeModel('gemini-2.5-flash-preview-04-17')
-            response = model.generate_content(debug_prompt)
+            model = provider_clients.get_gemini('settings', settings.GEMINI_API_KEY, GEMINI_MODEL)
+            response = model.call(model.client.generate_content, debug_prompt)
             
             if hasattr(response, 'text'):
                 fixed_script = response.text
@@ -117,8 +116,6 @@ def debug_manim_script(script, error_message):
     # Only try Azure OpenAI if configured and Gemini failed or isn't configured
     if settings.AZURE_OPENAI_API_KEY and settings.AZURE_OPENAI_ENDPOINT:
         try:
-            # Create client with minimal configuration to avoid proxy issues
-            # Using a fresh import in a separate function to isolate potential issues
             fixed_script = _azure_openai_debug(debug_prompt)
             
             if fixed_script:
@@ -148,19 +145,15 @@ def debug_manim_script(script, error_message):
 
 def _azure_openai_debug(prompt):
     """
-    Isolated function to handle Azure OpenAI API calls to avoid proxy issues
+    Ask Azure OpenAI for a fixed script, returns None on failure
     """
     try:
-        # Fresh import to avoid any cached configuration issues
-        from openai import AzureOpenAI
-        
-        client = AzureOpenAI(
-            api_key=settings.AZURE_OPENAI_API_KEY, 
-            api_version="2023-07-01-preview",
-            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT
+        client = provider_clients.get_azure_openai(
+            'settings', settings.AZURE_OPENAI_API_KEY, settings.AZURE_OPENAI_ENDPOINT
         )
         
-        response = client.chat.completions.create(
+        response = client.call(
+            client.client.chat.completions.create,
             model=settings.AZURE_OPENAI_DEPLOYMENT,
             messages=[
                 {"role": "system", "content": "You are an expert Manim developer who can fix errors in animation scripts."},
@@ -178,35 +171,12 @@ def _azure_openai_debug(prompt):
 def install_missing_dependencies(error_message):
     """
     Attempt to install missing dependencies in the Manim container
+    
+    Goes through DependencyAgent, so the module name is validated, mapped to
+    its distribution and installed from the wheelhouse.
     """
-    # Check for common import error patterns
-    if "No module named" in error_message or "ImportError" in error_message:
-        # Extract module name from error message
-        import_lines = [line for line in error_message.split('\n') if "No module named" in line or "ImportError" in line]
-        if import_lines:
-            module_line = import_lines[0]
-            # Extract module name (this is a simple heuristic, might need refinement)
-            if "No module named" in module_line:
-                module_name = module_line.split("No module named")[1].strip().strip("'").strip('"')
-            else:
-                module_name = module_line.split("ImportError:")[1].strip().split(" ")[0].strip("'").strip('"')
-            
-            try:
-                # Execute the installation script in the container
-                container_name = "omega-manim"
-                install_command = f"pip install {module_name}"
-                subprocess.run(
-                    ["docker", "exec", container_name, "bash", "-c", install_command],
-                    check=True,
-                    capture_output=True,
-                    text=True,
-                    encoding="utf-8",
-                    errors="replace"
-                )
-                return True
-            except subprocess.CalledProcessError as e:
-                return False
-    return False
+    result = DependencyAgent().detect_and_install_missing_dependencies(error_message, "omega-manim")
+    return result["success"]
 
 
 def ensure_docker_container_running(container_name="omega-manim"):
@@ -237,28 +207,25 @@ def ensure_docker_container_running(container_name="omega-manim"):
         return False
 
 
-def execute_manim_locally(script_content, scene_class, script_id):
+def execute_manim_locally(script_content, scene_class, script_id, quality=None):
     """
     Execute Manim script directly from memory without saving to a permanent file
+    
+    Renders at the preview quality unless another quality preset is given,
+    since the caller debugs failed renders.
     """
+    quality_flag, quality_folder = QUALITY_PRESETS[quality or get_preview_quality()]
     
     # Check and ensure Docker container is running first
     container_name = "omega-manim"
     docker_available = ensure_docker_container_running(container_name)
     
-    # Create a unique identifier for this execution
-    base_name = f"manim_script_{script_id}"
     media_root = settings.MEDIA_ROOT
     
-    # Create temp file for output capture
-    with tempfile.NamedTemporaryFile(prefix="manim_output_", suffix=".txt", delete=False, mode="w+", encoding="utf-8") as output_file:
-        output_file_path = output_file.name
-    
-    # Create a temporary script file
-    with tempfile.NamedTemporaryFile(suffix=".py", delete=False, mode="w+", encoding="utf-8") as script_file:
-        # Write the script content to the temp file
-        script_file.write(script_content)
-        script_path = script_file.name
+    # The job's own scratch directory - removed with everything tracked in it afterwards
+    scratch = ScratchSpaceAgent().create()
+    output_file_path = scratch.file("manim_output.txt")
+    script_path = scratch.file(f"{scratch.name}.py", script_content)
     
     try:
         # Clean script if needed - working directly with the temp file
@@ -274,15 +241,16 @@ def execute_manim_locally(script_content, scene_class, script_id):
                 # Try to use Docker even in local development mode
                 docker_run_cmd = [
                     "docker", "exec", container_name, 
-                    "bash", "-c", f"cd /manim && python -m manim {os.path.basename(script_path)} {scene_class} -qm"
+                    "bash", "-c", f"cd /manim && python -m manim {os.path.basename(script_path)} {scene_class} {quality_flag}"
                 ]
                 
                 # Copy the script to container first
-                temp_container_path = f"/tmp/{os.path.basename(script_path)}"
+                temp_container_path = scratch.track_container_file(f"/tmp/{os.path.basename(script_path)}", container_name)
                 copy_cmd = ["docker", "cp", script_path, f"{container_name}:{temp_container_path}"]
                 subprocess.run(copy_cmd, check=True, capture_output=True, encoding="utf-8", errors="replace")
                 
                 # Move the script to the manim directory in the container
+                scratch.track_container_file(f"/manim/{os.path.basename(script_path)}")
                 mv_cmd = ["docker", "exec", container_name, "bash", "-c", f"cp {temp_container_path} /manim/{os.path.basename(script_path)}"]
                 subprocess.run(mv_cmd, check=True, capture_output=True, encoding="utf-8", errors="replace")
                 
@@ -291,27 +259,24 @@ def execute_manim_locally(script_content, scene_class, script_id):
                 complete_output = process.stdout + process.stderr
             except Exception as e:
                 # If Docker execution fails, try direct command as before
-                cmd = f"cd {media_root} && manim {script_path} {scene_class} -qm 2>&1"
+                cmd = f"cd {media_root} && manim {script_path} {scene_class} {quality_flag} 2>&1"
                 process = subprocess.run(cmd, shell=True, capture_output=True, text=True)
                 complete_output = process.stdout + process.stderr
         else:
             # Use Docker container - copy temp file into container first
-            temp_container_path = f"/tmp/{os.path.basename(script_path)}"
+            temp_container_path = scratch.track_container_file(f"/tmp/{os.path.basename(script_path)}", container_name)
             
             # Copy the script to the container
             copy_cmd = ["docker", "cp", script_path, f"{container_name}:{temp_container_path}"]
             subprocess.run(copy_cmd, check=True, capture_output=True, encoding="utf-8", errors="replace")
             
             # Move the script to the manim directory in the container
+            scratch.track_container_file(f"/manim/{os.path.basename(script_path)}")
             mv_cmd = ["docker", "exec", container_name, "bash", "-c", f"cp {temp_container_path} /manim/{os.path.basename(script_path)}"]
             subprocess.run(mv_cmd, check=True, capture_output=True, encoding="utf-8", errors="replace")
             
-            # Remove the temporary file from Docker container
-            rm_cmd = ["docker", "exec", container_name, "bash", "-c", f"rm -f {temp_container_path}"]
-            subprocess.run(rm_cmd, capture_output=True, encoding="utf-8", errors="replace")
-            
             # Execute manim in the container - using python -m manim for better reliability
-            cmd = f"cd /manim && python -m manim {os.path.basename(script_path)} {scene_class} -qm"
+            cmd = f"cd /manim && python -m manim {os.path.basename(script_path)} {scene_class} {quality_flag}"
             process = subprocess.run(
                 ["docker", "exec", container_name, "bash", "-c", cmd],
                 capture_output=True,
@@ -320,15 +285,6 @@ def execute_manim_locally(script_content, scene_class, script_id):
                 errors="replace"
             )
             complete_output = process.stdout + process.stderr
-            
-            # Clean up script file in Docker container after execution
-            cleanup_cmd = f"rm -f /manim/{os.path.basename(script_path)}"
-            subprocess.run(
-                ["docker", "exec", container_name, "bash", "-c", cleanup_cmd],
-                capture_output=True,
-                encoding="utf-8",
-                errors="replace"
-            )
         
         # Write the output to file for reference with proper encoding
         with open(output_file_path, "w", encoding="utf-8", errors="replace") as f:
@@ -337,7 +293,7 @@ def execute_manim_locally(script_content, scene_class, script_id):
         # Determine the expected output path
         # Note: Manim creates output dirs based on the script filename without path
         script_basename = os.path.basename(script_path).replace('.py', '')
-        output_path = f"videos/{script_basename}/720p30/{scene_class}.mp4"
+        output_path = f"videos/{script_basename}/{quality_folder}/{scene_class}.mp4"
         full_output_path = os.path.join(media_root, output_path)
         
         # Check if output file exists in the expected location
@@ -346,11 +302,11 @@ def execute_manim_locally(script_content, scene_class, script_id):
         # If process was successful but file doesn't exist in the expected path,
         # try to find it in the media directory
         if success and not os.path.exists(full_output_path):
-            media_dir = os.path.join(media_root, f"videos/{script_basename}/720p30/")
+            media_dir = os.path.join(media_root, f"videos/{script_basename}/{quality_folder}/")
             if os.path.exists(media_dir):
                 files = os.listdir(media_dir)
                 if files:  # Use first file if any exist
-                    output_path = f"videos/{script_basename}/720p30/{files[0]}"
+                    output_path = f"videos/{script_basename}/{quality_folder}/{files[0]}"
                     full_output_path = os.path.join(media_root, output_path)
         
         # Final check if the file exists
@@ -391,43 +347,8 @@ def execute_manim_locally(script_content, scene_class, script_id):
             "output": ""
         }
     finally:
-        # Clean up temporary files
-        try:
-            # Delete the primary temp files we created
-            if os.path.exists(script_path):
-                os.unlink(script_path)
-            if os.path.exists(output_file_path):
-                os.unlink(output_file_path)
-                
-            # Clean up any temp directories created by Docker/Manim
-            script_basename = os.path.basename(script_path).replace('.py', '')
-            
-            # Get the server root directory (one level up from media_root)
-            server_root = os.path.dirname(media_root)
-            
-            temp_dirs = [
-                os.path.join(tempfile.gettempdir(), f"tmp{script_basename}*"),
-                os.path.join(tempfile.gettempdir(), f"manim_*_{script_id}*"),
-                os.path.join(media_root, f"videos/tmp{script_basename}*"),
-                # Add patterns for direct omega-server temp files
-                os.path.join(server_root, "tmp*.py"),
-                os.path.join(server_root, "tmp*"),
-                # Add specific pattern for the temp file the user mentioned
-                os.path.join(server_root, "tmp*fwni.py"),
-                os.path.join(server_root, "tmp*fwni")
-            ]
-            
-            # Use glob to find and remove matching temp dirs
-            import glob
-            import shutil
-            for pattern in temp_dirs:
-                for temp_dir in glob.glob(pattern):
-                    if os.path.isdir(temp_dir):
-                        shutil.rmtree(temp_dir, ignore_errors=True)
-                    elif os.path.isfile(temp_dir):
-                        os.unlink(temp_dir)
-        except Exception as e:
-            pass
+        # Remove exactly the files this job created, on the host and in the container
+        scratch.cleanup()
 
 
 def clean_script_content(script_path):
@@ -441,22 +362,6 @@ def clean_script_content(script_path):
             
             with open(script_path, "w", encoding="utf-8", errors="replace") as f:
                 f.write(cleaned_content)
-        
-        # Clean up any other temp files that may have been created in the root directory
-        try:
-            server_root = os.path.dirname(settings.MEDIA_ROOT)
-            import glob
-            
-            # Check for temp files in the server root with similar names
-            basename = os.path.basename(script_path)
-            if basename.startswith('tmp'):
-                # Look for similar temp files
-                similar_pattern = os.path.join(server_root, basename[:5] + '*')
-                for similar_file in glob.glob(similar_pattern):
-                    if similar_file != script_path and os.path.isfile(similar_file):
-                        os.unlink(similar_file)
-        except Exception as cleanup_err:
-            pass
             
         return True
     except Exception as e:
@@ -483,11 +388,8 @@ def execute_manim_script(script, script_id=None):
         
         try:
             # Get the scene class name from the script
-            scene_class = None
-            for line in current_script.split('\n'):
-                if line.strip().startswith('class ') and '(Scene)' in line:
-                    scene_class = line.strip().split('class ')[1].split('(')[0].strip()
-                    break
+            scene_classes = find_scene_classes(current_script.replace("```python", "").replace("```", ""))
+            scene_class = scene_classes[0] if scene_classes else None
                     
             if not scene_class:
                 raise ValueError("Could not find a Scene class in the generated script")
@@ -578,32 +480,4 @@ def execute_manim_script(script, script_id=None):
         'success': False
     }
     
-    # Final failsafe cleanup for temp files matching Manim patterns
-    try:
-        import glob
-        import shutil
-        server_root = os.path.dirname(settings.MEDIA_ROOT)
-        
-        # Comprehensive temp file patterns
-        patterns = [
-            os.path.join(server_root, "tmp*.py"),
-            os.path.join(server_root, "tmp*"),
-            os.path.join(server_root, "*.py.tmp*"),
-            os.path.join(tempfile.gettempdir(), "tmp*manim*"),
-            os.path.join(tempfile.gettempdir(), "manim_*")
-        ]
-        
-        # Find and remove all matching files and directories
-        for pattern in patterns:
-            for path in glob.glob(pattern):
-                try:
-                    if os.path.isdir(path):
-                        shutil.rmtree(path, ignore_errors=True)
-                    else:
-                        os.unlink(path)
-                except Exception as e:
-                    pass
-    except Exception as cleanup_error:
-        pass
-        
     return result
\ No newline at end of file
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+from django.test import SimpleTestCase, override_settings
+
+
+class ServeMediaTests(SimpleTestCase):
+    """Byte ranges, validators and caching of media files"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=self.media_root, MEDIA_ACCEL_MODE='')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        os.makedirs(os.path.join(self.media_root, 'jobs', 'a'))
+        with open(os.path.join(self.media_root, 'jobs', 'a', 'Scene.mp4'), 'wb') as f:
+            f.write(b'0123456789')
+
+    def _get(self, path='jobs/a/Scene.mp4', **headers):
+        return self.client.get(f'/media/{path}', headers=headers)
+
+    def _body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_whole_file(self):
+        response = self._get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._body(response), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_byte_ranges(self):
+        for header, content_range, body in (
+            ('bytes=2-4', 'bytes 2-4/10', b'234'),
+            ('bytes=7-', 'bytes 7-9/10', b'789'),
+            ('bytes=-3', 'bytes 7-9/10', b'789'),
+            ('bytes=8-100', 'bytes 8-9/10', b'89'),
+        ):
+            with self.subTest(header):
+                response = self._get(Range=header)
+
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(self._body(response), body)
+
+    def test_invalid_range_is_ignored(self):
+        for header in ('bytes=5-3', 'bytes=abc', 'bytes=0-1,4-5', 'items=0-1', 'bytes=-'):
+            with self.subTest(header):
+                response = self._get(Range=header)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self._body(response), b'0123456789')
+
+    def test_unsatisfiable_range(self):
+        for header in ('bytes=10-', 'bytes=20-30', 'bytes=-0'):
+            with self.subTest(header):
+                response = self._get(Range=header)
+
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_if_range_with_stale_etag_sends_the_whole_file(self):
+        response = self._get(Range='bytes=2-4', **{'If-Range': '"stale"'})
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified(self):
+        etag = self._get()['ETag']
+
+        self.assertEqual(self._get(**{'If-None-Match': etag}).status_code, 304)
+
+    def test_paths_outside_media_root(self):
+        self.assertEqual(self._get('../etc/passwd').status_code, 404)
+        self.assertEqual(self._get('jobs/a/missing.mp4').status_code, 404)
@@ -1,6 +1,12 @@
+import os
+import re
+import mimetypes
+from urllib.parse import quote
 from django.conf import settings
 from django.shortcuts import render
-from django.http import HttpResponse, FileResponse
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, FileResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
 from django.views.generic import TemplateView
 from rest_framework import viewsets, status
 from rest_framework.views import APIView
@@ -13,7 +19,8 @@ from .models import ManimScript
 from .serializers import ManimScriptSerializer, ManimScriptGenerateSerializer
 # Import agents instead of services
 from agents.agents.ai_agent import AIScriptGenerationAgent
-from agents.agents.execution_agent import ManimExecutionAgent
+from agents.agents.queue_agent import RenderQueueAgent
+from agents.models import Script
 
 
 class HomeView(TemplateView):
@@ -79,42 +86,28 @@ class GenerateManimScriptAPIView(APIView):
                 'script': script
             }
             
-            # Execute the script if requested
+            # Queue the script for execution if requested
             if should_execute:
                 try:
-                    # Execute using ManimExecutionAgent
-                    execution_agent = ManimExecutionAgent()
-                    exec_result = execution_agent.execute({
-                        'id': str(manim_script.id),
-                        'content': script
-                    })
+                    # Render against the Script record created by the generation agent
+                    script_obj = result.get('script_obj')
+                    if not script_obj:
+                        script_obj = Script.objects.create(
+                            prompt=prompt,
+                            content=script,
+                            status='pending'
+                        )
                     
-                    # Check if execution was successful
-                    if exec_result.get('success', False):
-                        # Update the model with execution results
-                        output_path = exec_result['output_path']
-                        output_url = f"{settings.BASE_URL}/media/{output_path}"
-                        
-                        manim_script.output_path = output_path
-                        manim_script.output_url = output_url
-                        manim_script.status = 'completed'
-                    else:
-                        # Execution failed but we still have the script
-                        error_msg = exec_result.get('error', 'Unknown error during execution')
-                        manim_script.status = 'failed'
-                        manim_script.error_message = error_msg
-                        
-                        # Add error to response
-                        response_data['error'] = error_msg
+                    execution = RenderQueueAgent().enqueue(script_obj)
                     
-                    # Save the model in either case
+                    # The execution signal fills in output_path/output_url when the job finishes
+                    manim_script.execution = execution
                     manim_script.save()
-
-                    # Add execution data to response if available
-                    if exec_result.get('output_path'):
-                        response_data['output_path'] = exec_result['output_path']
-                        output_url = f"{settings.BASE_URL}/media/{exec_result['output_path']}"
-                        response_data['output_url'] = output_url
+                    
+                    response_data['execution_id'] = str(execution.id)
+                    response_data['status'] = manim_script.status
+                    
+                    return Response(response_data, status=status.HTTP_202_ACCEPTED)
                     
                 except Exception as e:
                     error_msg = str(e)
@@ -139,18 +132,130 @@ class GenerateManimScriptAPIView(APIView):
 def serve_media(request, path):
     """
     Serve media files
-    """
-    import os
-    from django.http import Http404
     
-    # Construct path to the media file
-    media_root = settings.MEDIA_ROOT
-    file_path = os.path.join(media_root, path)
+    Supports byte ranges (206), ETag/Last-Modified validators with 304 responses
+    and long-lived caching of content-addressed outputs. With MEDIA_ACCEL_MODE
+    set, only the path is checked here and nginx (X-Accel-Redirect) or
+    Apache/lighttpd (X-Sendfile) sends the bytes.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
     
-    if not os.path.exists(file_path):
+    # Resolve the path and refuse anything outside MEDIA_ROOT
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    file_path = os.path.realpath(os.path.join(media_root, path))
+    if os.path.commonpath([media_root, file_path]) != media_root or not os.path.isfile(file_path):
         raise Http404(f"File not found: {path}")
     
+    stat = os.stat(file_path)
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    
+    # 304 Not Modified / 412 Precondition Failed
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if conditional is not None:
+        _set_media_cache_headers(conditional, path, etag, stat)
+        return conditional
+    
+    content_type, encoding = mimetypes.guess_type(file_path)
+    content_type = content_type or 'application/octet-stream'
+    
+    accel_mode = getattr(settings, 'MEDIA_ACCEL_MODE', '')
+    if accel_mode:
+        response = HttpResponse(content_type=content_type)
+        if accel_mode == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = quote(f"{getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')}{path}")
+        else:
+            response['X-Sendfile'] = file_path
+        _set_media_cache_headers(response, path, etag, stat)
+        return response
+    
+    byte_range = _parse_range(request, etag, stat)
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{stat.st_size}"
+        _set_media_cache_headers(response, path, etag, stat)
+        return response
+    
     try:
-        return FileResponse(open(file_path, 'rb'))
-    except Exception as e:
-        raise Http404(f"Error accessing file: {path}") 
\ No newline at end of file
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            body = _read_file_range(file_path, start, length) if request.method == 'GET' else []
+            response = StreamingHttpResponse(body, status=206, content_type=content_type)
+            response['Content-Range'] = f"bytes {start}-{end}/{stat.st_size}"
+            response['Content-Length'] = str(length)
+        else:
+            response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+    except OSError:
+        raise Http404(f"Error accessing file: {path}")
+    
+    if encoding:
+        response['Content-Encoding'] = encoding
+    _set_media_cache_headers(response, path, etag, stat)
+    return response
+
+
+def _parse_range(request, etag, stat):
+    """
+    Parse a single-range Range header
+    
+    Returns:
+        tuple: (start, end) inclusive byte offsets, None to send the whole file,
+               or 'unsatisfiable' for a valid range outside the file
+    """
+    header = request.META.get('HTTP_RANGE', '')
+    match = re.fullmatch(r'\s*bytes=(\d*)-(\d*)\s*', header)
+    if not match or match.groups() == ('', ''):
+        # Missing, malformed or multi-range requests get the whole file
+        return None
+    
+    first, last = match.groups()
+    if first and last and int(first) > int(last):
+        # An invalid range such as bytes=5-3 is ignored, not rejected (RFC 9110, section 14.2)
+        return None
+    
+    # If-Range: only honour the range while the file is unchanged
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag:
+        since = parse_http_date_safe(if_range)
+        if since is None or int(stat.st_mtime) > since:
+            return None
+    
+    size = stat.st_size
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(0, size - int(last))
+        end = size - 1
+    
+    if start >= size or start > end:
+        return 'unsatisfiable'
+    return start, end
+
+
+def _read_file_range(file_path, start, length, chunk_size=64 * 1024):
+    """Yield length bytes of a file starting at start"""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _set_media_cache_headers(response, path, etag, stat):
+    """Validators, range support and caching policy for a media response"""
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    
+    # Content-addressed outputs never change under the same path
+    immutable_prefixes = tuple(getattr(settings, 'MEDIA_IMMUTABLE_PREFIXES', ('render_cache/', 'jobs/')))
+    if immutable_prefixes and path.startswith(immutable_prefixes):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = 'public, max-age=0, must-revalidate'
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+"""
+Manim render daemon for the omega-manim container.
+
+Imports manim (and with it numpy, cairo and pango) once, then forks a child
+for every render job, so jobs start from a warm copy-on-write interpreter
+instead of paying for `python -m manim` start-up. Listens on a unix socket
+in a directory shared with the Django host, outside the media volume. Only
+the owner and the group of that directory may connect.
+
+Protocol - one JSON object per line:
+    request:  {"args": ["script.py", "Scene", "-ql", ...], "cwd": "/manim",
+               "timeout": 600, "memory_mb": 0, "cpu_seconds": 0}
+    replies:  {"type": "output", "stream": "stdout" | "stderr", "data": "..."}  while the job runs
+              {"type": "result", "returncode": 0, "timed_out": false, "oom": false, "seconds": 1.2}
+    ping:     {"ping": true} -> {"type": "pong", "pid": ..., "manim_version": "..."}
+
+Usage:
+    python render_daemon.py [--socket-dir /manim/run/render_daemon] [--name omega-manim]
+"""
+import os
+import sys
+import json
+import time
+import codecs
+import runpy
+import signal
+import socket
+import argparse
+import resource
+import selectors
+import traceback
+
+
+def warm_up():
+    """Import manim in the parent so every forked job inherits it"""
+    import manim
+    return getattr(manim, '__version__', '')
+
+
+def run_job(request):
+    """
+    Run one manim invocation in the forked job process - never returns
+
+    memory_mb is a best-effort RLIMIT_AS: going over it raises MemoryError in
+    the script, which fails the job like any other exception. Memory and
+    process counts are enforced by the container's cgroup.
+
+    Args:
+        request (dict): The job request
+    """
+    code = 1
+    try:
+        memory_mb = request.get("memory_mb")
+        if memory_mb:
+            limit = int(memory_mb) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+        cpu_seconds = request.get("cpu_seconds")
+        if cpu_seconds:
+            resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_seconds), int(cpu_seconds) + 5))
+
+        os.chdir(request.get("cwd") or "/manim")
+        sys.argv = ["manim", *request["args"]]
+        runpy.run_module("manim", run_name="__main__", alter_sys=True)
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        os._exit(code)
+
+
+def handle_connection(conn, manim_version):
+    """
+    Serve one request: fork the job, stream its output back, enforce the timeout
+
+    Runs in a child of the daemon, one per connection.
+    """
+    reader = conn.makefile("rb")
+
+    def send(message):
+        conn.sendall((json.dumps(message) + "\n").encode("utf-8"))
+
+    line = reader.readline()
+    if not line:
+        return
+    request = json.loads(line)
+
+    if request.get("ping"):
+        send({"type": "pong", "pid": os.getpid(), "manim_version": manim_version})
+        return
+
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    start = time.monotonic()
+
+    pid = os.fork()
+    if pid == 0:
+        # Job process - its own process group so ffmpeg children die with it
+        os.setpgid(0, 0)
+        conn.close()
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(out_w, 1)
+        os.dup2(err_w, 2)
+        for fd in (devnull, out_r, out_w, err_r, err_w):
+            os.close(fd)
+        run_job(request)
+
+    try:
+        os.setpgid(pid, pid)
+    except OSError:
+        pass
+    os.close(out_w)
+    os.close(err_w)
+
+    timeout = request.get("timeout")
+    deadline = start + timeout if timeout else None
+    timed_out = False
+
+    selector = selectors.DefaultSelector()
+    decoders = {}
+    for fd, stream in ((out_r, "stdout"), (err_r, "stderr")):
+        selector.register(fd, selectors.EVENT_READ, stream)
+        decoders[stream] = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    try:
+        while selector.get_map():
+            wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            events = selector.select(wait)
+
+            if not events and deadline is not None and time.monotonic() >= deadline:
+                # Kill the whole job and keep draining until the pipes close
+                timed_out = True
+                deadline = None
+                os.killpg(pid, signal.SIGKILL)
+                continue
+
+            for key, _ in events:
+                data = os.read(key.fd, 65536)
+                if not data:
+                    selector.unregister(key.fd)
+                    os.close(key.fd)
+                    continue
+                text = decoders[key.data].decode(data)
+                if not text:
+                    continue
+                send({"type": "output", "stream": key.data, "data": text})
+
+    except (BrokenPipeError, ConnectionResetError):
+        # The client went away - nobody wants the render any more
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except OSError:
+            pass
+        os.waitpid(pid, 0)
+        return
+
+    _, status = os.waitpid(pid, 0)
+    returncode = os.waitstatus_to_exitcode(status)
+
+    # Running out of CPU time (SIGXCPU) counts as a timeout; a SIGKILL we did
+    # not send comes from the container's OOM killer
+    timed_out = timed_out or returncode == -signal.SIGXCPU
+    oom = not timed_out and returncode == -signal.SIGKILL
+
+    send({
+        "type": "result",
+        "returncode": returncode,
+        "timed_out": timed_out,
+        "oom": oom,
+        "seconds": round(time.monotonic() - start, 3)
+    })
+
+
+def bind_socket(socket_path):
+    """
+    Bind the job socket so only the group of its directory can connect
+
+    Anyone who can connect can run code in the container, so the socket gets
+    mode 0660 and the group of its directory - the group of the Django web and
+    worker users, who create the directory on the host with mode 0770.
+    """
+    socket_dir = os.path.dirname(socket_path)
+    os.makedirs(socket_dir, mode=0o770, exist_ok=True)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Never reachable by others, not even between bind() and chmod()
+    umask = os.umask(0o117)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(umask)
+
+    group = os.stat(socket_dir).st_gid
+    if os.stat(socket_path).st_gid != group:
+        os.chown(socket_path, -1, group)
+    os.chmod(socket_path, 0o660)
+    return server
+
+
+def serve(socket_path):
+    """Accept connections forever, forking a handler for each"""
+    manim_version = warm_up()
+
+    server = bind_socket(socket_path)
+    server.listen(64)
+
+    def shutdown(signum, frame):
+        try:
+            os.unlink(socket_path)
+        finally:
+            os._exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    # Handlers exit on their own - let the kernel reap them
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    print(f"Render daemon (manim {manim_version}) listening on {socket_path}", flush=True)
+
+    while True:
+        conn, _ = server.accept()
+        pid = os.fork()
+        if pid == 0:
+            server.close()
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                handle_connection(conn, manim_version)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                os._exit(0)
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Manim renders from a warm interpreter")
+    parser.add_argument(
+        "--socket-dir",
+        default=os.getenv("RENDER_DAEMON_SOCKET_DIR", "/manim/run/render_daemon"),
+        help="Directory of the unix socket, shared with the host - its group may submit jobs"
+    )
+    parser.add_argument(
+        "--name",
+        default=os.getenv("RENDER_DAEMON_NAME", socket.gethostname()),
+        help="Socket name - the host connects to <socket-dir>/<container name>.sock"
+    )
+    args = parser.parse_args()
+
+    serve(os.path.join(args.socket_dir, f"{args.name}.sock"))
+
+
+if __name__ == "__main__":
+    main()